@@ -1,10 +1,11 @@
 # back-end/app.py
-from flask import Flask, redirect
+from flask import Flask, redirect, jsonify
 from flask_cors import CORS
 from config.settings import Config
 from config.database import init_db
 from extensions import db, bcrypt, jwt, mail
 from flask_jwt_extended import JWTManager
+from utils.json_provider import ProveedorJSON
 import logging
 from logging.handlers import RotatingFileHandler
 import os
@@ -14,8 +15,10 @@ import os
 # ========================================
 from models.usuario import Usuario, PerfilUsuario, PerfilEstudiante, PerfilProfesor, PerfilAdministrador
 from models.leccion import Leccion, Actividad, leccion_multimedia
-from models.multimedia import Multimedia, ConfiguracionMultimedia
+from models.multimedia import Multimedia, ConfiguracionMultimedia, SesionSubida, cache_configuracion_multimedia
 from models.cursos import Curso, ProgresoCurso
+from models.busqueda import TerminoLeccion, EtiquetaLeccion, EtiquetaMultimedia
+from models.token_revocado import TokenRevocado
 
 # ========================================
 # IMPORTAR BLUEPRINTS
@@ -25,6 +28,13 @@ from routes.usuario_routes import usuario_bp
 from routes.leccion_routes import leccion_bp
 from routes.multimedia_routes import multimedia_bp
 from routes.curso_routes import curso_bp
+from services.procesador_multimedia import procesador_multimedia
+from services.almacenamiento_multimedia import almacenamiento_multimedia
+from utils.urls_firmadas import firmador_urls, MediosFirmados
+from services.lista_revocacion import lista_revocacion
+from services.hash_contrasenas import hash_contrasenas, ServicioSaturado
+from services.limitador_intentos import limitador_intentos
+from utils.usuario_actual import cache_usuarios, versiones_token, usuario_de_token
 
 
 def create_app(config_class=Config):
@@ -32,6 +42,11 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    # ========================================
+    # JSON (orjson si está instalado, si no la librería estándar)
+    # ========================================
+    app.json = ProveedorJSON(app)
+    
     # ========================================
     # 🔥 CONFIGURACIÓN CRÍTICA PARA MULTIMEDIA
     # ========================================
@@ -73,6 +88,14 @@ def create_app(config_class=Config):
     bcrypt.init_app(app)
     jwt.init_app(app)
     mail.init_app(app)
+    procesador_multimedia.init_app(app)
+    almacenamiento_multimedia.init_app(app)
+    firmador_urls.init_app(app)
+    cache_usuarios.init_app(app)
+    versiones_token.init_app(app)
+    lista_revocacion.init_app(app)
+    hash_contrasenas.init_app(app)
+    limitador_intentos.init_app(app)
 
     # ========================================
     # CONFIGURAR JWT
@@ -83,8 +106,28 @@ def create_app(config_class=Config):
 
     @jwt.user_lookup_loader
     def user_lookup_callback(_jwt_header, jwt_data):
-        identity = jwt_data["sub"]
-        return Usuario.query.filter_by(id=int(identity)).one_or_none()
+        # UsuarioSesion desde los claims del token (o g / caché LRU / BD) (utils/usuario_actual.py)
+        return usuario_de_token(jwt_data)
+
+    @jwt.user_lookup_error_loader
+    def user_lookup_error_callback(_jwt_header, jwt_data):
+        # Usuario borrado, o token emitido antes de cambiar su rol / estado de cuenta / contraseña
+        return jsonify({
+            "error": "La sesión ya no es válida, vuelve a iniciar sesión",
+            "codigo": "TOKEN_DESACTUALIZADO"
+        }), 401
+
+    @jwt.token_in_blocklist_loader
+    def token_revocado_callback(_jwt_header, jwt_data):
+        # Filtro de Bloom en memoria; a la BD solo si el jti puede estar revocado
+        return lista_revocacion.esta_revocado(jwt_data)
+
+    @jwt.revoked_token_loader
+    def token_revocado_respuesta(_jwt_header, jwt_data):
+        return jsonify({
+            "error": "El token fue revocado, vuelve a iniciar sesión",
+            "codigo": "TOKEN_REVOCADO"
+        }), 401
 
     # ========================================
     # LOGGING
@@ -141,6 +184,28 @@ def create_app(config_class=Config):
     # ========================================
     with app.app_context():
         init_db()
+        
+        # Configuración multimedia en memoria: una sola consulta al arrancar
+        cache_configuracion_multimedia.configurar(
+            ttl=app.config.get('CONFIG_CACHE_TTL', 300),
+            archivo_version=app.config.get('CONFIG_CACHE_ARCHIVO_VERSION')
+        )
+        try:
+            total = len(cache_configuracion_multimedia.cargar())
+            print(f"✅ Configuración multimedia en caché ({total} claves)")
+        except Exception as e:
+            print(f"⚠️ No se pudo precargar la configuración multimedia: {e}")
+        
+        # URLs firmadas (/media/...): se sirven antes de Flask, sin BD ni sesión
+        app.wsgi_app = MediosFirmados(
+            app.wsgi_app,
+            firmador_urls,
+            ruta_base=ConfiguracionMultimedia.obtener_valor('ruta_almacenamiento', 'uploads/multimedia'),
+            niveles=ConfiguracionMultimedia.obtener_entero('niveles_directorio', 2),
+            modo=app.config.get('MULTIMEDIA_MODO_ENVIO', 'python'),
+            prefijo_x_accel=app.config.get('MULTIMEDIA_X_ACCEL_PREFIJO', '/protegido/multimedia/'),
+            almacenamiento=almacenamiento_multimedia
+        )
     
     # ========================================
     # ENDPOINTS BÁSICOS
@@ -183,6 +248,7 @@ def create_app(config_class=Config):
             return {
                 'status': 'healthy',
                 'database': 'connected',
+                'json': app.json.motor,
                 'version': '3.0.0',
                 'recursos': {
                     'usuarios': total_usuarios,
@@ -190,7 +256,8 @@ def create_app(config_class=Config):
                     'lecciones': total_lecciones,
                     'actividades': total_actividades,
                     'multimedia': total_multimedia
-                }
+                },
+                'limitador_intentos': limitador_intentos.estadisticas()
             }
         except Exception as e:
             app.logger.error(f'Health check failed: {str(e)}')
@@ -214,6 +281,17 @@ def create_app(config_class=Config):
             'error': 'Archivo muy grande. Máximo: 50MB'
         }, 413
     
+    @app.errorhandler(ServicioSaturado)
+    def servicio_saturado(error):
+        # Cola de hash de contraseñas llena (services/hash_contrasenas.py)
+        respuesta = jsonify({
+            'success': False,
+            'error': 'El servidor está ocupado, inténtalo de nuevo en unos segundos',
+            'codigo': 'SERVICIO_SATURADO'
+        })
+        respuesta.headers['Retry-After'] = str(error.reintentar_en)
+        return respuesta, 503
+    
     @app.errorhandler(500)
     def internal_error(error):
         db.session.rollback()
@@ -229,9 +307,22 @@ def create_app(config_class=Config):
 # ========================================
 # CREAR LA APLICACIÓN
 # ========================================
-app = create_app()
+def __getattr__(nombre):
+    """
+    `from app import app` (scripts, gunicorn app:app) crea la aplicación
+    la primera vez que se pide. No se crea al importar el módulo: con
+    `python app.py` los procesos spawn de los pools vuelven a importarlo
+    como __mp_main__ y cada uno levantaría la aplicación entera.
+    """
+    if nombre == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
 
 if __name__ == '__main__':
+    app = create_app()
     print("\n" + "="*60)
     print("🚀 INICIANDO SPEAKLEXI v3.0")
     print("="*60)
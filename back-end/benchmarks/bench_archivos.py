@@ -0,0 +1,113 @@
+"""
+Benchmark de envío de archivos multimedia: send_file anterior vs utils/envio_archivos
+Mide peticiones por segundo de un worker (cliente de pruebas de Flask, sin red)
+Usa archivos en una carpeta temporal, no necesita MySQL
+Ejecutar: python benchmarks/bench_archivos.py [segundos_por_caso]   (default: 2)
+"""
+
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify, send_file
+from utils.envio_archivos import enviar_archivo, ArchivoNoEncontrado
+
+TAMANOS = {
+    'imagen 64 KB': ('imagen', '.png', 64 * 1024),
+    'audio 1 MB': ('audio', '.mp3', 1024 * 1024),
+    'video 8 MB': ('video', '.mp4', 8 * 1024 * 1024),
+}
+
+
+def crear_app(ruta_base, modo):
+    app = Flask(__name__)
+    app.config['MULTIMEDIA_MODO_ENVIO'] = modo
+
+    @app.route('/anterior/<path:filename>')
+    def anterior(filename):
+        # Implementación anterior de servir_archivo (sin la consulta a la BD)
+        ruta_archivo = Path(ruta_base) / filename
+        if not ruta_archivo.exists():
+            return jsonify({"error": "Archivo no encontrado"}), 404
+        if not str(ruta_archivo.resolve()).startswith(str(Path(ruta_base).resolve())):
+            return jsonify({"error": "Acceso denegado"}), 403
+        return send_file(str(ruta_archivo), as_attachment=False, mimetype=None)
+
+    @app.route('/nuevo/<path:filename>')
+    def nuevo(filename):
+        try:
+            return enviar_archivo(ruta_base, filename)
+        except ArchivoNoEncontrado:
+            return jsonify({"error": "Archivo no encontrado"}), 404
+
+    return app
+
+
+def crear_archivos(ruta_base):
+    archivos = {}
+    for caso, (carpeta, extension, tamano) in TAMANOS.items():
+        Path(ruta_base, carpeta).mkdir(parents=True, exist_ok=True)
+        nombre = f'{carpeta}/{uuid.uuid4().hex}{extension}'
+        with open(os.path.join(ruta_base, nombre), 'wb') as f:
+            f.write(os.urandom(tamano))
+        archivos[caso] = (nombre, tamano)
+    return archivos
+
+
+def medir(cliente, url, cabeceras, segundos):
+    """Peticiones por segundo y MB/s consumiendo el cuerpo completo"""
+    total, bytes_enviados = 0, 0
+    fin = time.perf_counter() + segundos
+    inicio = time.perf_counter()
+    while time.perf_counter() < fin:
+        respuesta = cliente.get(url, headers=cabeceras)
+        bytes_enviados += len(respuesta.get_data())
+        respuesta.close()
+        total += 1
+    transcurrido = time.perf_counter() - inicio
+    return total / transcurrido, bytes_enviados / transcurrido / (1024 * 1024), respuesta.status_code
+
+
+def main():
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+
+    with tempfile.TemporaryDirectory() as ruta_base:
+        archivos = crear_archivos(ruta_base)
+
+        print("BENCHMARK ENVÍO DE ARCHIVOS MULTIMEDIA (1 worker)")
+        print("=" * 88)
+        print(f"{'Caso':<44}{'anterior':>14}{'nuevo':>14}{'x-accel':>14}")
+
+        for caso, (nombre, tamano) in archivos.items():
+            cliente_python = crear_app(ruta_base, 'python').test_client()
+            cliente_accel = crear_app(ruta_base, 'x-accel').test_client()
+
+            # ETag que conoce el navegador tras la primera descarga
+            etag_anterior = cliente_python.get(f'/anterior/{nombre}').headers.get('ETag')
+            etag_nuevo = cliente_python.get(f'/nuevo/{nombre}').headers.get('ETag')
+
+            escenarios = [
+                ('GET completo', {}, {}),
+                ('Range 64 KB (seek)', {'Range': f'bytes={tamano // 2}-{tamano // 2 + 65535}'},
+                 {'Range': f'bytes={tamano // 2}-{tamano // 2 + 65535}'}),
+                ('If-None-Match (revalidación)', {'If-None-Match': etag_anterior},
+                 {'If-None-Match': etag_nuevo}),
+            ]
+            for escenario, cab_anterior, cab_nuevo in escenarios:
+                rps_a, mbs_a, cod_a = medir(cliente_python, f'/anterior/{nombre}', cab_anterior, segundos)
+                rps_n, mbs_n, cod_n = medir(cliente_python, f'/nuevo/{nombre}', cab_nuevo, segundos)
+                rps_x, _, cod_x = medir(cliente_accel, f'/nuevo/{nombre}', cab_nuevo, segundos)
+                etiqueta = f'{caso} · {escenario}'
+                print(f"{etiqueta:<44}{rps_a:>8.0f} r/s{rps_n:>10.0f} r/s{rps_x:>10.0f} r/s"
+                      f"   [{cod_a}/{cod_n}/{cod_x}] {mbs_a:.0f}→{mbs_n:.0f} MB/s")
+
+        print("\nx-accel: Flask solo emite cabeceras; nginx envía los bytes (no medido aquí)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark de búsqueda de lecciones: ILIKE '%termino%' vs índice invertido
+Usa SQLite en un archivo temporal, no necesita MySQL
+Ejecutar: python benchmarks/bench_busqueda.py [tamanos...]   (default: 10000 100000)
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from extensions import db
+from models.usuario import Usuario
+from models.cursos import Curso
+from models.leccion import Leccion, EstadoLeccion
+from models.multimedia import Multimedia
+from models.busqueda import TerminoLeccion
+from services.indice_busqueda import indice_busqueda, terminos_leccion
+
+SILABAS = ['ca', 'ción', 'ver', 'bo', 'gra', 'má', 'ti', 'pro', 'nun', 'fa', 'mi', 'lia',
+           'co', 'mi', 'da', 'via', 'jes', 'nú', 'me', 'ros', 'lo', 'res', 'ani', 'ma', 'les']
+TAMANO_VOCABULARIO = 20000
+CONSULTAS = ['cacion', 'gramati', 'verbo proti', 'pronun', 'familia comida', 'mime', 'viaj', 'nume']
+REPETICIONES = 200
+
+
+def crear_app(ruta_db):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{ruta_db}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def crear_vocabulario(rng):
+    """Palabras sintéticas con frecuencia tipo Zipf (pocas comunes, muchas raras)."""
+    palabras = list(dict.fromkeys(
+        ''.join(rng.choice(SILABAS) for _ in range(rng.randint(2, 4)))
+        for _ in range(TAMANO_VOCABULARIO * 2)
+    ))[:TAMANO_VOCABULARIO]
+    pesos = [1.0 / (rango + 1) for rango in range(len(palabras))]
+    return palabras, pesos
+
+
+def texto_aleatorio(rng, vocabulario, palabras):
+    return ' '.join(rng.choices(vocabulario[0], weights=vocabulario[1], k=palabras))
+
+
+def poblar(n, rng):
+    vocabulario = crear_vocabulario(rng)
+    profesor = Usuario(nombre='Bench', primer_apellido='Mark', correo='bench@speaklexi.com',
+                       contrasena_hash='x', rol='profesor')
+    db.session.add(profesor)
+    db.session.flush()
+    curso = Curso(nombre='Bench', nivel='A1', codigo='BENCH', profesor_id=profesor.id)
+    db.session.add(curso)
+    db.session.flush()
+
+    lote = []
+    for i in range(n):
+        lote.append({
+            'curso_id': curso.id,
+            'titulo': f"Lección {i}: {texto_aleatorio(rng, vocabulario, 3)}",
+            'descripcion': texto_aleatorio(rng, vocabulario, 12),
+            'contenido': {'secciones': [{'texto': texto_aleatorio(rng, vocabulario, 20)}]},
+            'etiquetas': texto_aleatorio(rng, vocabulario, 2).split(),
+            'orden': i,
+            'nivel': 'principiante',
+            'idioma': 'ingles',
+            'estado': 'publicada',
+            'creado_por': profesor.id,
+            'puntos_xp': 50,
+        })
+        if len(lote) == 5000:
+            db.session.execute(Leccion.__table__.insert(), lote)
+            lote = []
+    if lote:
+        db.session.execute(Leccion.__table__.insert(), lote)
+    db.session.commit()
+
+    # Construir el índice en bloque
+    filas = []
+    for leccion in Leccion.query.yield_per(2000):
+        for termino, peso in terminos_leccion(leccion).items():
+            filas.append({'termino': termino, 'leccion_id': leccion.id, 'peso': peso})
+        if len(filas) >= 50000:
+            db.session.execute(TerminoLeccion.__table__.insert(), filas)
+            filas = []
+    if filas:
+        db.session.execute(TerminoLeccion.__table__.insert(), filas)
+    db.session.commit()
+
+
+def medir(funcion):
+    tiempos = []
+    for i in range(REPETICIONES):
+        consulta = CONSULTAS[i % len(CONSULTAS)]
+        inicio = time.perf_counter()
+        funcion(consulta)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return statistics.median(tiempos), tiempos[int(len(tiempos) * 0.95) - 1]
+
+
+def buscar_ilike(q):
+    like_q = f"%{q}%"
+    return (Leccion.query
+            .filter(db.or_(Leccion.titulo.ilike(like_q), Leccion.descripcion.ilike(like_q)))
+            .order_by(Leccion.orden).limit(20).all())
+
+
+def buscar_indice(q):
+    return indice_busqueda.buscar(q, limite=20)
+
+
+def ejecutar(n):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = crear_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            inicio = time.perf_counter()
+            poblar(n, random.Random(42))
+            print(f"\n📦 {n} lecciones pobladas e indexadas en {time.perf_counter() - inicio:.1f}s")
+
+            for nombre, funcion in (('ILIKE', buscar_ilike), ('Índice', buscar_indice)):
+                p50, p95 = medir(funcion)
+                print(f"   {nombre:8s} p50={p50:8.2f} ms   p95={p95:8.2f} ms")
+            db.session.remove()
+
+
+if __name__ == "__main__":
+    tamanos = [int(a) for a in sys.argv[1:]] or [10000, 100000]
+    print("=" * 60)
+    print("BENCHMARK BÚSQUEDA DE LECCIONES (SQLite)")
+    print("=" * 60)
+    for n in tamanos:
+        ejecutar(n)
@@ -0,0 +1,82 @@
+"""
+Benchmark de hash de contraseñas: logins por segundo y núcleo en el hilo vs en el pool
+Mismo camino que Usuario.check_password (services/hash_contrasenas.py), con el
+método configurado o los que se pasen. No necesita MySQL ni la BD
+Ejecutar: python benchmarks/bench_contrasenas.py [metodo ...] [--procesos=N] [--cola=N] [--logins=N] [--hilos=N]
+Ejemplo:  python benchmarks/bench_contrasenas.py scrypt:32768:8:1 scrypt:16384:8:1 pbkdf2:sha256:600000
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import Config
+from services.hash_contrasenas import HashContrasenas, ServicioSaturado
+from utils.tareas_contrasenas import generar_hash, verificar_hash
+
+PASSWORD = 'contraseña de prueba 123'
+
+
+def medir_en_hilo(metodo, repeticiones=5):
+    """Segundos de CPU de un login (verificación) sin pool"""
+    hash_actual = generar_hash(PASSWORD, metodo)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        verificar_hash(hash_actual, PASSWORD, metodo)
+    return (time.perf_counter() - inicio) / repeticiones
+
+
+def medir_en_pool(metodo, procesos, cola_maxima, logins, hilos):
+    """(logins/s, rechazados con 503) con `hilos` peticiones a la vez"""
+    servicio = HashContrasenas()
+    servicio.init_app(SimpleNamespace(config={
+        'CONTRASENA_METODO': metodo,
+        'CONTRASENA_PROCESOS': procesos,
+        'CONTRASENA_COLA_MAXIMA': cola_maxima,
+    }))
+    hash_actual = generar_hash(PASSWORD, metodo)
+    servicio.verificar(hash_actual, PASSWORD)  # Arranca los procesos fuera de la medida
+
+    def login(_):
+        try:
+            return servicio.verificar(hash_actual, PASSWORD)[0]
+        except ServicioSaturado:
+            return None
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as peticiones:
+        resultados = list(peticiones.map(login, range(logins)))
+    duracion = time.perf_counter() - inicio
+    servicio.detener(esperar=True)
+
+    correctos = sum(1 for r in resultados if r)
+    return correctos / duracion, resultados.count(None)
+
+
+def main():
+    opciones = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+    metodos = [a for a in sys.argv[1:] if not a.startswith('--')] or [Config.CONTRASENA_METODO]
+    procesos = int(opciones.get('procesos', Config.CONTRASENA_PROCESOS or 1))
+    cola_maxima = int(opciones.get('cola', procesos * 4))
+    logins = int(opciones.get('logins', 100))
+    # Por defecto, tantas peticiones a la vez como caben en la cola (más, y empiezan los 503)
+    hilos = int(opciones.get('hilos', procesos + cola_maxima))
+
+    print("BENCHMARK HASH DE CONTRASEÑAS")
+    print("=" * 88)
+    print(f"{procesos} procesos, {logins} logins, {hilos} peticiones a la vez\n")
+    print(f"{'Método':<28}{'ms/login':>10}{'hilo (por núcleo)':>20}{'pool':>12}{'pool (por núcleo)':>20}{'503':>6}")
+
+    for metodo in metodos:
+        segundos = medir_en_hilo(metodo)
+        por_segundo, rechazados = medir_en_pool(metodo, procesos, cola_maxima, logins, hilos)
+        print(f"{metodo:<28}{segundos * 1000:>10.1f}{1 / segundos:>16.1f} l/s"
+              f"{por_segundo:>8.1f} l/s{por_segundo / procesos:>16.1f} l/s{rechazados:>6}")
+
+
+if __name__ == "__main__":
+    main()
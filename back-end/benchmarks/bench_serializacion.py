@@ -0,0 +1,240 @@
+"""
+Benchmark de serialización: to_dict escrito a mano vs serializadores precompilados
+Usa SQLite en memoria, no necesita MySQL: las filas se leen de la BD como en la API
+Ejecutar: python benchmarks/bench_serializacion.py [filas]   (default: 2000)
+"""
+
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from extensions import db
+from models.usuario import Usuario
+from models.cursos import Curso, ProgresoCurso
+from models.leccion import Leccion, Actividad, NivelDificultad, EstadoLeccion, TipoActividad
+from models.multimedia import Multimedia, TipoMultimedia, EstadoMultimedia
+from models.serializacion import registro_serializadores
+
+REPETICIONES = 20
+
+
+# ========== IMPLEMENTACIONES ANTERIORES (referencia) ==========
+
+def leccion_original(self):
+    return {
+        'id': self.id,
+        'curso_id': self.curso_id,
+        'titulo': self.titulo,
+        'descripcion': self.descripcion,
+        'contenido': self.contenido,
+        'nivel': self.nivel.value if isinstance(self.nivel, NivelDificultad) else self.nivel,
+        'idioma': self.idioma,
+        'categoria': self.categoria,
+        'etiquetas': self.etiquetas or [],
+        'orden': self.orden,
+        'requisitos': self.requisitos or [],
+        'duracion_estimada': self.duracion_estimada,
+        'puntos_xp': self.puntos_xp,
+        'estado': self.estado.value if isinstance(self.estado, EstadoLeccion) else self.estado,
+        'creado_por': self.creado_por,
+        'creado_en': self.creado_en.isoformat() if getattr(self, 'creado_en', None) else None,
+        'actualizado_en': self.actualizado_en.isoformat() if getattr(self, 'actualizado_en', None) else None,
+    }
+
+
+def actividad_original(self):
+    return {
+        'id': self.id,
+        'leccion_id': self.leccion_id,
+        'tipo': self.tipo.value if isinstance(self.tipo, TipoActividad) else self.tipo,
+        'pregunta': self.pregunta,
+        'instrucciones': self.instrucciones,
+        'opciones': self.opciones,
+        'retroalimentacion': self.retroalimentacion,
+        'pista': self.pista,
+        'puntos': self.puntos,
+        'orden': self.orden,
+        'tiempo_limite': self.tiempo_limite,
+        'multimedia_id': self.multimedia_id,
+        'creado_en': self.creado_en.isoformat() if getattr(self, 'creado_en', None) else None,
+        'actualizado_en': self.actualizado_en.isoformat() if getattr(self, 'actualizado_en', None) else None,
+    }
+
+
+def multimedia_original(self):
+    return {
+        'id': self.id,
+        'nombre_archivo': self.nombre_archivo,
+        'tipo': self.tipo.value if isinstance(self.tipo, TipoMultimedia) else self.tipo,
+        'mime_type': self.mime_type,
+        'categoria': self.categoria,
+        'url': self.url,
+        'url_thumbnail': self.url_thumbnail,
+        'tamano': self.tamano,
+        'tamano_formateado': self._formatear_tamano(),
+        'duracion': self.duracion,
+        'duracion_formateada': self._formatear_duracion(),
+        'dimensiones': self.dimensiones,
+        'estado': self.estado.value if isinstance(self.estado, EstadoMultimedia) else self.estado,
+        'descripcion': self.descripcion,
+        'alt_text': self.alt_text,
+        'transcripcion': self.transcripcion,
+        'etiquetas': self.etiquetas or [],
+        'veces_usado': self.veces_usado,
+        'subido_por': self.subido_por,
+        'creado_en': self.creado_en.isoformat() if getattr(self, 'creado_en', None) else None,
+        'actualizado_en': self.actualizado_en.isoformat() if getattr(self, 'actualizado_en', None) else None,
+    }
+
+
+def curso_original(self):
+    return {
+        'id': self.id,
+        'nombre': self.nombre,
+        'nivel': self.nivel,
+        'descripcion': self.descripcion,
+        'idioma': self.idioma,
+        'codigo': self.codigo,
+        'profesor_id': self.profesor_id,
+        'imagen_portada': self.imagen_portada,
+        'orden': self.orden,
+        'activo': self.activo,
+        'total_lecciones': self.total_lecciones,
+        'duracion_estimada_total': self.duracion_estimada_total,
+        'requisitos_previos': self.requisitos_previos or [],
+        'objetivos_aprendizaje': self.objetivos_aprendizaje or [],
+        'creado_en': self.creado_en.isoformat() if self.creado_en else None,
+        'actualizado_en': self.actualizado_en.isoformat() if self.actualizado_en else None
+    }
+
+
+def progreso_original(self):
+    return {
+        'id': self.id,
+        'usuario_id': self.usuario_id,
+        'curso_id': self.curso_id,
+        'lecciones_completadas': self.lecciones_completadas,
+        'lecciones_totales': self.lecciones_totales,
+        'porcentaje_completado': float(self.porcentaje_completado) if self.porcentaje_completado else 0.0,
+        'fecha_inicio': self.fecha_inicio.isoformat() if self.fecha_inicio else None,
+        'fecha_completado': self.fecha_completado.isoformat() if self.fecha_completado else None,
+        'estado': self.estado,
+        'tiempo_dedicado': self.tiempo_dedicado,
+        'puntuacion_promedio': float(self.puntuacion_promedio) if self.puntuacion_promedio else None,
+        'ultima_leccion_id': self.ultima_leccion_id
+    }
+
+
+# ========== DATOS DE PRUEBA ==========
+
+def crear_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def crear_filas(n):
+    ahora = datetime(2024, 1, 1, 12, 0, 0)
+    lecciones, actividades, recursos, cursos, progresos = [], [], [], [], []
+    for i in range(n):
+        fecha = ahora + timedelta(minutes=i)
+        lecciones.append(Leccion(
+            id=i + 1, curso_id=i % 10, titulo=f'Lección {i}', descripcion='Vocabulario básico',
+            contenido={'secciones': [{'texto': 'hola mundo ' * 20}] * 3},
+            nivel=NivelDificultad.PRINCIPIANTE, idioma='ingles', categoria='vocabulario',
+            etiquetas=['verbos', 'a1'] if i % 2 else None, orden=i, requisitos=[],
+            duracion_estimada=10, puntos_xp=50, estado=EstadoLeccion.PUBLICADA,
+            creado_por=1, creado_en=fecha, actualizado_en=fecha
+        ))
+        actividades.append(Actividad(
+            id=i + 1, leccion_id=i + 1, tipo=TipoActividad.MULTIPLE_CHOICE, pregunta='¿?',
+            opciones={'a': 1, 'b': 2}, respuesta_correcta='a', retroalimentacion={},
+            puntos=10, orden=1, creado_en=fecha, actualizado_en=fecha
+        ))
+        recursos.append(Multimedia(
+            id=i + 1, nombre_archivo=f'img{i}.png', nombre_almacenado=f'x{i}.png',
+            tipo=TipoMultimedia.IMAGEN, mime_type='image/png', url=f'/u/{i}.png',
+            tamano=1024 * (i + 1), duracion=i % 300, estado=EstadoMultimedia.DISPONIBLE,
+            etiquetas=['animales'], veces_usado=i, subido_por=1,
+            creado_en=fecha, actualizado_en=fecha
+        ))
+        cursos.append(Curso(
+            id=i + 1, nombre=f'Curso {i}', nivel='A1', idioma='ingles', codigo=f'C{i}',
+            profesor_id=1, orden=i, activo=True, total_lecciones=10,
+            duracion_estimada_total=100, requisitos_previos=None,
+            objetivos_aprendizaje=['hablar'], creado_en=fecha, actualizado_en=fecha
+        ))
+        progresos.append(ProgresoCurso(
+            id=i + 1, usuario_id=i, curso_id=i % 10, lecciones_completadas=3,
+            lecciones_totales=10, porcentaje_completado=Decimal('30.00'),
+            fecha_inicio=date(2024, 1, 1), estado='en_progreso', tiempo_dedicado=40,
+            puntuacion_promedio=Decimal('85.50') if i % 2 else None
+        ))
+    for grupo in (lecciones, actividades, recursos, cursos, progresos):
+        db.session.add_all(grupo)
+    db.session.commit()
+    db.session.expunge_all()
+
+    # Instancias recién cargadas, igual que en un listado real
+    lecciones = Leccion.query.all()
+    actividades = Actividad.query.all()
+    recursos = Multimedia.query.all()
+    cursos = Curso.query.all()
+    progresos = ProgresoCurso.query.all()
+
+    return {
+        'Leccion': (lecciones, leccion_original, 'completa'),
+        'Actividad': (actividades, actividad_original, 'base'),
+        'Multimedia': (recursos, multimedia_original, 'base'),
+        'Curso': (cursos, curso_original, 'base'),
+        'ProgresoCurso': (progresos, progreso_original, 'base')
+    }
+
+
+def medir(funcion):
+    mejor = float('inf')
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    app = crear_app()
+    with app.app_context():
+        db.create_all()
+        ejecutar(crear_filas(filas), filas)
+
+
+def ejecutar(datos, filas):
+    print("BENCHMARK SERIALIZACIÓN DE MODELOS")
+    print("=" * 72)
+    print(f"{filas} filas por modelo, mejor de {REPETICIONES} repeticiones\n")
+    print(f"{'Modelo':<15}{'to_dict original':>18}{'precompilado':>15}{'lista bulk':>14}{'mejora':>10}")
+
+    for nombre, (instancias, original, vista) in datos.items():
+        serializar = registro_serializadores.obtener(type(instancias[0]), vista)
+
+        # Ambas rutas deben producir exactamente lo mismo
+        for instancia in instancias[:50]:
+            assert serializar(instancia) == original(instancia), nombre
+
+        t_original = medir(lambda: [original(x) for x in instancias])
+        t_compilado = medir(lambda: [serializar(x) for x in instancias])
+        t_bulk = medir(lambda: registro_serializadores.serializar_lista(instancias, vista))
+
+        print(f"{nombre:<15}{t_original:>15.2f} ms{t_compilado:>12.2f} ms"
+              f"{t_bulk:>11.2f} ms{t_original / t_bulk:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
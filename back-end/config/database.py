@@ -11,6 +11,13 @@ load_dotenv()
 
 # Importar db desde extensions (instancia única)
 from extensions import db
+from sqlalchemy.dialects import mysql
+
+# Fecha con microsegundos (DATETIME de MySQL redondea al segundo). Para
+# actualizado_en de lo que tiene ETag (utils/cache_http.py): dos cambios en
+# el mismo segundo deben dar otra versión.
+# En BDs ya creadas: python scripts/migrar_precision_fechas.py
+FechaPrecisa = db.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql', 'mariadb')
 
 
 def init_db():
@@ -23,7 +23,20 @@ SECRET_KEY_ENV = os.getenv('SECRET_KEY', 'clave_super_secreta_por_defecto')
 DEBUG_ENV = os.getenv('DEBUG', 'True').lower() == 'true' # Convertir a booleano
 
 JWT_SECRET_KEY_ENV = os.getenv('JWT_SECRET_KEY', SECRET_KEY_ENV) # Usa SECRET_KEY_ENV como fallback
-JWT_ACCESS_TOKEN_EXPIRES_ENV = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 3600))
+JWT_ACCESS_TOKEN_EXPIRES_ENV = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 900))  # Corto: se renueva con /api/auth/refresh
+JWT_REFRESH_TOKEN_EXPIRES_ENV = int(os.getenv('JWT_REFRESH_TOKEN_EXPIRES', 30 * 24 * 3600))
+JWT_REVOCADOS_INTERVALO_ENV = int(os.getenv('JWT_REVOCADOS_INTERVALO', 5))
+JWT_REVOCADOS_CAPACIDAD_ENV = int(os.getenv('JWT_REVOCADOS_CAPACIDAD', 100000))
+JWT_REVOCADOS_MARGEN_ENV = int(os.getenv('JWT_REVOCADOS_MARGEN', 60))
+
+CONTRASENA_METODO_ENV = os.getenv('CONTRASENA_METODO', 'scrypt:32768:8:1')  # Formato de werkzeug
+CONTRASENA_PROCESOS_ENV = int(os.getenv('CONTRASENA_PROCESOS', os.cpu_count() or 1))  # 0 = en el hilo de la petición
+CONTRASENA_COLA_MAXIMA_ENV = int(os.getenv('CONTRASENA_COLA_MAXIMA', CONTRASENA_PROCESOS_ENV * 4))
+
+LIMITADOR_ACTIVO_ENV = os.getenv('LIMITADOR_ACTIVO', 'True').lower() == 'true'
+LIMITADOR_BACKEND_ENV = os.getenv('LIMITADOR_BACKEND', 'local')  # local | redis
+LIMITADOR_REDIS_URL_ENV = os.getenv('LIMITADOR_REDIS_URL')
+LIMITADOR_PROXIES_ENV = int(os.getenv('LIMITADOR_PROXIES', 0))  # Proxies delante de la app (X-Forwarded-For)
 
 MAIL_SERVER_ENV = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
 MAIL_PORT_ENV = int(os.getenv('MAIL_PORT', 587))
@@ -38,6 +51,36 @@ ALLOWED_EXTENSIONS_ENV = set(os.getenv('ALLOWED_EXTENSIONS', 'png,jpg,jpeg,gif,m
 
 CORS_ORIGINS_ENV = os.getenv('CORS_ORIGINS', 'http://localhost:3000').split(',')
 
+JSON_USAR_ORJSON_ENV = os.getenv('JSON_USAR_ORJSON', 'True').lower() == 'true'
+
+CONFIG_CACHE_TTL_ENV = int(os.getenv('CONFIG_CACHE_TTL', 300))
+CONFIG_CACHE_ARCHIVO_VERSION_ENV = os.getenv('CONFIG_CACHE_ARCHIVO_VERSION')  # None = carpeta temporal
+
+USUARIO_CACHE_TTL_ENV = int(os.getenv('USUARIO_CACHE_TTL', 30))  # 0 = sin caché entre peticiones
+USUARIO_CACHE_MAXIMO_ENV = int(os.getenv('USUARIO_CACHE_MAXIMO', 4096))
+JWT_VERSIONES_INTERVALO_ENV = int(os.getenv('JWT_VERSIONES_INTERVALO', 30))
+
+MULTIMEDIA_MODO_ENVIO_ENV = os.getenv('MULTIMEDIA_MODO_ENVIO', 'python')  # python | x-accel | x-sendfile
+MULTIMEDIA_X_ACCEL_PREFIJO_ENV = os.getenv('MULTIMEDIA_X_ACCEL_PREFIJO', '/protegido/multimedia/')
+MULTIMEDIA_PROCESOS_ENV = int(os.getenv('MULTIMEDIA_PROCESOS', 2))  # 0 = sin miniaturas
+MULTIMEDIA_CONTEXTO_PROCESOS_ENV = os.getenv('MULTIMEDIA_CONTEXTO_PROCESOS', 'spawn')
+
+MULTIMEDIA_ALMACENAMIENTO_ENV = os.getenv('MULTIMEDIA_ALMACENAMIENTO', 'local')  # local | s3
+MULTIMEDIA_S3_BUCKET_ENV = os.getenv('MULTIMEDIA_S3_BUCKET')
+MULTIMEDIA_S3_PREFIJO_ENV = os.getenv('MULTIMEDIA_S3_PREFIJO', '')
+MULTIMEDIA_S3_ENDPOINT_ENV = os.getenv('MULTIMEDIA_S3_ENDPOINT')  # MinIO: http://localhost:9000
+MULTIMEDIA_S3_REGION_ENV = os.getenv('MULTIMEDIA_S3_REGION')
+MULTIMEDIA_S3_ACCESS_KEY_ENV = os.getenv('MULTIMEDIA_S3_ACCESS_KEY')  # None = credenciales de boto3
+MULTIMEDIA_S3_SECRET_KEY_ENV = os.getenv('MULTIMEDIA_S3_SECRET_KEY')
+MULTIMEDIA_S3_EXPIRACION_URL_ENV = int(os.getenv('MULTIMEDIA_S3_EXPIRACION_URL', 3600))
+MULTIMEDIA_S3_UMBRAL_MULTIPARTE_ENV = int(os.getenv('MULTIMEDIA_S3_UMBRAL_MULTIPARTE', 16 * 1024 * 1024))
+MULTIMEDIA_S3_TAMANO_PARTE_ENV = int(os.getenv('MULTIMEDIA_S3_TAMANO_PARTE', 8 * 1024 * 1024))
+
+MULTIMEDIA_FIRMA_SECRETO_ENV = os.getenv('MULTIMEDIA_FIRMA_SECRETO')  # None = SECRET_KEY
+MULTIMEDIA_FIRMA_PREFIJO_ENV = os.getenv('MULTIMEDIA_FIRMA_PREFIJO', '/media/')
+MULTIMEDIA_FIRMA_DURACION_ENV = int(os.getenv('MULTIMEDIA_FIRMA_DURACION', 3600))
+MULTIMEDIA_FIRMA_VENTANA_ENV = int(os.getenv('MULTIMEDIA_FIRMA_VENTANA', 300))
+
 # ==========================================================
 # CLASE CONFIG PARA FLASK
 # ==========================================================
@@ -57,6 +100,22 @@ class Config:
     # JWT
     JWT_SECRET_KEY = JWT_SECRET_KEY_ENV
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=JWT_ACCESS_TOKEN_EXPIRES_ENV)
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(seconds=JWT_REFRESH_TOKEN_EXPIRES_ENV)
+    # Lista de revocación: logout y refresh tokens usados (services/lista_revocacion.py)
+    JWT_REVOCADOS_INTERVALO = JWT_REVOCADOS_INTERVALO_ENV
+    JWT_REVOCADOS_CAPACIDAD = JWT_REVOCADOS_CAPACIDAD_ENV
+    JWT_REVOCADOS_MARGEN = JWT_REVOCADOS_MARGEN_ENV
+
+    # Hash de contraseñas en un pool de procesos (services/hash_contrasenas.py)
+    CONTRASENA_METODO = CONTRASENA_METODO_ENV
+    CONTRASENA_PROCESOS = CONTRASENA_PROCESOS_ENV
+    CONTRASENA_COLA_MAXIMA = CONTRASENA_COLA_MAXIMA_ENV
+
+    # Límite de intentos de login / verificación (services/limitador_intentos.py)
+    LIMITADOR_ACTIVO = LIMITADOR_ACTIVO_ENV
+    LIMITADOR_BACKEND = LIMITADOR_BACKEND_ENV
+    LIMITADOR_REDIS_URL = LIMITADOR_REDIS_URL_ENV
+    LIMITADOR_PROXIES = LIMITADOR_PROXIES_ENV
     # Configuración CSRF (deshabilitado como antes)
     JWT_CSRF_CHECK_FORM = False
     JWT_CSRF_IN_COOKIES = False
@@ -84,6 +143,44 @@ class Config:
     # CORS (Aunque flask_cors lo maneja en app.py, lo mantenemos aquí por consistencia)
     CORS_ORIGINS = CORS_ORIGINS_ENV
 
+    # JSON: usar orjson si está instalado (utils/json_provider.py)
+    JSON_USAR_ORJSON = JSON_USAR_ORJSON_ENV
+
+    # Caché de ConfiguracionMultimedia (utils/cache_configuracion.py)
+    CONFIG_CACHE_TTL = CONFIG_CACHE_TTL_ENV
+    CONFIG_CACHE_ARCHIVO_VERSION = CONFIG_CACHE_ARCHIVO_VERSION_ENV
+
+    # Usuario actual de las rutas con JWT (utils/usuario_actual.py)
+    USUARIO_CACHE_TTL = USUARIO_CACHE_TTL_ENV
+    USUARIO_CACHE_MAXIMO = USUARIO_CACHE_MAXIMO_ENV
+    JWT_VERSIONES_INTERVALO = JWT_VERSIONES_INTERVALO_ENV
+
+    # Envío de archivos multimedia (utils/envio_archivos.py)
+    MULTIMEDIA_MODO_ENVIO = MULTIMEDIA_MODO_ENVIO_ENV
+    MULTIMEDIA_X_ACCEL_PREFIJO = MULTIMEDIA_X_ACCEL_PREFIJO_ENV
+
+    # Miniaturas y variantes WebP en segundo plano (services/procesador_multimedia.py)
+    MULTIMEDIA_PROCESOS = MULTIMEDIA_PROCESOS_ENV
+    MULTIMEDIA_CONTEXTO_PROCESOS = MULTIMEDIA_CONTEXTO_PROCESOS_ENV
+
+    # Backend de almacenamiento multimedia (services/almacenamiento_multimedia.py)
+    MULTIMEDIA_ALMACENAMIENTO = MULTIMEDIA_ALMACENAMIENTO_ENV
+    MULTIMEDIA_S3_BUCKET = MULTIMEDIA_S3_BUCKET_ENV
+    MULTIMEDIA_S3_PREFIJO = MULTIMEDIA_S3_PREFIJO_ENV
+    MULTIMEDIA_S3_ENDPOINT = MULTIMEDIA_S3_ENDPOINT_ENV
+    MULTIMEDIA_S3_REGION = MULTIMEDIA_S3_REGION_ENV
+    MULTIMEDIA_S3_ACCESS_KEY = MULTIMEDIA_S3_ACCESS_KEY_ENV
+    MULTIMEDIA_S3_SECRET_KEY = MULTIMEDIA_S3_SECRET_KEY_ENV
+    MULTIMEDIA_S3_EXPIRACION_URL = MULTIMEDIA_S3_EXPIRACION_URL_ENV
+    MULTIMEDIA_S3_UMBRAL_MULTIPARTE = MULTIMEDIA_S3_UMBRAL_MULTIPARTE_ENV
+    MULTIMEDIA_S3_TAMANO_PARTE = MULTIMEDIA_S3_TAMANO_PARTE_ENV
+
+    # URLs de multimedia firmadas con HMAC (utils/urls_firmadas.py)
+    MULTIMEDIA_FIRMA_SECRETO = MULTIMEDIA_FIRMA_SECRETO_ENV
+    MULTIMEDIA_FIRMA_PREFIJO = MULTIMEDIA_FIRMA_PREFIJO_ENV
+    MULTIMEDIA_FIRMA_DURACION = MULTIMEDIA_FIRMA_DURACION_ENV
+    MULTIMEDIA_FIRMA_VENTANA = MULTIMEDIA_FIRMA_VENTANA_ENV
+
 
 # ==========================================================
 # IMPRIMIR CONFIGURACIÓN AL INICIAR (Solo en desarrollo)
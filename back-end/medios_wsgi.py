@@ -0,0 +1,42 @@
+# back-end/medios_wsgi.py
+"""
+Servidor mínimo de URLs firmadas (/media/...) sin Flask, BD ni sesión
+
+Permite sacar el tráfico de multimedia de los workers de la aplicación:
+
+    gunicorn -w 4 medios_wsgi:aplicacion
+
+y en nginx enviar /media/ a este proceso. Con MULTIMEDIA_MODO_ENVIO=x-accel
+solo comprueba la firma y nginx envía los bytes (location internal, ver
+utils/envio_archivos.py).
+
+Variables de entorno (además de las MULTIMEDIA_FIRMA_* de config/settings.py):
+    MULTIMEDIA_RUTA_ALMACENAMIENTO: carpeta de los archivos (default: uploads/multimedia)
+    MULTIMEDIA_NIVELES_DIRECTORIO: niveles de subcarpetas (default: 2)
+"""
+
+import os
+
+from config.settings import Config
+from utils.urls_firmadas import FirmadorUrls, MediosFirmados
+
+firmador = FirmadorUrls(
+    Config.MULTIMEDIA_FIRMA_SECRETO or Config.SECRET_KEY,
+    Config.MULTIMEDIA_FIRMA_PREFIJO,
+    Config.MULTIMEDIA_FIRMA_DURACION,
+    Config.MULTIMEDIA_FIRMA_VENTANA
+)
+
+aplicacion = MediosFirmados(
+    None,
+    firmador,
+    ruta_base=os.getenv('MULTIMEDIA_RUTA_ALMACENAMIENTO', 'uploads/multimedia'),
+    niveles=int(os.getenv('MULTIMEDIA_NIVELES_DIRECTORIO', 2)),
+    modo=Config.MULTIMEDIA_MODO_ENVIO,
+    prefijo_x_accel=Config.MULTIMEDIA_X_ACCEL_PREFIJO
+)
+
+
+if __name__ == '__main__':
+    from werkzeug.serving import run_simple
+    run_simple('0.0.0.0', int(os.getenv('PUERTO_MEDIOS', 5001)), aplicacion, threaded=True)
@@ -5,8 +5,9 @@ Modelos de la aplicación SpeakLexi
 
 from models.usuario import Usuario, PerfilUsuario, PerfilEstudiante, PerfilProfesor, PerfilAdministrador
 from models.leccion import Leccion, Actividad, NivelDificultad, TipoActividad, EstadoLeccion
-from models.multimedia import Multimedia
+from models.multimedia import Multimedia, SesionSubida
 from models.cursos import Curso, ProgresoCurso  # ← AGREGAR
+from models.busqueda import TerminoLeccion, EtiquetaLeccion, EtiquetaMultimedia
 
 __all__ = [
     'Usuario',
@@ -20,6 +21,10 @@ __all__ = [
     'TipoActividad',
     'EstadoLeccion',
     'Multimedia',
+    'SesionSubida',
     'Curso',  # ← AGREGAR
-    'ProgresoCurso'  # ← AGREGAR
+    'ProgresoCurso',  # ← AGREGAR
+    'TerminoLeccion',
+    'EtiquetaLeccion',
+    'EtiquetaMultimedia'
 ]
\ No newline at end of file
@@ -4,6 +4,7 @@ Evita duplicación de código en todos los modelos
 """
 
 from extensions import db
+from models.serializacion import registro_serializadores
 from datetime import datetime
 from typing import Dict, Any
 
@@ -36,29 +37,11 @@ class SerializableMixin:
         """
         Convierte el modelo a diccionario (campos básicos)
         Excluye contraseñas y campos sensibles automáticamente
-        """
-        result = {}
-        
-        # Lista de campos a excluir siempre
-        exclude_fields = {'password_hash', 'password', '_sa_instance_state'}
         
-        for column in self.__table__.columns:
-            field_name = column.name
-            
-            # Saltar campos excluidos
-            if field_name in exclude_fields:
-                continue
-            
-            value = getattr(self, field_name)
-            
-            # Convertir datetime a string ISO
-            if isinstance(value, datetime):
-                result[field_name] = value.isoformat()
-            # Convertir otros objetos a su representación
-            else:
-                result[field_name] = value
-        
-        return result
+        Usa el serializador precompilado del modelo (se genera una vez
+        por clase con los conversores de cada columna ya resueltos)
+        """
+        return registro_serializadores.serializar(self)
 
 
 class ModelHelpers:
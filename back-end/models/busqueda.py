@@ -0,0 +1,73 @@
+# back-end/models/busqueda.py
+from __future__ import annotations
+
+from config.database import db
+
+
+class TerminoLeccion(db.Model):
+    """
+    Índice invertido de búsqueda: término normalizado -> lección.
+
+    Cada fila indica que una lección contiene un término (ya sin acentos
+    y en minúsculas) con un peso acumulado según el campo donde aparece.
+    La clave primaria (termino, leccion_id) permite buscar por igualdad
+    y por prefijo (termino LIKE 'abc%') usando el índice.
+    """
+    __tablename__ = 'indice_terminos_lecciones'
+
+    LONGITUD_MAXIMA = 64
+
+    termino = db.Column(db.String(LONGITUD_MAXIMA), primary_key=True)
+    leccion_id = db.Column(
+        db.Integer,
+        db.ForeignKey('lecciones.id', ondelete='CASCADE'),
+        primary_key=True,
+        index=True
+    )
+    peso = db.Column(db.Integer, nullable=False, default=1)
+
+    def __repr__(self) -> str:
+        return f'<TerminoLeccion {self.termino} -> {self.leccion_id} ({self.peso})>'
+
+
+class EtiquetaLeccion(db.Model):
+    """
+    Índice de etiquetas de lecciones: etiqueta normalizada -> lección.
+
+    Refleja Leccion.etiquetas (columna JSON, no indexable) en una tabla
+    normalizada para filtrar por varias etiquetas y contar facetas.
+    """
+    __tablename__ = 'etiquetas_lecciones'
+
+    LONGITUD_MAXIMA = 100
+
+    etiqueta = db.Column(db.String(LONGITUD_MAXIMA), primary_key=True)
+    leccion_id = db.Column(
+        db.Integer,
+        db.ForeignKey('lecciones.id', ondelete='CASCADE'),
+        primary_key=True,
+        index=True
+    )
+
+    def __repr__(self) -> str:
+        return f'<EtiquetaLeccion {self.etiqueta} -> {self.leccion_id}>'
+
+
+class EtiquetaMultimedia(db.Model):
+    """
+    Índice de etiquetas de multimedia: etiqueta normalizada -> recurso.
+    """
+    __tablename__ = 'etiquetas_multimedia'
+
+    LONGITUD_MAXIMA = 100
+
+    etiqueta = db.Column(db.String(LONGITUD_MAXIMA), primary_key=True)
+    multimedia_id = db.Column(
+        db.Integer,
+        db.ForeignKey('multimedia.id', ondelete='CASCADE'),
+        primary_key=True,
+        index=True
+    )
+
+    def __repr__(self) -> str:
+        return f'<EtiquetaMultimedia {self.etiqueta} -> {self.multimedia_id}>'
@@ -1,6 +1,9 @@
 # back-end/models/cursos.py
 from extensions import db
+from config.database import FechaPrecisa
+from models.serializacion import registro_serializadores
 from sqlalchemy.dialects.mysql import JSON
+from sqlalchemy.orm import joinedload
 from datetime import datetime, date
 from decimal import Decimal
 
@@ -24,7 +27,7 @@ class Curso(db.Model):
     requisitos_previos = db.Column(JSON)
     objetivos_aprendizaje = db.Column(JSON)
     creado_en = db.Column(db.DateTime, default=datetime.utcnow)
-    actualizado_en = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    actualizado_en = db.Column(FechaPrecisa, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relaciones
     lecciones = db.relationship('Leccion', backref='curso', lazy='dynamic')
@@ -33,24 +36,7 @@ class Curso(db.Model):
     
     def to_dict(self, incluir_lecciones=False, incluir_profesor=False):
         """Convierte el curso a diccionario"""
-        data = {
-            'id': self.id,
-            'nombre': self.nombre,
-            'nivel': self.nivel,
-            'descripcion': self.descripcion,
-            'idioma': self.idioma,
-            'codigo': self.codigo,
-            'profesor_id': self.profesor_id,
-            'imagen_portada': self.imagen_portada,
-            'orden': self.orden,
-            'activo': self.activo,
-            'total_lecciones': self.total_lecciones,
-            'duracion_estimada_total': self.duracion_estimada_total,
-            'requisitos_previos': self.requisitos_previos or [],
-            'objetivos_aprendizaje': self.objetivos_aprendizaje or [],
-            'creado_en': self.creado_en.isoformat() if self.creado_en else None,
-            'actualizado_en': self.actualizado_en.isoformat() if self.actualizado_en else None
-        }
+        data = _serializar_curso(self)
         
         if incluir_profesor and self.profesor:
             data['profesor'] = {
@@ -61,9 +47,9 @@ class Curso(db.Model):
             }
         
         if incluir_lecciones:
-            from models.leccion import Leccion
-            lecciones = Leccion.query.filter_by(curso_id=self.id).order_by(Leccion.orden).all()
-            data['lecciones'] = [l.to_dict() for l in lecciones]
+            from models.leccion import Leccion, VISTA_RESUMEN
+            lecciones = Leccion.query_resumen().filter_by(curso_id=self.id).order_by(Leccion.orden).all()
+            data['lecciones'] = registro_serializadores.serializar_lista(lecciones, VISTA_RESUMEN)
         
         return data
     
@@ -117,22 +103,25 @@ class ProgresoCurso(db.Model):
         db.UniqueConstraint('usuario_id', 'curso_id', name='unique_usuario_curso'),
     )
     
+    @classmethod
+    def opciones_carga(cls, incluir_curso=False, incluir_usuario=False):
+        """
+        Opciones de carga (joinedload) para las relaciones que usará to_dict()
+        con los mismos flags, así un listado se resuelve en una sola consulta.
+        
+        Ejemplo:
+            ProgresoCurso.query.options(*ProgresoCurso.opciones_carga(incluir_curso=True))
+        """
+        opciones = []
+        if incluir_curso:
+            opciones.append(joinedload(cls.curso))
+        if incluir_usuario:
+            opciones.append(joinedload(cls.usuario))
+        return opciones
+    
     def to_dict(self, incluir_curso=False, incluir_usuario=False):
         """Convierte el progreso a diccionario"""
-        data = {
-            'id': self.id,
-            'usuario_id': self.usuario_id,
-            'curso_id': self.curso_id,
-            'lecciones_completadas': self.lecciones_completadas,
-            'lecciones_totales': self.lecciones_totales,
-            'porcentaje_completado': float(self.porcentaje_completado) if self.porcentaje_completado else 0.0,
-            'fecha_inicio': self.fecha_inicio.isoformat() if self.fecha_inicio else None,
-            'fecha_completado': self.fecha_completado.isoformat() if self.fecha_completado else None,
-            'estado': self.estado,
-            'tiempo_dedicado': self.tiempo_dedicado,
-            'puntuacion_promedio': float(self.puntuacion_promedio) if self.puntuacion_promedio else None,
-            'ultima_leccion_id': self.ultima_leccion_id
-        }
+        data = _serializar_progreso(self)
         
         if incluir_curso and self.curso:
             data['curso'] = self.curso.to_dict()
@@ -161,3 +150,25 @@ class ProgresoCurso(db.Model):
     
     def __repr__(self):
         return f'<ProgresoCurso Usuario:{self.usuario_id} Curso:{self.curso_id} {self.porcentaje_completado}%>'
+
+
+# -------------------- Serializadores precompilados --------------------
+_serializar_curso = registro_serializadores.registrar(
+    Curso, 'base',
+    campos=[
+        'id', 'nombre', 'nivel', 'descripcion', 'idioma', 'codigo', 'profesor_id',
+        'imagen_portada', 'orden', 'activo', 'total_lecciones', 'duracion_estimada_total',
+        'requisitos_previos', 'objetivos_aprendizaje', 'creado_en', 'actualizado_en'
+    ],
+    por_defecto={'requisitos_previos': [], 'objetivos_aprendizaje': []}
+)
+
+_serializar_progreso = registro_serializadores.registrar(
+    ProgresoCurso, 'base',
+    campos=[
+        'id', 'usuario_id', 'curso_id', 'lecciones_completadas', 'lecciones_totales',
+        'porcentaje_completado', 'fecha_inicio', 'fecha_completado', 'estado',
+        'tiempo_dedicado', 'puntuacion_promedio', 'ultima_leccion_id'
+    ],
+    por_defecto={'porcentaje_completado': 0.0, 'puntuacion_promedio': None}
+)
@@ -3,8 +3,10 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-from config.database import db
+from config.database import db, FechaPrecisa
+from models.serializacion import registro_serializadores
 from sqlalchemy import Enum as SQLEnum
+from sqlalchemy.orm import defer, selectinload
 import enum
 
 
@@ -13,7 +15,7 @@ class TimestampMixin:
     """Mixin para columnas de auditoría comunes."""
     creado_en = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     actualizado_en = db.Column(
-        db.DateTime,
+        FechaPrecisa,
         default=datetime.utcnow,
         onupdate=datetime.utcnow,
         nullable=False,
@@ -23,7 +25,7 @@ class TimestampMixin:
 class SerializableMixin:
     """Mixin simple para exponer to_dict (puede ser sobreescrito)."""
     def to_dict_base(self) -> Dict[str, Any]:
-        return {}
+        return registro_serializadores.serializar(self)
 
 
 # -------------------- Enums --------------------
@@ -52,6 +54,14 @@ class EstadoLeccion(enum.Enum):
     ARCHIVADA = "archivada"
 
 
+# -------------------- Vistas de serialización --------------------
+# 'resumen' omite `contenido` (el JSON pesado) y es la vista de los listados;
+# 'completa' solo se usa al pedir una lección concreta.
+VISTA_RESUMEN = 'resumen'
+VISTA_COMPLETA = 'completa'
+VISTAS_LECCION = (VISTA_RESUMEN, VISTA_COMPLETA)
+
+
 # -------------------- Models: Leccion + Actividad --------------------
 class Leccion(db.Model, TimestampMixin, SerializableMixin):
     """
@@ -139,26 +149,18 @@ class Leccion(db.Model, TimestampMixin, SerializableMixin):
         return f'<Leccion {self.id}: {self.titulo}>'
 
     # -------------------- Serialización --------------------
-    def to_dict(self, incluir_actividades: bool = False, incluir_multimedia: bool = False) -> Dict[str, Any]:
-        data: Dict[str, Any] = {
-            'id': self.id,
-            'curso_id': self.curso_id,  # ⭐ Incluir curso_id
-            'titulo': self.titulo,
-            'descripcion': self.descripcion,
-            'contenido': self.contenido,
-            'nivel': self.nivel.value if isinstance(self.nivel, NivelDificultad) else self.nivel,
-            'idioma': self.idioma,
-            'categoria': self.categoria,
-            'etiquetas': self.etiquetas or [],
-            'orden': self.orden,
-            'requisitos': self.requisitos or [],
-            'duracion_estimada': self.duracion_estimada,
-            'puntos_xp': self.puntos_xp,
-            'estado': self.estado.value if isinstance(self.estado, EstadoLeccion) else self.estado,
-            'creado_por': self.creado_por,
-            'creado_en': self.creado_en.isoformat() if getattr(self, 'creado_en', None) else None,
-            'actualizado_en': self.actualizado_en.isoformat() if getattr(self, 'actualizado_en', None) else None,
-        }
+    def to_dict(
+        self,
+        incluir_actividades: bool = False,
+        incluir_multimedia: bool = False,
+        vista: str = VISTA_COMPLETA
+    ) -> Dict[str, Any]:
+        """
+        vista='resumen' no incluye `contenido` ni lo toca, así que se puede usar
+        con Leccion.query_resumen() sin provocar una consulta por lección.
+        """
+        serializar = _serializar_leccion_resumen if vista == VISTA_RESUMEN else _serializar_leccion
+        data: Dict[str, Any] = serializar(self)
 
         if incluir_actividades:
             data['actividades'] = [actividad.to_dict() for actividad in list(self.actividades)]
@@ -173,18 +175,29 @@ class Leccion(db.Model, TimestampMixin, SerializableMixin):
     def get_by_id(cls, _id: int) -> Optional['Leccion']:
         return cls.query.get(_id)
 
+    @classmethod
+    def opciones_carga(cls, incluir_actividades: bool = False, incluir_multimedia: bool = False) -> List[Any]:
+        """
+        Opciones de carga para las relaciones que usará to_dict() con los mismos flags.
+        Con selectinload cada relación cuesta una consulta extra en total, no una por lección.
+        """
+        opciones: List[Any] = []
+        if incluir_actividades:
+            opciones.append(selectinload(cls.actividades))
+        if incluir_multimedia:
+            opciones.append(selectinload(cls.recursos_multimedia))
+        return opciones
+
+    @classmethod
+    def query_resumen(cls):
+        """Consulta que difiere la columna `contenido` (para listados en vista resumen)."""
+        return cls.query.options(defer(cls.contenido))
+
     @classmethod
     def search(cls, q: str, limit: int = 20) -> List['Leccion']:
-        """Búsqueda simple por título y descripción (case-insensitive)."""
-        like_q = f"%{q}%"
-        return (
-            cls.query.filter(
-                db.or_(cls.titulo.ilike(like_q), cls.descripcion.ilike(like_q))
-            )
-            .order_by(cls.orden)
-            .limit(limit)
-            .all()
-        )
+        """Búsqueda por relevancia usando el índice invertido (sin acentos, case-insensitive)."""
+        from services.indice_busqueda import indice_busqueda
+        return indice_busqueda.buscar(q, limite=limit)
 
     @classmethod
     def paginate(cls, page: int = 1, per_page: int = 20):
@@ -256,27 +269,8 @@ class Actividad(db.Model, TimestampMixin, SerializableMixin):
         return f'<Actividad {self.id} - {tipo_val}>'
 
     def to_dict(self, incluir_respuesta: bool = False) -> Dict[str, Any]:
-        data: Dict[str, Any] = {
-            'id': self.id,
-            'leccion_id': self.leccion_id,
-            'tipo': self.tipo.value if isinstance(self.tipo, TipoActividad) else self.tipo,
-            'pregunta': self.pregunta,
-            'instrucciones': self.instrucciones,
-            'opciones': self.opciones,
-            'retroalimentacion': self.retroalimentacion,
-            'pista': self.pista,
-            'puntos': self.puntos,
-            'orden': self.orden,
-            'tiempo_limite': self.tiempo_limite,
-            'multimedia_id': self.multimedia_id,
-            'creado_en': self.creado_en.isoformat() if getattr(self, 'creado_en', None) else None,
-            'actualizado_en': self.actualizado_en.isoformat() if getattr(self, 'actualizado_en', None) else None,
-        }
-
-        if incluir_respuesta:
-            data['respuesta_correcta'] = self.respuesta_correcta
-
-        return data
+        serializar = _serializar_actividad_con_respuesta if incluir_respuesta else _serializar_actividad
+        return serializar(self)
 
     def verificar_respuesta(self, respuesta_usuario: Any) -> Dict[str, Any]:
         correcta = self._comparar_respuesta(respuesta_usuario)
@@ -324,4 +318,34 @@ leccion_multimedia = db.Table(
     db.Column('multimedia_id', db.Integer, db.ForeignKey('multimedia.id', ondelete='CASCADE'), primary_key=True),
     db.Column('orden', db.Integer, default=0),
     db.Column('creado_en', db.DateTime, default=datetime.utcnow)
-)
\ No newline at end of file
+)
+
+# -------------------- Serializadores precompilados --------------------
+_CAMPOS_LECCION = [
+    'id', 'curso_id', 'titulo', 'descripcion', 'contenido', 'nivel', 'idioma',
+    'categoria', 'etiquetas', 'orden', 'requisitos', 'duracion_estimada',
+    'puntos_xp', 'estado', 'creado_por', 'creado_en', 'actualizado_en'
+]
+_DEFECTOS_LECCION = {'etiquetas': [], 'requisitos': []}
+
+_serializar_leccion = registro_serializadores.registrar(
+    Leccion, VISTA_COMPLETA, campos=_CAMPOS_LECCION, por_defecto=_DEFECTOS_LECCION
+)
+_serializar_leccion_resumen = registro_serializadores.registrar(
+    Leccion, VISTA_RESUMEN,
+    campos=[c for c in _CAMPOS_LECCION if c != 'contenido'],
+    por_defecto=_DEFECTOS_LECCION
+)
+
+_CAMPOS_ACTIVIDAD = [
+    'id', 'leccion_id', 'tipo', 'pregunta', 'instrucciones', 'opciones',
+    'retroalimentacion', 'pista', 'puntos', 'orden', 'tiempo_limite',
+    'multimedia_id', 'creado_en', 'actualizado_en'
+]
+
+_serializar_actividad = registro_serializadores.registrar(
+    Actividad, 'base', campos=_CAMPOS_ACTIVIDAD
+)
+_serializar_actividad_con_respuesta = registro_serializadores.registrar(
+    Actividad, 'con_respuesta', campos=_CAMPOS_ACTIVIDAD + ['respuesta_correcta']
+)
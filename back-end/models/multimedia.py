@@ -1,10 +1,15 @@
 # multimedia.py
 from __future__ import annotations
 from datetime import datetime
-from typing import Any, Dict, Optional
-
-from config.database import db
-from sqlalchemy import Enum as SQLEnum
+from typing import Any, Dict, List, Optional
+
+from config.database import db, FechaPrecisa
+from models.serializacion import registro_serializadores
+from utils.cache_configuracion import CacheConfiguracion
+from utils.distribucion_archivos import PREFIJO_URL
+from utils.urls_firmadas import firmador_urls
+from sqlalchemy import Enum as SQLEnum, update
+from sqlalchemy.orm.attributes import set_committed_value
 import enum
 
 
@@ -47,6 +52,8 @@ class Multimedia(db.Model):
 
     # Propiedades del archivo
     tamano = db.Column(db.Integer)  # En bytes
+    hash_sha256 = db.Column(db.String(64), index=True)  # Contenido; varios registros pueden compartir archivo
+    hash_perceptual = db.Column(db.String(16))  # dHash de imágenes (64 bits hex): detecta copias reescaladas
     duracion = db.Column(db.Integer)  # En segundos (para audio/video)
     dimensiones = db.Column(db.JSON)  # {"ancho": 1920, "alto": 1080}
 
@@ -76,7 +83,7 @@ class Multimedia(db.Model):
     subido_por = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
     creado_en = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     actualizado_en = db.Column(
-        db.DateTime,
+        FechaPrecisa,
         default=datetime.utcnow,
         onupdate=datetime.utcnow,
         nullable=False
@@ -94,38 +101,13 @@ class Multimedia(db.Model):
     def __repr__(self) -> str:
         return f'<Multimedia {self.id}: {self.nombre_archivo}>'
 
-    def to_dict(self, incluir_metadata: bool = False) -> Dict[str, Any]:
-        data: Dict[str, Any] = {
-            'id': self.id,
-            'nombre_archivo': self.nombre_archivo,
-            'tipo': self.tipo.value if isinstance(self.tipo, TipoMultimedia) else self.tipo,
-            'mime_type': self.mime_type,
-            'categoria': self.categoria,
-            'url': self.url,
-            'url_thumbnail': self.url_thumbnail,
-            'tamano': self.tamano,
-            'tamano_formateado': self._formatear_tamano(),
-            'duracion': self.duracion,
-            'duracion_formateada': self._formatear_duracion(),
-            'dimensiones': self.dimensiones,
-            'estado': self.estado.value if isinstance(self.estado, EstadoMultimedia) else self.estado,
-            'descripcion': self.descripcion,
-            'alt_text': self.alt_text,
-            'transcripcion': self.transcripcion,
-            'etiquetas': self.etiquetas or [],
-            'veces_usado': self.veces_usado,
-            'subido_por': self.subido_por,
-            'creado_en': self.creado_en.isoformat() if getattr(self, 'creado_en', None) else None,
-            'actualizado_en': self.actualizado_en.isoformat() if getattr(self, 'actualizado_en', None) else None,
-        }
-
-        if incluir_metadata:
-            data['metadata'] = self.meta_data or {}
-            data['nombre_almacenado'] = self.nombre_almacenado
-            data['ruta_local'] = self.ruta_local
-            data['mensaje_error'] = self.mensaje_error
-
-        return data
+    def to_dict(self, incluir_metadata: bool = False, firmar_urls: bool = False) -> Dict[str, Any]:
+        serializar = _serializar_multimedia_con_metadata if incluir_metadata else _serializar_multimedia
+        datos = serializar(self)
+        if firmar_urls:
+            # URLs /media/... con HMAC y caducidad: se sirven sin BD (utils/urls_firmadas.py)
+            datos = firmador_urls.firmar_recurso(datos)
+        return datos
 
     def _formatear_tamano(self) -> str:
         """Formatea el tamaño sin mutar self.tamano."""
@@ -150,6 +132,57 @@ class Multimedia(db.Model):
             return f"{horas}:{minutos:02d}:{segundos:02d}"
         return f"{minutos}:{segundos:02d}"
 
+    @property
+    def clave_almacenamiento(self) -> Optional[str]:
+        """Clave del archivo en el almacenamiento ('imagen/9f/86/<sha256>.png')"""
+        if self.url and self.url.startswith(PREFIJO_URL):
+            return self.url[len(PREFIJO_URL):]
+        return None
+
+    def claves_variantes(self) -> List[str]:
+        """Claves de la miniatura y las variantes _wNNN generadas por el procesador"""
+        urls = [self.url_thumbnail, *((self.meta_data or {}).get('variantes') or {}).values()]
+        return [url[len(PREFIJO_URL):] for url in urls if url and url.startswith(PREFIJO_URL)]
+
+    def comparte_archivo(self) -> bool:
+        """True si otro registro apunta al mismo archivo (subida deduplicada)"""
+        consulta = Multimedia.query.filter(Multimedia.id != self.id)
+        if self.hash_sha256:
+            # Usa el índice de hash (ruta_local no está indexada y cambia al
+            # migrar de distribución; el archivo deduplicado es el del hash)
+            consulta = consulta.filter(
+                Multimedia.hash_sha256 == self.hash_sha256,
+                Multimedia.tipo == self.tipo
+            )
+        elif self.ruta_local:
+            consulta = consulta.filter(Multimedia.ruta_local == self.ruta_local)
+        elif self.url:
+            consulta = consulta.filter(Multimedia.url == self.url)
+        else:
+            return False
+        return db.session.query(consulta.exists()).scalar()
+
+    def aplicar_metadatos(self, metadatos: Dict[str, Any]) -> None:
+        """Guarda lo extraído de la cabecera (utils/metadatos_multimedia.py)"""
+        if metadatos.get('dimensiones'):
+            self.dimensiones = metadatos['dimensiones']
+        if metadatos.get('duracion') is not None:
+            self.duracion = int(round(metadatos['duracion']))
+        extra = {clave: metadatos[clave] for clave in ('formato', 'bitrate') if clave in metadatos}
+        if extra:
+            self.meta_data = {**(self.meta_data or {}), **extra}
+
+    def copiar_derivados(self, original: 'Multimedia') -> None:
+        """Copia lo que el procesador sacó del archivo (subida duplicada: mismo contenido)"""
+        self.dimensiones = original.dimensiones
+        self.duracion = original.duracion
+        self.url_thumbnail = original.url_thumbnail
+        self.hash_perceptual = original.hash_perceptual
+        meta_original = original.meta_data or {}
+        extra = {clave: meta_original[clave] for clave in ('variantes', 'formato', 'bitrate') if clave in meta_original}
+        if extra:
+            self.meta_data = {**(self.meta_data or {}), **extra}
+
     def marcar_disponible(self) -> None:
         self.estado = EstadoMultimedia.DISPONIBLE
         self.actualizado_en = datetime.utcnow()
@@ -160,8 +193,28 @@ class Multimedia(db.Model):
         self.actualizado_en = datetime.utcnow()
 
     def incrementar_uso(self) -> None:
-        self.veces_usado = (self.veces_usado or 0) + 1
-        self.ultima_vez_usado = datetime.utcnow()
+        """
+        Cuenta un uso con un UPDATE directo que deja actualizado_en como
+        estaba: un contador no cambia el contenido, así que no obliga a
+        regenerar los paquetes de lecciones (su versión sale de
+        MAX(actualizado_en)). Los ETag de respuestas con los contadores los
+        incluyen aparte (agregados_uso). Además es atómico entre workers.
+        """
+        ahora = datetime.utcnow()
+        db.session.execute(
+            update(Multimedia).where(Multimedia.id == self.id).values(
+                veces_usado=db.func.coalesce(Multimedia.veces_usado, 0) + 1,
+                ultima_vez_usado=ahora,
+                actualizado_en=Multimedia.actualizado_en
+            ).execution_options(synchronize_session=False)
+        )
+        set_committed_value(self, 'veces_usado', (self.veces_usado or 0) + 1)
+        set_committed_value(self, 'ultima_vez_usado', ahora)
+
+    @staticmethod
+    def agregados_uso():
+        """SUM(veces_usado) y MAX(ultima_vez_usado), para version_de_consulta"""
+        return db.func.sum(Multimedia.veces_usado), db.func.max(Multimedia.ultima_vez_usado)
 
     def es_imagen(self) -> bool:
         return self.tipo == TipoMultimedia.IMAGEN
@@ -224,6 +277,34 @@ class Multimedia(db.Model):
         return extensiones.get(mime_type, '.bin')
 
 
+# -------------------- Serializadores precompilados --------------------
+_CAMPOS_MULTIMEDIA = [
+    'id', 'nombre_archivo', 'tipo', 'mime_type', 'categoria', 'url', 'url_thumbnail',
+    'tamano', 'tamano_formateado', 'duracion', 'duracion_formateada', 'dimensiones',
+    'estado', 'descripcion', 'alt_text', 'transcripcion', 'etiquetas', 'veces_usado',
+    'subido_por', 'creado_en', 'actualizado_en'
+]
+_CALCULADOS_MULTIMEDIA = {
+    'tamano_formateado': Multimedia._formatear_tamano,
+    'duracion_formateada': Multimedia._formatear_duracion
+}
+
+_serializar_multimedia = registro_serializadores.registrar(
+    Multimedia, 'base',
+    campos=_CAMPOS_MULTIMEDIA,
+    calculados=_CALCULADOS_MULTIMEDIA,
+    por_defecto={'etiquetas': []}
+)
+_serializar_multimedia_con_metadata = registro_serializadores.registrar(
+    Multimedia, 'metadata',
+    campos=_CAMPOS_MULTIMEDIA + [
+        ('metadata', 'meta_data'), 'nombre_almacenado', 'ruta_local', 'hash_sha256', 'mensaje_error'
+    ],
+    calculados=_CALCULADOS_MULTIMEDIA,
+    por_defecto={'etiquetas': [], 'metadata': {}}
+)
+
+
 class ConfiguracionMultimedia(db.Model):
     """
     Modelo para configuración global de multimedia.
@@ -242,8 +323,30 @@ class ConfiguracionMultimedia(db.Model):
 
     @staticmethod
     def obtener_valor(clave: str, valor_por_defecto: Optional[Any] = None) -> Any:
-        config = ConfiguracionMultimedia.query.filter_by(clave=clave).first()
-        return config.valor if config else valor_por_defecto
+        """Lee de la caché en memoria (toda la tabla, una consulta por recarga)"""
+        return cache_configuracion_multimedia.obtener(clave, valor_por_defecto)
+
+    @staticmethod
+    def obtener_entero(clave: str, valor_por_defecto: Optional[int] = None) -> Optional[int]:
+        return cache_configuracion_multimedia.obtener_entero(clave, valor_por_defecto)
+
+    @staticmethod
+    def obtener_booleano(clave: str, valor_por_defecto: bool = False) -> bool:
+        return cache_configuracion_multimedia.obtener_booleano(clave, valor_por_defecto)
+
+    @staticmethod
+    def obtener_lista(clave: str, valor_por_defecto: Optional[List[str]] = None) -> List[str]:
+        return cache_configuracion_multimedia.obtener_lista(clave, valor_por_defecto)
+
+    @staticmethod
+    def obtener_todos() -> Dict[str, str]:
+        """Copia de toda la configuración (desde la caché)"""
+        return cache_configuracion_multimedia.todos()
+
+    @staticmethod
+    def cargar_todos() -> Dict[str, str]:
+        """Toda la configuración en una sola consulta"""
+        return dict(db.session.query(ConfiguracionMultimedia.clave, ConfiguracionMultimedia.valor).all())
 
     @staticmethod
     def establecer_valor(clave: str, valor: Any, descripcion: Optional[str] = None) -> 'ConfiguracionMultimedia':
@@ -255,12 +358,54 @@ class ConfiguracionMultimedia(db.Model):
             config = ConfiguracionMultimedia(clave=clave, valor=str(valor), descripcion=descripcion)
             db.session.add(config)
         db.session.commit()
+        cache_configuracion_multimedia.establecido()
         return config
 
     def __repr__(self) -> str:
         return f'<ConfigMultimedia {self.clave}: {self.valor}>'
 
 
+class SesionSubida(db.Model):
+    """
+    Sesión de subida reanudable (por partes).
+
+    Las partes viven en disco (<ruta_almacenamiento>/.subidas/<id>/) y su
+    presencia se deduce del directorio: subir una parte no escribe en la BD.
+    """
+    __tablename__ = 'sesiones_subida'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4.hex
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False, index=True)
+    nombre_archivo = db.Column(db.String(255), nullable=False)
+    mime_type = db.Column(db.String(100), nullable=False)
+    tipo = db.Column(SQLEnum(TipoMultimedia), nullable=False)
+    tamano_total = db.Column(db.BigInteger, nullable=False)
+    tamano_parte = db.Column(db.Integer, nullable=False)
+    datos_adicionales = db.Column(db.JSON, default=dict)  # descripcion, etiquetas, ...
+    creado_en = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expira_en = db.Column(db.DateTime, nullable=False, index=True)
+
+    @property
+    def total_partes(self) -> int:
+        return max(1, -(-self.tamano_total // self.tamano_parte))
+
+    def tamano_esperado(self, indice: int) -> int:
+        """Bytes que debe tener la parte `indice` (la última puede ser menor)"""
+        if indice < self.total_partes - 1:
+            return self.tamano_parte
+        return self.tamano_total - self.tamano_parte * (self.total_partes - 1)
+
+    def expirada(self) -> bool:
+        return datetime.utcnow() >= self.expira_en
+
+    def __repr__(self) -> str:
+        return f'<SesionSubida {self.id}: {self.nombre_archivo}>'
+
+
+# Caché de ConfiguracionMultimedia compartida por el proceso (ver utils/cache_configuracion.py)
+cache_configuracion_multimedia = CacheConfiguracion(ConfiguracionMultimedia.cargar_todos)
+
+
 # Valores por defecto de configuración
 CONFIGURACION_POR_DEFECTO = {
     'max_tamano_imagen': '5242880',  # 5 MB en bytes
@@ -268,9 +413,11 @@ CONFIGURACION_POR_DEFECTO = {
     'max_tamano_video': '52428800',  # 50 MB
     'max_tamano_documento': '10485760',  # 10 MB
     'ruta_almacenamiento': 'uploads/multimedia',
+    'niveles_directorio': '2',  # subcarpetas por prefijo del nombre (0 = plano)
     'generar_thumbnails': 'true',
     'thumbnail_ancho': '300',
     'thumbnail_alto': '300',
+    'anchos_variantes_imagen': '320,640,1280',  # variantes WebP responsive
     'calidad_compresion_imagen': '85',
     'formatos_permitidos_imagen': 'jpg,jpeg,png,gif,webp',
     'formatos_permitidos_audio': 'mp3,wav,ogg',
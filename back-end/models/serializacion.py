@@ -0,0 +1,205 @@
+# back-end/models/serializacion.py
+"""
+Serializadores precompilados para los modelos de SpeakLexi
+
+Cada serializador se construye una sola vez (al importar el modelo): la
+lista de campos es fija y el conversor de cada columna (fecha, enum,
+decimal) se decide a partir de su tipo, no con isinstance por fila.
+El resultado es una función generada que lee todos los atributos de una
+vez (del estado ya cargado de la instancia) y arma el diccionario en una
+sola expresión.
+
+Uso:
+    _serializar = registro_serializadores.registrar(
+        Curso, 'base', campos=['id', 'nombre', 'creado_en'],
+        por_defecto={'requisitos_previos': []}
+    )
+    _serializar(curso)                                  # -> dict
+    registro_serializadores.serializar_lista(cursos)    # -> list[dict]
+"""
+
+from __future__ import annotations
+
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import Date, DateTime, Enum as SQLEnum, Numeric
+
+
+# Campos que nunca se serializan en el modo genérico
+CAMPOS_SENSIBLES = {'password_hash', 'password', 'contrasena_hash', '_sa_instance_state'}
+
+VISTA_BASE = 'base'
+
+Campo = Union[str, Tuple[str, str]]
+
+
+def _columnas_modelo(modelo) -> Dict[str, Any]:
+    """Atributo -> Column, sin configurar los mappers (se puede usar al importar)."""
+    return {clave: columna for clave, columna in modelo.__mapper__.columns.items()}
+
+
+def _expresion_campo(variable: str, columna, nombre_defecto: Optional[str], namespace: Dict[str, Any]) -> str:
+    """Genera la expresión Python que convierte el valor de una columna."""
+    tipo = columna.type if columna is not None else None
+
+    if isinstance(tipo, SQLEnum) and tipo.enum_class is not None:
+        clase = f'_enum_{len(namespace)}'
+        namespace[clase] = tipo.enum_class
+        convertido = f'{variable}.value if {variable}.__class__ is {clase} else {variable}'
+        return f'({convertido})'
+
+    if isinstance(tipo, (DateTime, Date)):
+        convertido = f'{variable}.isoformat()'
+    elif isinstance(tipo, Numeric):
+        convertido = f'float({variable})'
+    else:
+        convertido = variable
+
+    if nombre_defecto is not None:
+        # Mismo criterio que los to_dict escritos a mano: `valor or defecto`
+        return f'({convertido} if {variable} else {nombre_defecto})'
+    if convertido == variable:
+        return variable
+    return f'({convertido} if {variable} is not None else None)'
+
+
+def compilar_serializador(
+    modelo,
+    campos: Sequence[Campo],
+    calculados: Optional[Dict[str, Callable[[Any], Any]]] = None,
+    por_defecto: Optional[Dict[str, Any]] = None,
+    nombre: str = VISTA_BASE
+) -> Callable[[Any], Dict[str, Any]]:
+    """
+    Construye la función que serializa una instancia del modelo.
+
+    Args:
+        modelo: Clase del modelo (ya mapeada)
+        campos: Claves de salida en orden. Un str usa el atributo del mismo
+                nombre; una tupla (clave, atributo) permite renombrar.
+                Las claves presentes en `calculados` no se leen del modelo.
+        calculados: clave -> función(instancia) para valores derivados
+        por_defecto: clave -> valor si el atributo es falsy (p. ej. [] o {})
+        nombre: Nombre de la vista, solo para trazas
+
+    Returns:
+        Función serializar(instancia) -> dict
+    """
+    calculados = calculados or {}
+    por_defecto = por_defecto or {}
+    columnas = _columnas_modelo(modelo)
+
+    namespace: Dict[str, Any] = {}
+    atributos: List[str] = []
+    lineas_dict: List[str] = []
+
+    for campo in campos:
+        clave, atributo = (campo, campo) if isinstance(campo, str) else campo
+
+        if clave in calculados:
+            funcion = f'_calc_{len(namespace)}'
+            namespace[funcion] = calculados[clave]
+            lineas_dict.append(f'        {clave!r}: {funcion}(obj),')
+            continue
+
+        variable = f'v{len(atributos)}'
+        atributos.append(atributo)
+
+        nombre_defecto = None
+        if clave in por_defecto:
+            defecto = por_defecto[clave]
+            if defecto is None or defecto == [] or defecto == {}:
+                # Literal en el código: las listas/dicts vacíos se crean en cada llamada
+                nombre_defecto = repr(defecto)
+            else:
+                nombre_defecto = f'_def_{len(namespace)}'
+                namespace[nombre_defecto] = defecto
+
+        expresion = _expresion_campo(variable, columnas.get(atributo), nombre_defecto, namespace)
+        lineas_dict.append(f'        {clave!r}: {expresion},')
+
+    lineas = ['def serializar(obj):']
+    if atributos:
+        variables = ', '.join(f'v{i}' for i in range(len(atributos)))
+        if len(atributos) == 1:
+            variables += ','
+        # Camino rápido: valores ya cargados en __dict__ sin pasar por los
+        # descriptores de SQLAlchemy. Si falta alguno (expirado, diferido o
+        # sin asignar) se leen con getattr, que los carga como siempre.
+        lineas.extend([
+            '    try:',
+            f'        {variables} = _leer_estado(obj.__dict__)',
+            '    except KeyError:',
+            f'        {variables} = _leer(obj)',
+        ])
+        namespace['_leer_estado'] = itemgetter(*atributos) if len(atributos) > 1 else (
+            lambda d, _clave=atributos[0]: (d[_clave],)
+        )
+        namespace['_leer'] = attrgetter(*atributos) if len(atributos) > 1 else (
+            lambda o, _clave=atributos[0]: (getattr(o, _clave),)
+        )
+    lineas.append('    return {')
+    lineas.extend(lineas_dict)
+    lineas.append('    }')
+
+    codigo = compile('\n'.join(lineas), f'<serializador {modelo.__name__}.{nombre}>', 'exec')
+    exec(codigo, namespace)
+    serializar = namespace['serializar']
+    serializar.__qualname__ = f'serializar_{modelo.__name__}_{nombre}'
+    return serializar
+
+
+class RegistroSerializadores:
+    """Guarda los serializadores compilados por (modelo, vista)"""
+
+    def __init__(self):
+        self._serializadores: Dict[Tuple[type, str], Callable[[Any], Dict[str, Any]]] = {}
+
+    def registrar(
+        self,
+        modelo,
+        vista: str = VISTA_BASE,
+        campos: Optional[Sequence[Campo]] = None,
+        calculados: Optional[Dict[str, Callable[[Any], Any]]] = None,
+        por_defecto: Optional[Dict[str, Any]] = None
+    ) -> Callable[[Any], Dict[str, Any]]:
+        """
+        Compila y registra el serializador de una vista del modelo.
+        Sin `campos` se usan todas las columnas menos las sensibles.
+        """
+        if campos is None:
+            campos = [c for c in _columnas_modelo(modelo) if c not in CAMPOS_SENSIBLES]
+        serializar = compilar_serializador(modelo, campos, calculados, por_defecto, vista)
+        self._serializadores[(modelo, vista)] = serializar
+        return serializar
+
+    def obtener(self, modelo, vista: str = VISTA_BASE) -> Callable[[Any], Dict[str, Any]]:
+        """
+        Devuelve el serializador de la vista; la vista 'base' de un modelo
+        sin registrar se compila con todas sus columnas la primera vez.
+        """
+        serializar = self._serializadores.get((modelo, vista))
+        if serializar is None:
+            if vista != VISTA_BASE:
+                raise KeyError(f"No hay serializador '{vista}' para {modelo.__name__}")
+            serializar = self.registrar(modelo, vista)
+        return serializar
+
+    def serializar(self, instancia, vista: str = VISTA_BASE) -> Dict[str, Any]:
+        """Serializa una instancia"""
+        return self.obtener(type(instancia), vista)(instancia)
+
+    def serializar_lista(self, instancias: Iterable[Any], vista: str = VISTA_BASE) -> List[Dict[str, Any]]:
+        """
+        Serializa una lista de instancias del mismo modelo.
+        Resuelve el serializador una vez y lo aplica con map().
+        """
+        instancias = list(instancias)
+        if not instancias:
+            return []
+        return list(map(self.obtener(type(instancias[0]), vista), instancias))
+
+
+# Registro global compartido por todos los modelos
+registro_serializadores = RegistroSerializadores()
@@ -0,0 +1,31 @@
+# back-end/models/token_revocado.py
+from __future__ import annotations
+
+from datetime import datetime
+
+from config.database import db
+
+
+class TokenRevocado(db.Model):
+    """
+    Lista de revocación de JWT (logout y refresh tokens ya usados).
+
+    Cada fila es un `jti` que ya no vale hasta `expira_en`; pasada esa
+    fecha el propio token caduca y la fila se puede borrar
+    (scripts/purgar_tokens_revocados.py). Con tipo 'familia' el jti es el
+    de una cadena de refresh tokens completa (reutilización detectada).
+    Se consulta a través del filtro de Bloom de services/lista_revocacion.py.
+    """
+    __tablename__ = 'tokens_revocados'
+
+    TIPOS = ('access', 'refresh', 'familia')
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    tipo = db.Column(db.String(10), nullable=False, default='access')
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='CASCADE'), index=True)
+    expira_en = db.Column(db.DateTime, nullable=False, index=True)
+    revocado_en = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self) -> str:
+        return f'<TokenRevocado {self.tipo} {self.jti}>'
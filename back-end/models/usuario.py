@@ -1,5 +1,5 @@
 from config.database import db
-from werkzeug.security import generate_password_hash, check_password_hash 
+from services.hash_contrasenas import hash_contrasenas
 from datetime import datetime
 from sqlalchemy import Date, JSON, Numeric
 
@@ -32,6 +32,9 @@ class Usuario(db.Model):
     estado_cuenta = db.Column(db.String(20), default="activo", nullable=False) 
     fecha_desactivacion = db.Column(db.DateTime, nullable=True)
     
+    # Versión de los claims del JWT: sube al cambiar rol / estado_cuenta (utils/usuario_actual.py)
+    version_token = db.Column(db.Integer, default=0, nullable=False)
+    
     # Timestamps
     creado_en = db.Column(db.DateTime, default=db.func.now()) 
     actualizado_en = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
@@ -43,14 +46,20 @@ class Usuario(db.Model):
     perfil_admin = db.relationship("PerfilAdministrador", back_populates="usuario", uselist=False, cascade="all, delete-orphan")
 
     def set_password(self, password):
-        """Genera el hash de la contraseña"""
-        self.contrasena_hash = generate_password_hash(password)
+        """Genera el hash de la contraseña (en el pool de services/hash_contrasenas.py)"""
+        self.contrasena_hash = hash_contrasenas.generar(password)
 
     def check_password(self, password):
-        """Verifica la contraseña"""
+        """
+        Verifica la contraseña. Si es correcta y el hash usa parámetros de
+        coste anteriores lo sustituye por uno nuevo (falta hacer commit).
+        """
         if not self.contrasena_hash:
             return False
-        return check_password_hash(self.contrasena_hash, password)
+        correcta, hash_nuevo = hash_contrasenas.verificar(self.contrasena_hash, password)
+        if hash_nuevo:
+            self.contrasena_hash = hash_nuevo
+        return correcta
 
     def __repr__(self):
         return f"<Usuario {self.id}: {self.correo}>"
@@ -1,8 +1,9 @@
 # back-end/routes/actividades_routes.py
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from models.leccion import Actividad, Leccion
-from models.usuario import Usuario
+from utils.usuario_actual import obtener_usuario_actual, usuario_actual_id
+from services.mapa_propietarios import mapa_propietarios
 from extensions import db
 
 actividades_bp = Blueprint('actividades', __name__, url_prefix='/api/actividades')
@@ -28,10 +29,9 @@ def crear_actividad():
     }
     """
     try:
-        usuario_id = get_jwt_identity()
-        usuario = Usuario.query.get(usuario_id)
+        usuario = obtener_usuario_actual()
         
-        if usuario.rol not in ['admin', 'profesor']:
+        if not usuario.tiene_rol('admin', 'profesor'):
             return jsonify({'success': False, 'error': 'No autorizado'}), 403
         
         data = request.json
@@ -58,15 +58,11 @@ def crear_actividad():
             }), 400
         
         # Si es profesor, verificar que sea su lección
-        if usuario.rol == 'profesor':
-            if leccion.curso_id:
-                from models.cursos import Curso
-                curso = Curso.query.get(leccion.curso_id)
-                if curso and curso.profesor_id != usuario_id:
-                    return jsonify({
-                        'success': False,
-                        'error': 'No puedes crear actividades en esta lección'
-                    }), 403
+        if not mapa_propietarios.puede_gestionar(usuario, leccion.curso_id):
+            return jsonify({
+                'success': False,
+                'error': 'No puedes crear actividades en esta lección'
+            }), 403
         
         # Determinar el siguiente orden si no se especifica
         if 'orden' not in data:
@@ -146,22 +142,16 @@ def obtener_actividad(actividad_id):
 def actualizar_actividad(actividad_id):
     """Actualizar una actividad"""
     try:
-        usuario_id = get_jwt_identity()
-        usuario = Usuario.query.get(usuario_id)
+        usuario = obtener_usuario_actual()
         
-        if usuario.rol not in ['admin', 'profesor']:
+        if not usuario.tiene_rol('admin', 'profesor'):
             return jsonify({'success': False, 'error': 'No autorizado'}), 403
         
         actividad = Actividad.query.get_or_404(actividad_id)
         
         # Si es profesor, verificar permisos
-        if usuario.rol == 'profesor':
-            leccion = Leccion.query.get(actividad.leccion_id)
-            if leccion.curso_id:
-                from models.cursos import Curso
-                curso = Curso.query.get(leccion.curso_id)
-                if curso and curso.profesor_id != usuario_id:
-                    return jsonify({'success': False, 'error': 'No autorizado'}), 403
+        if not mapa_propietarios.puede_gestionar(usuario, leccion_id=actividad.leccion_id):
+            return jsonify({'success': False, 'error': 'No autorizado'}), 403
         
         data = request.json
         
@@ -194,22 +184,16 @@ def actualizar_actividad(actividad_id):
 def eliminar_actividad(actividad_id):
     """Eliminar una actividad"""
     try:
-        usuario_id = get_jwt_identity()
-        usuario = Usuario.query.get(usuario_id)
+        usuario = obtener_usuario_actual()
         
-        if usuario.rol not in ['admin', 'profesor']:
+        if not usuario.tiene_rol('admin', 'profesor'):
             return jsonify({'success': False, 'error': 'No autorizado'}), 403
         
         actividad = Actividad.query.get_or_404(actividad_id)
         
         # Verificar permisos si es profesor
-        if usuario.rol == 'profesor':
-            leccion = Leccion.query.get(actividad.leccion_id)
-            if leccion.curso_id:
-                from models.cursos import Curso
-                curso = Curso.query.get(leccion.curso_id)
-                if curso and curso.profesor_id != usuario_id:
-                    return jsonify({'success': False, 'error': 'No autorizado'}), 403
+        if not mapa_propietarios.puede_gestionar(usuario, leccion_id=actividad.leccion_id):
+            return jsonify({'success': False, 'error': 'No autorizado'}), 403
         
         leccion_id = actividad.leccion_id
         pregunta = actividad.pregunta
@@ -235,7 +219,7 @@ def validar_respuesta(actividad_id):
     Body: {"respuesta": "..."}
     """
     try:
-        usuario_id = get_jwt_identity()
+        usuario_id = usuario_actual_id()
         
         actividad = Actividad.query.get_or_404(actividad_id)
         data = request.json
@@ -1,7 +1,13 @@
 from flask import Blueprint, request, jsonify
 from models.usuario import Usuario
-from flask_jwt_extended import create_access_token, create_refresh_token
+from flask_jwt_extended import (
+    create_access_token, create_refresh_token, decode_token, get_jwt, jwt_required
+)
 from services.gestor_usuarios import GestorUsuarios
+from services.hash_contrasenas import ServicioSaturado
+from services.lista_revocacion import lista_revocacion, nueva_familia, CLAIM_FAMILIA
+from services.limitador_intentos import limitar, limitador_intentos
+from utils.usuario_actual import claims_para_token, obtener_usuario_actual, CLAIM_VERSION
 
 # ========================================
 # BLUEPRINT DE AUTENTICACIÓN
@@ -71,6 +77,8 @@ def registrar():
             }
         )
         return jsonify(respuesta), codigo
+    except ServicioSaturado:
+        raise  # 503 con Retry-After (app.py)
     except Exception as e:
         print(f"❌ Error en registro: {str(e)}")
         return jsonify({
@@ -78,6 +86,7 @@ def registrar():
         }), 500
 
 @auth_bp.route("/verificar-email", methods=["POST"])
+@limitar("verificar_email")
 def verificar_email():
     """Verifica el correo con código de 6 dígitos"""
     data = request.get_json()
@@ -91,6 +100,7 @@ def verificar_email():
     return jsonify(respuesta), codigo_http
 
 @auth_bp.route("/reenviar-codigo", methods=["POST"])
+@limitar("reenviar_codigo")
 def reenviar_codigo():
     """Reenvía el código de verificación"""
     data = request.get_json()
@@ -106,6 +116,7 @@ def reenviar_codigo():
 # AUTENTICACIÓN
 # ========================================
 @auth_bp.route("/login", methods=["POST"])
+@limitar("login")  # Antes de tocar la BD o calcular el hash
 def login():
     """Inicia sesión, devuelve datos del usuario, perfil específico y token JWT"""
     data = request.get_json()
@@ -119,6 +130,8 @@ def login():
     respuesta_auth, codigo_auth = gestor.autenticar_usuario(correo, password)
 
     # --- MANEJO DE ERRORES DE AUTENTICACIÓN ---
+    if codigo_auth == 401:
+        limitador_intentos.registrar_fallo("login")  # El cubo del correo solo gasta con fallos
     if codigo_auth != 200:
         # Si la cuenta está desactivada, añadir ID si es posible
         if codigo_auth == 403 and respuesta_auth.get("codigo") == "CUENTA_DESACTIVADA":
@@ -143,8 +156,12 @@ def login():
         usuario_id = usuario_data_completa['id']
 
         # Crear tokens JWT
-        access_token = create_access_token(identity=str(usuario_id))
-        refresh_token = create_refresh_token(identity=str(usuario_id))
+        claims = claims_para_token(usuario_id)  # rol, estado_cuenta, versión
+        access_token = create_access_token(identity=str(usuario_id), additional_claims=claims)
+        refresh_token = create_refresh_token(
+            identity=str(usuario_id),
+            additional_claims={**nueva_familia(), CLAIM_VERSION: claims.get(CLAIM_VERSION, 0)}
+        )
 
         # Construir la respuesta final
         respuesta_final = {
@@ -162,10 +179,90 @@ def login():
             "error": f"Error interno del servidor: {str(e)}"
         }), 500
 
+@auth_bp.route("/refresh", methods=["POST"])
+@jwt_required(refresh=True)
+def refrescar_token():
+    """
+    Cambia un refresh token por un access token nuevo y otro refresh token
+    (rotación: el recibido queda revocado y no se puede volver a usar)
+    """
+    datos_token = get_jwt()
+    usuario = obtener_usuario_actual()
+    if not usuario.activo:
+        return jsonify({"error": "La cuenta no está activa", "codigo": "CUENTA_DESACTIVADA"}), 403
+
+    if not lista_revocacion.consumir_refresh(datos_token):
+        return jsonify({
+            "error": "El refresh token ya se había usado; vuelve a iniciar sesión",
+            "codigo": "TOKEN_REUTILIZADO"
+        }), 401
+
+    usuario_id = usuario.id
+    familia = {CLAIM_FAMILIA: datos_token[CLAIM_FAMILIA]} if CLAIM_FAMILIA in datos_token else nueva_familia()
+    claims = claims_para_token(usuario_id)
+    return jsonify({
+        "access_token": create_access_token(identity=str(usuario_id), additional_claims=claims),
+        "refresh_token": create_refresh_token(
+            identity=str(usuario_id),
+            additional_claims={**familia, CLAIM_VERSION: claims.get(CLAIM_VERSION, 0)}
+        )
+    }), 200
+
+
+def _token_de_cabecera():
+    """
+    JWT de Authorization (access o refresh) decodificado aunque haya
+    caducado: la firma se comprueba igual. None si no viene.
+
+    Raises:
+        Exception: Si el token no es válido (firma, formato)
+    """
+    cabecera = request.headers.get("Authorization", "")
+    if not cabecera.startswith("Bearer "):
+        return None
+    return decode_token(cabecera[len("Bearer "):].strip(), allow_expired=True)
+
+
+@auth_bp.route("/logout", methods=["POST"])
+def logout():
+    """
+    Cierra la sesión con el access token o con el refresh token (en
+    Authorization o en el body como refresh_token), aunque el access token
+    ya haya caducado. Se revocan los tokens recibidos y, si hay refresh
+    token, toda su familia.
+    """
+    try:
+        datos_token = _token_de_cabecera()
+    except Exception:
+        return jsonify({"error": "Token inválido"}), 401
+    revocar = [datos_token] if datos_token else []
+
+    data = request.get_json(silent=True) or {}
+    if data.get("refresh_token"):
+        try:
+            datos_refresh = decode_token(data["refresh_token"], allow_expired=True)
+        except Exception:
+            return jsonify({"error": "Refresh token inválido"}), 400
+        if datos_refresh.get("type") != "refresh" or \
+           (datos_token and datos_refresh.get("sub") != datos_token["sub"]):
+            return jsonify({"error": "Refresh token inválido"}), 400
+        revocar.append(datos_refresh)
+
+    if not revocar:
+        return jsonify({"error": "Falta el access token o el refresh token de la sesión"}), 401
+
+    for datos in revocar:
+        lista_revocacion.revocar(datos)
+        if datos.get("type") == "refresh":
+            lista_revocacion.revocar_familia(datos)
+
+    return jsonify({"mensaje": "Sesión cerrada"}), 200
+
 # ========================================
 # RECUPERACIÓN DE CONTRASEÑA
 # ========================================
 @auth_bp.route("/recuperar-password", methods=["POST"])
+@limitar("recuperar_password")
 def recuperar_password():
     """Inicia el proceso de recuperación de contraseña"""
     data = request.get_json()
@@ -190,6 +287,7 @@ def validar_token():
     return jsonify(respuesta), codigo
 
 @auth_bp.route("/restablecer-password", methods=["POST"])
+@limitar("restablecer_password")
 def restablecer_password():
     """Restablece la contraseña usando el token"""
     data = request.get_json()
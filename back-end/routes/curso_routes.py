@@ -1,16 +1,52 @@
 # back-end/routes/curso_routes.py
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from models.cursos import Curso, ProgresoCurso
-from models.usuario import Usuario
-from models.leccion import Leccion
+from utils.usuario_actual import obtener_usuario_actual, usuario_actual_id
+from models.leccion import Leccion, VISTA_RESUMEN
+from models.serializacion import registro_serializadores
 from extensions import db
 from sqlalchemy import func, or_
+from sqlalchemy.orm import defer
+from utils.cache_http import respuesta_condicional, version_de_consulta, combinar_versiones
 
 curso_bp = Blueprint('cursos', __name__, url_prefix='/api/cursos')
 
 
+# ========== VERSIONES PARA GET CONDICIONAL ==========
+
+def version_tabla_cursos(**kwargs):
+    """Catálogo de cursos: cambia si cambia cualquier curso"""
+    return combinar_versiones(version_de_consulta(Curso.query, Curso.actualizado_en))
+
+
+def version_curso(curso_id):
+    """Un curso y, si se piden (?lecciones=true), sus lecciones"""
+    fecha_curso = db.session.query(Curso.actualizado_en).filter_by(id=curso_id).scalar()
+    if fecha_curso is None:
+        return None
+    
+    versiones = [(curso_id, fecha_curso)]
+    if request.args.get('lecciones', 'false').lower() == 'true':
+        versiones.append(version_de_consulta(
+            Leccion.query.filter_by(curso_id=curso_id), Leccion.actualizado_en
+        ))
+    return combinar_versiones(*versiones)
+
+
+def version_lecciones_curso(curso_id):
+    """Lecciones de un curso (la respuesta también lleva el nombre del curso)"""
+    fecha_curso = db.session.query(Curso.actualizado_en).filter_by(id=curso_id).scalar()
+    if fecha_curso is None:
+        return None
+    return combinar_versiones(
+        (curso_id, fecha_curso),
+        version_de_consulta(Leccion.query.filter_by(curso_id=curso_id), Leccion.actualizado_en)
+    )
+
+
 @curso_bp.route('', methods=['GET'])
+@respuesta_condicional(version_tabla_cursos)
 def obtener_cursos():
     """
     Obtener lista de cursos con filtros opcionales
@@ -43,7 +79,7 @@ def obtener_cursos():
         
         return jsonify({
             'success': True,
-            'cursos': [c.to_dict() for c in cursos],
+            'cursos': registro_serializadores.serializar_lista(cursos),
             'total': len(cursos)
         }), 200
         
@@ -52,6 +88,7 @@ def obtener_cursos():
 
 
 @curso_bp.route('/<int:curso_id>', methods=['GET'])
+@respuesta_condicional(version_curso)
 def obtener_curso(curso_id):
     """Obtener detalles de un curso específico"""
     try:
@@ -85,10 +122,10 @@ def crear_curso():
     }
     """
     try:
-        usuario_id = get_jwt_identity()
-        usuario = Usuario.query.get(usuario_id)
+        usuario = obtener_usuario_actual()
+        usuario_id = usuario.id
         
-        if usuario.rol not in ['admin', 'profesor']:
+        if not usuario.tiene_rol('admin', 'profesor'):
             return jsonify({
                 'success': False, 
                 'error': 'No autorizado. Solo administradores y profesores pueden crear cursos.'
@@ -158,10 +195,10 @@ def crear_curso():
 def actualizar_curso(curso_id):
     """Actualizar curso existente"""
     try:
-        usuario_id = get_jwt_identity()
-        usuario = Usuario.query.get(usuario_id)
+        usuario = obtener_usuario_actual()
+        usuario_id = usuario.id
         
-        if usuario.rol not in ['admin', 'profesor']:
+        if not usuario.tiene_rol('admin', 'profesor'):
             return jsonify({'success': False, 'error': 'No autorizado'}), 403
         
         curso = Curso.query.get_or_404(curso_id)
@@ -204,10 +241,10 @@ def actualizar_curso(curso_id):
 def eliminar_curso(curso_id):
     """Eliminar curso (Solo Admin)"""
     try:
-        usuario_id = get_jwt_identity()
-        usuario = Usuario.query.get(usuario_id)
+        usuario = obtener_usuario_actual()
+        usuario_id = usuario.id
         
-        if usuario.rol != 'admin':
+        if not usuario.tiene_rol('admin'):
             return jsonify({'success': False, 'error': 'Solo administradores'}), 403
         
         curso = Curso.query.get_or_404(curso_id)
@@ -233,6 +270,7 @@ def eliminar_curso(curso_id):
 
 
 @curso_bp.route('/<int:curso_id>/lecciones', methods=['GET'])
+@respuesta_condicional(version_lecciones_curso)
 def obtener_lecciones_curso(curso_id):
     """Obtener todas las lecciones de un curso"""
     try:
@@ -240,7 +278,7 @@ def obtener_lecciones_curso(curso_id):
         
         estado = request.args.get('estado', 'publicada')
         
-        query = curso.lecciones
+        query = curso.lecciones.options(defer(Leccion.contenido))
         if estado:
             query = query.filter_by(estado=estado)
         
@@ -250,7 +288,7 @@ def obtener_lecciones_curso(curso_id):
             'success': True,
             'curso_id': curso_id,
             'curso_nombre': curso.nombre,
-            'lecciones': [l.to_dict() for l in lecciones],
+            'lecciones': registro_serializadores.serializar_lista(lecciones, VISTA_RESUMEN),
             'total': len(lecciones)
         }), 200
         
@@ -263,7 +301,7 @@ def obtener_lecciones_curso(curso_id):
 def obtener_progreso_curso(curso_id):
     """Obtener progreso del usuario autenticado en un curso"""
     try:
-        usuario_id = get_jwt_identity()
+        usuario_id = usuario_actual_id()
         
         progreso = ProgresoCurso.query.filter_by(
             usuario_id=usuario_id,
@@ -295,7 +333,7 @@ def obtener_progreso_curso(curso_id):
 def inscribir_en_curso(curso_id):
     """Inscribir al usuario en un curso"""
     try:
-        usuario_id = get_jwt_identity()
+        usuario_id = usuario_actual_id()
         
         curso = Curso.query.get_or_404(curso_id)
         
@@ -362,10 +400,10 @@ def inscribir_en_curso(curso_id):
 def obtener_estadisticas_curso(curso_id):
     """Obtener estadísticas generales del curso (Admin/Profesor)"""
     try:
-        usuario_id = get_jwt_identity()
-        usuario = Usuario.query.get(usuario_id)
+        usuario = obtener_usuario_actual()
+        usuario_id = usuario.id
         
-        if usuario.rol not in ['admin', 'profesor']:
+        if not usuario.tiene_rol('admin', 'profesor'):
             return jsonify({'success': False, 'error': 'No autorizado'}), 403
         
         curso = Curso.query.get_or_404(curso_id)
@@ -431,10 +469,10 @@ def obtener_estadisticas_curso(curso_id):
 def obtener_estudiantes_curso(curso_id):
     """Obtener lista de estudiantes inscritos en el curso (Admin/Profesor)"""
     try:
-        usuario_id = get_jwt_identity()
-        usuario = Usuario.query.get(usuario_id)
+        usuario = obtener_usuario_actual()
+        usuario_id = usuario.id
         
-        if usuario.rol not in ['admin', 'profesor']:
+        if not usuario.tiene_rol('admin', 'profesor'):
             return jsonify({'success': False, 'error': 'No autorizado'}), 403
         
         curso = Curso.query.get_or_404(curso_id)
@@ -442,7 +480,12 @@ def obtener_estudiantes_curso(curso_id):
         if usuario.rol == 'profesor' and curso.profesor_id != usuario_id:
             return jsonify({'success': False, 'error': 'No es tu curso'}), 403
         
-        progresos = ProgresoCurso.query.filter_by(curso_id=curso_id).all()
+        progresos = (
+            ProgresoCurso.query
+            .options(*ProgresoCurso.opciones_carga(incluir_usuario=True))
+            .filter_by(curso_id=curso_id)
+            .all()
+        )
         
         estudiantes = []
         for progreso in progresos:
@@ -466,10 +509,10 @@ def obtener_estudiantes_curso(curso_id):
 def cambiar_estado_curso(curso_id):
     """Activar/Desactivar curso (Solo Admin)"""
     try:
-        usuario_id = get_jwt_identity()
-        usuario = Usuario.query.get(usuario_id)
+        usuario = obtener_usuario_actual()
+        usuario_id = usuario.id
         
-        if usuario.rol != 'admin':
+        if not usuario.tiene_rol('admin'):
             return jsonify({'success': False, 'error': 'Solo administradores'}), 403
         
         curso = Curso.query.get_or_404(curso_id)
@@ -493,8 +536,8 @@ def cambiar_estado_curso(curso_id):
 def obtener_mis_cursos():
     """Obtener cursos del usuario autenticado"""
     try:
-        usuario_id = get_jwt_identity()
-        usuario = Usuario.query.get(usuario_id)
+        usuario = obtener_usuario_actual()
+        usuario_id = usuario.id
         
         if usuario.rol == 'profesor':
             # Cursos que imparte
@@ -502,13 +545,18 @@ def obtener_mis_cursos():
             return jsonify({
                 'success': True,
                 'tipo': 'profesor',
-                'cursos': [c.to_dict() for c in cursos],
+                'cursos': registro_serializadores.serializar_lista(cursos),
                 'total': len(cursos)
             }), 200
         
         elif usuario.rol == 'alumno':
             # Cursos en los que está inscrito
-            progresos = ProgresoCurso.query.filter_by(usuario_id=usuario_id).all()
+            progresos = (
+                ProgresoCurso.query
+                .options(*ProgresoCurso.opciones_carga(incluir_curso=True))
+                .filter_by(usuario_id=usuario_id)
+                .all()
+            )
             cursos_data = [p.to_dict(incluir_curso=True) for p in progresos]
             
             return jsonify({
@@ -524,7 +572,7 @@ def obtener_mis_cursos():
             return jsonify({
                 'success': True,
                 'tipo': 'admin',
-                'cursos': [c.to_dict() for c in cursos],
+                'cursos': registro_serializadores.serializar_lista(cursos),
                 'total': len(cursos)
             }), 200
         
@@ -4,10 +4,18 @@ Endpoints REST para el módulo de lecciones
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from services.gestor_lecciones import gestor_lecciones
-from models.usuario import Usuario
+from utils.usuario_actual import obtener_usuario_actual, usuario_actual_id
 from models.cursos import Curso
+from models.leccion import Leccion, Actividad, leccion_multimedia
+from models.multimedia import Multimedia, ConfiguracionMultimedia
+from config.database import db
+from services.paquetes_lecciones import paquetes_lecciones
+from services.mapa_propietarios import mapa_propietarios
+from utils.cache_http import respuesta_condicional, version_de_consulta, combinar_versiones
+from utils.envio_archivos import enviar_archivo, ArchivoNoEncontrado
+from utils.parametros_consulta import obtener_etiquetas_query
 from functools import wraps
 
 # Crear blueprint
@@ -20,10 +28,9 @@ def validar_permisos_admin_profesor(f):
     """Decorador para validar permisos de admin o profesor"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        usuario_id = get_jwt_identity()
-        usuario = Usuario.query.get(usuario_id)
+        usuario = obtener_usuario_actual()
         
-        if not usuario or usuario.rol not in ['admin', 'profesor']:
+        if not usuario or not usuario.tiene_rol('admin', 'profesor'):
             return jsonify({
                 'success': False,
                 'error': 'No autorizado. Se requiere rol de administrador o profesor.'
@@ -37,41 +44,90 @@ def validar_profesor_curso(f):
     """Decorador para validar que el profesor sea dueño del curso"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        usuario_id = get_jwt_identity()
-        usuario = Usuario.query.get(usuario_id)
+        usuario = obtener_usuario_actual()
         
         # Admin puede todo
-        if usuario.rol == 'admin':
+        if usuario.tiene_rol('admin'):
             return f(*args, **kwargs)
         
         # Profesor debe ser dueño del curso
-        if usuario.rol == 'profesor':
-            # Obtener curso_id del body o de la lección
+        if usuario.tiene_rol('profesor'):
+            # curso_id del body o, si no viene, de la lección (mapa en memoria, sin consultas)
             data = request.get_json()
             curso_id = data.get('curso_id') if data else None
             
-            # Si no hay curso_id en el body, obtenerlo de la lección
-            if not curso_id and 'leccion_id' in kwargs:
-                from models.leccion import Leccion
-                leccion = Leccion.query.get(kwargs['leccion_id'])
-                if leccion:
-                    curso_id = leccion.curso_id
-            
-            if curso_id:
-                curso = Curso.query.get(curso_id)
-                if curso and curso.profesor_id != usuario_id:
-                    return jsonify({
-                        'success': False,
-                        'error': 'No puedes gestionar lecciones de cursos que no son tuyos'
-                    }), 403
+            if not mapa_propietarios.puede_gestionar(usuario, curso_id, kwargs.get('leccion_id')):
+                return jsonify({
+                    'success': False,
+                    'error': 'No puedes gestionar lecciones de cursos que no son tuyos'
+                }), 403
         
         return f(*args, **kwargs)
     return decorated
 
 
+# ========== VERSIONES PARA GET CONDICIONAL ==========
+
+def _version_actividades(query_lecciones_ids):
+    """(total, max actualizado_en) de las actividades de un conjunto de lecciones"""
+    return version_de_consulta(
+        Actividad.query.filter(Actividad.leccion_id.in_(query_lecciones_ids)),
+        Actividad.actualizado_en
+    )
+
+
+def _version_multimedia(query_lecciones_ids):
+    """Versión de los recursos asociados a un conjunto de lecciones (con sus contadores de uso)"""
+    return version_de_consulta(
+        Multimedia.query
+        .join(leccion_multimedia, leccion_multimedia.c.multimedia_id == Multimedia.id)
+        .filter(leccion_multimedia.c.leccion_id.in_(query_lecciones_ids)),
+        Multimedia.actualizado_en,
+        *Multimedia.agregados_uso()
+    )
+
+
+def _version_lecciones_con_relaciones(query_lecciones, *versiones_extra):
+    """Versión de un conjunto de lecciones más actividades/multimedia si se piden"""
+    versiones = [version_de_consulta(query_lecciones, Leccion.actualizado_en), *versiones_extra]
+    ids = query_lecciones.with_entities(Leccion.id)
+    
+    if request.args.get('incluir_actividades', 'false').lower() == 'true':
+        versiones.append(_version_actividades(ids))
+    if request.args.get('incluir_multimedia', 'false').lower() == 'true':
+        versiones.append(_version_multimedia(ids))
+    
+    return combinar_versiones(*versiones)
+
+
+def version_tabla_lecciones(**kwargs):
+    """Listados, búsqueda y facetas: cambian si cambia cualquier lección"""
+    return combinar_versiones(version_de_consulta(Leccion.query, Leccion.actualizado_en))
+
+
+def version_leccion(leccion_id):
+    """Una lección (y sus actividades/multimedia si se piden)"""
+    query = Leccion.query.filter_by(id=leccion_id)
+    version = _version_lecciones_con_relaciones(query)
+    # Lección inexistente: que la vista responda el 404
+    return version if version.partes[0][0] else None
+
+
+def version_lecciones_curso(curso_id):
+    """Lecciones de un curso (incluye el curso por su nombre en la respuesta)"""
+    fecha_curso = db.session.query(Curso.actualizado_en).filter_by(id=curso_id).scalar()
+    if fecha_curso is None:
+        return None
+    return _version_lecciones_con_relaciones(
+        Leccion.query.filter_by(curso_id=curso_id),
+        (curso_id, fecha_curso)
+    )
+
+
 # ========== ENDPOINTS DE LECCIONES ==========
 
 @leccion_bp.route('', methods=['GET'])
+@respuesta_condicional(version_tabla_lecciones)
 def listar_lecciones():
     """
     GET /api/lecciones
@@ -84,9 +140,14 @@ def listar_lecciones():
         - categoria: vocabulario|gramatica|etc
         - estado: borrador|publicada|archivada
         - buscar: término de búsqueda
-        - etiqueta: etiqueta específica
+        - etiqueta: una o varias etiquetas (repetida o separada por comas)
+        - modo_etiquetas: and|or, todas las etiquetas o alguna (default: and)
         - pagina: número de página (default: 1)
-        - por_pagina: items por página (default: 20)
+        - por_pagina: items por página (default: 20, máximo: 100)
+        - cursor: activa paginación por cursor ('' para la primera página,
+                  luego el next_cursor de la respuesta anterior)
+        - incluir_total: true|false, total estimado en modo cursor (default: false)
+        - vista: resumen|completa (default: resumen, sin el contenido de cada lección)
     """
     try:
         # Obtener parámetros de consulta
@@ -97,7 +158,8 @@ def listar_lecciones():
             'categoria': request.args.get('categoria'),
             'estado': request.args.get('estado'),
             'buscar': request.args.get('buscar'),
-            'etiqueta': request.args.get('etiqueta')
+            'etiqueta': obtener_etiquetas_query() or None,
+            'modo_etiquetas': request.args.get('modo_etiquetas')
         }
         
         # Remover valores None
@@ -106,14 +168,20 @@ def listar_lecciones():
         pagina = request.args.get('pagina', 1, type=int)
         por_pagina = request.args.get('por_pagina', 20, type=int)
         
+        cursor = request.args.get('cursor')
+        incluir_total = request.args.get('incluir_total', 'false').lower() == 'true'
+        
         resultado, codigo = gestor_lecciones.listar_lecciones(
             filtros=filtros,
             pagina=pagina,
-            por_pagina=por_pagina
+            por_pagina=por_pagina,
+            cursor=cursor,
+            incluir_total=incluir_total,
+            vista=request.args.get('vista', 'resumen')
         )
         
         return jsonify({
-            'success': True,
+            'success': codigo == 200,
             **resultado
         }), codigo
         
@@ -124,7 +192,84 @@ def listar_lecciones():
         }), 500
 
 
+@leccion_bp.route('/buscar', methods=['GET'])
+@respuesta_condicional(version_tabla_lecciones)
+def buscar_lecciones():
+    """
+    GET /api/lecciones/buscar
+    Búsqueda de lecciones por relevancia (índice invertido, sin acentos)
+    
+    Query params:
+        - q: texto de búsqueda (requerido)
+        - limite: máximo de resultados (default: 20, máximo: 100)
+        - solo_publicadas: true|false (default: false)
+    """
+    try:
+        texto = request.args.get('q', '').strip()
+        
+        if not texto:
+            return jsonify({
+                'success': False,
+                'error': "Debe proporcionar un término de búsqueda (q)"
+            }), 400
+        
+        limite = min(request.args.get('limite', 20, type=int), 100)
+        solo_publicadas = request.args.get('solo_publicadas', 'false').lower() == 'true'
+        
+        resultado, codigo = gestor_lecciones.buscar_lecciones(
+            texto,
+            limite=limite,
+            solo_publicadas=solo_publicadas
+        )
+        
+        return jsonify({
+            'success': codigo == 200,
+            **resultado
+        }), codigo
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f"Error al buscar lecciones: {str(e)}"
+        }), 500
+
+
+@leccion_bp.route('/etiquetas', methods=['GET'])
+@respuesta_condicional(version_tabla_lecciones)
+def obtener_facetas_etiquetas():
+    """
+    GET /api/lecciones/etiquetas
+    Conteo de lecciones por etiqueta (facetas), de mayor a menor
+    
+    Query params:
+        - curso_id: filtrar por curso (opcional)
+        - estado: borrador|publicada|archivada (opcional)
+        - limite: máximo de etiquetas (default: 50, máximo: 200)
+    """
+    try:
+        filtros = {
+            'curso_id': request.args.get('curso_id', type=int),
+            'estado': request.args.get('estado')
+        }
+        filtros = {k: v for k, v in filtros.items() if v is not None}
+        limite = max(1, min(request.args.get('limite', 50, type=int), 200))
+        
+        resultado, codigo = gestor_lecciones.obtener_facetas_etiquetas(filtros, limite=limite)
+        
+        return jsonify({
+            'success': codigo == 200,
+            **resultado
+        }), codigo
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f"Error al obtener etiquetas: {str(e)}"
+        }), 500
+
+
 @leccion_bp.route('/<int:leccion_id>', methods=['GET'])
+@respuesta_condicional(version_leccion)
 def obtener_leccion(leccion_id):
     """
     GET /api/lecciones/<id>
@@ -156,6 +301,68 @@ def obtener_leccion(leccion_id):
         }), 500
 
 
+@leccion_bp.route('/<int:leccion_id>/paquete', methods=['GET'])
+def descargar_paquete_leccion(leccion_id):
+    """
+    GET /api/lecciones/<id>/paquete
+    Descarga la lección offline: un .zip con leccion.json, manifiesto.json
+    y los archivos multimedia de la lección y de sus actividades
+    
+    El paquete se genera al publicar y se reutiliza hasta que cambia la
+    lección, una actividad o un recurso. Soporta ETag (304) y Range.
+    """
+    try:
+        ruta_base = ConfiguracionMultimedia.obtener_valor('ruta_almacenamiento', 'uploads/multimedia')
+        respuesta = None
+        for _ in range(2):
+            nombre, version = paquetes_lecciones.obtener(leccion_id)
+            if nombre is None:
+                return jsonify({'success': False, 'error': 'Lección no encontrada'}), 404
+            try:
+                respuesta = enviar_archivo(ruta_base, nombre, cache_control='no-cache')
+                break
+            except ArchivoNoEncontrado:
+                # Lo sustituyó uno más nuevo entre obtener() y el envío: se pide el vigente
+                continue
+        if respuesta is None:
+            return jsonify({'success': False, 'error': 'Paquete no disponible, inténtalo de nuevo'}), 404
+        
+        respuesta.headers['Content-Disposition'] = f'attachment; filename="leccion-{leccion_id}.zip"'
+        respuesta.headers['X-Paquete-Version'] = version
+        return respuesta
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f"Error al generar paquete de la lección: {str(e)}"
+        }), 500
+
+
+@leccion_bp.route('/<int:leccion_id>/paquete/manifiesto', methods=['GET'])
+def obtener_manifiesto_paquete(leccion_id):
+    """
+    GET /api/lecciones/<id>/paquete/manifiesto
+    Manifiesto del paquete (versión y archivos con sha256): el cliente
+    descarga el .zip solo si cambió la versión, o pide por su url los
+    archivos que no tiene
+    """
+    try:
+        manifiesto = paquetes_lecciones.leer_manifiesto(leccion_id)
+        if manifiesto is None:
+            return jsonify({'success': False, 'error': 'Lección no encontrada'}), 404
+        
+        return jsonify({
+            'success': True,
+            'manifiesto': manifiesto
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f"Error al obtener manifiesto: {str(e)}"
+        }), 500
+
+
 @leccion_bp.route('', methods=['POST'])
 @jwt_required()
 @validar_permisos_admin_profesor
@@ -182,7 +389,7 @@ def crear_leccion():
     }
     """
     try:
-        usuario_id = get_jwt_identity()
+        usuario_id = usuario_actual_id()
         datos = request.get_json()
         
         if not datos:
@@ -230,7 +437,7 @@ def actualizar_leccion(leccion_id):
     Body JSON: Campos a actualizar (mismos que POST)
     """
     try:
-        usuario_id = get_jwt_identity()
+        usuario_id = usuario_actual_id()
         datos = request.get_json()
         
         if not datos:
@@ -273,7 +480,7 @@ def eliminar_leccion(leccion_id):
     Elimina (archiva) una lección
     """
     try:
-        usuario_id = get_jwt_identity()
+        usuario_id = usuario_actual_id()
         resultado, codigo = gestor_lecciones.eliminar_leccion(leccion_id, usuario_id)
         
         return jsonify({
@@ -298,7 +505,7 @@ def publicar_leccion(leccion_id):
     Publica una lección (cambia estado de borrador a publicada)
     """
     try:
-        usuario_id = get_jwt_identity()
+        usuario_id = usuario_actual_id()
         resultado, codigo = gestor_lecciones.publicar_leccion(leccion_id, usuario_id)
         
         if codigo == 200:
@@ -342,6 +549,7 @@ def obtener_estadisticas_leccion(leccion_id):
 
 
 @leccion_bp.route('/nivel/<string:nivel>', methods=['GET'])
+@respuesta_condicional(version_tabla_lecciones)
 def obtener_lecciones_por_nivel(nivel):
     """
     GET /api/lecciones/nivel/<nivel>
@@ -367,6 +575,7 @@ def obtener_lecciones_por_nivel(nivel):
 
 
 @leccion_bp.route('/curso/<int:curso_id>', methods=['GET'])
+@respuesta_condicional(version_lecciones_curso)
 def obtener_lecciones_por_curso(curso_id):
     """
     GET /api/lecciones/curso/<curso_id>
@@ -374,10 +583,19 @@ def obtener_lecciones_por_curso(curso_id):
     
     Query params:
         - solo_publicadas: true|false (default: true)
+        - incluir_actividades: true|false (default: false)
+        - incluir_multimedia: true|false (default: false)
     """
     try:
         solo_publicadas = request.args.get('solo_publicadas', 'true').lower() == 'true'
-        resultado, codigo = gestor_lecciones.obtener_lecciones_por_curso(curso_id, solo_publicadas)
+        incluir_actividades = request.args.get('incluir_actividades', 'false').lower() == 'true'
+        incluir_multimedia = request.args.get('incluir_multimedia', 'false').lower() == 'true'
+        resultado, codigo = gestor_lecciones.obtener_lecciones_por_curso(
+            curso_id,
+            solo_publicadas,
+            incluir_actividades=incluir_actividades,
+            incluir_multimedia=incluir_multimedia
+        )
         
         return jsonify({
             'success': True,
@@ -580,11 +798,15 @@ def info():
         "endpoints": {
             "lecciones": {
                 "GET /api/lecciones": "Listar lecciones con filtros (incluye curso_id)",
+                "GET /api/lecciones/buscar?q=": "Buscar lecciones por relevancia",
+                "GET /api/lecciones/etiquetas": "Conteo de lecciones por etiqueta",
                 "GET /api/lecciones/<id>": "Obtener lección específica",
                 "POST /api/lecciones": "Crear nueva lección (requiere curso_id)",
                 "PUT /api/lecciones/<id>": "Actualizar lección",
                 "DELETE /api/lecciones/<id>": "Eliminar lección",
                 "POST /api/lecciones/<id>/publicar": "Publicar lección",
+                "GET /api/lecciones/<id>/paquete": "Descargar lección offline (.zip)",
+                "GET /api/lecciones/<id>/paquete/manifiesto": "Manifiesto del paquete offline",
                 "GET /api/lecciones/<id>/estadisticas": "Estadísticas de lección",
                 "GET /api/lecciones/nivel/<nivel>": "Lecciones por nivel",
                 "GET /api/lecciones/curso/<curso_id>": "Lecciones por curso"
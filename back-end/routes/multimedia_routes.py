@@ -3,11 +3,19 @@ Rutas API para gestión de recursos multimedia - SpeakLexi
 Endpoints REST para subir, gestionar y servir archivos multimedia
 """
 
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, redirect
 from services.gestor_multimedia import gestor_multimedia
+from services.gestor_subidas import gestor_subidas
+from services.almacenamiento_multimedia import almacenamiento_multimedia, ClaveInvalida
+from services.indice_similitud import DISTANCIA_POR_DEFECTO
+from models.multimedia import Multimedia
+from utils.cache_http import respuesta_condicional, version_de_consulta, combinar_versiones
+from utils.envio_archivos import enviar_archivo, ArchivoNoEncontrado
+from utils.distribucion_archivos import rutas_candidatas, NIVELES_POR_DEFECTO
+from utils.urls_firmadas import firmador_urls
+from utils.parametros_consulta import obtener_etiquetas_query
 from werkzeug.utils import secure_filename
 from functools import wraps
-from pathlib import Path
 import os
 
 # Crear blueprint
@@ -75,9 +83,28 @@ def archivo_permitido(filename, tipo=None):
     return extension in todas_extensiones
 
 
+# ========== VERSIONES PARA GET CONDICIONAL ==========
+
+def pide_urls_firmadas():
+    return request.args.get('firmar', 'false').lower() == 'true'
+
+
+def version_tabla_multimedia(**kwargs):
+    """
+    Listados/estadísticas: cambian si cambia cualquier recurso, también sus
+    contadores de uso (van en la respuesta pero no tocan actualizado_en)
+    """
+    version = version_de_consulta(Multimedia.query, Multimedia.actualizado_en, *Multimedia.agregados_uso())
+    if pide_urls_firmadas():
+        # Las URLs firmadas cambian al cambiar de ventana: un 304 no debe devolver URLs caducadas
+        return combinar_versiones(version, (firmador_urls.periodo_actual(),))
+    return combinar_versiones(version)
+
+
 # ========== ENDPOINTS DE MULTIMEDIA ==========
 
 @multimedia_bp.route('/', methods=['GET'])
+@respuesta_condicional(version_tabla_multimedia)
 def listar_recursos():
     """
     GET /api/multimedia
@@ -88,9 +115,14 @@ def listar_recursos():
         - categoria: vocabulario|gramatica|pronunciacion|etc
         - estado: pendiente|procesando|disponible|error
         - buscar: término de búsqueda
-        - etiqueta: etiqueta específica
+        - etiqueta: una o varias etiquetas (repetida o separada por comas)
+        - modo_etiquetas: and|or, todas las etiquetas o alguna (default: and)
         - pagina: número de página (default: 1)
-        - por_pagina: items por página (default: 20)
+        - por_pagina: items por página (default: 20, máximo: 100)
+        - cursor: activa paginación por cursor ('' para la primera página,
+                  luego el next_cursor de la respuesta anterior)
+        - incluir_total: true|false, total estimado en modo cursor (default: false)
+        - firmar: true|false, URLs /media/ firmadas y con caducidad (default: false)
     """
     try:
         # Obtener parámetros de consulta
@@ -99,7 +131,8 @@ def listar_recursos():
             'categoria': request.args.get('categoria'),
             'estado': request.args.get('estado'),
             'buscar': request.args.get('buscar'),
-            'etiqueta': request.args.get('etiqueta')
+            'etiqueta': obtener_etiquetas_query() or None,
+            'modo_etiquetas': request.args.get('modo_etiquetas')
         }
         
         # Remover valores None
@@ -108,10 +141,16 @@ def listar_recursos():
         pagina = request.args.get('pagina', 1, type=int)
         por_pagina = request.args.get('por_pagina', 20, type=int)
         
+        cursor = request.args.get('cursor')
+        incluir_total = request.args.get('incluir_total', 'false').lower() == 'true'
+        
         resultado, codigo = gestor_multimedia.listar_recursos(
             filtros=filtros,
             pagina=pagina,
-            por_pagina=por_pagina
+            por_pagina=por_pagina,
+            cursor=cursor,
+            incluir_total=incluir_total,
+            firmar_urls=pide_urls_firmadas()
         )
         
         return jsonify(resultado), codigo
@@ -128,13 +167,15 @@ def obtener_recurso(multimedia_id):
     
     Query params:
         - incluir_metadata: true|false (default: false)
+        - firmar: true|false, URLs /media/ firmadas y con caducidad (default: false)
     """
     try:
         incluir_metadata = request.args.get('incluir_metadata', 'false').lower() == 'true'
         
         resultado, codigo = gestor_multimedia.obtener_recurso(
             multimedia_id,
-            incluir_metadata=incluir_metadata
+            incluir_metadata=incluir_metadata,
+            firmar_urls=pide_urls_firmadas()
         )
         
         return jsonify(resultado), codigo
@@ -143,6 +184,53 @@ def obtener_recurso(multimedia_id):
         return jsonify({"error": f"Error al obtener recurso: {str(e)}"}), 500
 
 
+@multimedia_bp.route('/<int:multimedia_id>/descarga', methods=['GET'])
+def obtener_url_descarga(multimedia_id):
+    """
+    GET /api/multimedia/<id>/descarga
+    URL para descargar el archivo: prefirmada y temporal con S3,
+    /api/multimedia/archivo/<clave> con almacenamiento local
+    
+    Query params:
+        - expira: segundos de validez de la URL prefirmada (máx. 7 días)
+    """
+    try:
+        segundos = request.args.get('expira', type=int)
+        resultado, codigo = gestor_multimedia.obtener_url_descarga(multimedia_id, segundos)
+        return jsonify(resultado), codigo
+        
+    except Exception as e:
+        return jsonify({"error": f"Error al obtener URL de descarga: {str(e)}"}), 500
+
+
+@multimedia_bp.route('/<int:multimedia_id>/similares', methods=['GET'])
+def obtener_similares(multimedia_id):
+    """
+    GET /api/multimedia/<id>/similares
+    Imágenes que se ven igual (copias reescaladas o recomprimidas),
+    más parecidas primero, con su distancia de Hamming (0-64)
+    
+    Query params:
+        - distancia: distancia máxima entre hashes perceptuales (default: 6, máx. 12)
+        - limite: máximo de resultados (default: 20, máx. 100)
+        - firmar: true|false, URLs /media/ firmadas y con caducidad (default: false)
+    """
+    try:
+        distancia = request.args.get('distancia', DISTANCIA_POR_DEFECTO, type=int)
+        limite = max(1, min(request.args.get('limite', 20, type=int), 100))
+        
+        resultado, codigo = gestor_multimedia.buscar_similares(
+            multimedia_id,
+            distancia=distancia,
+            limite=limite,
+            firmar_urls=pide_urls_firmadas()
+        )
+        return jsonify(resultado), codigo
+        
+    except Exception as e:
+        return jsonify({"error": f"Error al buscar recursos similares: {str(e)}"}), 500
+
+
 @multimedia_bp.route('/upload', methods=['POST'])
 @validar_usuario_id
 def subir_archivo():
@@ -198,6 +286,93 @@ def subir_archivo():
         return jsonify({"error": f"Error al subir archivo: {str(e)}"}), 500
 
 
+# ========== SUBIDAS REANUDABLES (POR PARTES) ==========
+
+@multimedia_bp.route('/subidas', methods=['POST'])
+@validar_usuario_id
+def crear_sesion_subida():
+    """
+    POST /api/multimedia/subidas
+    Crea una sesión de subida por partes
+    
+    Body (JSON):
+        - nombre_archivo: string (requerido)
+        - mime_type: string (requerido)
+        - tamano_total: int en bytes (requerido)
+        - tamano_parte: int en bytes (default 5 MB)
+        - descripcion, alt_text, categoria, transcripcion, etiquetas
+    """
+    try:
+        datos = request.get_json(silent=True) or {}
+        resultado, codigo = gestor_subidas.crear_sesion(datos, request.usuario_id)
+        return jsonify(resultado), codigo
+        
+    except Exception as e:
+        return jsonify({"error": f"Error al crear sesión de subida: {str(e)}"}), 500
+
+
+@multimedia_bp.route('/subidas/<sesion_id>/partes/<int:indice>', methods=['PUT'])
+@validar_usuario_id
+def subir_parte(sesion_id, indice):
+    """
+    PUT /api/multimedia/subidas/<sesion_id>/partes/<indice>
+    Sube la parte `indice` (desde 0). Body: bytes de la parte (application/octet-stream)
+    """
+    try:
+        resultado, codigo = gestor_subidas.guardar_parte(
+            sesion_id, indice, request.stream, request.usuario_id
+        )
+        return jsonify(resultado), codigo
+        
+    except Exception as e:
+        return jsonify({"error": f"Error al subir parte: {str(e)}"}), 500
+
+
+@multimedia_bp.route('/subidas/<sesion_id>', methods=['GET'])
+@validar_usuario_id
+def obtener_estado_subida(sesion_id):
+    """
+    GET /api/multimedia/subidas/<sesion_id>
+    Partes recibidas y faltantes, para reanudar una subida interrumpida
+    """
+    try:
+        resultado, codigo = gestor_subidas.obtener_estado(sesion_id, request.usuario_id)
+        return jsonify(resultado), codigo
+        
+    except Exception as e:
+        return jsonify({"error": f"Error al obtener estado de subida: {str(e)}"}), 500
+
+
+@multimedia_bp.route('/subidas/<sesion_id>/finalizar', methods=['POST'])
+@validar_usuario_id
+def finalizar_subida(sesion_id):
+    """
+    POST /api/multimedia/subidas/<sesion_id>/finalizar
+    Une las partes y crea el recurso multimedia (misma respuesta que /upload)
+    """
+    try:
+        resultado, codigo = gestor_subidas.finalizar(sesion_id, request.usuario_id)
+        return jsonify(resultado), codigo
+        
+    except Exception as e:
+        return jsonify({"error": f"Error al finalizar subida: {str(e)}"}), 500
+
+
+@multimedia_bp.route('/subidas/<sesion_id>', methods=['DELETE'])
+@validar_usuario_id
+def cancelar_subida(sesion_id):
+    """
+    DELETE /api/multimedia/subidas/<sesion_id>
+    Cancela la subida y borra las partes
+    """
+    try:
+        resultado, codigo = gestor_subidas.cancelar(sesion_id, request.usuario_id)
+        return jsonify(resultado), codigo
+        
+    except Exception as e:
+        return jsonify({"error": f"Error al cancelar subida: {str(e)}"}), 500
+
+
 @multimedia_bp.route('/<int:multimedia_id>', methods=['PUT', 'PATCH'])
 @validar_usuario_id
 def actualizar_recurso(multimedia_id):
@@ -306,6 +481,7 @@ def desasociar_de_leccion(multimedia_id, leccion_id):
 
 
 @multimedia_bp.route('/estadisticas', methods=['GET'])
+@respuesta_condicional(version_tabla_multimedia)
 def obtener_estadisticas():
     """
     GET /api/multimedia/estadisticas
@@ -319,40 +495,63 @@ def obtener_estadisticas():
         return jsonify({"error": f"Error al obtener estadísticas: {str(e)}"}), 500
 
 
+@multimedia_bp.route('/etiquetas', methods=['GET'])
+@respuesta_condicional(version_tabla_multimedia)
+def obtener_facetas_etiquetas():
+    """
+    GET /api/multimedia/etiquetas
+    Conteo de recursos por etiqueta (facetas), de mayor a menor
+    
+    Query params:
+        - tipo: imagen|audio|video|documento (opcional)
+        - limite: máximo de etiquetas (default: 50, máx: 200)
+    """
+    try:
+        filtros = {'tipo': request.args.get('tipo')}
+        filtros = {k: v for k, v in filtros.items() if v is not None}
+        limite = max(1, min(request.args.get('limite', 50, type=int), 200))
+        
+        resultado, codigo = gestor_multimedia.obtener_facetas_etiquetas(filtros, limite=limite)
+        return jsonify(resultado), codigo
+        
+    except Exception as e:
+        return jsonify({"error": f"Error al obtener etiquetas: {str(e)}"}), 500
+
+
 @multimedia_bp.route('/archivo/<path:filename>', methods=['GET'])
 def servir_archivo(filename):
     """
     GET /api/multimedia/archivo/<filename>
     Sirve un archivo multimedia estático
     
-    Este endpoint permite servir archivos directamente
+    Soporta Range (206) para adelantar audio/video, ETag/Last-Modified
+    (304) y, según MULTIMEDIA_MODO_ENVIO, delega el envío a nginx/Apache.
+    Resuelve tanto la distribución plana (imagen/x.png) como la repartida
+    en subcarpetas (imagen/9f/86/x.png) mientras dura la migración.
+    Con almacenamiento remoto (S3) redirige a una URL GET prefirmada.
     """
     try:
         from models.multimedia import ConfiguracionMultimedia
         
-        # Obtener ruta base
+        if not almacenamiento_multimedia.es_local:
+            try:
+                return redirect(almacenamiento_multimedia.url_firmada(filename), code=302)
+            except ClaveInvalida:
+                return jsonify({"error": "Archivo no encontrado"}), 404
+        
+        # Obtener ruta base (caché en memoria)
         ruta_base = ConfiguracionMultimedia.obtener_valor(
             'ruta_almacenamiento',
             'uploads/multimedia'
         )
+        niveles = ConfiguracionMultimedia.obtener_entero('niveles_directorio', NIVELES_POR_DEFECTO)
         
-        # Construir ruta completa
-        ruta_archivo = Path(ruta_base) / filename
-        
-        # Verificar que el archivo existe
-        if not ruta_archivo.exists():
-            return jsonify({"error": "Archivo no encontrado"}), 404
-        
-        # Verificar que la ruta no sale del directorio permitido
-        if not str(ruta_archivo.resolve()).startswith(str(Path(ruta_base).resolve())):
-            return jsonify({"error": "Acceso denegado"}), 403
-        
-        # Servir archivo
-        return send_file(
-            str(ruta_archivo),
-            as_attachment=False,
-            mimetype=None  # Flask detectará automáticamente
-        )
+        for candidata in rutas_candidatas(filename, niveles):
+            try:
+                return enviar_archivo(ruta_base, candidata)
+            except ArchivoNoEncontrado:
+                continue
+        return jsonify({"error": "Archivo no encontrado"}), 404
         
     except Exception as e:
         return jsonify({"error": f"Error al servir archivo: {str(e)}"}), 500
@@ -433,6 +632,7 @@ def buscar_recursos():
             "tipo": "imagen|audio|video|documento",
             "categoria": "string",
             "etiquetas": ["tag1", "tag2"],
+            "modo_etiquetas": "and|or",
             "fecha_desde": "YYYY-MM-DD",
             "fecha_hasta": "YYYY-MM-DD",
             "tamano_min": int (bytes),
@@ -502,7 +702,18 @@ def info():
                 "PUT /api/multimedia/<id>": "Actualizar recurso",
                 "DELETE /api/multimedia/<id>": "Eliminar recurso",
                 "GET /api/multimedia/estadisticas": "Estadísticas generales",
-                "GET /api/multimedia/archivo/<filename>": "Servir archivo estático"
+                "GET /api/multimedia/etiquetas": "Conteo de recursos por etiqueta",
+                "GET /api/multimedia/<id>/descarga": "URL de descarga (prefirmada con S3)",
+                "GET /api/multimedia/<id>/similares": "Imágenes parecidas (hash perceptual)",
+                "GET /api/multimedia/archivo/<filename>": "Servir archivo estático",
+                "GET /media/<clave>?e=&s=": "Archivo por URL firmada (?firmar=true), sin BD"
+            },
+            "subidas_reanudables": {
+                "POST /api/multimedia/subidas": "Crear sesión de subida por partes",
+                "PUT /api/multimedia/subidas/<sid>/partes/<n>": "Subir parte n",
+                "GET /api/multimedia/subidas/<sid>": "Partes recibidas y faltantes",
+                "POST /api/multimedia/subidas/<sid>/finalizar": "Unir partes y crear recurso",
+                "DELETE /api/multimedia/subidas/<sid>": "Cancelar subida"
             },
             "asociaciones": {
                 "POST /api/multimedia/<id>/asociar-leccion/<lid>": "Asociar con lección",
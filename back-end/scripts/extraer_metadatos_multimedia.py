@@ -0,0 +1,74 @@
+"""
+Script para rellenar dimensiones, duración y bitrate de la biblioteca existente
+Lee solo las cabeceras de los archivos (utils/metadatos_multimedia.py) en un pool
+de procesos y guarda los resultados por lotes (registros con archivo local;
+con S3 los procesa el pool al subir)
+Ejecutar: python scripts/extraer_metadatos_multimedia.py [procesos] [--todos]
+"""
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from config.database import db
+from models.multimedia import Multimedia, TipoMultimedia
+from utils.metadatos_multimedia import extraer_metadatos
+
+TAMANO_LOTE = 500
+
+
+def _consulta_pendientes(todos):
+    consulta = Multimedia.query.filter(
+        Multimedia.ruta_local.isnot(None),
+        Multimedia.tipo.in_([TipoMultimedia.IMAGEN, TipoMultimedia.AUDIO, TipoMultimedia.VIDEO])
+    )
+    if not todos:
+        consulta = consulta.filter(db.or_(
+            db.and_(Multimedia.tipo == TipoMultimedia.IMAGEN, Multimedia.dimensiones.is_(None)),
+            db.and_(Multimedia.tipo != TipoMultimedia.IMAGEN, Multimedia.duracion.is_(None))
+        ))
+    return consulta.order_by(Multimedia.id)
+
+
+def extraer(procesos=None, todos=False):
+    """Extrae metadatos de los registros sin dimensiones/duración (o de todos)"""
+    with app.app_context():
+        total = actualizados = sin_datos = 0
+        ultimo_id = 0
+
+        print("🔎 Leyendo cabeceras de la biblioteca multimedia...")
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            while True:
+                # Paginación por id: los registros ya guardados no vuelven a salir
+                lote = _consulta_pendientes(todos).filter(
+                    Multimedia.id > ultimo_id
+                ).limit(TAMANO_LOTE).all()
+                if not lote:
+                    break
+                ultimo_id = lote[-1].id
+
+                rutas = [fila.ruta_local for fila in lote]
+                resultados = pool.map(extraer_metadatos, rutas, chunksize=16)
+
+                for multimedia, metadatos in zip(lote, resultados):
+                    total += 1
+                    if not metadatos:
+                        sin_datos += 1
+                        continue
+                    multimedia.aplicar_metadatos(metadatos)
+                    actualizados += 1
+
+                db.session.commit()
+                db.session.expunge_all()
+                print(f"   {total} revisados, {actualizados} actualizados")
+
+        print(f"✅ {actualizados} actualizados, {sin_datos} sin metadatos legibles (de {total})")
+
+
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+    procesos = int(argumentos[0]) if argumentos else None
+    extraer(procesos, todos='--todos' in sys.argv)
@@ -0,0 +1,172 @@
+"""
+Script para mover los archivos multimedia a la distribución en subcarpetas
+(imagen/x.png -> imagen/9f/86/x.png) y actualizar ruta_local, url,
+url_thumbnail y las variantes de cada registro
+Primero se mueve el archivo y después se actualiza el registro; mientras tanto
+servir_archivo encuentra el archivo en cualquiera de las dos rutas.
+Con --niveles=0 deshace la migración (vuelve a la distribución plana)
+Ejecutar: python scripts/migrar_distribucion_multimedia.py [hilos] [--niveles=N]
+"""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from config.database import db
+from models.multimedia import Multimedia, ConfiguracionMultimedia
+from services.almacenamiento_multimedia import almacenamiento_multimedia
+from utils.distribucion_archivos import (
+    ruta_distribuida, url_de, PREFIJO_URL, NIVELES_POR_DEFECTO
+)
+
+TAMANO_LOTE = 500
+
+
+def mover(origen, destino):
+    """Mueve un archivo; True si queda en destino"""
+    try:
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        os.replace(origen, destino)
+        return True
+    except FileNotFoundError:
+        # Archivo compartido ya movido por otro registro o ejecución anterior
+        return os.path.isfile(destino)
+
+
+class PlanLote:
+    """Movimientos de archivos y cambios de registros de un lote"""
+
+    def __init__(self, base_absoluta, niveles):
+        self.base_absoluta = base_absoluta
+        self.niveles = niveles
+        self.movimientos = {}  # origen -> destino (un archivo compartido se mueve una vez)
+
+    def nueva_relativa(self, relativa):
+        """Ruta relativa en la distribución nueva y registra el movimiento"""
+        nueva = ruta_distribuida(relativa, self.niveles)
+        if nueva != relativa:
+            origen = os.path.join(self.base_absoluta, relativa)
+            self.movimientos[origen] = os.path.join(self.base_absoluta, nueva)
+        return nueva
+
+    def relativa_de_ruta(self, ruta_local):
+        relativa = os.path.relpath(os.path.abspath(ruta_local), self.base_absoluta)
+        if relativa.startswith('..'):
+            return None  # Fuera de la carpeta de almacenamiento: no se toca
+        return relativa.replace(os.sep, '/')
+
+    def relativa_de_url(self, url):
+        if not url or not url.startswith(PREFIJO_URL):
+            return None
+        return url[len(PREFIJO_URL):]
+
+
+def planificar(plan, multimedia, ruta_base):
+    """Lista de (campo, valor nuevo, ruta de origen) de un registro"""
+    cambios = []
+
+    relativa = plan.relativa_de_ruta(multimedia.ruta_local) if multimedia.ruta_local else None
+    if relativa:
+        nueva = plan.nueva_relativa(relativa)
+        if nueva != relativa:
+            origen = os.path.join(plan.base_absoluta, relativa)
+            cambios.append(('ruta_local', os.path.join(ruta_base, *nueva.split('/')), origen))
+
+    for campo in ('url', 'url_thumbnail'):
+        relativa = plan.relativa_de_url(getattr(multimedia, campo))
+        if relativa:
+            nueva = plan.nueva_relativa(relativa)
+            if nueva != relativa:
+                cambios.append((campo, url_de(nueva), os.path.join(plan.base_absoluta, relativa)))
+
+    variantes = (multimedia.meta_data or {}).get('variantes') or {}
+    for ancho, url in variantes.items():
+        relativa = plan.relativa_de_url(url)
+        if relativa:
+            nueva = plan.nueva_relativa(relativa)
+            if nueva != relativa:
+                cambios.append((('variantes', ancho), url_de(nueva), os.path.join(plan.base_absoluta, relativa)))
+
+    return cambios
+
+
+def migrar(hilos=8, niveles=None):
+    """Mueve los archivos en paralelo y actualiza los registros por lotes"""
+    with app.app_context():
+        if not almacenamiento_multimedia.es_local:
+            print("⚠️ La migración de distribución solo aplica al almacenamiento local")
+            return
+
+        ruta_base = ConfiguracionMultimedia.obtener_valor('ruta_almacenamiento', 'uploads/multimedia')
+        if niveles is None:
+            niveles = ConfiguracionMultimedia.obtener_entero('niveles_directorio', NIVELES_POR_DEFECTO)
+        else:
+            # Las subidas nuevas usan ya la distribución de destino
+            ConfiguracionMultimedia.establecer_valor('niveles_directorio', niveles)
+
+        base_absoluta = os.path.abspath(ruta_base)
+        print(f"📦 Migrando {base_absoluta} a {niveles} nivel(es) de subcarpetas...")
+
+        revisados = actualizados = archivos_movidos = fallidos = 0
+        ultimo_id = 0
+
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            while True:
+                lote = Multimedia.query.filter(
+                    Multimedia.id > ultimo_id
+                ).order_by(Multimedia.id).limit(TAMANO_LOTE).all()
+                if not lote:
+                    break
+                ultimo_id = lote[-1].id
+
+                plan = PlanLote(base_absoluta, niveles)
+                cambios_lote = [(m, planificar(plan, m, ruta_base)) for m in lote]
+
+                # Renombrados en paralelo (E/S del sistema de archivos)
+                origenes = list(plan.movimientos)
+                movidos = dict(zip(origenes, pool.map(
+                    lambda origen: mover(origen, plan.movimientos[origen]), origenes
+                )))
+                archivos_movidos += sum(movidos.values())
+
+                filas = []
+                for multimedia, cambios in cambios_lote:
+                    revisados += 1
+                    if not cambios:
+                        continue
+                    fila = {'id': multimedia.id}
+                    variantes = dict((multimedia.meta_data or {}).get('variantes') or {})
+                    for campo, valor, origen in cambios:
+                        if not movidos.get(origen):
+                            fallidos += 1
+                            print(f"⚠️ Multimedia {multimedia.id}: no se encontró {origen}")
+                            continue
+                        if isinstance(campo, tuple):
+                            variantes[campo[1]] = valor
+                        else:
+                            fila[campo] = valor
+                    if variantes != ((multimedia.meta_data or {}).get('variantes') or {}):
+                        fila['meta_data'] = {**multimedia.meta_data, 'variantes': variantes}
+                    if len(fila) > 1:
+                        filas.append(fila)
+
+                if filas:
+                    # UPDATE por clave primaria en bloque (executemany)
+                    db.session.execute(db.update(Multimedia), filas)
+                    actualizados += len(filas)
+                db.session.commit()
+                db.session.expunge_all()
+                print(f"   {revisados} revisados, {actualizados} actualizados, {archivos_movidos} archivos movidos")
+
+        print(f"✅ Migración terminada: {actualizados} registros actualizados, {fallidos} rutas sin archivo")
+
+
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+    opciones = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+    hilos = int(argumentos[0]) if argumentos else 8
+    niveles = int(opciones['niveles']) if 'niveles' in opciones else None
+    migrar(hilos, niveles)
@@ -0,0 +1,73 @@
+"""
+Script para añadir la columna multimedia.hash_sha256 y calcular el hash de los archivos existentes
+db.create_all() no altera tablas ya creadas, así que en BDs anteriores hay que ejecutarlo una vez
+Ejecutar: python scripts/migrar_hash_multimedia.py [tamano_lote]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hashlib
+from sqlalchemy import inspect
+
+from app import app
+from extensions import db
+from models.multimedia import Multimedia
+from utils.subida_archivos import TAMANO_BLOQUE
+
+
+def hash_archivo(ruta):
+    """SHA-256 de un archivo leído por bloques"""
+    resumen = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(TAMANO_BLOQUE), b''):
+            resumen.update(bloque)
+    return resumen.hexdigest()
+
+
+def agregar_columna():
+    """Crea la columna y su índice si todavía no existen"""
+    inspector = inspect(db.engine)
+    columnas = {c['name'] for c in inspector.get_columns('multimedia')}
+    if 'hash_sha256' in columnas:
+        print("✅ La columna hash_sha256 ya existe")
+        return
+
+    with db.engine.begin() as conexion:
+        conexion.execute(db.text('ALTER TABLE multimedia ADD COLUMN hash_sha256 VARCHAR(64) NULL'))
+        conexion.execute(db.text('CREATE INDEX ix_multimedia_hash_sha256 ON multimedia (hash_sha256)'))
+    print("✅ Columna hash_sha256 e índice creados")
+
+
+def calcular_hashes(tamano_lote=200):
+    """Calcula el hash de los registros que no lo tienen, por lotes"""
+    procesados, sin_archivo = 0, 0
+    ultimo_id = 0
+    while True:
+        lote = Multimedia.query.filter(
+            Multimedia.id > ultimo_id,
+            Multimedia.hash_sha256.is_(None)
+        ).order_by(Multimedia.id).limit(tamano_lote).all()
+        if not lote:
+            break
+
+        for recurso in lote:
+            ultimo_id = recurso.id
+            if recurso.ruta_local and os.path.isfile(recurso.ruta_local):
+                recurso.hash_sha256 = hash_archivo(recurso.ruta_local)
+                procesados += 1
+            else:
+                sin_archivo += 1
+        db.session.commit()
+        print(f"   ... {procesados} hashes calculados")
+
+    print(f"✅ {procesados} registros actualizados, {sin_archivo} sin archivo en disco")
+
+
+if __name__ == "__main__":
+    lote = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with app.app_context():
+        agregar_columna()
+        calcular_hashes(lote)
@@ -0,0 +1,83 @@
+"""
+Script para añadir la columna multimedia.hash_perceptual y calcular el dHash
+de las imágenes existentes en un pool de procesos (requiere Pillow)
+db.create_all() no altera tablas ya creadas, así que en BDs anteriores hay que ejecutarlo una vez
+Las imágenes nuevas las procesa el pool al subirlas
+Ejecutar: python scripts/migrar_hash_perceptual.py [procesos]
+"""
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect
+
+from app import app
+from config.database import db
+from models.multimedia import Multimedia, TipoMultimedia
+from utils.hash_perceptual import calcular_dhash, HASH_PERCEPTUAL_DISPONIBLE
+
+TAMANO_LOTE = 500
+
+
+def agregar_columna():
+    """Crea la columna si todavía no existe"""
+    inspector = inspect(db.engine)
+    columnas = {c['name'] for c in inspector.get_columns('multimedia')}
+    if 'hash_perceptual' in columnas:
+        print("✅ La columna hash_perceptual ya existe")
+        return
+
+    with db.engine.begin() as conexion:
+        conexion.execute(db.text('ALTER TABLE multimedia ADD COLUMN hash_perceptual VARCHAR(16) NULL'))
+    print("✅ Columna hash_perceptual creada")
+
+
+def calcular_hashes(procesos=None):
+    """Calcula el dHash de las imágenes con archivo local que no lo tienen"""
+    total = calculados = ilegibles = 0
+    ultimo_id = 0
+
+    print("🖼️ Calculando hashes perceptuales...")
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        while True:
+            lote = Multimedia.query.filter(
+                Multimedia.id > ultimo_id,
+                Multimedia.tipo == TipoMultimedia.IMAGEN,
+                Multimedia.hash_perceptual.is_(None),
+                Multimedia.ruta_local.isnot(None)
+            ).order_by(Multimedia.id).limit(TAMANO_LOTE).all()
+            if not lote:
+                break
+            ultimo_id = lote[-1].id
+
+            rutas = [m.ruta_local for m in lote if os.path.isfile(m.ruta_local)]
+            hashes = dict(zip(rutas, pool.map(calcular_dhash, rutas, chunksize=16)))
+
+            for multimedia in lote:
+                total += 1
+                valor = hashes.get(multimedia.ruta_local)
+                if not valor:
+                    ilegibles += 1
+                    continue
+                multimedia.hash_perceptual = valor
+                calculados += 1
+
+            db.session.commit()
+            db.session.expunge_all()
+            print(f"   {total} revisadas, {calculados} con hash")
+
+    print(f"✅ {calculados} hashes calculados, {ilegibles} sin archivo o ilegibles (de {total})")
+
+
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+    procesos = int(argumentos[0]) if argumentos else None
+    with app.app_context():
+        agregar_columna()
+        if HASH_PERCEPTUAL_DISPONIBLE:
+            calcular_hashes(procesos)
+        else:
+            print("⚠️ Pillow no está instalado: no se pueden calcular los hashes")
@@ -0,0 +1,33 @@
+"""
+Script para crear el índice de tokens_revocados.revocado_en en BDs ya creadas
+La sincronización de services/lista_revocacion.py vuelve a leer en cada ciclo lo revocado en el último margen
+db.create_all() no añade índices a tablas existentes, así que hay que ejecutarlo una vez
+Ejecutar: python scripts/migrar_indice_revocados.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect
+
+from app import app
+from config.database import db
+from models.token_revocado import TokenRevocado
+
+
+def crear_indice():
+    """Crea ix_tokens_revocados_revocado_en si todavía no existe"""
+    indice = next(i for i in TokenRevocado.__table__.indexes if i.name == 'ix_tokens_revocados_revocado_en')
+    existentes = {i['name'] for i in inspect(db.engine).get_indexes(TokenRevocado.__tablename__)}
+    if indice.name in existentes:
+        print(f"✅ {indice.name} ya existe")
+        return
+    indice.create(db.engine)
+    print(f"✅ {indice.name} creado")
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        crear_indice()
@@ -0,0 +1,47 @@
+"""
+Script para pasar actualizado_en de lecciones, actividades, multimedia y cursos a DATETIME(6)
+Los ETag salen de MAX(actualizado_en): con DATETIME (al segundo) dos cambios en el mismo segundo dan la misma versión
+db.create_all() no altera tablas ya creadas, así que en BDs MySQL/MariaDB anteriores hay que ejecutarlo una vez
+Ejecutar: python scripts/migrar_precision_fechas.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect
+
+from app import app
+from config.database import db
+
+# tabla -> admite NULL
+TABLAS = {
+    'lecciones': False,
+    'actividades': False,
+    'multimedia': False,
+    'cursos': True,
+}
+
+
+def migrar_columnas():
+    """Cambia el tipo de actualizado_en donde todavía no tiene microsegundos"""
+    if db.engine.dialect.name not in ('mysql', 'mariadb'):
+        print(f"✅ {db.engine.dialect.name} ya guarda microsegundos: nada que hacer")
+        return
+
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conexion:
+        for tabla, admite_null in TABLAS.items():
+            columna = next(c for c in inspector.get_columns(tabla) if c['name'] == 'actualizado_en')
+            if getattr(columna['type'], 'fsp', None) == 6:
+                print(f"✅ {tabla}.actualizado_en ya es DATETIME(6)")
+                continue
+            nulo = 'NULL' if admite_null else 'NOT NULL'
+            conexion.execute(db.text(f'ALTER TABLE {tabla} MODIFY actualizado_en DATETIME(6) {nulo}'))
+            print(f"✅ {tabla}.actualizado_en -> DATETIME(6)")
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        migrar_columnas()
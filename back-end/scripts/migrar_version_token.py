@@ -0,0 +1,34 @@
+"""
+Script para añadir la columna usuarios.version_token (versión de los claims del JWT)
+db.create_all() no altera tablas ya creadas, así que en BDs anteriores hay que ejecutarlo una vez
+Todos los usuarios empiezan en 0; los tokens emitidos antes siguen valiendo hasta que caduquen
+Ejecutar: python scripts/migrar_version_token.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect
+
+from app import app
+from config.database import db
+
+
+def agregar_columna():
+    """Crea la columna si todavía no existe"""
+    inspector = inspect(db.engine)
+    columnas = {c['name'] for c in inspector.get_columns('usuarios')}
+    if 'version_token' in columnas:
+        print("✅ La columna version_token ya existe")
+        return
+
+    with db.engine.begin() as conexion:
+        conexion.execute(db.text('ALTER TABLE usuarios ADD COLUMN version_token INTEGER NOT NULL DEFAULT 0'))
+    print("✅ Columna version_token creada")
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        agregar_columna()
@@ -0,0 +1,34 @@
+"""
+Script para procesar los recursos pendientes (metadatos, miniaturas y variantes WebP)
+Reencola los recursos PENDIENTE y los PROCESANDO abandonados (p. ej. tras un reinicio)
+y espera a que el pool termine
+Ejecutar: python scripts/procesar_multimedia_pendiente.py [limite]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from services.procesador_multimedia import procesador_multimedia
+
+
+def procesar(limite=500):
+    """Encola los pendientes y espera a que terminen"""
+    with app.app_context():
+        if not procesador_multimedia.activo:
+            print("⚠️ Procesador inactivo (MULTIMEDIA_PROCESOS=0)")
+            return
+
+        print("🖼️  Encolando recursos pendientes...")
+        total = procesador_multimedia.encolar_pendientes(limite)
+        print(f"   {total} recursos en el pool, esperando...")
+
+    procesador_multimedia.detener(esperar=True)
+    print("✅ Procesamiento terminado")
+
+
+if __name__ == "__main__":
+    limite = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    procesar(limite)
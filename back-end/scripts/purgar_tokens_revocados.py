@@ -0,0 +1,21 @@
+"""
+Script para borrar de tokens_revocados los tokens que ya caducaron
+(un token caducado se rechaza solo; su fila ya no hace falta)
+Conviene ejecutarlo a diario (cron); los filtros de Bloom se reconstruyen solos al llenarse
+Ejecutar: python scripts/purgar_tokens_revocados.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from services.lista_revocacion import lista_revocacion
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        print("🧹 Purgando tokens revocados caducados...")
+        borrados = lista_revocacion.purgar_expirados()
+        print(f"✅ {borrados} tokens borrados")
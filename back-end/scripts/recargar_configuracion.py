@@ -0,0 +1,27 @@
+"""
+Script para avisar a todos los workers de que la configuración multimedia cambió
+Útil tras editar la tabla configuracion_multimedia a mano (SQL, migraciones):
+los procesos recargan la caché en su siguiente lectura, sin esperar al TTL
+Ejecutar: python scripts/recargar_configuracion.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from models.multimedia import cache_configuracion_multimedia
+
+
+def recargar():
+    """Toca el archivo de versión compartido y muestra la configuración vigente"""
+    with app.app_context():
+        cache_configuracion_multimedia.establecido()
+        print(f"🔔 Aviso publicado en {cache_configuracion_multimedia.archivo_version}")
+        for clave, valor in sorted(cache_configuracion_multimedia.todos().items()):
+            print(f"   {clave} = {valor}")
+
+
+if __name__ == "__main__":
+    recargar()
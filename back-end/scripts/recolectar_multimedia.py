@@ -0,0 +1,73 @@
+"""
+Script para reconciliar la carpeta de multimedia con la tabla multimedia
+Pone en cuarentena los archivos sin registro, marca ERROR los registros sin
+archivo y borra las sesiones de subida expiradas (services/recolector_multimedia.py)
+Ejecutar: python scripts/recolectar_multimedia.py [--simular] [--edad-minima=MINUTOS]
+          [--por-segundo=N] [--solo-archivos | --solo-registros]
+"""
+
+import os
+import sys
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from services.gestor_subidas import gestor_subidas
+from services.recolector_multimedia import recolector_multimedia, EDAD_MINIMA_POR_DEFECTO
+
+
+def imprimir_archivos(resumen):
+    if resumen.get("error"):
+        print(f"⚠️ {resumen['error']}")
+        return
+    mb = resumen["bytes_huerfanos"] / (1024 * 1024)
+    print(f"   Archivos revisados: {resumen['revisados']}")
+    print(f"   Huérfanos: {resumen['huerfanos']} ({mb:.2f} MB), en cuarentena: {resumen['en_cuarentena']}")
+    print(f"   Recientes (ignorados): {resumen['recientes']}, no reconocidos: {resumen['no_reconocidos']}")
+    for ruta in resumen["ejemplos"]:
+        print(f"     - {ruta}")
+
+
+def imprimir_registros(resumen):
+    print(f"   Registros revisados: {resumen['revisados']}")
+    print(f"   Sin archivo: {resumen['sin_archivo']}, marcados ERROR: {resumen['marcados']}")
+    if resumen["ids"]:
+        print(f"     ids: {resumen['ids']}")
+
+
+def recolectar(simular=False, edad_minima=EDAD_MINIMA_POR_DEFECTO, por_segundo=0,
+               archivos=True, registros=True):
+    """Ejecuta el recolector e imprime el resumen"""
+    with app.app_context():
+        if simular:
+            print("🔍 Modo simulación: no se moverá ni modificará nada")
+
+        if archivos and registros and not simular:
+            print(f"🧹 Sesiones de subida expiradas borradas: {gestor_subidas.limpiar_expiradas()}")
+
+        if archivos:
+            print("🗂️  Buscando archivos huérfanos...")
+            imprimir_archivos(recolector_multimedia.recolectar_huerfanos(simular, edad_minima, por_segundo))
+
+        if registros:
+            print("📋 Buscando registros sin archivo...")
+            imprimir_registros(recolector_multimedia.marcar_registros_sin_archivo(simular, por_segundo))
+
+    print("✅ Recolección terminada")
+
+
+if __name__ == "__main__":
+    opciones = dict(
+        (a[2:].split('=', 1) + [''])[:2] for a in sys.argv[1:] if a.startswith('--')
+    )
+    recolectar(
+        simular='simular' in opciones,
+        edad_minima=(
+            timedelta(minutes=int(opciones['edad-minima']))
+            if opciones.get('edad-minima') else EDAD_MINIMA_POR_DEFECTO
+        ),
+        por_segundo=int(opciones.get('por-segundo') or 0),
+        archivos='solo-registros' not in opciones,
+        registros='solo-archivos' not in opciones
+    )
@@ -0,0 +1,26 @@
+"""
+Script para reconstruir el índice de búsqueda de lecciones
+Útil la primera vez (backfill) o si el índice quedó desincronizado
+Ejecutar: python scripts/reindexar_busqueda.py [tamano_lote]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from services.indice_busqueda import indice_busqueda
+
+
+def reindexar(tamano_lote=500):
+    """Reindexa todas las lecciones por lotes"""
+    with app.app_context():
+        print("🔎 Reconstruyendo índice de búsqueda de lecciones...")
+        total = indice_busqueda.reindexar_todo(tamano_lote=tamano_lote)
+        print(f"✅ {total} lecciones indexadas")
+
+
+if __name__ == "__main__":
+    lote = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    reindexar(lote)
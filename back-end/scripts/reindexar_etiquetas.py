@@ -0,0 +1,27 @@
+"""
+Script para reconstruir los índices de etiquetas de lecciones y multimedia
+Útil la primera vez (backfill) o si los índices quedaron desincronizados
+Ejecutar: python scripts/reindexar_etiquetas.py [tamano_lote]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from services.indice_etiquetas import indice_etiquetas
+
+
+def reindexar(tamano_lote=500):
+    """Reindexa las etiquetas de lecciones y recursos por lotes"""
+    with app.app_context():
+        print("🏷️  Reconstruyendo índices de etiquetas...")
+        totales = indice_etiquetas.reindexar_todo(tamano_lote=tamano_lote)
+        for tabla, total in totales.items():
+            print(f"✅ {tabla}: {total} registros indexados")
+
+
+if __name__ == "__main__":
+    lote = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    reindexar(lote)
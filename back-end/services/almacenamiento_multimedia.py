@@ -0,0 +1,316 @@
+"""
+Almacenamiento de archivos multimedia - SpeakLexi
+
+Los archivos se identifican por una clave relativa ('imagen/9f/86/<sha256>.png',
+la misma parte de la URL tras /uploads/multimedia/) y se guardan en un backend
+intercambiable:
+
+    MULTIMEDIA_ALMACENAMIENTO = 'local'  (default) carpeta 'ruta_almacenamiento'
+    MULTIMEDIA_ALMACENAMIENTO = 's3'     bucket S3 o compatible (MinIO, Ceph...)
+
+Con S3 varios nodos de la aplicación comparten los archivos: la subida se
+hace en streaming desde el temporal (multiparte por encima de un umbral),
+servir_archivo redirige a una URL GET prefirmada y el pool de procesamiento
+trabaja sobre una copia local temporal. boto3 solo hace falta con 's3'.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from contextlib import closing
+from typing import BinaryIO, Optional
+
+from models.multimedia import ConfiguracionMultimedia
+
+try:
+    import boto3
+    from botocore.config import Config as ConfigBotocore
+    from botocore.exceptions import ClientError
+except ImportError:  # boto3 es opcional (solo backend S3)
+    boto3 = None
+    ConfigBotocore = None
+    ClientError = Exception
+
+BACKEND_LOCAL = 'local'
+BACKEND_S3 = 's3'
+BACKENDS = (BACKEND_LOCAL, BACKEND_S3)
+
+TAMANO_BLOQUE = 1024 * 1024
+UMBRAL_MULTIPARTE_POR_DEFECTO = 16 * 1024 * 1024
+TAMANO_PARTE_S3_POR_DEFECTO = 8 * 1024 * 1024
+TAMANO_PARTE_S3_MINIMO = 5 * 1024 * 1024  # Mínimo de S3 salvo la última parte
+
+
+class ClaveInvalida(ValueError):
+    """Clave vacía, absoluta, con '..' o con segmentos ocultos"""
+
+
+def validar_clave(clave: str) -> str:
+    """Normaliza una clave relativa; los segmentos ocultos (.subidas) nunca se exponen"""
+    partes = (clave or '').replace('\\', '/').split('/')
+    if not clave or clave.startswith('/') or any(not p or p.startswith('.') for p in partes):
+        raise ClaveInvalida(clave)
+    return '/'.join(partes)
+
+
+class AlmacenamientoLocal:
+    """Carpeta local (o compartida por NFS) configurada en 'ruta_almacenamiento'"""
+
+    es_local = True
+
+    @property
+    def ruta_base(self) -> str:
+        return ConfiguracionMultimedia.obtener_valor('ruta_almacenamiento', 'uploads/multimedia')
+
+    def ruta_local(self, clave: str) -> str:
+        return os.path.join(self.ruta_base, *validar_clave(clave).split('/'))
+
+    def guardar(self, ruta_archivo: str, clave: str, mime_type: Optional[str] = None,
+                conservar_copia: bool = False) -> None:
+        """Mueve un archivo local a su clave (renombrado atómico en el mismo disco)"""
+        destino = self.ruta_local(clave)
+        if os.path.abspath(ruta_archivo) == os.path.abspath(destino):
+            return
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        os.replace(ruta_archivo, destino)
+
+    def existe(self, clave: str) -> bool:
+        return os.path.isfile(self.ruta_local(clave))
+
+    def eliminar(self, clave: str) -> None:
+        try:
+            os.unlink(self.ruta_local(clave))
+        except FileNotFoundError:
+            pass
+
+    def abrir(self, clave: str) -> BinaryIO:
+        return open(self.ruta_local(clave), 'rb')
+
+    def descargar(self, clave: str, destino: str) -> None:
+        shutil.copyfile(self.ruta_local(clave), destino)
+
+    def url_firmada(self, clave: str, segundos: Optional[int] = None) -> Optional[str]:
+        return None  # Se sirve desde servir_archivo
+
+    def copia_para_procesar(self, clave: str) -> str:
+        return self.ruta_local(clave)
+
+    def liberar_copia(self, ruta: str) -> None:
+        pass
+
+    def descartar_copia(self, clave: str) -> None:
+        pass
+
+
+class AlmacenamientoS3:
+    """Bucket S3 o compatible (endpoint_url para MinIO/moto)"""
+
+    es_local = False
+
+    def __init__(self, bucket, prefijo='', endpoint_url=None, region=None,
+                 access_key=None, secret_key=None, expiracion_url=3600,
+                 umbral_multiparte=UMBRAL_MULTIPARTE_POR_DEFECTO,
+                 tamano_parte=TAMANO_PARTE_S3_POR_DEFECTO, directorio_temporal=None):
+        if boto3 is None:
+            raise RuntimeError("boto3 no está instalado (necesario para MULTIMEDIA_ALMACENAMIENTO=s3)")
+        if not bucket:
+            raise RuntimeError("Falta MULTIMEDIA_S3_BUCKET")
+        self.bucket = bucket
+        self.prefijo = prefijo.strip('/')
+        self.expiracion_url = expiracion_url
+        self.umbral_multiparte = umbral_multiparte
+        self.tamano_parte = max(int(tamano_parte), TAMANO_PARTE_S3_MINIMO)
+        self.directorio_temporal = directorio_temporal or os.path.join(
+            tempfile.gettempdir(), 'speaklexi-multimedia'
+        )
+        self._parametros_cliente = {
+            'endpoint_url': endpoint_url or None,
+            'region_name': region or None,
+            'aws_access_key_id': access_key or None,
+            'aws_secret_access_key': secret_key or None,
+        }
+        self._cliente = None
+        self._lock = threading.Lock()
+
+    @property
+    def cliente(self):
+        # Los clientes de boto3 son seguros entre hilos: uno por proceso
+        if self._cliente is None:
+            with self._lock:
+                if self._cliente is None:
+                    self._cliente = boto3.client(
+                        's3',
+                        config=ConfigBotocore(signature_version='s3v4', retries={'mode': 'standard'}),
+                        **self._parametros_cliente
+                    )
+        return self._cliente
+
+    def _clave_objeto(self, clave: str) -> str:
+        clave = validar_clave(clave)
+        return f"{self.prefijo}/{clave}" if self.prefijo else clave
+
+    def ruta_local(self, clave: str) -> Optional[str]:
+        return None
+
+    # ========== ESCRITURA ==========
+
+    def guardar(self, ruta_archivo: str, clave: str, mime_type: Optional[str] = None,
+                conservar_copia: bool = False) -> None:
+        """
+        Sube un archivo local leyéndolo por bloques y lo borra del disco.
+
+        Por encima de umbral_multiparte usa subida multiparte (partes de
+        tamano_parte), así un vídeo grande nunca se carga entero en memoria
+        y un fallo de red solo repite una parte. Con conservar_copia el
+        archivo queda en el directorio temporal para el pool de procesamiento.
+        """
+        extra = {'ContentType': mime_type} if mime_type else {}
+        if os.path.getsize(ruta_archivo) > self.umbral_multiparte:
+            self._subir_multiparte(ruta_archivo, clave, extra)
+        else:
+            with open(ruta_archivo, 'rb') as archivo:
+                self.cliente.put_object(
+                    Bucket=self.bucket, Key=self._clave_objeto(clave), Body=archivo, **extra
+                )
+
+        if conservar_copia:
+            copia = self._ruta_copia(clave)
+            os.makedirs(os.path.dirname(copia), exist_ok=True)
+            shutil.move(ruta_archivo, copia)  # Puede ser otro sistema de archivos
+        else:
+            os.unlink(ruta_archivo)
+
+    def _subir_multiparte(self, ruta_archivo, clave, extra):
+        clave_objeto = self._clave_objeto(clave)
+        subida = self.cliente.create_multipart_upload(Bucket=self.bucket, Key=clave_objeto, **extra)
+        subida_id = subida['UploadId']
+        partes = []
+        try:
+            with open(ruta_archivo, 'rb') as archivo:
+                numero = 1
+                while True:
+                    bloque = archivo.read(self.tamano_parte)
+                    if not bloque:
+                        break
+                    respuesta = self.cliente.upload_part(
+                        Bucket=self.bucket, Key=clave_objeto, UploadId=subida_id,
+                        PartNumber=numero, Body=bloque
+                    )
+                    partes.append({'ETag': respuesta['ETag'], 'PartNumber': numero})
+                    numero += 1
+            self.cliente.complete_multipart_upload(
+                Bucket=self.bucket, Key=clave_objeto, UploadId=subida_id,
+                MultipartUpload={'Parts': partes}
+            )
+        except Exception:
+            # Sin abortar, S3 cobra las partes huérfanas
+            self.cliente.abort_multipart_upload(Bucket=self.bucket, Key=clave_objeto, UploadId=subida_id)
+            raise
+
+    def eliminar(self, clave: str) -> None:
+        self.cliente.delete_object(Bucket=self.bucket, Key=self._clave_objeto(clave))
+
+    # ========== LECTURA ==========
+
+    def existe(self, clave: str) -> bool:
+        try:
+            self.cliente.head_object(Bucket=self.bucket, Key=self._clave_objeto(clave))
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def abrir(self, clave: str) -> BinaryIO:
+        """Stream del objeto; usar con `with` y leer por bloques"""
+        respuesta = self.cliente.get_object(Bucket=self.bucket, Key=self._clave_objeto(clave))
+        return closing(respuesta['Body'])
+
+    def descargar(self, clave: str, destino: str) -> None:
+        temporal = f"{destino}.{os.getpid()}.tmp"
+        with self.abrir(clave) as origen, open(temporal, 'wb') as archivo:
+            for bloque in iter(lambda: origen.read(TAMANO_BLOQUE), b''):
+                archivo.write(bloque)
+        os.replace(temporal, destino)
+
+    def url_firmada(self, clave: str, segundos: Optional[int] = None) -> str:
+        """URL GET prefirmada: el cliente descarga directamente del bucket"""
+        return self.cliente.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': self._clave_objeto(clave)},
+            ExpiresIn=segundos or self.expiracion_url
+        )
+
+    # ========== COPIA LOCAL PARA EL POOL ==========
+
+    def _ruta_copia(self, clave: str) -> str:
+        return os.path.join(self.directorio_temporal, *validar_clave(clave).split('/'))
+
+    def copia_para_procesar(self, clave: str) -> str:
+        """
+        Copia local propia de quien la pide; se borra con liberar_copia(ruta).
+
+        La primera tarea se queda la que dejó guardar() (renombrado atómico,
+        también entre procesos); las demás con la misma clave descargan la
+        suya, así ninguna borra el archivo que otra sigue leyendo.
+        """
+        compartida = self._ruta_copia(clave)
+        raiz, extension = os.path.splitext(compartida)
+        copia = f"{raiz}.{uuid.uuid4().hex}{extension}"
+        try:
+            os.rename(compartida, copia)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(copia), exist_ok=True)
+            self.descargar(clave, copia)
+        return copia
+
+    def liberar_copia(self, ruta: str) -> None:
+        try:
+            os.unlink(ruta)
+        except FileNotFoundError:
+            pass
+
+    def descartar_copia(self, clave: str) -> None:
+        """Borra la copia que dejó guardar() si ninguna tarea llegó a usarla"""
+        self.liberar_copia(self._ruta_copia(clave))
+
+
+def crear_backend(config):
+    """Backend según MULTIMEDIA_ALMACENAMIENTO"""
+    tipo = (config.get('MULTIMEDIA_ALMACENAMIENTO') or BACKEND_LOCAL).lower()
+    if tipo == BACKEND_LOCAL:
+        return AlmacenamientoLocal()
+    if tipo == BACKEND_S3:
+        return AlmacenamientoS3(
+            bucket=config.get('MULTIMEDIA_S3_BUCKET'),
+            prefijo=config.get('MULTIMEDIA_S3_PREFIJO', ''),
+            endpoint_url=config.get('MULTIMEDIA_S3_ENDPOINT'),
+            region=config.get('MULTIMEDIA_S3_REGION'),
+            access_key=config.get('MULTIMEDIA_S3_ACCESS_KEY'),
+            secret_key=config.get('MULTIMEDIA_S3_SECRET_KEY'),
+            expiracion_url=int(config.get('MULTIMEDIA_S3_EXPIRACION_URL', 3600)),
+            umbral_multiparte=int(config.get('MULTIMEDIA_S3_UMBRAL_MULTIPARTE', UMBRAL_MULTIPARTE_POR_DEFECTO)),
+            tamano_parte=int(config.get('MULTIMEDIA_S3_TAMANO_PARTE', TAMANO_PARTE_S3_POR_DEFECTO)),
+            directorio_temporal=config.get('MULTIMEDIA_S3_DIRECTORIO_TEMPORAL'),
+        )
+    raise RuntimeError(f"MULTIMEDIA_ALMACENAMIENTO no válido: {tipo} (opciones: {', '.join(BACKENDS)})")
+
+
+class GestorAlmacenamiento:
+    """Punto de acceso al backend configurado (local hasta init_app)"""
+
+    def __init__(self):
+        self.backend = AlmacenamientoLocal()
+
+    def init_app(self, app):
+        self.backend = crear_backend(app.config)
+        print(f"🗄️  Almacenamiento multimedia: {app.config.get('MULTIMEDIA_ALMACENAMIENTO') or BACKEND_LOCAL}")
+
+    def __getattr__(self, nombre):
+        return getattr(self.backend, nombre)
+
+
+# Instancia global del almacenamiento
+almacenamiento_multimedia = GestorAlmacenamiento()
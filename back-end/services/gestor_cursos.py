@@ -438,7 +438,12 @@ class GestorCursos:
             list: Lista de cursos con progreso
         """
         try:
-            progresos = ProgresoCurso.query.filter_by(usuario_id=usuario_id).all()
+            progresos = (
+                ProgresoCurso.query
+                .options(*ProgresoCurso.opciones_carga(incluir_curso=True))
+                .filter_by(usuario_id=usuario_id)
+                .all()
+            )
             
             if not incluir_progreso:
                 return [p.curso for p in progresos]
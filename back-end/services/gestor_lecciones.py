@@ -6,12 +6,21 @@ Maneja toda la lógica de negocio relacionada con lecciones y actividades
 from config.database import db
 from models.leccion import (
     Leccion, Actividad, NivelDificultad, 
-    TipoActividad, EstadoLeccion
+    TipoActividad, EstadoLeccion,
+    VISTA_RESUMEN, VISTAS_LECCION
 )
 from models.multimedia import Multimedia
+from models.serializacion import registro_serializadores
+from services.indice_busqueda import indice_busqueda
+from services.indice_etiquetas import indice_etiquetas, MODOS_VALIDOS
+from services.paquetes_lecciones import paquetes_lecciones
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import or_, and_
 from datetime import datetime
+from utils.paginacion import (
+    paginar_por_cursor, contador_estimado, clave_conteo, CursorInvalido,
+    PaginacionInvalida, validar_paginacion
+)
 
 
 class GestorLecciones:
@@ -141,7 +150,11 @@ class GestorLecciones:
             )
             
             db.session.add(nueva_leccion)
+            db.session.flush()
+            indice_busqueda.indexar_leccion(nueva_leccion)
+            indice_etiquetas.sincronizar_leccion(nueva_leccion)
             db.session.commit()
+            contador_estimado.invalidar('lecciones')
             
             return {
                 "mensaje": "Lección creada exitosamente",
@@ -167,7 +180,12 @@ class GestorLecciones:
         Returns:
             tuple: (dict con lección o error, código HTTP)
         """
-        leccion = Leccion.query.get(leccion_id)
+        leccion = (
+            Leccion.query
+            .options(*Leccion.opciones_carga(incluir_actividades, incluir_multimedia))
+            .filter_by(id=leccion_id)
+            .first()
+        )
         
         if not leccion:
             return {"error": "Lección no encontrada"}, 404
@@ -179,20 +197,63 @@ class GestorLecciones:
             )
         }, 200
     
-    def listar_lecciones(self, filtros=None, pagina=1, por_pagina=20):
+    def buscar_lecciones(self, texto, limite=20, solo_publicadas=False):
+        """
+        Búsqueda de lecciones por relevancia usando el índice invertido.
+        
+        Args:
+            texto (str): Texto de búsqueda (el último término se busca por prefijo)
+            limite (int): Máximo de resultados
+            solo_publicadas (bool): Si solo retornar lecciones publicadas
+        
+        Returns:
+            tuple: (dict con lecciones ordenadas por relevancia, código HTTP)
+        """
+        try:
+            filtros_extra = []
+            if solo_publicadas:
+                filtros_extra.append(Leccion.estado == EstadoLeccion.PUBLICADA)
+            
+            lecciones = indice_busqueda.buscar(
+                texto, limite=limite, filtros_extra=filtros_extra,
+                query_base=Leccion.query_resumen()
+            )
+            
+            return {
+                "termino": texto,
+                "total": len(lecciones),
+                "lecciones": registro_serializadores.serializar_lista(lecciones, VISTA_RESUMEN)
+            }, 200
+            
+        except Exception as e:
+            return {"error": f"Error al buscar lecciones: {str(e)}"}, 500
+    
+    def listar_lecciones(self, filtros=None, pagina=1, por_pagina=20, cursor=None,
+                         incluir_total=False, vista=VISTA_RESUMEN):
         """
         Lista lecciones con filtros opcionales y paginación.
         
+        Si se recibe cursor (aunque sea vacío) se usa paginación por keyset
+        sobre (orden, creado_en, id) en lugar de OFFSET + COUNT(*).
+        
         Args:
             filtros (dict): Filtros opcionales
             pagina (int): Número de página
             por_pagina (int): Lecciones por página
+            cursor (str): Cursor de la página anterior ('' para la primera)
+            incluir_total (bool): En modo cursor, incluir total estimado (cacheado)
+            vista (str): 'resumen' (sin contenido, no lo lee de la BD) o 'completa'
         
         Returns:
             tuple: (dict con lecciones paginadas, código HTTP)
         """
         try:
-            query = Leccion.query
+            if vista not in VISTAS_LECCION:
+                return {"error": f"Vista inválida. Debe ser: {', '.join(VISTAS_LECCION)}"}, 400
+            
+            pagina, por_pagina = validar_paginacion(pagina, por_pagina)
+            
+            query = Leccion.query_resumen() if vista == VISTA_RESUMEN else Leccion.query
             
             # Aplicar filtros si existen
             if filtros:
@@ -221,19 +282,24 @@ class GestorLecciones:
                         pass  # Ignorar estado inválido
                 
                 if filtros.get('buscar'):
-                    termino = f"%{filtros['buscar']}%"
                     query = query.filter(
-                        or_(
-                            Leccion.titulo.ilike(termino),
-                            Leccion.descripcion.ilike(termino)
-                        )
+                        Leccion.id.in_(indice_busqueda.subconsulta_ids(filtros['buscar']))
                     )
                 
+                # Una o varias etiquetas, todas (and) o alguna (or)
                 if filtros.get('etiqueta'):
+                    modo = filtros.get('modo_etiquetas', 'and')
+                    if modo not in MODOS_VALIDOS:
+                        return {"error": f"modo_etiquetas inválido. Debe ser: {', '.join(MODOS_VALIDOS)}"}, 400
                     query = query.filter(
-                        Leccion.etiquetas.contains([filtros['etiqueta']])
+                        Leccion.id.in_(indice_etiquetas.subconsulta_lecciones(filtros['etiqueta'], modo))
                     )
             
+            if cursor is not None:
+                return self._listar_lecciones_por_cursor(
+                    query, filtros, cursor, por_pagina, incluir_total, vista
+                )
+            
             # Ordenar por orden y fecha de creación
             query = query.order_by(Leccion.orden.asc(), Leccion.creado_en.desc())
             
@@ -245,7 +311,7 @@ class GestorLecciones:
             )
             
             return {
-                "lecciones": [leccion.to_dict() for leccion in paginacion.items],
+                "lecciones": registro_serializadores.serializar_lista(paginacion.items, vista),
                 "total": paginacion.total,
                 "pagina": paginacion.page,
                 "paginas_totales": paginacion.pages,
@@ -253,9 +319,65 @@ class GestorLecciones:
                 "tiene_anterior": paginacion.has_prev
             }, 200
             
+        except (CursorInvalido, PaginacionInvalida) as e:
+            return {"error": str(e)}, 400
         except Exception as e:
             return {"error": f"Error al listar lecciones: {str(e)}"}, 500
     
+    def obtener_facetas_etiquetas(self, filtros=None, limite=50):
+        """
+        Cuenta las lecciones por etiqueta con una sola consulta agrupada.
+        
+        Args:
+            filtros (dict): Filtros opcionales (curso_id, estado)
+            limite (int): Máximo de etiquetas
+        
+        Returns:
+            tuple: (dict con etiquetas y totales, código HTTP)
+        """
+        try:
+            condiciones = []
+            if filtros:
+                if filtros.get('curso_id'):
+                    condiciones.append(Leccion.curso_id == filtros['curso_id'])
+                if filtros.get('estado'):
+                    try:
+                        condiciones.append(Leccion.estado == self._obtener_estado_enum(filtros['estado']))
+                    except ValueError as e:
+                        return {"error": str(e)}, 400
+            
+            return {
+                "etiquetas": indice_etiquetas.facetas_lecciones(condiciones, limite=limite)
+            }, 200
+            
+        except Exception as e:
+            return {"error": f"Error al obtener etiquetas: {str(e)}"}, 500
+    
+    def _listar_lecciones_por_cursor(self, query, filtros, cursor, por_pagina, incluir_total, vista):
+        """Página de lecciones por keyset (orden ASC, creado_en DESC, id DESC)."""
+        columnas = [
+            (Leccion.orden, False),
+            (Leccion.creado_en, True),
+            (Leccion.id, True)
+        ]
+        
+        lecciones, siguiente_cursor = paginar_por_cursor(query, columnas, cursor, por_pagina)
+        
+        total = None
+        if incluir_total:
+            total = contador_estimado.obtener(
+                clave_conteo('lecciones', filtros),
+                query.count
+            )
+        
+        return {
+            "lecciones": registro_serializadores.serializar_lista(lecciones, vista),
+            "total": total,
+            "por_pagina": por_pagina,
+            "next_cursor": siguiente_cursor,
+            "tiene_siguiente": siguiente_cursor is not None
+        }, 200
+    
     def actualizar_leccion(self, leccion_id, datos_actualizados, usuario_id):
         """Actualiza una lección existente."""
         try:
@@ -290,8 +412,16 @@ class GestorLecciones:
                 except ValueError as e:
                     return {"error": str(e)}, 400
             
+            # Reindexar solo si cambió algún campo buscable
+            campos_indexados = {'titulo', 'descripcion', 'contenido', 'etiquetas'}
+            if campos_indexados & set(datos_actualizados):
+                indice_busqueda.indexar_leccion(leccion)
+            if 'etiquetas' in datos_actualizados:
+                indice_etiquetas.sincronizar_leccion(leccion)
+            
             leccion.actualizado_en = datetime.utcnow()
             db.session.commit()
+            contador_estimado.invalidar('lecciones')  # curso, nivel o etiquetas pueden cambiar de filtro
             
             return {
                 "mensaje": "Lección actualizada exitosamente",
@@ -312,6 +442,7 @@ class GestorLecciones:
             
             leccion.archivar()
             db.session.commit()
+            contador_estimado.invalidar('lecciones')
             
             return {
                 "mensaje": "Lección archivada exitosamente",
@@ -341,6 +472,13 @@ class GestorLecciones:
             
             leccion.publicar()
             db.session.commit()
+            contador_estimado.invalidar('lecciones')
+            
+            # Paquete offline listo para la primera descarga
+            try:
+                paquetes_lecciones.obtener(leccion_id)
+            except Exception as e:
+                print(f"⚠️ No se pudo generar el paquete de la lección {leccion_id}: {e}")
             
             return {
                 "mensaje": "Lección publicada exitosamente",
@@ -520,7 +658,7 @@ class GestorLecciones:
             except ValueError as e:
                 return {"error": str(e)}, 400
             
-            query = Leccion.query.filter_by(
+            query = Leccion.query_resumen().filter_by(
                 nivel=nivel_enum,
                 estado=EstadoLeccion.PUBLICADA
             )
@@ -534,20 +672,23 @@ class GestorLecciones:
                 "nivel": nivel,
                 "idioma": idioma,
                 "total": len(lecciones),
-                "lecciones": [leccion.to_dict() for leccion in lecciones]
+                "lecciones": registro_serializadores.serializar_lista(lecciones, VISTA_RESUMEN)
             }, 200
             
         except Exception as e:
             return {"error": f"Error al obtener lecciones: {str(e)}"}, 500
     
     # Método para obtener lecciones por curso
-    def obtener_lecciones_por_curso(self, curso_id, solo_publicadas=True):
+    def obtener_lecciones_por_curso(self, curso_id, solo_publicadas=True,
+                                    incluir_actividades=False, incluir_multimedia=False):
         """
         Obtiene todas las lecciones de un curso específico.
         
         Args:
             curso_id (int): ID del curso
             solo_publicadas (bool): Si solo retornar lecciones publicadas
+            incluir_actividades (bool): Si incluir actividades (precargadas)
+            incluir_multimedia (bool): Si incluir recursos multimedia (precargados)
         
         Returns:
             tuple: (dict con lecciones, código HTTP)
@@ -559,7 +700,11 @@ class GestorLecciones:
             if not curso:
                 return {"error": "Curso no encontrado"}, 404
             
-            query = Leccion.query.filter_by(curso_id=curso_id)
+            query = (
+                Leccion.query_resumen()
+                .options(*Leccion.opciones_carga(incluir_actividades, incluir_multimedia))
+                .filter_by(curso_id=curso_id)
+            )
             
             if solo_publicadas:
                 query = query.filter_by(estado=EstadoLeccion.PUBLICADA)
@@ -570,7 +715,14 @@ class GestorLecciones:
                 "curso_id": curso_id,
                 "curso_nombre": curso.nombre,
                 "total": len(lecciones),
-                "lecciones": [leccion.to_dict() for leccion in lecciones]
+                "lecciones": [
+                    leccion.to_dict(
+                        incluir_actividades=incluir_actividades,
+                        incluir_multimedia=incluir_multimedia,
+                        vista=VISTA_RESUMEN
+                    )
+                    for leccion in lecciones
+                ]
             }, 200
             
         except Exception as e:
@@ -1,21 +1,38 @@
 """
 Gestor de Multimedia - SpeakLexi
-VERSIÓN SIMPLIFICADA - NO REQUIERE PIL
+PIL es opcional: metadatos y miniaturas se generan en segundo plano (procesador_multimedia)
 """
 
 from config.database import db
 from models.multimedia import (
     Multimedia, TipoMultimedia, EstadoMultimedia,
-    ConfiguracionMultimedia, CONFIGURACION_POR_DEFECTO
+    ConfiguracionMultimedia, CONFIGURACION_POR_DEFECTO, cache_configuracion_multimedia
 )
 from models.leccion import Leccion
+from models.serializacion import registro_serializadores
+from services.indice_etiquetas import indice_etiquetas, MODOS_VALIDOS
+from services.procesador_multimedia import procesador_multimedia
+from services.almacenamiento_multimedia import almacenamiento_multimedia
+from services.indice_similitud import indice_similitud, DISTANCIA_POR_DEFECTO, DISTANCIA_MAXIMA
+from utils.subida_archivos import recibir_archivo, ArchivoDemasiadoGrande
+from utils.distribucion_archivos import ruta_distribuida, url_de, NIVELES_POR_DEFECTO
+from utils.urls_firmadas import firmador_urls
+from utils.paginacion import (
+    paginar_por_cursor, contador_estimado, clave_conteo, CursorInvalido,
+    PaginacionInvalida, validar_paginacion
+)
 from werkzeug.utils import secure_filename
 from datetime import datetime
 import os
+import time
 import uuid
 from pathlib import Path
 
 
+# Límite de S3 para URLs prefirmadas con firma v4
+EXPIRACION_URL_MAXIMA = 7 * 24 * 3600
+
+
 class GestorMultimedia:
     """Gestiona operaciones CRUD y procesamiento de archivos multimedia"""
     
@@ -29,15 +46,21 @@ class GestorMultimedia:
             self._configuracion_inicializada = True
     
     def _inicializar_configuracion(self):
-        """Carga configuración o crea valores por defecto"""
-        for clave, valor in CONFIGURACION_POR_DEFECTO.items():
-            config = ConfiguracionMultimedia.query.filter_by(clave=clave).first()
-            if not config:
-                ConfiguracionMultimedia.establecer_valor(
-                    clave, 
-                    valor, 
-                    f"Configuración {clave}"
-                )
+        """Carga configuración o crea valores por defecto (una consulta)"""
+        existentes = ConfiguracionMultimedia.obtener_todos()
+        faltantes = {
+            clave: valor for clave, valor in CONFIGURACION_POR_DEFECTO.items()
+            if clave not in existentes
+        }
+        if not faltantes:
+            return
+        
+        db.session.add_all([
+            ConfiguracionMultimedia(clave=clave, valor=valor, descripcion=f"Configuración {clave}")
+            for clave, valor in faltantes.items()
+        ])
+        db.session.commit()
+        cache_configuracion_multimedia.establecido()
     
     def subir_archivo(self, archivo, datos_adicionales, usuario_id):
         """
@@ -63,39 +86,88 @@ class GestorMultimedia:
                     "error": f"Tipo de archivo no soportado: {mime_type}"
                 }, 400
             
-            # Validar tamaño del archivo
-            archivo.seek(0, os.SEEK_END)
-            tamano = archivo.tell()
-            archivo.seek(0)
-            
             tamano_maximo = self._obtener_tamano_maximo(tipo)
-            if tamano > tamano_maximo:
-                tamano_mb = tamano / (1024 * 1024)
+            ruta_completa = self.obtener_directorio(tipo)
+            
+            # Copiar por bloques a un temporal: SHA-256 y límite de tamaño sobre la marcha
+            try:
+                recibido = recibir_archivo(archivo.stream, ruta_completa, tamano_maximo)
+            except ArchivoDemasiadoGrande:
                 max_mb = tamano_maximo / (1024 * 1024)
                 return {
-                    "error": f"Archivo muy grande ({tamano_mb:.2f} MB). Máximo: {max_mb:.2f} MB"
+                    "error": f"Archivo muy grande. Máximo: {max_mb:.2f} MB"
                 }, 400
             
-            # Generar nombre único
+        except Exception as e:
+            print(f"❌ ERROR al subir archivo: {str(e)}")
+            return {"error": f"Error al subir archivo: {str(e)}"}, 500
+        
+        return self.registrar_archivo(
+            recibido, nombre_original, mime_type, tipo, datos_adicionales, usuario_id
+        )
+    
+    def obtener_directorio(self, tipo):
+        """Directorio de almacenamiento de un tipo (se crea si no existe)"""
+        ruta_base = ConfiguracionMultimedia.obtener_valor(
+            'ruta_almacenamiento',
+            'uploads/multimedia'
+        )
+        ruta_completa = Path(ruta_base) / tipo.value
+        ruta_completa.mkdir(parents=True, exist_ok=True)
+        return ruta_completa
+    
+    def registrar_archivo(self, recibido, nombre_original, mime_type, tipo, datos_adicionales, usuario_id):
+        """
+        Crea el registro Multimedia de un archivo ya recibido en disco.
+        
+        Lo usan la subida directa y la subida por partes (gestor_subidas).
+        El temporal debe estar en obtener_directorio(tipo).
+        
+        Args:
+            recibido: ArchivoRecibido (temporal + tamaño + SHA-256)
+            nombre_original: Nombre ya saneado con secure_filename
+            mime_type: Tipo MIME declarado
+            tipo: TipoMultimedia
+            datos_adicionales: descripcion, alt_text, categoria, etiquetas, transcripcion
+            usuario_id: Usuario que sube
+        """
+        clave_nueva = None
+        try:
+            # Nombre único del registro (el archivo puede ser compartido)
             nombre_almacenado = Multimedia.generar_nombre_unico(nombre_original)
             
-            # Obtener ruta de almacenamiento
-            ruta_base = ConfiguracionMultimedia.obtener_valor(
-                'ruta_almacenamiento',
-                'uploads/multimedia'
-            )
-            
-            # Crear directorio si no existe
-            ruta_completa = Path(ruta_base) / tipo.value
-            ruta_completa.mkdir(parents=True, exist_ok=True)
-            
-            # Ruta del archivo
-            ruta_archivo = ruta_completa / nombre_almacenado
-            
-            # Guardar archivo
-            archivo.save(str(ruta_archivo))
-            
-            print(f"✅ Archivo guardado en: {ruta_archivo}")
+            # Deduplicar: mismo contenido ya almacenado -> reutilizar el archivo
+            original = self._buscar_por_contenido(recibido.sha256, recibido.tamano, tipo)
+            procesar = procesador_multimedia.requiere_procesamiento(tipo)
+            if original:
+                recibido.descartar()
+                ruta_local = original.ruta_local
+                url = original.url
+                print(f"♻️ Contenido duplicado de multimedia {original.id}: {url}")
+            else:
+                # Nombre direccionado por contenido: subidas iguales acaban en el mismo archivo
+                nombre_archivo_disco = f"{recibido.sha256}{Path(nombre_original).suffix.lower()}"
+                clave = ruta_distribuida(
+                    f"{tipo.value}/{nombre_archivo_disco}",
+                    ConfiguracionMultimedia.obtener_entero('niveles_directorio', NIVELES_POR_DEFECTO)
+                )
+                # Local: renombrado atómico; S3: subida en streaming (multiparte si es grande)
+                almacenamiento_multimedia.guardar(
+                    recibido.ruta_temporal, clave, mime_type, conservar_copia=procesar
+                )
+                clave_nueva = clave
+                ruta_local = almacenamiento_multimedia.ruta_local(clave)
+                url = url_de(clave)
+                print(f"✅ Archivo guardado en: {ruta_local or clave}")
+            
+            # Un duplicado no se vuelve a procesar: hereda el estado del original
+            # (si aún se está procesando, el procesador lo completa al terminar)
+            if not procesar:
+                estado = EstadoMultimedia.DISPONIBLE
+            elif not original or original.estado in (EstadoMultimedia.PENDIENTE, EstadoMultimedia.PROCESANDO):
+                estado = EstadoMultimedia.PENDIENTE
+            else:
+                estado = original.estado
             
             # Crear registro en base de datos
             nuevo_multimedia = Multimedia(
@@ -104,28 +176,40 @@ class GestorMultimedia:
                 tipo=tipo,
                 mime_type=mime_type,
                 categoria=datos_adicionales.get('categoria'),
-                url=f"/uploads/multimedia/{tipo.value}/{nombre_almacenado}",
-                ruta_local=str(ruta_archivo),
-                tamano=tamano,
-                estado=EstadoMultimedia.DISPONIBLE,
+                url=url,
+                ruta_local=ruta_local,
+                tamano=recibido.tamano,
+                hash_sha256=recibido.sha256,
+                estado=estado,
                 descripcion=datos_adicionales.get('descripcion'),
                 alt_text=datos_adicionales.get('alt_text'),
                 transcripcion=datos_adicionales.get('transcripcion'),
                 etiquetas=datos_adicionales.get('etiquetas', []),
-                meta_data={},
+                meta_data={'duplicado_de': original.id} if original else {},
                 subido_por=usuario_id
             )
-            
-            # ⚠️ SIMPLIFICADO: No generamos thumbnails ni extraemos metadata
-            # Para producción, instalar PIL y ffmpeg
+            if original:
+                nuevo_multimedia.copiar_derivados(original)
+                if estado == EstadoMultimedia.ERROR:
+                    nuevo_multimedia.mensaje_error = original.mensaje_error
             
             db.session.add(nuevo_multimedia)
+            db.session.flush()
+            indice_etiquetas.sincronizar_multimedia(nuevo_multimedia)
             db.session.commit()
+            contador_estimado.invalidar('multimedia')
             
             print(f"✅ Multimedia creado en BD con ID: {nuevo_multimedia.id}")
             
+            # Miniaturas y variantes WebP en el pool de procesos (no bloquea la respuesta)
+            if nuevo_multimedia.estado == EstadoMultimedia.PENDIENTE and not original:
+                procesador_multimedia.encolar(nuevo_multimedia.id)
+            elif original:
+                indice_similitud.agregar(nuevo_multimedia.id, nuevo_multimedia.hash_perceptual)
+            
             return {
                 "mensaje": "Archivo subido exitosamente",
+                "duplicado": original is not None,
                 "multimedia": nuevo_multimedia.to_dict()
             }, 201
             
@@ -133,13 +217,32 @@ class GestorMultimedia:
             db.session.rollback()
             print(f"❌ ERROR al subir archivo: {str(e)}")
             
-            # Limpiar archivo si existe
-            if 'ruta_archivo' in locals() and Path(ruta_archivo).exists():
-                Path(ruta_archivo).unlink()
+            # Limpiar solo el archivo escrito en esta subida (nunca uno compartido)
+            recibido.descartar()
+            if clave_nueva:
+                try:
+                    if not Multimedia.query.filter_by(hash_sha256=recibido.sha256).first():
+                        almacenamiento_multimedia.eliminar(clave_nueva)
+                        almacenamiento_multimedia.descartar_copia(clave_nueva)
+                except Exception as e_limpieza:
+                    print(f"⚠️ No se pudo limpiar {clave_nueva}: {e_limpieza}")
             
             return {"error": f"Error al subir archivo: {str(e)}"}, 500
     
-    def obtener_recurso(self, multimedia_id, incluir_metadata=False):
+    def _buscar_por_contenido(self, sha256, tamano, tipo):
+        """Registro existente con el mismo contenido y archivo aún almacenado"""
+        candidatos = Multimedia.query.filter_by(
+            hash_sha256=sha256, tamano=tamano, tipo=tipo
+        ).order_by(Multimedia.id).limit(5)
+        for candidato in candidatos:
+            if candidato.ruta_local:
+                if os.path.isfile(candidato.ruta_local):
+                    return candidato
+            elif candidato.clave_almacenamiento and almacenamiento_multimedia.existe(candidato.clave_almacenamiento):
+                return candidato
+        return None
+    
+    def obtener_recurso(self, multimedia_id, incluir_metadata=False, firmar_urls=False):
         """Obtiene un recurso multimedia por su ID."""
         multimedia = Multimedia.query.get(multimedia_id)
         
@@ -151,12 +254,87 @@ class GestorMultimedia:
         db.session.commit()
         
         return {
-            "multimedia": multimedia.to_dict(incluir_metadata=incluir_metadata)
+            "multimedia": multimedia.to_dict(incluir_metadata=incluir_metadata, firmar_urls=firmar_urls)
+        }, 200
+    
+    def obtener_url_descarga(self, multimedia_id, segundos=None):
+        """URL de descarga del archivo (prefirmada si el almacenamiento es remoto)"""
+        multimedia = db.session.get(Multimedia, multimedia_id)
+        if not multimedia:
+            return {"error": "Recurso multimedia no encontrado"}, 404
+        
+        clave = multimedia.clave_almacenamiento
+        if not clave:
+            return {"error": "El recurso no tiene archivo almacenado"}, 404
+        
+        if segundos is not None and not 1 <= segundos <= EXPIRACION_URL_MAXIMA:
+            return {"error": f"expira debe estar entre 1 y {EXPIRACION_URL_MAXIMA} segundos"}, 400
+        
+        url = almacenamiento_multimedia.url_firmada(clave, segundos)
+        if url:
+            return {
+                "url": url,
+                "firmada": True,
+                "expira_en": segundos or almacenamiento_multimedia.expiracion_url
+            }, 200
+        return {"url": f"/api/multimedia/archivo/{clave}", "firmada": False}, 200
+    
+    def buscar_similares(self, multimedia_id, distancia=DISTANCIA_POR_DEFECTO, limite=20, firmar_urls=False):
+        """
+        Imágenes que se ven igual que un recurso (reescaladas, recomprimidas...)
+        según la distancia de Hamming entre hashes perceptuales.
+        """
+        multimedia = db.session.get(Multimedia, multimedia_id)
+        if not multimedia:
+            return {"error": "Recurso multimedia no encontrado"}, 404
+        
+        if not 0 <= distancia <= DISTANCIA_MAXIMA:
+            return {"error": f"distancia debe estar entre 0 y {DISTANCIA_MAXIMA}"}, 400
+        
+        if not multimedia.hash_perceptual:
+            # Audio/vídeo, imagen aún en el pool o sin Pillow
+            return {"multimedia_id": multimedia_id, "indexado": False, "similares": []}, 200
+        
+        encontrados = indice_similitud.buscar(
+            multimedia.hash_perceptual, distancia, excluir={multimedia_id}, limite=limite
+        )
+        recursos = {
+            m.id: m for m in Multimedia.query.filter(
+                Multimedia.id.in_([mid for _, mid in encontrados])
+            )
+        } if encontrados else {}
+        
+        # Orden por distancia; los borrados en otro worker no aparecen
+        ordenados = [(d, recursos[mid]) for d, mid in encontrados if mid in recursos]
+        datos = self._serializar_lista([m for _, m in ordenados], firmar_urls)
+        for dato, (d, _) in zip(datos, ordenados):
+            dato['distancia'] = d
+        
+        return {
+            "multimedia_id": multimedia_id,
+            "indexado": True,
+            "distancia_maxima": distancia,
+            "similares": datos
         }, 200
     
-    def listar_recursos(self, filtros=None, pagina=1, por_pagina=20):
-        """Lista recursos multimedia con filtros y paginación."""
+    def _serializar_lista(self, recursos, firmar_urls=False):
+        datos = registro_serializadores.serializar_lista(recursos)
+        if firmar_urls:
+            ahora = time.time()  # Misma caducidad para toda la página
+            datos = [firmador_urls.firmar_recurso(d, ahora) for d in datos]
+        return datos
+    
+    def listar_recursos(self, filtros=None, pagina=1, por_pagina=20, cursor=None, incluir_total=False,
+                        firmar_urls=False):
+        """
+        Lista recursos multimedia con filtros y paginación.
+        
+        Con cursor (aunque sea vacío) pagina por keyset sobre (creado_en, id)
+        y el total solo se incluye si se pide, desde un conteo cacheado.
+        Con firmar_urls las URLs son /media/... firmadas (utils/urls_firmadas.py).
+        """
         try:
+            pagina, por_pagina = validar_paginacion(pagina, por_pagina)
             query = Multimedia.query
             
             # Aplicar filtros básicos
@@ -170,6 +348,37 @@ class GestorMultimedia:
                 
                 if filtros.get('categoria'):
                     query = query.filter_by(categoria=filtros['categoria'])
+                
+                # Una o varias etiquetas, todas (and) o alguna (or)
+                etiquetas = filtros.get('etiquetas') or filtros.get('etiqueta')
+                if etiquetas:
+                    modo = filtros.get('modo_etiquetas', 'and')
+                    if modo not in MODOS_VALIDOS:
+                        return {"error": f"modo_etiquetas inválido. Debe ser: {', '.join(MODOS_VALIDOS)}"}, 400
+                    query = query.filter(
+                        Multimedia.id.in_(indice_etiquetas.subconsulta_multimedia(etiquetas, modo))
+                    )
+            
+            if cursor is not None:
+                columnas = [(Multimedia.creado_en, True), (Multimedia.id, True)]
+                recursos, siguiente_cursor = paginar_por_cursor(
+                    query, columnas, cursor, por_pagina
+                )
+                
+                total = None
+                if incluir_total:
+                    total = contador_estimado.obtener(
+                        clave_conteo('multimedia', filtros),
+                        query.count
+                    )
+                
+                return {
+                    "recursos": self._serializar_lista(recursos, firmar_urls),
+                    "total": total,
+                    "por_pagina": por_pagina,
+                    "next_cursor": siguiente_cursor,
+                    "tiene_siguiente": siguiente_cursor is not None
+                }, 200
             
             # Ordenar por fecha
             query = query.order_by(Multimedia.creado_en.desc())
@@ -182,7 +391,7 @@ class GestorMultimedia:
             )
             
             return {
-                "recursos": [recurso.to_dict() for recurso in paginacion.items],
+                "recursos": self._serializar_lista(paginacion.items, firmar_urls),
                 "total": paginacion.total,
                 "pagina": paginacion.page,
                 "paginas_totales": paginacion.pages,
@@ -190,9 +399,28 @@ class GestorMultimedia:
                 "tiene_anterior": paginacion.has_prev
             }, 200
             
+        except (CursorInvalido, PaginacionInvalida) as e:
+            return {"error": str(e)}, 400
         except Exception as e:
             return {"error": f"Error al listar recursos: {str(e)}"}, 500
     
+    def obtener_facetas_etiquetas(self, filtros=None, limite=50):
+        """Cuenta los recursos por etiqueta con una sola consulta agrupada."""
+        try:
+            condiciones = []
+            if filtros and filtros.get('tipo'):
+                try:
+                    condiciones.append(Multimedia.tipo == TipoMultimedia[filtros['tipo'].upper()])
+                except KeyError:
+                    return {"error": f"Tipo inválido: {filtros['tipo']}"}, 400
+            
+            return {
+                "etiquetas": indice_etiquetas.facetas_multimedia(condiciones, limite=limite)
+            }, 200
+            
+        except Exception as e:
+            return {"error": f"Error al obtener etiquetas: {str(e)}"}, 500
+    
     def actualizar_recurso(self, multimedia_id, datos_actualizados):
         """Actualiza información de un recurso multimedia."""
         try:
@@ -211,8 +439,12 @@ class GestorMultimedia:
                 if campo in datos_actualizados:
                     setattr(multimedia, campo, datos_actualizados[campo])
             
+            if 'etiquetas' in datos_actualizados:
+                indice_etiquetas.sincronizar_multimedia(multimedia)
+            
             multimedia.actualizado_en = datetime.utcnow()
             db.session.commit()
+            contador_estimado.invalidar('multimedia')  # categoria o etiquetas pueden cambiar de filtro
             
             return {
                 "mensaje": "Recurso actualizado exitosamente",
@@ -232,19 +464,29 @@ class GestorMultimedia:
                 return {"error": "Recurso no encontrado"}, 404
             
             # Verificar si está en uso
-            if multimedia.lecciones.count() > 0:
+            # (lecciones es una lista: backref con lazy='select')
+            if multimedia.lecciones:
                 return {
                     "error": "El recurso está siendo usado en lecciones"
                 }, 400
             
-            # Eliminar archivo físico
-            if eliminar_archivo and multimedia.ruta_local:
-                ruta = Path(multimedia.ruta_local)
-                if ruta.exists():
-                    ruta.unlink()
-            
+            # Eliminar archivo físico (si ningún otro registro lo comparte)
+            if eliminar_archivo and not multimedia.comparte_archivo():
+                if multimedia.ruta_local:
+                    ruta = Path(multimedia.ruta_local)
+                    if ruta.exists():
+                        ruta.unlink()
+                elif multimedia.clave_almacenamiento:
+                    almacenamiento_multimedia.eliminar(multimedia.clave_almacenamiento)
+                # Miniatura y variantes: se nombran por el hash, así que también son compartidas
+                for clave in multimedia.claves_variantes():
+                    almacenamiento_multimedia.eliminar(clave)
+            
+            indice_etiquetas.eliminar_multimedia(multimedia_id)
             db.session.delete(multimedia)
             db.session.commit()
+            contador_estimado.invalidar('multimedia')
+            indice_similitud.quitar(multimedia_id)
             
             return {
                 "mensaje": "Recurso eliminado exitosamente",
@@ -337,9 +579,7 @@ class GestorMultimedia:
         }
         
         clave = claves.get(tipo, 'max_tamano_imagen')
-        valor = ConfiguracionMultimedia.obtener_valor(clave, '5242880')
-        
-        return int(valor)
+        return ConfiguracionMultimedia.obtener_entero(clave, 5242880)
     
     def obtener_estadisticas(self):
         """Obtiene estadísticas generales de multimedia."""
@@ -0,0 +1,279 @@
+"""
+Gestor de Subidas Reanudables - SpeakLexi
+
+Protocolo:
+    1. crear_sesion()      -> id de sesión y tamaño de parte
+    2. guardar_parte(i)    -> PUT de cada parte numerada (0..n-1), en cualquier
+                              orden; repetir una parte la sobrescribe
+    3. obtener_estado()    -> qué partes hay en el servidor (para reanudar)
+    4. finalizar()         -> une las partes en disco y crea el registro
+                              Multimedia igual que la subida directa
+
+Las partes se guardan en <ruta_almacenamiento>/.subidas/<sesion_id>/ con
+nombre NNNNNN.parte; nada se carga entero en memoria.
+"""
+
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from config.database import db
+from models.multimedia import SesionSubida, ConfiguracionMultimedia
+from services.gestor_multimedia import gestor_multimedia
+from utils.subida_archivos import (
+    recibir_archivo, ensamblar_partes, ArchivoDemasiadoGrande
+)
+from werkzeug.utils import secure_filename
+
+TAMANO_PARTE_POR_DEFECTO = 5 * 1024 * 1024   # 5 MB
+TAMANO_PARTE_MINIMO = 256 * 1024              # 256 KB
+TAMANO_PARTE_MAXIMO = 20 * 1024 * 1024        # 20 MB (por debajo de MAX_CONTENT_LENGTH)
+DURACION_SESION = timedelta(hours=24)
+
+
+class GestorSubidas:
+    """Gestiona sesiones de subida por partes"""
+
+    # ========== RUTAS EN DISCO ==========
+
+    def _directorio_sesiones(self):
+        ruta_base = ConfiguracionMultimedia.obtener_valor(
+            'ruta_almacenamiento',
+            'uploads/multimedia'
+        )
+        return Path(ruta_base) / '.subidas'
+
+    def _directorio_sesion(self, sesion_id):
+        return self._directorio_sesiones() / sesion_id
+
+    def _ruta_parte(self, sesion_id, indice):
+        return self._directorio_sesion(sesion_id) / f"{indice:06d}.parte"
+
+    def _partes_recibidas(self, sesion):
+        """Índices de las partes completas en disco"""
+        directorio = self._directorio_sesion(sesion.id)
+        recibidas = []
+        try:
+            entradas = os.scandir(directorio)
+        except FileNotFoundError:
+            return recibidas
+        with entradas:
+            for entrada in entradas:
+                nombre = entrada.name
+                if not nombre.endswith('.parte'):
+                    continue
+                try:
+                    indice = int(nombre[:-len('.parte')])
+                except ValueError:
+                    continue
+                if indice < sesion.total_partes and entrada.stat().st_size == sesion.tamano_esperado(indice):
+                    recibidas.append(indice)
+        return sorted(recibidas)
+
+    def _obtener_sesion(self, sesion_id, usuario_id):
+        """Sesión del usuario o (None, (error, código))"""
+        sesion = db.session.get(SesionSubida, sesion_id)
+        if not sesion:
+            return None, ({"error": "Sesión de subida no encontrada"}, 404)
+        if sesion.usuario_id != usuario_id:
+            return None, ({"error": "La sesión pertenece a otro usuario"}, 403)
+        if sesion.expirada():
+            return None, ({"error": "La sesión de subida ha expirado"}, 410)
+        return sesion, None
+
+    def _estado(self, sesion):
+        recibidas = self._partes_recibidas(sesion)
+        bytes_recibidos = sum(sesion.tamano_esperado(i) for i in recibidas)
+        return {
+            "sesion_id": sesion.id,
+            "nombre_archivo": sesion.nombre_archivo,
+            "tamano_total": sesion.tamano_total,
+            "tamano_parte": sesion.tamano_parte,
+            "total_partes": sesion.total_partes,
+            "partes_recibidas": recibidas,
+            "partes_faltantes": sorted(set(range(sesion.total_partes)) - set(recibidas)),
+            "bytes_recibidos": bytes_recibidos,
+            "expira_en": sesion.expira_en.isoformat()
+        }
+
+    # ========== PROTOCOLO ==========
+
+    def crear_sesion(self, datos, usuario_id):
+        """
+        Crea una sesión de subida.
+
+        Args:
+            datos: nombre_archivo, mime_type, tamano_total (requeridos),
+                   tamano_parte y los datos adicionales de la subida directa
+            usuario_id: Usuario que sube
+        """
+        gestor_multimedia._asegurar_configuracion()
+
+        try:
+            nombre_original = secure_filename(datos.get('nombre_archivo') or '')
+            if not nombre_original:
+                return {"error": "Nombre de archivo inválido"}, 400
+
+            mime_type = datos.get('mime_type') or 'application/octet-stream'
+            tipo = gestor_multimedia._detectar_tipo_multimedia(mime_type)
+            if not tipo:
+                return {"error": f"Tipo de archivo no soportado: {mime_type}"}, 400
+
+            try:
+                tamano_total = int(datos.get('tamano_total'))
+                tamano_parte = int(datos.get('tamano_parte') or TAMANO_PARTE_POR_DEFECTO)
+            except (TypeError, ValueError):
+                return {"error": "tamano_total y tamano_parte deben ser enteros"}, 400
+
+            if tamano_total <= 0:
+                return {"error": "tamano_total debe ser mayor que 0"}, 400
+            if not TAMANO_PARTE_MINIMO <= tamano_parte <= TAMANO_PARTE_MAXIMO:
+                return {
+                    "error": f"tamano_parte debe estar entre {TAMANO_PARTE_MINIMO} y {TAMANO_PARTE_MAXIMO} bytes"
+                }, 400
+
+            tamano_maximo = gestor_multimedia._obtener_tamano_maximo(tipo)
+            if tamano_total > tamano_maximo:
+                max_mb = tamano_maximo / (1024 * 1024)
+                return {"error": f"Archivo muy grande. Máximo: {max_mb:.2f} MB"}, 400
+
+            sesion = SesionSubida(
+                id=uuid.uuid4().hex,
+                usuario_id=usuario_id,
+                nombre_archivo=nombre_original,
+                mime_type=mime_type,
+                tipo=tipo,
+                tamano_total=tamano_total,
+                tamano_parte=tamano_parte,
+                datos_adicionales={
+                    clave: datos.get(clave)
+                    for clave in ('descripcion', 'alt_text', 'categoria', 'transcripcion', 'etiquetas')
+                    if datos.get(clave) is not None
+                },
+                expira_en=datetime.utcnow() + DURACION_SESION
+            )
+            self._directorio_sesion(sesion.id).mkdir(parents=True, exist_ok=True)
+            db.session.add(sesion)
+            db.session.commit()
+
+            return {
+                "mensaje": "Sesión de subida creada",
+                "sesion": self._estado(sesion)
+            }, 201
+
+        except Exception as e:
+            db.session.rollback()
+            return {"error": f"Error al crear sesión de subida: {str(e)}"}, 500
+
+    def guardar_parte(self, sesion_id, indice, stream, usuario_id):
+        """Guarda la parte `indice` leyendo el cuerpo de la petición por bloques"""
+        sesion, error = self._obtener_sesion(sesion_id, usuario_id)
+        if error:
+            return error
+
+        if not 0 <= indice < sesion.total_partes:
+            return {"error": f"Índice de parte fuera de rango (0-{sesion.total_partes - 1})"}, 400
+
+        esperado = sesion.tamano_esperado(indice)
+        directorio = self._directorio_sesion(sesion.id)
+        directorio.mkdir(parents=True, exist_ok=True)
+
+        try:
+            recibido = recibir_archivo(stream, directorio, esperado)
+        except ArchivoDemasiadoGrande:
+            return {"error": f"La parte {indice} debe tener {esperado} bytes"}, 400
+        except Exception as e:
+            return {"error": f"Error al guardar parte: {str(e)}"}, 500
+
+        if recibido.tamano != esperado:
+            recibido.descartar()
+            return {
+                "error": f"La parte {indice} debe tener {esperado} bytes (recibidos {recibido.tamano})"
+            }, 400
+
+        # Renombrado atómico: una parte a medias nunca cuenta como recibida
+        recibido.mover_a_destino(self._ruta_parte(sesion.id, indice))
+
+        return {
+            "indice": indice,
+            "sha256": recibido.sha256,
+            "sesion": self._estado(sesion)
+        }, 200
+
+    def obtener_estado(self, sesion_id, usuario_id):
+        """Partes recibidas y faltantes (para reanudar)"""
+        sesion, error = self._obtener_sesion(sesion_id, usuario_id)
+        if error:
+            return error
+        return {"sesion": self._estado(sesion)}, 200
+
+    def finalizar(self, sesion_id, usuario_id):
+        """Une las partes y crea el registro Multimedia"""
+        sesion, error = self._obtener_sesion(sesion_id, usuario_id)
+        if error:
+            return error
+
+        recibidas = self._partes_recibidas(sesion)
+        if len(recibidas) != sesion.total_partes:
+            estado = self._estado(sesion)
+            return {
+                "error": "Faltan partes por subir",
+                "partes_faltantes": estado["partes_faltantes"]
+            }, 409
+
+        try:
+            directorio = gestor_multimedia.obtener_directorio(sesion.tipo)
+            recibido = ensamblar_partes(
+                [self._ruta_parte(sesion.id, i) for i in range(sesion.total_partes)],
+                directorio,
+                sesion.tamano_total
+            )
+        except ArchivoDemasiadoGrande:
+            return {"error": "Las partes superan el tamaño declarado"}, 400
+        except Exception as e:
+            return {"error": f"Error al unir las partes: {str(e)}"}, 500
+
+        resultado, codigo = gestor_multimedia.registrar_archivo(
+            recibido,
+            sesion.nombre_archivo,
+            sesion.mime_type,
+            sesion.tipo,
+            sesion.datos_adicionales or {},
+            usuario_id
+        )
+        if codigo == 201:
+            self._eliminar_sesion(sesion)
+        return resultado, codigo
+
+    def cancelar(self, sesion_id, usuario_id):
+        """Descarta la sesión y sus partes"""
+        sesion = db.session.get(SesionSubida, sesion_id)
+        if not sesion:
+            return {"error": "Sesión de subida no encontrada"}, 404
+        if sesion.usuario_id != usuario_id:
+            return {"error": "La sesión pertenece a otro usuario"}, 403
+
+        self._eliminar_sesion(sesion)
+        return {"mensaje": "Sesión de subida cancelada", "sesion_id": sesion_id}, 200
+
+    def _eliminar_sesion(self, sesion):
+        try:
+            shutil.rmtree(self._directorio_sesion(sesion.id), ignore_errors=True)
+            db.session.delete(sesion)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ No se pudo eliminar la sesión de subida {sesion.id}: {e}")
+
+    def limpiar_expiradas(self):
+        """Borra sesiones expiradas y sus partes. Devuelve cuántas se borraron."""
+        expiradas = SesionSubida.query.filter(SesionSubida.expira_en <= datetime.utcnow()).all()
+        for sesion in expiradas:
+            self._eliminar_sesion(sesion)
+        return len(expiradas)
+
+
+# Instancia global del gestor
+gestor_subidas = GestorSubidas()
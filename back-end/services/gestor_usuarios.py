@@ -1,5 +1,7 @@
 from config.database import db
 from models.usuario import Usuario, PerfilUsuario, PerfilEstudiante, PerfilProfesor, PerfilAdministrador
+from services.hash_contrasenas import ServicioSaturado
+from utils.usuario_actual import revocar_sesiones
 from services.correo_service import (
     enviar_codigo_verificacion,
     enviar_recuperacion_password
@@ -141,6 +143,9 @@ class GestorUsuarios:
                 "rol": rol
             }, 201
 
+        except ServicioSaturado:
+            db.session.rollback()
+            raise  # 503 con Retry-After (app.py)
         except IntegrityError as e:
             db.session.rollback()
             print(f"❌ Error de integridad al registrar {correo}: {e}")
@@ -223,6 +228,15 @@ class GestorUsuarios:
         if not usuario or not usuario.check_password(password):
             return {"error": "Credenciales inválidas"}, 401
 
+        # check_password regeneró el hash si los parámetros de coste cambiaron
+        if db.session.is_modified(usuario):
+            try:
+                db.session.commit()
+                print(f"🔐 Hash de contraseña actualizado para usuario {usuario.id}")
+            except Exception as e:
+                db.session.rollback()
+                print(f"⚠️ No se pudo actualizar el hash de usuario {usuario.id}: {e}")
+
         # Verificar estado de la cuenta
         if usuario.estado_cuenta == 'desactivado':
             dias_restantes = 0
@@ -555,9 +569,13 @@ class GestorUsuarios:
             usuario.set_password(nueva_password)
             usuario.token_recuperacion = None
             usuario.expira_token_recuperacion = None
+            revocar_sesiones(usuario)  # Cierra las sesiones abiertas con la contraseña anterior
             db.session.commit()
             print(f"✅ Contraseña restablecida para usuario {usuario.id}")
             return {"mensaje": "Tu contraseña ha sido restablecida. Ya puedes iniciar sesión."}, 200
+        except ServicioSaturado:
+            db.session.rollback()
+            raise  # 503 con Retry-After (app.py)
         except Exception as e:
             db.session.rollback()
             print(f"❌ Error al restablecer contraseña: {str(e)}")
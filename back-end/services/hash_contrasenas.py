@@ -0,0 +1,158 @@
+"""
+Hash de contraseñas en un pool de procesos - SpeakLexi
+
+scrypt / pbkdf2 consumen ~50-200 ms de CPU por login o registro. Hechos en
+el hilo de la petición, una ráfaga de logins (inicio de una clase) ocupa
+todos los workers y frena cualquier otro endpoint. Aquí se hacen en un
+pool de CONTRASENA_PROCESOS procesos con una cola acotada:
+
+    en curso < procesos + CONTRASENA_COLA_MAXIMA  -> al pool; el hilo espera sin CPU
+    si no                                          -> ServicioSaturado (503 + Retry-After)
+
+- Parámetros de coste configurables (CONTRASENA_METODO, formato de
+  werkzeug: 'scrypt:32768:8:1', 'pbkdf2:sha256:600000'...).
+- Si una contraseña correcta tiene un hash de otros parámetros se
+  regenera en la misma tarea (Usuario.check_password lo guarda).
+- Con CONTRASENA_PROCESOS = 0, o fuera de la app (scripts), se calcula en
+  el propio hilo como antes.
+- benchmarks/bench_contrasenas.py mide logins/s por núcleo.
+"""
+
+import atexit
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.tareas_contrasenas import generar_hash, verificar_hash, necesita_rehash
+
+METODO_POR_DEFECTO = 'scrypt:32768:8:1'
+ESPERA_MAXIMA = 30  # segundos (incluye arrancar los procesos la primera vez)
+
+
+class ServicioSaturado(Exception):
+    """La cola del pool está llena: la petición debe reintentarse más tarde"""
+
+    def __init__(self, reintentar_en=1):
+        super().__init__("Demasiadas operaciones de contraseña en curso")
+        self.reintentar_en = reintentar_en
+
+
+class HashContrasenas:
+    """Pool de procesos acotado para generar y verificar hashes"""
+
+    def __init__(self):
+        self._pool = None
+        self._lock = threading.Lock()
+        self._en_curso = 0
+        self._tiempo_medio = 0.1  # segundos por tarea (media móvil)
+        self.metodo = METODO_POR_DEFECTO
+        self.procesos = 0
+        self.cola_maxima = 0
+        self.espera_maxima = ESPERA_MAXIMA
+        self.contexto = 'spawn'
+
+    def init_app(self, app):
+        """
+        Configuración:
+            CONTRASENA_METODO (str): Método y coste de werkzeug (default: scrypt:32768:8:1)
+            CONTRASENA_PROCESOS (int): Procesos del pool; 0 = en el hilo de la petición (default: núcleos)
+            CONTRASENA_COLA_MAXIMA (int): Tareas esperando además de las que se ejecutan (default: 4 por proceso)
+            CONTRASENA_ESPERA_MAXIMA (int): Segundos que una petición espera su resultado (default: 30)
+            CONTRASENA_CONTEXTO_PROCESOS (str): spawn | forkserver | fork (default: spawn)
+        """
+        self.metodo = app.config.get('CONTRASENA_METODO', METODO_POR_DEFECTO)
+        self.procesos = int(app.config.get('CONTRASENA_PROCESOS', os.cpu_count() or 1))
+        self.cola_maxima = int(app.config.get('CONTRASENA_COLA_MAXIMA', self.procesos * 4))
+        self.espera_maxima = float(app.config.get('CONTRASENA_ESPERA_MAXIMA', ESPERA_MAXIMA))
+        self.contexto = app.config.get('CONTRASENA_CONTEXTO_PROCESOS', 'spawn')
+        atexit.register(self.detener)
+
+    @property
+    def activo(self) -> bool:
+        return self.procesos > 0
+
+    def _obtener_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.procesos,
+                mp_context=multiprocessing.get_context(self.contexto)
+            )
+        return self._pool
+
+    def detener(self, esperar=False):
+        """Cierra el pool (al salir o en tests)"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=esperar, cancel_futures=not esperar)
+                self._pool = None
+
+    # ========== EJECUCIÓN ==========
+
+    def _reintentar_en(self) -> int:
+        # Lo que tarda en vaciarse la cola con todos los procesos trabajando
+        return max(1, math.ceil(self._en_curso / self.procesos * self._tiempo_medio))
+
+    def _al_terminar(self, inicio, _futuro):
+        with self._lock:
+            self._en_curso -= 1
+            self._tiempo_medio = 0.9 * self._tiempo_medio + 0.1 * (time.monotonic() - inicio)
+
+    def _ejecutar(self, funcion, *argumentos):
+        if not self.activo:
+            return funcion(*argumentos)
+
+        with self._lock:
+            if self._en_curso >= self.procesos + self.cola_maxima:
+                raise ServicioSaturado(self._reintentar_en())
+            try:
+                futuro = self._obtener_pool().submit(funcion, *argumentos)
+            except (BrokenProcessPool, RuntimeError):
+                # Un proceso murió o el pool se cerró: se recrea en la siguiente
+                self._pool = None
+                futuro = None
+            else:
+                self._en_curso += 1
+                futuro.add_done_callback(lambda f, inicio=time.monotonic(): self._al_terminar(inicio, f))
+
+        if futuro is None:
+            return funcion(*argumentos)
+        try:
+            return futuro.result(timeout=self.espera_maxima)
+        except TimeoutError:
+            raise ServicioSaturado(self._reintentar_en())
+        except BrokenProcessPool:
+            with self._lock:
+                self._pool = None
+            return funcion(*argumentos)
+
+    def generar(self, password: str) -> str:
+        """
+        Hash con los parámetros actuales.
+
+        Raises:
+            ServicioSaturado: Si la cola del pool está llena
+        """
+        return self._ejecutar(generar_hash, password, self.metodo)
+
+    def verificar(self, hash_actual: str, password: str):
+        """
+        Comprueba la contraseña contra el hash.
+
+        Returns:
+            (correcta, hash nuevo si hay que actualizarlo o None)
+
+        Raises:
+            ServicioSaturado: Si la cola del pool está llena
+        """
+        return self._ejecutar(verificar_hash, hash_actual, password, self.metodo)
+
+    def necesita_rehash(self, hash_actual: str) -> bool:
+        return necesita_rehash(hash_actual, self.metodo)
+
+
+# Instancia global del servicio
+hash_contrasenas = HashContrasenas()
@@ -0,0 +1,289 @@
+"""
+Índice de Búsqueda - SpeakLexi
+Índice invertido de lecciones (titulo, descripcion, contenido, etiquetas)
+con tokens normalizados sin acentos y resultados ordenados por relevancia.
+
+Reemplaza los filtros ILIKE '%termino%', que no pueden usar índices;
+solo se siguen usando para textos sin términos buscables (palabras vacías
+o de una letra), que el índice no guarda.
+Solo usa SQL estándar, por lo que funciona igual en MySQL y en SQLite.
+Las entradas de una lección se borran con ella (ON DELETE CASCADE);
+archivarla no la saca del índice (se filtra por estado).
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+
+from config.database import db
+from models.busqueda import TerminoLeccion
+from models.leccion import Leccion
+from sqlalchemy import func, literal, union_all
+
+
+# Peso de cada aparición de un término según el campo
+PESOS_CAMPOS = {
+    'titulo': 5,
+    'etiquetas': 3,
+    'descripcion': 2,
+    'contenido': 1
+}
+
+# Palabras vacías (español/inglés) que no aportan a la búsqueda
+PALABRAS_VACIAS = {
+    'de', 'la', 'el', 'en', 'los', 'las', 'del', 'al', 'un', 'una', 'unos',
+    'unas', 'por', 'con', 'para', 'que', 'es', 'se', 'lo', 'su', 'sus', 'y',
+    'o', 'a', 'the', 'of', 'and', 'to', 'in', 'is', 'an', 'on', 'for', 'at'
+}
+
+# Letras y dígitos de cualquier alfabeto (\w sin '_'): cirílico, griego, CJK...
+_PATRON_TOKEN = re.compile(r'[^\W_]+', re.UNICODE)
+_ALFABETO_TOKEN = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def normalizar_texto(texto: str) -> str:
+    """Convierte a minúsculas y elimina acentos (canción -> cancion)."""
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return sin_acentos.lower()
+
+
+def tokenizar(texto: str) -> List[str]:
+    """
+    Divide un texto en términos normalizados.
+
+    Args:
+        texto: Texto libre
+
+    Returns:
+        Lista de términos (con repeticiones, en orden de aparición)
+    """
+    if not texto:
+        return []
+    return [
+        token[:TerminoLeccion.LONGITUD_MAXIMA]
+        for token in _PATRON_TOKEN.findall(normalizar_texto(str(texto)))
+        if len(token) > 1 and token not in PALABRAS_VACIAS
+    ]
+
+
+def _limite_superior_prefijo(prefijo: str):
+    """
+    Menor cadena mayor que todas las que empiezan por prefijo (abc -> abd, abz -> ac).
+
+    Solo para prefijos de [0-9a-z], que ordenan igual en binario y en las
+    colaciones case-insensitive: así el prefijo se busca como un rango
+    sobre la clave primaria en lugar de LIKE (SQLite no usa el índice para
+    LIKE case-insensitive). Fuera de ese alfabeto el orden depende de la
+    colación y consulta_coincidencias usa LIKE.
+
+    Returns:
+        Cadena límite o None si no hay límite superior (prefijo 'zzz')
+    """
+    caracteres = list(prefijo)
+    while caracteres:
+        posicion = _ALFABETO_TOKEN.find(caracteres[-1])
+        if 0 <= posicion < len(_ALFABETO_TOKEN) - 1:
+            caracteres[-1] = _ALFABETO_TOKEN[posicion + 1]
+            return ''.join(caracteres)
+        caracteres.pop()
+    return None
+
+
+def _condicion_prefijo(prefijo: str):
+    """termino empieza por prefijo: rango si es [0-9a-z], LIKE si no"""
+    if set(prefijo) <= set(_ALFABETO_TOKEN):
+        condicion = TerminoLeccion.termino >= prefijo
+        limite = _limite_superior_prefijo(prefijo)
+        if limite is not None:
+            condicion = db.and_(condicion, TerminoLeccion.termino < limite)
+        return condicion
+    # Los tokens no tienen '%' ni '_': no hace falta escapar
+    return TerminoLeccion.termino.like(f"{prefijo}%")
+
+
+def _textos_contenido(valor: Any) -> Iterable[str]:
+    """Recorre el JSON de contenido y devuelve todos los textos que contiene."""
+    if isinstance(valor, str):
+        yield valor
+    elif isinstance(valor, dict):
+        for v in valor.values():
+            yield from _textos_contenido(v)
+    elif isinstance(valor, (list, tuple)):
+        for v in valor:
+            yield from _textos_contenido(v)
+
+
+def terminos_leccion(leccion: Leccion) -> Dict[str, int]:
+    """
+    Calcula los términos de una lección con su peso acumulado.
+
+    Returns:
+        dict termino -> peso
+    """
+    pesos: Counter = Counter()
+
+    campos = {
+        'titulo': [leccion.titulo or ''],
+        'descripcion': [leccion.descripcion or ''],
+        'etiquetas': [str(e) for e in (leccion.etiquetas or [])],
+        'contenido': _textos_contenido(leccion.contenido or {})
+    }
+
+    for campo, textos in campos.items():
+        peso = PESOS_CAMPOS[campo]
+        for texto in textos:
+            for token in tokenizar(texto):
+                pesos[token] += peso
+
+    return dict(pesos)
+
+
+class IndiceBusqueda:
+    """Mantiene y consulta el índice invertido de lecciones"""
+
+    def indexar_leccion(self, leccion: Leccion) -> None:
+        """
+        Reemplaza las entradas del índice de una lección.
+        No hace commit: se llama dentro de la transacción del gestor.
+        La lección debe tener id (usar db.session.flush() antes si es nueva).
+        """
+        TerminoLeccion.query.filter_by(leccion_id=leccion.id).delete(synchronize_session=False)
+
+        filas = [
+            {'termino': termino, 'leccion_id': leccion.id, 'peso': peso}
+            for termino, peso in terminos_leccion(leccion).items()
+        ]
+        if filas:
+            db.session.execute(TerminoLeccion.__table__.insert(), filas)
+
+    def consulta_coincidencias(self, texto: str):
+        """
+        Construye la consulta agregada (leccion_id, puntuacion) para un texto.
+
+        Todos los términos deben aparecer (AND). El último término se busca
+        por prefijo para soportar búsqueda mientras el usuario escribe.
+
+        Returns:
+            Select con columnas leccion_id y puntuacion, o None si el texto
+            no tiene términos buscables.
+        """
+        tokens = list(dict.fromkeys(tokenizar(texto)))
+        if not tokens:
+            return None
+
+        partes = []
+        for posicion, token in enumerate(tokens):
+            if posicion == len(tokens) - 1:
+                condicion = _condicion_prefijo(token)
+            else:
+                condicion = TerminoLeccion.termino == token
+            partes.append(
+                db.select(
+                    TerminoLeccion.leccion_id.label('leccion_id'),
+                    TerminoLeccion.peso.label('peso'),
+                    literal(posicion).label('posicion')
+                ).where(condicion)
+            )
+
+        coincidencias = union_all(*partes).subquery('coincidencias')
+
+        return (
+            db.select(
+                coincidencias.c.leccion_id,
+                func.sum(coincidencias.c.peso).label('puntuacion')
+            )
+            .group_by(coincidencias.c.leccion_id)
+            .having(func.count(func.distinct(coincidencias.c.posicion)) == len(tokens))
+        )
+
+    @staticmethod
+    def filtro_literal(texto: str):
+        """
+        ILIKE '%texto%' sobre título y descripción, como antes del índice.
+        Solo para textos sin términos buscables ("de", "a", "y"...), que el
+        índice no guarda.
+        """
+        texto = (texto or '').strip()
+        if not texto:
+            return db.false()
+        return db.or_(
+            Leccion.titulo.icontains(texto, autoescape=True),
+            Leccion.descripcion.icontains(texto, autoescape=True)
+        )
+
+    def subconsulta_ids(self, texto: str):
+        """
+        Subconsulta de ids de lecciones que coinciden con el texto,
+        para usarse en filtros: Leccion.id.in_(subconsulta_ids(q)).
+        """
+        consulta = self.consulta_coincidencias(texto)
+        if consulta is None:
+            return db.select(Leccion.id).where(self.filtro_literal(texto))
+        coincidencias = consulta.subquery('ranking')
+        return db.select(coincidencias.c.leccion_id)
+
+    def buscar(self, texto: str, limite: int = 20, filtros_extra=None, query_base=None) -> List[Leccion]:
+        """
+        Busca lecciones ordenadas por relevancia.
+
+        Args:
+            texto: Texto de búsqueda
+            limite: Máximo de resultados
+            filtros_extra: Condiciones SQLAlchemy adicionales sobre Leccion
+            query_base: Consulta inicial (p. ej. Leccion.query_resumen()), por defecto Leccion.query
+
+        Returns:
+            Lista de lecciones, la más relevante primero
+        """
+        query = query_base if query_base is not None else Leccion.query
+        consulta = self.consulta_coincidencias(texto)
+        if consulta is None:
+            return (
+                query.filter(self.filtro_literal(texto), *(filtros_extra or []))
+                .order_by(Leccion.orden.asc(), Leccion.id.asc())
+                .limit(limite)
+                .all()
+            )
+
+        ranking = consulta.subquery('ranking')
+        query = (
+            query
+            .join(ranking, ranking.c.leccion_id == Leccion.id)
+            .filter(*(filtros_extra or []))
+            .order_by(ranking.c.puntuacion.desc(), Leccion.orden.asc(), Leccion.id.asc())
+            .limit(limite)
+        )
+        return query.all()
+
+    def reindexar_todo(self, tamano_lote: int = 500) -> int:
+        """
+        Reconstruye el índice completo por lotes (para backfill).
+
+        Returns:
+            Número de lecciones indexadas
+        """
+        total = 0
+        ultimo_id = 0
+        while True:
+            lote = (
+                Leccion.query
+                .filter(Leccion.id > ultimo_id)
+                .order_by(Leccion.id)
+                .limit(tamano_lote)
+                .all()
+            )
+            if not lote:
+                break
+            for leccion in lote:
+                self.indexar_leccion(leccion)
+            db.session.commit()
+            total += len(lote)
+            ultimo_id = lote[-1].id
+            db.session.expunge_all()
+        return total
+
+
+# Instancia global del índice
+indice_busqueda = IndiceBusqueda()
@@ -0,0 +1,153 @@
+"""
+Índice de Etiquetas - SpeakLexi
+Mantiene las tablas etiquetas_lecciones / etiquetas_multimedia a partir
+de las columnas JSON `etiquetas`, que no se pueden indexar.
+
+Permite filtrar por varias etiquetas (AND / OR) y obtener el conteo de
+cada etiqueta (facetas) con una sola consulta agrupada sobre el índice.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from config.database import db
+from models.busqueda import EtiquetaLeccion, EtiquetaMultimedia
+from models.leccion import Leccion
+from models.multimedia import Multimedia
+from services.indice_busqueda import normalizar_texto
+from sqlalchemy import func
+
+
+MODOS_VALIDOS = ('and', 'or')
+
+
+def normalizar_etiqueta(etiqueta: Any) -> str:
+    """Normaliza una etiqueta: sin acentos, minúsculas y sin espacios extremos."""
+    return normalizar_texto(str(etiqueta)).strip()[:EtiquetaLeccion.LONGITUD_MAXIMA]
+
+
+def normalizar_etiquetas(etiquetas: Optional[Iterable[Any]]) -> List[str]:
+    """Normaliza y deduplica una lista de etiquetas conservando el orden."""
+    if not etiquetas or isinstance(etiquetas, (str, bytes)):
+        etiquetas = [etiquetas] if etiquetas else []
+    return list(dict.fromkeys(e for e in (normalizar_etiqueta(x) for x in etiquetas) if e))
+
+
+class IndiceEtiquetas:
+    """Sincroniza y consulta las tablas de etiquetas"""
+
+    # (modelo de índice, columna de id, modelo dueño)
+    _TABLAS = {
+        'lecciones': (EtiquetaLeccion, 'leccion_id', Leccion),
+        'multimedia': (EtiquetaMultimedia, 'multimedia_id', Multimedia)
+    }
+
+    def _sincronizar(self, tabla: str, entidad_id: int, etiquetas) -> None:
+        modelo, columna_id, _ = self._TABLAS[tabla]
+        modelo.query.filter(getattr(modelo, columna_id) == entidad_id).delete(synchronize_session=False)
+
+        filas = [{'etiqueta': e, columna_id: entidad_id} for e in normalizar_etiquetas(etiquetas)]
+        if filas:
+            db.session.execute(modelo.__table__.insert(), filas)
+
+    def sincronizar_leccion(self, leccion: Leccion) -> None:
+        """Refleja leccion.etiquetas en el índice (sin commit, requiere id)."""
+        self._sincronizar('lecciones', leccion.id, leccion.etiquetas)
+
+    def sincronizar_multimedia(self, multimedia: Multimedia) -> None:
+        """Refleja multimedia.etiquetas en el índice (sin commit, requiere id)."""
+        self._sincronizar('multimedia', multimedia.id, multimedia.etiquetas)
+
+    def eliminar_multimedia(self, multimedia_id: int) -> None:
+        """Elimina las etiquetas de un recurso (sin commit)."""
+        EtiquetaMultimedia.query.filter_by(multimedia_id=multimedia_id).delete(synchronize_session=False)
+
+    def _subconsulta(self, tabla: str, etiquetas, modo: str = 'and'):
+        modelo, columna_id, _ = self._TABLAS[tabla]
+        columna = getattr(modelo, columna_id)
+        normalizadas = normalizar_etiquetas(etiquetas)
+
+        consulta = db.select(columna).where(modelo.etiqueta.in_(normalizadas))
+        if modo == 'and' and len(normalizadas) > 1:
+            consulta = (
+                consulta.group_by(columna)
+                .having(func.count(modelo.etiqueta) == len(normalizadas))
+            )
+        return consulta.distinct() if modo == 'or' else consulta
+
+    def subconsulta_lecciones(self, etiquetas, modo: str = 'and'):
+        """
+        Subconsulta de ids de lecciones con las etiquetas dadas.
+
+        Args:
+            etiquetas: Lista de etiquetas (o una sola)
+            modo: 'and' (todas las etiquetas) u 'or' (alguna)
+
+        Ejemplo:
+            query.filter(Leccion.id.in_(indice_etiquetas.subconsulta_lecciones(['verbos', 'a1'])))
+        """
+        return self._subconsulta('lecciones', etiquetas, modo)
+
+    def subconsulta_multimedia(self, etiquetas, modo: str = 'and'):
+        """Subconsulta de ids de multimedia con las etiquetas dadas ('and' u 'or')."""
+        return self._subconsulta('multimedia', etiquetas, modo)
+
+    def _facetas(self, tabla: str, filtros_entidad=None, limite: int = 50) -> List[Dict[str, Any]]:
+        modelo, columna_id, dueno = self._TABLAS[tabla]
+        consulta = db.select(modelo.etiqueta, func.count().label('total'))
+
+        if filtros_entidad:
+            consulta = consulta.join(dueno, dueno.id == getattr(modelo, columna_id)).where(*filtros_entidad)
+
+        consulta = (
+            consulta.group_by(modelo.etiqueta)
+            .order_by(func.count().desc(), modelo.etiqueta.asc())
+            .limit(limite)
+        )
+        return [{'etiqueta': etiqueta, 'total': total} for etiqueta, total in db.session.execute(consulta)]
+
+    def facetas_lecciones(self, filtros_entidad=None, limite: int = 50) -> List[Dict[str, Any]]:
+        """
+        Conteo de lecciones por etiqueta, de mayor a menor.
+
+        Args:
+            filtros_entidad: Condiciones opcionales sobre Leccion (p. ej. curso o estado)
+            limite: Máximo de etiquetas devueltas
+        """
+        return self._facetas('lecciones', filtros_entidad, limite)
+
+    def facetas_multimedia(self, filtros_entidad=None, limite: int = 50) -> List[Dict[str, Any]]:
+        """Conteo de recursos multimedia por etiqueta, de mayor a menor."""
+        return self._facetas('multimedia', filtros_entidad, limite)
+
+    def reindexar_todo(self, tamano_lote: int = 500) -> Dict[str, int]:
+        """
+        Reconstruye ambas tablas de etiquetas por lotes (para backfill).
+
+        Returns:
+            dict con el número de lecciones y recursos procesados
+        """
+        totales = {}
+        for tabla, (_, _, dueno) in self._TABLAS.items():
+            total = 0
+            ultimo_id = 0
+            while True:
+                lote = (
+                    db.session.query(dueno.id, dueno.etiquetas)
+                    .filter(dueno.id > ultimo_id)
+                    .order_by(dueno.id)
+                    .limit(tamano_lote)
+                    .all()
+                )
+                if not lote:
+                    break
+                for entidad_id, etiquetas in lote:
+                    self._sincronizar(tabla, entidad_id, etiquetas)
+                db.session.commit()
+                total += len(lote)
+                ultimo_id = lote[-1][0]
+            totales[tabla] = total
+        return totales
+
+
+# Instancia global del índice
+indice_etiquetas = IndiceEtiquetas()
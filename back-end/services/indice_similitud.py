@@ -0,0 +1,206 @@
+"""
+Índice de imágenes parecidas - SpeakLexi
+
+Índice en memoria del hash perceptual (dHash de 64 bits,
+utils/hash_perceptual.py) de las imágenes para buscar todas las que están
+a distancia de Hamming <= d. Usa multi-index hashing (IndiceHamming): con
+100k imágenes y d <= 7 cada búsqueda mira unas 70 claves de diccionario y
+compara con un puñado de candidatos, en vez de con todas. (Un árbol BK
+con hashes de 64 bits bien repartidos acaba visitando buena parte del
+árbol para d >= 4.)
+
+- Se carga la primera vez que se usa, con una consulta en streaming.
+- Cada worker tiene su copia: cada INTERVALO_SINCRONIZACION segundos
+  añade los hashes guardados por otros procesos (filtro por actualizado_en).
+- Los registros borrados en otro worker se quedan en su índice hasta
+  reiniciar; quien consulta carga los registros por id y los que ya no
+  existen no aparecen.
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+from config.database import db
+from models.multimedia import Multimedia
+from utils.hash_perceptual import distancia_hamming
+
+DISTANCIA_POR_DEFECTO = 6   # De 64 bits: misma imagen reescalada o recomprimida
+DISTANCIA_MAXIMA = 12  # Por encima la búsqueda deja de ser sub-milisegundo
+INTERVALO_SINCRONIZACION = 30  # segundos
+TROZOS = 4
+TAMANO_TROZO = 16  # TROZOS * TAMANO_TROZO = 64 bits
+_MASCARA_TROZO = (1 << TAMANO_TROZO) - 1
+_MASCARAS = {}
+
+
+def _mascaras(bits_distintos):
+    """Máscaras de TAMANO_TROZO bits con como mucho `bits_distintos` bits a 1"""
+    mascaras = _MASCARAS.get(bits_distintos)
+    if mascaras is None:
+        mascaras = [m for m in range(1 << TAMANO_TROZO) if bin(m).count('1') <= bits_distintos]
+        mascaras.sort(key=lambda m: bin(m).count('1'))
+        _MASCARAS[bits_distintos] = mascaras
+    return mascaras
+
+
+class IndiceHamming:
+    """
+    Multi-index hashing: el hash de 64 bits se parte en TROZOS trozos de
+    TAMANO_TROZO bits y cada trozo tiene su tabla trozo -> hashes.
+
+    Si dos hashes están a distancia <= d, por el principio del palomar
+    algún trozo difiere en <= d // TROZOS bits: basta mirar en cada tabla
+    las claves a esa distancia del trozo buscado (1 clave con d < 4, 17
+    con d < 8) y comprobar la distancia real solo de esos candidatos.
+    """
+
+    def __init__(self):
+        self.tablas = [{} for _ in range(TROZOS)]
+        self.ids_por_valor = {}  # hash -> ids de los registros que lo tienen
+
+    def __len__(self):
+        return len(self.ids_por_valor)
+
+    @staticmethod
+    def _trozos(valor):
+        return [(valor >> (TAMANO_TROZO * i)) & _MASCARA_TROZO for i in range(TROZOS)]
+
+    def agregar(self, valor, identificador):
+        ids = self.ids_por_valor.get(valor)
+        if ids is None:
+            ids = self.ids_por_valor[valor] = set()
+            for tabla, trozo in zip(self.tablas, self._trozos(valor)):
+                tabla.setdefault(trozo, set()).add(valor)
+        ids.add(identificador)
+
+    def quitar(self, valor, identificador):
+        ids = self.ids_por_valor.get(valor)
+        if ids is None:
+            return
+        ids.discard(identificador)
+        if not ids:
+            del self.ids_por_valor[valor]
+            for tabla, trozo in zip(self.tablas, self._trozos(valor)):
+                valores = tabla.get(trozo)
+                if valores is not None:
+                    valores.discard(valor)
+                    if not valores:
+                        del tabla[trozo]
+
+    def buscar(self, valor, distancia_maxima):
+        """Lista de (distancia, id) a distancia <= distancia_maxima"""
+        mascaras = _mascaras(distancia_maxima // TROZOS)
+        candidatos = set()
+        for tabla, trozo in zip(self.tablas, self._trozos(valor)):
+            for mascara in mascaras:
+                valores = tabla.get(trozo ^ mascara)
+                if valores:
+                    candidatos.update(valores)
+
+        resultados = []
+        for candidato in candidatos:
+            distancia = distancia_hamming(valor, candidato)
+            if distancia <= distancia_maxima:
+                resultados.extend((distancia, identificador) for identificador in self.ids_por_valor[candidato])
+        return resultados
+
+
+class IndiceSimilitud:
+    """Índice en memoria de los hashes perceptuales de la tabla multimedia"""
+
+    def __init__(self, intervalo=INTERVALO_SINCRONIZACION):
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._indice = IndiceHamming()
+        self._hash_por_id = {}
+        self._cargado = False
+        self._marca = None              # Mayor actualizado_en visto
+        self._siguiente_sincronizacion = 0.0
+
+    def __len__(self):
+        return len(self._hash_por_id)
+
+    def invalidar(self):
+        """Descarta el índice; se recarga en la siguiente búsqueda"""
+        with self._lock:
+            self._indice = IndiceHamming()
+            self._hash_por_id = {}
+            self._cargado = False
+            self._marca = None
+
+    # ========== ALTAS Y BAJAS ==========
+
+    def _agregar(self, multimedia_id, hash_hex):
+        valor = int(hash_hex, 16)
+        anterior = self._hash_por_id.get(multimedia_id)
+        if anterior == valor:
+            return
+        if anterior is not None:
+            self._indice.quitar(anterior, multimedia_id)
+        self._indice.agregar(valor, multimedia_id)
+        self._hash_por_id[multimedia_id] = valor
+
+    def agregar(self, multimedia_id, hash_hex):
+        """Añade (o actualiza) el hash de un registro en este proceso"""
+        if not hash_hex:
+            return
+        with self._lock:
+            if self._cargado:
+                self._agregar(multimedia_id, hash_hex)
+
+    def quitar(self, multimedia_id):
+        with self._lock:
+            valor = self._hash_por_id.pop(multimedia_id, None)
+            if valor is not None:
+                self._indice.quitar(valor, multimedia_id)
+
+    # ========== CARGA ==========
+
+    def _cargar_desde(self, desde=None):
+        consulta = db.session.query(
+            Multimedia.id, Multimedia.hash_perceptual, Multimedia.actualizado_en
+        ).filter(Multimedia.hash_perceptual.isnot(None))
+        if desde is not None:
+            # >= y un segundo de margen: fechas iguales o con redondeo de la BD
+            consulta = consulta.filter(Multimedia.actualizado_en >= desde - timedelta(seconds=1))
+
+        for multimedia_id, hash_hex, actualizado_en in consulta.execution_options(yield_per=5000):
+            self._agregar(multimedia_id, hash_hex)
+            if actualizado_en and (self._marca is None or actualizado_en > self._marca):
+                self._marca = actualizado_en
+
+    def _sincronizar(self):
+        ahora = time.monotonic()
+        if self._cargado and ahora < self._siguiente_sincronizacion:
+            return
+        if not self._cargado:
+            inicio = time.perf_counter()
+            self._cargar_desde()
+            self._cargado = True
+            print(f"🖼️ Índice de similitud cargado: {len(self._hash_por_id)} imágenes "
+                  f"en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+        else:
+            self._cargar_desde(self._marca)
+        self._siguiente_sincronizacion = ahora + self.intervalo
+
+    # ========== BÚSQUEDA ==========
+
+    def buscar(self, hash_hex, distancia_maxima=DISTANCIA_POR_DEFECTO, excluir=(), limite=20):
+        """
+        Registros con hash a distancia <= distancia_maxima, más parecidos primero.
+
+        Returns:
+            list: [(distancia, multimedia_id), ...] (como máximo `limite`)
+        """
+        valor = int(hash_hex, 16)
+        with self._lock:
+            self._sincronizar()
+            resultados = self._indice.buscar(valor, distancia_maxima)
+        resultados = [r for r in resultados if r[1] not in excluir]
+        resultados.sort()
+        return resultados[:limite]
+
+
+# Instancia global del índice
+indice_similitud = IndiceSimilitud()
@@ -0,0 +1,317 @@
+"""
+Limitador de intentos (fuerza bruta) - SpeakLexi
+
+Token bucket por IP y por correo para login, verificación de correo,
+reenvío de códigos y recuperación de contraseña. Cada intento gasta un
+token; el cubo se rellena a ritmo constante hasta su capacidad
+(capacidad / periodo por segundo). Sin tokens -> 429 con Retry-After,
+antes de tocar la BD o de calcular ningún hash (el decorador va antes que
+la vista).
+
+Las dimensiones con solo_fallos (el correo del login) se comprueban antes
+de la vista pero solo gastan token cuando la vista llama a
+registrar_fallo(): un atacante que conoce el correo no puede bloquear a
+su dueño, que sigue entrando con la contraseña correcta.
+
+    LIMITADOR_BACKEND = 'local'  (default) cubos en memoria de cada proceso
+    LIMITADOR_BACKEND = 'redis'  cubos compartidos por todos los workers
+                                 (LIMITADOR_REDIS_URL; script Lua atómico)
+
+- Con 'local' cada worker tiene sus cubos: el límite real es el
+  configurado por el número de workers.
+- Si Redis no responde se deja pasar (se cuenta en errores_backend): un
+  fallo del limitador no debe tumbar el login.
+- Las claves son un hash de regla + dimensión + valor: ni correos ni IPs
+  en claro en Redis.
+- estadisticas() da los contadores de permitidos / rechazados (en /health).
+- redis-py solo hace falta con 'redis'.
+"""
+
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import wraps
+from hashlib import blake2b
+from typing import NamedTuple, Optional, Tuple
+
+from flask import request, jsonify
+
+try:
+    import redis
+except ImportError:  # redis-py es opcional (solo backend redis)
+    redis = None
+
+BACKEND_LOCAL = 'local'
+BACKEND_REDIS = 'redis'
+BACKENDS = (BACKEND_LOCAL, BACKEND_REDIS)
+
+CLAVES_MAXIMAS_POR_DEFECTO = 100_000
+
+
+class Regla(NamedTuple):
+    """`capacidad` intentos seguidos; el cubo se rellena entero en `periodo` segundos"""
+    capacidad: int
+    periodo: float
+    solo_fallos: bool = False  # Solo gasta con registrar_fallo()
+
+    @property
+    def por_segundo(self) -> float:
+        return self.capacidad / self.periodo
+
+
+# regla -> dimensión -> límite. Los códigos de verificación son de 6 dígitos
+# y duran 10 minutos: con 5 intentos por correo cada 10 minutos, adivinar
+# uno cuesta de media unos 2 años.
+REGLAS = {
+    'login': {'ip': Regla(30, 300), 'correo': Regla(5, 300, solo_fallos=True)},
+    'verificar_email': {'ip': Regla(20, 600), 'correo': Regla(5, 600)},
+    'restablecer_password': {'ip': Regla(10, 900)},  # El token tiene 256 bits: basta la IP
+    # Cada intento envía un correo: por correo para no bombardear un buzón
+    'reenviar_codigo': {'ip': Regla(10, 600), 'correo': Regla(3, 600)},
+    'recuperar_password': {'ip': Regla(10, 900), 'correo': Regla(3, 900)},
+}
+
+
+class CubosLocales:
+    """Cubos en memoria del proceso (LRU acotado por número de claves)"""
+
+    nombre = BACKEND_LOCAL
+
+    def __init__(self, claves_maximas=CLAVES_MAXIMAS_POR_DEFECTO):
+        self.claves_maximas = claves_maximas
+        self._lock = threading.Lock()
+        self._cubos = OrderedDict()  # clave -> [tokens, última actualización]
+
+    def __len__(self):
+        return len(self._cubos)
+
+    def consumir(self, clave: str, regla: Regla, coste: int = 1) -> Tuple[bool, float]:
+        """(permitido, segundos hasta el siguiente token); con coste 0 solo comprueba"""
+        ahora = time.monotonic()
+        with self._lock:
+            cubo = self._cubos.get(clave)
+            if cubo is None:
+                cubo = self._cubos[clave] = [float(regla.capacidad), ahora]
+                # Un cubo expulsado vuelve lleno: se pierde como mucho su historial
+                while len(self._cubos) > self.claves_maximas:
+                    self._cubos.popitem(last=False)
+            else:
+                self._cubos.move_to_end(clave)
+                cubo[0] = min(regla.capacidad, cubo[0] + (ahora - cubo[1]) * regla.por_segundo)
+                cubo[1] = ahora
+
+            if cubo[0] >= 1:
+                cubo[0] -= coste
+                return True, 0.0
+            return False, (1 - cubo[0]) / regla.por_segundo
+
+    def limpiar(self):
+        with self._lock:
+            self._cubos.clear()
+
+
+# Mismo algoritmo que CubosLocales, atómico en Redis y con su reloj
+_SCRIPT_CUBO = """
+local capacidad = tonumber(ARGV[1])
+local por_segundo = tonumber(ARGV[2])
+local coste = tonumber(ARGV[3])
+local reloj = redis.call('TIME')
+local ahora = tonumber(reloj[1]) + tonumber(reloj[2]) / 1000000
+local datos = redis.call('HMGET', KEYS[1], 't', 'u')
+local tokens = tonumber(datos[1]) or capacidad
+local ultima = tonumber(datos[2]) or ahora
+tokens = math.min(capacidad, tokens + (ahora - ultima) * por_segundo)
+local permitido = 0
+local espera = 0
+if tokens >= 1 then
+    tokens = tokens - coste
+    permitido = 1
+else
+    espera = (1 - tokens) / por_segundo
+end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 'u', tostring(ahora))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacidad / por_segundo * 1000))
+return {permitido, tostring(espera)}
+"""
+
+
+class CubosRedis:
+    """Cubos compartidos en Redis (un script por intento, sin carreras)"""
+
+    nombre = BACKEND_REDIS
+
+    def __init__(self, url, prefijo='limitador:'):
+        if redis is None:
+            raise RuntimeError("redis no está instalado (necesario para LIMITADOR_BACKEND=redis)")
+        if not url:
+            raise RuntimeError("LIMITADOR_REDIS_URL es obligatorio con LIMITADOR_BACKEND=redis")
+        self.prefijo = prefijo
+        # Tiempos cortos: si Redis no responde se deja pasar, no se espera
+        self._cliente = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self._script = self._cliente.register_script(_SCRIPT_CUBO)
+
+    def __len__(self):
+        return 0  # Las claves viven en Redis y caducan solas
+
+    def consumir(self, clave: str, regla: Regla, coste: int = 1) -> Tuple[bool, float]:
+        permitido, espera = self._script(
+            keys=[self.prefijo + clave], args=[regla.capacidad, regla.por_segundo, coste]
+        )
+        return bool(permitido), float(espera)
+
+    def limpiar(self):
+        for clave in self._cliente.scan_iter(match=self.prefijo + '*', count=1000):
+            self._cliente.delete(clave)
+
+
+def crear_backend(config):
+    """Backend según LIMITADOR_BACKEND"""
+    tipo = (config.get('LIMITADOR_BACKEND') or BACKEND_LOCAL).lower()
+    if tipo == BACKEND_LOCAL:
+        return CubosLocales(int(config.get('LIMITADOR_CLAVES_MAXIMAS', CLAVES_MAXIMAS_POR_DEFECTO)))
+    if tipo == BACKEND_REDIS:
+        return CubosRedis(config.get('LIMITADOR_REDIS_URL'), config.get('LIMITADOR_REDIS_PREFIJO', 'limitador:'))
+    raise RuntimeError(f"LIMITADOR_BACKEND no válido: {tipo} (opciones: {', '.join(BACKENDS)})")
+
+
+class LimitadorIntentos:
+    """Reglas por IP / correo sobre el backend configurado (local hasta init_app)"""
+
+    def __init__(self):
+        self.backend = CubosLocales()
+        self.activo = True
+        self.proxies = 0
+        self._lock = threading.Lock()
+        self._contadores = Counter()  # (regla, 'permitidos' | dimensión rechazada) -> n
+        self._errores_backend = 0
+
+    def init_app(self, app):
+        """
+        Configuración:
+            LIMITADOR_ACTIVO (bool): False desactiva el limitador (default: True)
+            LIMITADOR_BACKEND (str): local | redis (default: local)
+            LIMITADOR_REDIS_URL (str): redis://host:6379/0 (solo con redis)
+            LIMITADOR_PROXIES (int): Proxies de confianza delante de la app; la IP
+                del cliente se toma de X-Forwarded-For (default: 0 = remote_addr)
+        """
+        self.activo = bool(app.config.get('LIMITADOR_ACTIVO', True))
+        self.proxies = int(app.config.get('LIMITADOR_PROXIES', 0))
+        self.backend = crear_backend(app.config)
+        print(f"🚦 Limitador de intentos: {self.backend.nombre if self.activo else 'desactivado'}")
+
+    # ========== CLAVES ==========
+
+    def ip_cliente(self) -> str:
+        if self.proxies and len(request.access_route) >= self.proxies:
+            return request.access_route[-self.proxies]
+        return request.remote_addr or 'desconocida'
+
+    @staticmethod
+    def _correo() -> Optional[str]:
+        datos = request.get_json(silent=True) or {}
+        correo = datos.get('correo')
+        return correo.strip().lower() if isinstance(correo, str) and correo.strip() else None
+
+    @staticmethod
+    def _clave(regla: str, dimension: str, valor: str) -> str:
+        return blake2b(f"{regla}:{dimension}:{valor}".encode('utf-8'), digest_size=12).hexdigest()
+
+    # ========== COMPROBACIÓN ==========
+
+    def _consumir(self, nombre_regla, dimension, valor, regla, coste):
+        try:
+            return self.backend.consumir(self._clave(nombre_regla, dimension, valor), regla, coste)
+        except Exception as e:
+            with self._lock:
+                self._errores_backend += 1
+            print(f"⚠️ Limitador de intentos sin backend ({e}): se deja pasar")
+            return True, 0.0
+
+    def comprobar(self, nombre_regla: str) -> Tuple[bool, float]:
+        """
+        Gasta un intento en cada dimensión de la regla para la petición actual
+        (las de solo_fallos solo se comprueban).
+
+        Returns:
+            (permitido, segundos a esperar si no lo está)
+        """
+        valores = {'ip': self.ip_cliente(), 'correo': self._correo()}
+        permitido, espera, rechazadas = True, 0.0, []
+
+        for dimension, regla in REGLAS[nombre_regla].items():
+            valor = valores.get(dimension)
+            if valor is None:
+                continue
+            ok, segundos = self._consumir(nombre_regla, dimension, valor, regla, 0 if regla.solo_fallos else 1)
+            if not ok:
+                permitido = False
+                espera = max(espera, segundos)
+                rechazadas.append(dimension)
+
+        with self._lock:
+            if permitido:
+                self._contadores[(nombre_regla, 'permitidos')] += 1
+            for dimension in rechazadas:
+                self._contadores[(nombre_regla, dimension)] += 1
+        return permitido, espera
+
+    def registrar_fallo(self, nombre_regla: str) -> None:
+        """Gasta el intento de las dimensiones solo_fallos (p. ej. contraseña incorrecta)"""
+        if not self.activo:
+            return
+        valores = {'ip': self.ip_cliente(), 'correo': self._correo()}
+        for dimension, regla in REGLAS[nombre_regla].items():
+            valor = valores.get(dimension)
+            if regla.solo_fallos and valor is not None:
+                self._consumir(nombre_regla, dimension, valor, regla, 1)
+
+    def estadisticas(self) -> dict:
+        """Contadores para monitorización (desde el arranque del proceso)"""
+        with self._lock:
+            reglas = {
+                nombre: {
+                    'permitidos': self._contadores[(nombre, 'permitidos')],
+                    'rechazados': {d: self._contadores[(nombre, d)] for d in dimensiones},
+                }
+                for nombre, dimensiones in REGLAS.items()
+            }
+            errores = self._errores_backend
+        return {
+            'activo': self.activo,
+            'backend': self.backend.nombre,
+            'claves_en_memoria': len(self.backend),
+            'errores_backend': errores,
+            'reglas': reglas,
+        }
+
+    def limpiar(self):
+        """Vacía cubos y contadores (tests, o tras un falso positivo masivo)"""
+        self.backend.limpiar()
+        with self._lock:
+            self._contadores.clear()
+            self._errores_backend = 0
+
+
+# Instancia global del limitador
+limitador_intentos = LimitadorIntentos()
+
+
+def limitar(nombre_regla):
+    """Decorador: 429 + Retry-After si la IP o el correo agotaron sus intentos"""
+    def decorador(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if limitador_intentos.activo and request.method != 'OPTIONS':
+                permitido, espera = limitador_intentos.comprobar(nombre_regla)
+                if not permitido:
+                    segundos = max(1, int(espera + 0.999))
+                    respuesta = jsonify({
+                        "error": f"Demasiados intentos. Inténtalo de nuevo en {segundos} segundos",
+                        "codigo": "DEMASIADOS_INTENTOS",
+                        "reintentar_en": segundos
+                    })
+                    respuesta.headers['Retry-After'] = str(segundos)
+                    return respuesta, 429
+            return f(*args, **kwargs)
+        return decorated
+    return decorador
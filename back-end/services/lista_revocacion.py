@@ -0,0 +1,204 @@
+"""
+Lista de revocación de JWT - SpeakLexi
+
+Tokens revocados (logout) y refresh tokens ya usados (rotación) en la
+tabla tokens_revocados, con un filtro de Bloom delante en cada proceso:
+
+    jti no está en el filtro  -> no revocado, sin tocar la BD (caso normal)
+    jti puede estar           -> se confirma con una consulta por jti
+
+- El filtro se construye la primera vez que se usa con los jti que aún
+  no han caducado, y se reconstruye (el doble de grande) si se llena.
+- Cada INTERVALO_SINCRONIZACION segundos se añaden los revocados en otros
+  workers: filas con id mayor que el último visto y, además, las revocadas
+  en los últimos MARGEN_SINCRONIZACION segundos antes de la más reciente
+  vista (los id autoincrementales se asignan al insertar y pueden llegar
+  al commit desordenados). Hasta entonces un logout hecho en otro worker
+  no se ve aquí.
+- Rotación: cada refresh token se usa una sola vez. Si llega otra vez
+  (la fila ya existe: índice único, sin carreras entre workers) se revoca
+  su familia entera, la cadena de refresh tokens que salió de un mismo login.
+"""
+
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from config.database import db
+from models.token_revocado import TokenRevocado
+from utils.filtro_bloom import FiltroBloom
+
+INTERVALO_SINCRONIZACION = 5  # segundos
+MARGEN_SINCRONIZACION = 60  # segundos (transacciones lentas y relojes de otros hosts)
+CAPACIDAD_POR_DEFECTO = 100_000
+ERROR_FILTRO = 0.01
+CLAIM_FAMILIA = 'fam'
+SIN_CADUCIDAD = timedelta(days=3650)
+
+
+def nueva_familia() -> dict:
+    """Claims del refresh token de un login nuevo"""
+    return {CLAIM_FAMILIA: uuid.uuid4().hex}
+
+
+class ListaRevocacion:
+    """Filtro de Bloom + tabla tokens_revocados"""
+
+    def __init__(self, intervalo=INTERVALO_SINCRONIZACION, capacidad=CAPACIDAD_POR_DEFECTO):
+        self.intervalo = intervalo
+        self.capacidad = capacidad
+        self._lock = threading.Lock()
+        self._filtro = None
+        self._ultimo_id = 0
+        self._marca = None  # Mayor revocado_en visto
+        self.margen = timedelta(seconds=MARGEN_SINCRONIZACION)
+        self._siguiente_sincronizacion = 0.0
+        self.duracion_refresh = timedelta(days=30)
+
+    def init_app(self, app):
+        """
+        Configuración:
+            JWT_REVOCADOS_INTERVALO (int): Segundos entre lecturas de lo revocado en otros workers (default: 5)
+            JWT_REVOCADOS_CAPACIDAD (int): Tokens revocados vigentes previstos para el filtro (default: 100000)
+            JWT_REVOCADOS_MARGEN (int): Segundos hacia atrás que se vuelven a leer en cada sincronización (default: 60)
+        """
+        self.intervalo = float(app.config.get('JWT_REVOCADOS_INTERVALO', INTERVALO_SINCRONIZACION))
+        self.margen = timedelta(seconds=float(app.config.get('JWT_REVOCADOS_MARGEN', MARGEN_SINCRONIZACION)))
+        self.capacidad = int(app.config.get('JWT_REVOCADOS_CAPACIDAD', CAPACIDAD_POR_DEFECTO))
+        duracion = app.config.get('JWT_REFRESH_TOKEN_EXPIRES', timedelta(days=30))
+        if duracion is False:
+            duracion = SIN_CADUCIDAD
+        elif not isinstance(duracion, timedelta):
+            duracion = timedelta(seconds=int(duracion))
+        self.duracion_refresh = duracion
+        self.invalidar()
+
+    def invalidar(self):
+        """Descarta el filtro; se reconstruye en la siguiente consulta"""
+        with self._lock:
+            self._filtro = None
+            self._ultimo_id = 0
+            self._marca = None
+
+    # ========== FILTRO ==========
+
+    def _reconstruir(self):
+        ahora = datetime.utcnow()
+        # Último id y fecha antes de leer: lo que entre mientras llega en la siguiente sincronización
+        ultimo_id, marca = db.session.query(
+            db.func.max(TokenRevocado.id), db.func.max(TokenRevocado.revocado_en)
+        ).one()
+        vigentes = db.session.query(TokenRevocado.jti).filter(TokenRevocado.expira_en > ahora)
+        total = vigentes.count()
+
+        filtro = FiltroBloom(max(self.capacidad, total * 2), ERROR_FILTRO)
+        for (jti,) in vigentes.execution_options(yield_per=5000):
+            filtro.agregar(jti)
+
+        self._filtro = filtro
+        self._ultimo_id = ultimo_id or 0
+        self._marca = marca
+        print(f"🔒 Lista de revocación cargada: {total} tokens ({filtro.tamano_bytes // 1024} KB)")
+
+    def _sincronizar(self):
+        ahora = time.monotonic()
+        if self._filtro is not None and ahora < self._siguiente_sincronizacion:
+            return
+        if self._filtro is None or self._filtro.lleno:
+            self._reconstruir()
+        else:
+            condicion = TokenRevocado.id > self._ultimo_id
+            if self._marca is not None:
+                # Ids menores que llegaron al commit después que uno mayor ya leído
+                condicion = or_(condicion, TokenRevocado.revocado_en >= self._marca - self.margen)
+            nuevos = db.session.query(TokenRevocado.id, TokenRevocado.jti, TokenRevocado.revocado_en).filter(condicion)
+            for fila_id, jti, revocado_en in nuevos:
+                self._filtro.agregar(jti)
+                self._ultimo_id = max(self._ultimo_id, fila_id)
+                if revocado_en and (self._marca is None or revocado_en > self._marca):
+                    self._marca = revocado_en
+        self._siguiente_sincronizacion = ahora + self.intervalo
+
+    def esta_revocado(self, jwt_data) -> bool:
+        """True si el token o su familia están revocados (token_in_blocklist_loader)"""
+        if jwt_data.get('type') == 'refresh':
+            # Su propio jti lo comprueba consumir_refresh al rotarlo: así una
+            # reutilización llega hasta allí y revoca la familia
+            candidatos = [jwt_data.get(CLAIM_FAMILIA)]
+        else:
+            candidatos = [jwt_data.get('jti')]
+        with self._lock:
+            self._sincronizar()
+            candidatos = [jti for jti in candidatos if jti and jti in self._filtro]
+        if not candidatos:
+            return False
+        # Posible (o falso positivo del filtro): se confirma en la BD
+        return db.session.query(TokenRevocado.id).filter(
+            TokenRevocado.jti.in_(candidatos)
+        ).first() is not None
+
+    # ========== REVOCAR ==========
+
+    def _insertar(self, jti, tipo, usuario_id, expira_en) -> bool:
+        db.session.add(TokenRevocado(jti=jti, tipo=tipo, usuario_id=usuario_id, expira_en=expira_en))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return False
+        with self._lock:
+            if self._filtro is not None:
+                self._filtro.agregar(jti)
+        return True
+
+    @staticmethod
+    def _datos(jwt_data):
+        usuario_id = int(jwt_data['sub'])
+        if 'exp' in jwt_data:
+            expira_en = datetime.utcfromtimestamp(jwt_data['exp'])
+        else:
+            expira_en = datetime.utcnow() + SIN_CADUCIDAD
+        return usuario_id, expira_en
+
+    def revocar(self, jwt_data) -> bool:
+        """Revoca un token decodificado. False si ya lo estaba."""
+        usuario_id, expira_en = self._datos(jwt_data)
+        return self._insertar(jwt_data['jti'], jwt_data.get('type', 'access'), usuario_id, expira_en)
+
+    def revocar_familia(self, jwt_data) -> bool:
+        """Revoca todos los refresh tokens que salieron del mismo login"""
+        familia = jwt_data.get(CLAIM_FAMILIA)
+        if not familia:
+            return False
+        usuario_id, _ = self._datos(jwt_data)
+        # Dura lo que el refresh token más nuevo que pudo salir de ella
+        return self._insertar(familia, 'familia', usuario_id, datetime.utcnow() + self.duracion_refresh)
+
+    def consumir_refresh(self, jwt_data) -> bool:
+        """
+        Marca como usado un refresh token al rotarlo.
+
+        Returns:
+            bool: False si ya se había usado (reutilización: se revoca la familia)
+        """
+        if self.revocar(jwt_data):
+            return True
+        self.revocar_familia(jwt_data)
+        print(f"⚠️ Refresh token reutilizado (usuario {jwt_data.get('sub')}): familia revocada")
+        return False
+
+    def purgar_expirados(self) -> int:
+        """Borra las filas de tokens ya caducados. Devuelve cuántas."""
+        borrados = TokenRevocado.query.filter(
+            TokenRevocado.expira_en <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return borrados
+
+
+# Instancia global de la lista
+lista_revocacion = ListaRevocacion()
@@ -0,0 +1,177 @@
+"""
+Mapa de propietarios - SpeakLexi
+
+Responde en memoria "¿este profesor es dueño de este curso / lección?",
+que antes costaba hasta tres consultas por escritura
+(Usuario -> Leccion -> Curso.profesor_id):
+
+    curso_id   -> profesor_id
+    leccion_id -> curso_id
+
+Son dos diccionarios de enteros (unos 100 bytes por entrada en CPython).
+
+- Se carga la primera vez que se usa, con dos consultas de dos columnas.
+- Un id que no está (creado en otro worker) se consulta y se guarda.
+- Cada INTERVALO_SINCRONIZACION segundos se vuelven a leer los cursos y
+  lecciones modificados desde la última vez (filtro por actualizado_en):
+  así llega a cada worker un cambio de profesor o de curso hecho en otro.
+- En este proceso, al cambiar profesor_id / curso_id o borrar el registro
+  se quita la entrada en el mismo flush y se vuelve a leer de la BD.
+"""
+
+import threading
+import time
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import event, inspect
+
+from config.database import db
+from models.cursos import Curso
+from models.leccion import Leccion
+
+INTERVALO_SINCRONIZACION = 30  # segundos
+_NO_ESTA = object()
+NO_EXISTE = object()  # profesor_de_curso de un curso que no existe (distinto de None: sin profesor)
+
+
+class MapaPropietarios:
+    """curso -> profesor y lección -> curso en memoria"""
+
+    def __init__(self, intervalo=INTERVALO_SINCRONIZACION):
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._profesor_por_curso = {}
+        self._curso_por_leccion = {}
+        self._cargado = False
+        self._marca_cursos = None
+        self._marca_lecciones = None
+        self._siguiente_sincronizacion = 0.0
+
+    def invalidar(self):
+        """Descarta el mapa; se recarga en la siguiente consulta"""
+        with self._lock:
+            self._profesor_por_curso = {}
+            self._curso_por_leccion = {}
+            self._cargado = False
+            self._marca_cursos = self._marca_lecciones = None
+
+    def olvidar_curso(self, curso_id):
+        with self._lock:
+            self._profesor_por_curso.pop(curso_id, None)
+
+    def olvidar_leccion(self, leccion_id):
+        with self._lock:
+            self._curso_por_leccion.pop(leccion_id, None)
+
+    # ========== CARGA ==========
+
+    @staticmethod
+    def _leer(columna_id, columna_valor, actualizado_en, destino, desde):
+        consulta = db.session.query(columna_id, columna_valor, actualizado_en)
+        if desde is not None:
+            # >= y un segundo de margen: fechas iguales o con redondeo de la BD
+            consulta = consulta.filter(actualizado_en >= desde - timedelta(seconds=1))
+
+        marca = desde
+        for entidad_id, valor, fecha in consulta.execution_options(yield_per=5000):
+            destino[entidad_id] = valor
+            if fecha and (marca is None or fecha > marca):
+                marca = fecha
+        return marca
+
+    def _sincronizar(self):
+        ahora = time.monotonic()
+        if self._cargado and ahora < self._siguiente_sincronizacion:
+            return
+        self._marca_cursos = self._leer(
+            Curso.id, Curso.profesor_id, Curso.actualizado_en,
+            self._profesor_por_curso, self._marca_cursos
+        )
+        self._marca_lecciones = self._leer(
+            Leccion.id, Leccion.curso_id, Leccion.actualizado_en,
+            self._curso_por_leccion, self._marca_lecciones
+        )
+        if not self._cargado:
+            self._cargado = True
+            print(f"🔐 Mapa de propietarios cargado: {len(self._profesor_por_curso)} cursos, "
+                  f"{len(self._curso_por_leccion)} lecciones")
+        self._siguiente_sincronizacion = ahora + self.intervalo
+
+    def _buscar(self, destino, modelo, columna, entidad_id):
+        with self._lock:
+            self._sincronizar()
+            valor = destino.get(entidad_id, _NO_ESTA)
+        if valor is not _NO_ESTA:
+            return valor
+
+        fila = db.session.query(columna).filter(modelo.id == entidad_id).first()
+        if fila is None:
+            return NO_EXISTE
+        with self._lock:
+            destino[entidad_id] = fila[0]
+        return fila[0]
+
+    # ========== CONSULTAS ==========
+
+    def profesor_de_curso(self, curso_id):
+        """profesor_id del curso: None si no tiene profesor, NO_EXISTE si no existe"""
+        return self._buscar(self._profesor_por_curso, Curso, Curso.profesor_id, curso_id)
+
+    def curso_de_leccion(self, leccion_id) -> Optional[int]:
+        """curso_id de la lección (None si no existe o no tiene curso)"""
+        curso_id = self._buscar(self._curso_por_leccion, Leccion, Leccion.curso_id, leccion_id)
+        return None if curso_id is NO_EXISTE else curso_id
+
+    def profesor_de_leccion(self, leccion_id) -> Optional[int]:
+        curso_id = self.curso_de_leccion(leccion_id)
+        profesor_id = self.profesor_de_curso(curso_id) if curso_id else None
+        return None if profesor_id is NO_EXISTE else profesor_id
+
+    def puede_gestionar(self, usuario, curso_id=None, leccion_id=None) -> bool:
+        """
+        True si el usuario (UsuarioSesion) puede modificar el curso / la
+        lección: admin siempre; profesor si es el dueño. Un curso sin
+        profesor solo lo gestiona un admin. Sin curso, o si el curso no
+        existe, se deja pasar y la vista responde (400 / 404), como hacían
+        las rutas.
+        """
+        if usuario.tiene_rol('admin'):
+            return True
+        if not usuario.tiene_rol('profesor'):
+            return False
+        if not curso_id and leccion_id:
+            curso_id = self.curso_de_leccion(leccion_id)
+        if not curso_id:
+            return True
+        profesor_id = self.profesor_de_curso(curso_id)
+        if profesor_id is NO_EXISTE:
+            return True
+        return profesor_id is not None and profesor_id == usuario.id
+
+# Instancia global del mapa
+mapa_propietarios = MapaPropietarios()
+
+
+# ========== INVALIDACIÓN ==========
+
+@event.listens_for(Curso, 'after_update')
+def _curso_actualizado(mapper, connection, curso):
+    if inspect(curso).attrs.profesor_id.history.has_changes():
+        mapa_propietarios.olvidar_curso(curso.id)
+
+
+@event.listens_for(Curso, 'after_delete')
+def _curso_borrado(mapper, connection, curso):
+    mapa_propietarios.olvidar_curso(curso.id)
+
+
+@event.listens_for(Leccion, 'after_update')
+def _leccion_actualizada(mapper, connection, leccion):
+    if inspect(leccion).attrs.curso_id.history.has_changes():
+        mapa_propietarios.olvidar_leccion(leccion.id)
+
+
+@event.listens_for(Leccion, 'after_delete')
+def _leccion_borrada(mapper, connection, leccion):
+    mapa_propietarios.olvidar_leccion(leccion.id)
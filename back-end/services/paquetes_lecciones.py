@@ -0,0 +1,238 @@
+"""
+Paquetes offline de lecciones - SpeakLexi
+
+Un paquete es un .zip con todo lo necesario para hacer una lección sin
+conexión, en una sola descarga:
+
+    leccion.json        Lección con actividades y multimedia (como GET /api/lecciones/<id>)
+    manifiesto.json     Versión del paquete y lista de archivos con sha256 y tamaño
+    multimedia/<sha256>.<ext>
+                        Archivos de leccion_multimedia y de Actividad.multimedia_id
+
+El manifiesto también se sirve suelto: el cliente compara los sha256 con
+los archivos que ya tiene y descarga solo los que faltan por su url.
+
+Los paquetes se generan al publicar la lección y se guardan en
+<ruta_almacenamiento>/paquetes/leccion-<id>-<version>.zip. La versión sale
+de las mismas consultas ligeras que el ETag de la lección (COUNT/MAX de
+actualizado_en de la lección, sus actividades y su multimedia): cualquier
+cambio de contenido da otro nombre, el siguiente GET genera el paquete
+nuevo y borra los anteriores. Los contadores de uso de Multimedia no tocan
+actualizado_en (Multimedia.incrementar_uso), así que ver un recurso no
+obliga a regenerar el paquete.
+"""
+
+import glob
+import hashlib
+import os
+import tempfile
+import zipfile
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import or_
+
+from config.database import db
+from models.leccion import Leccion, Actividad, leccion_multimedia
+from models.multimedia import Multimedia, ConfiguracionMultimedia
+from services.almacenamiento_multimedia import almacenamiento_multimedia
+from utils.cache_http import version_de_consulta, calcular_etag
+
+CARPETA_PAQUETES = 'paquetes'
+TAMANO_BLOQUE = 1024 * 1024
+FORMATO_PAQUETE = 1
+
+# Imagen, audio y vídeo ya van comprimidos: se guardan tal cual (ZIP_STORED)
+_COMPRIMIR_TIPOS = ('text/', 'application/json', 'application/xml', 'image/svg+xml')
+
+
+class GestorPaquetesLecciones:
+    """Genera, cachea en disco y localiza los paquetes offline de lecciones"""
+
+    # ========== VERSIÓN ==========
+
+    @staticmethod
+    def _consulta_multimedia(leccion_id):
+        """Multimedia de la lección: asociada directamente o usada por una actividad"""
+        asociados = db.session.query(leccion_multimedia.c.multimedia_id).filter(
+            leccion_multimedia.c.leccion_id == leccion_id
+        )
+        de_actividades = db.session.query(Actividad.multimedia_id).filter(
+            Actividad.leccion_id == leccion_id,
+            Actividad.multimedia_id.isnot(None)
+        )
+        return Multimedia.query.filter(or_(
+            Multimedia.id.in_(asociados),
+            Multimedia.id.in_(de_actividades)
+        ))
+
+    def version(self, leccion_id):
+        """
+        Versión del paquete (hash corto), o None si la lección no existe.
+        Tres consultas agregadas, sin cargar filas.
+        """
+        leccion = version_de_consulta(Leccion.query.filter_by(id=leccion_id), Leccion.actualizado_en)
+        if not leccion[0]:
+            return None
+        actividades = version_de_consulta(
+            Actividad.query.filter_by(leccion_id=leccion_id), Actividad.actualizado_en
+        )
+        multimedia = version_de_consulta(self._consulta_multimedia(leccion_id), Multimedia.actualizado_en)
+        return calcular_etag(FORMATO_PAQUETE, leccion_id, leccion, actividades, multimedia)[:16]
+
+    # ========== RUTAS ==========
+
+    @staticmethod
+    def carpeta():
+        ruta_base = ConfiguracionMultimedia.obtener_valor('ruta_almacenamiento', 'uploads/multimedia')
+        return os.path.join(ruta_base, CARPETA_PAQUETES)
+
+    @staticmethod
+    def nombre_paquete(leccion_id, version):
+        return f"leccion-{leccion_id}-{version}.zip"
+
+    # ========== GENERACIÓN ==========
+
+    def obtener(self, leccion_id):
+        """
+        Paquete vigente de una lección; lo genera si no existe.
+
+        Returns:
+            tuple: (nombre relativo a la ruta de almacenamiento, versión),
+                   o (None, None) si la lección no existe
+        """
+        version = self.version(leccion_id)
+        if version is None:
+            return None, None
+        nombre = self.nombre_paquete(leccion_id, version)
+        if not os.path.isfile(os.path.join(self.carpeta(), nombre)):
+            self._generar(leccion_id, version)
+        return f"{CARPETA_PAQUETES}/{nombre}", version
+
+    def leer_manifiesto(self, leccion_id):
+        """Manifiesto del paquete vigente (dict), o None si la lección no existe"""
+        ruta_base = ConfiguracionMultimedia.obtener_valor('ruta_almacenamiento', 'uploads/multimedia')
+        for intento in range(2):
+            nombre, _ = self.obtener(leccion_id)
+            if nombre is None:
+                return None
+            try:
+                with zipfile.ZipFile(os.path.join(ruta_base, *nombre.split('/'))) as paquete:
+                    return current_app.json.loads(paquete.read('manifiesto.json'))
+            except FileNotFoundError:
+                # Lo sustituyó uno más nuevo entre obtener() y la lectura: se pide el vigente
+                if intento:
+                    raise
+
+    def _abrir_archivo(self, multimedia):
+        # En local se prefiere ruta_local: sigue valiendo durante una migración de distribución
+        if almacenamiento_multimedia.es_local and multimedia.ruta_local and os.path.isfile(multimedia.ruta_local):
+            return open(multimedia.ruta_local, 'rb')
+        return almacenamiento_multimedia.abrir(multimedia.clave_almacenamiento)
+
+    def _escribir_archivo(self, paquete, multimedia, nombre_en_zip):
+        """Copia el archivo al zip por bloques; devuelve (sha256, tamaño)"""
+        info = zipfile.ZipInfo(nombre_en_zip, date_time=(multimedia.actualizado_en or datetime.utcnow()).timetuple()[:6])
+        comprimir = (multimedia.mime_type or '').startswith(_COMPRIMIR_TIPOS)
+        info.compress_type = zipfile.ZIP_DEFLATED if comprimir else zipfile.ZIP_STORED
+
+        resumen = hashlib.sha256()
+        tamano = 0
+        with self._abrir_archivo(multimedia) as origen, paquete.open(info, 'w', force_zip64=True) as destino:
+            for bloque in iter(lambda: origen.read(TAMANO_BLOQUE), b''):
+                resumen.update(bloque)
+                tamano += len(bloque)
+                destino.write(bloque)
+        return resumen.hexdigest(), tamano
+
+    def _generar(self, leccion_id, version):
+        leccion = Leccion.query.options(
+            *Leccion.opciones_carga(incluir_actividades=True, incluir_multimedia=True)
+        ).filter_by(id=leccion_id).one()
+        recursos = self._consulta_multimedia(leccion_id).order_by(Multimedia.id).all()
+
+        datos_leccion = leccion.to_dict(incluir_actividades=True, incluir_multimedia=True)
+        carpeta = self.carpeta()
+        os.makedirs(carpeta, exist_ok=True)
+        nombre = self.nombre_paquete(leccion_id, version)
+
+        # Temporal en la misma carpeta + os.replace: nadie ve un zip a medias
+        descriptor, temporal = tempfile.mkstemp(prefix=f".{nombre}.", suffix='.tmp', dir=carpeta)
+        try:
+            archivos, faltantes, escritos = [], [], {}
+            with os.fdopen(descriptor, 'wb') as salida, \
+                    zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as paquete:
+                paquete.writestr('leccion.json', current_app.json.dumps(datos_leccion))
+
+                for multimedia in recursos:
+                    clave = multimedia.clave_almacenamiento
+                    if not clave:
+                        faltantes.append(multimedia.id)
+                        continue
+                    extension = os.path.splitext(clave)[1]
+                    nombre_en_zip = f"multimedia/{multimedia.hash_sha256 or multimedia.nombre_almacenado}"
+                    if multimedia.hash_sha256:
+                        nombre_en_zip += extension
+
+                    # Registros deduplicados comparten archivo: se guarda una vez
+                    if nombre_en_zip not in escritos:
+                        try:
+                            escritos[nombre_en_zip] = self._escribir_archivo(paquete, multimedia, nombre_en_zip)
+                        except Exception as e:
+                            print(f"⚠️ Paquete lección {leccion_id}: no se pudo leer multimedia {multimedia.id}: {e}")
+                            faltantes.append(multimedia.id)
+                            continue
+
+                    sha256, tamano = escritos[nombre_en_zip]
+                    archivos.append({
+                        "multimedia_id": multimedia.id,
+                        "archivo": nombre_en_zip,
+                        "sha256": sha256,
+                        "tamano": tamano,
+                        "mime_type": multimedia.mime_type,
+                        "url": multimedia.url
+                    })
+
+                paquete.writestr('manifiesto.json', current_app.json.dumps({
+                    "formato": FORMATO_PAQUETE,
+                    "leccion_id": leccion_id,
+                    "version": version,
+                    "generado_en": datetime.utcnow().isoformat(),
+                    "archivos": archivos,
+                    "faltantes": faltantes
+                }))
+            os.replace(temporal, os.path.join(carpeta, nombre))
+        except BaseException:
+            try:
+                os.unlink(temporal)
+            except FileNotFoundError:
+                pass
+            raise
+
+        self._borrar_anteriores(leccion_id, nombre)
+        print(f"📦 Paquete de la lección {leccion_id} generado ({len(archivos)} archivos)")
+
+    def _borrar_anteriores(self, leccion_id, vigente):
+        """
+        Borra los paquetes anteriores al recién escrito. Otro worker puede
+        haber generado a la vez uno más nuevo (la lección cambió mientras
+        tanto): se conserva el de la versión actual y cualquiera escrito
+        después que este.
+        """
+        carpeta = self.carpeta()
+        conservar = {vigente, self.nombre_paquete(leccion_id, self.version(leccion_id))}
+        try:
+            escrito_en = os.stat(os.path.join(carpeta, vigente)).st_mtime_ns
+        except FileNotFoundError:
+            return
+        for ruta in glob.glob(os.path.join(carpeta, f"leccion-{leccion_id}-*.zip")):
+            if os.path.basename(ruta) in conservar:
+                continue
+            try:
+                if os.stat(ruta).st_mtime_ns <= escrito_en:
+                    os.unlink(ruta)
+            except FileNotFoundError:
+                pass
+
+# Instancia global del gestor de paquetes
+paquetes_lecciones = GestorPaquetesLecciones()
@@ -0,0 +1,313 @@
+"""
+Procesador de Multimedia en segundo plano - SpeakLexi
+
+Extrae metadatos de cabecera (dimensiones, duración, bitrate) de imágenes,
+audio y vídeo, y genera miniaturas, variantes WebP y el hash perceptual de
+las imágenes, en un pool de procesos (trabajo de CPU/E-S en paralelo), sin
+bloquear la subida:
+
+    subida -> PENDIENTE -> (entra al pool) PROCESANDO -> DISPONIBLE / ERROR
+
+- El pool se crea la primera vez que hace falta; los procesos ejecutan
+  solo utils/tareas_multimedia.procesar_archivo (sin Flask ni BD).
+- Al terminar cada tarea, el callback (hilo del proceso principal)
+  actualiza el registro dentro de un app context.
+- Con el hash perceptual se buscan imágenes parecidas ya subidas
+  (services/indice_similitud.py) y se avisa en meta_data['similares'].
+- Sin Pillow solo se extraen metadatos (las imágenes quedan sin miniatura);
+  con MULTIMEDIA_PROCESOS = 0 no se procesa nada y todo queda DISPONIBLE.
+- encolar_pendientes() reencola lo que quedó a medias tras un reinicio
+  (scripts/procesar_multimedia_pendiente.py).
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+from config.database import db
+from models.multimedia import (
+    Multimedia, TipoMultimedia, EstadoMultimedia, ConfiguracionMultimedia
+)
+from services.almacenamiento_multimedia import almacenamiento_multimedia
+from services.indice_similitud import indice_similitud
+from utils.distribucion_archivos import (
+    subdirectorio, ruta_distribuida, url_de, NIVELES_POR_DEFECTO
+)
+from utils.hash_perceptual import HASH_PERCEPTUAL_DISPONIBLE
+from utils.tareas_multimedia import procesar_archivo
+from utils.variantes_imagen import PILLOW_DISPONIBLE, anchos_desde_texto
+
+CARPETA_VARIANTES = 'thumbnails'
+MAXIMO_SIMILARES_AVISO = 5
+ANCHOS_POR_DEFECTO = '320,640,1280'
+TIPOS_PROCESABLES = (TipoMultimedia.IMAGEN, TipoMultimedia.AUDIO, TipoMultimedia.VIDEO)
+# Un registro PROCESANDO más viejo que esto se considera abandonado (reinicio, proceso muerto)
+TIEMPO_MAXIMO_PROCESANDO = timedelta(minutes=15)
+
+
+class ProcesadorMultimedia:
+    """Pool de procesos para metadatos, miniaturas y variantes"""
+
+    def __init__(self):
+        self._app = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self.procesos = 0
+        self.contexto = 'spawn'
+
+    def init_app(self, app):
+        """
+        Configuración:
+            MULTIMEDIA_PROCESOS (int): Procesos del pool; 0 desactiva (default: 2)
+            MULTIMEDIA_CONTEXTO_PROCESOS (str): spawn | forkserver | fork (default: spawn)
+        """
+        self._app = app
+        self.procesos = int(app.config.get('MULTIMEDIA_PROCESOS', 2))
+        self.contexto = app.config.get('MULTIMEDIA_CONTEXTO_PROCESOS', 'spawn')
+        if self.procesos > 0 and not PILLOW_DISPONIBLE:
+            print("⚠️ Pillow no está instalado: no se generarán miniaturas")
+        atexit.register(self.detener)
+
+    @property
+    def activo(self) -> bool:
+        return self.procesos > 0 and self._app is not None
+
+    def _obtener_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.procesos,
+                    mp_context=multiprocessing.get_context(self.contexto)
+                )
+            return self._pool
+
+    def detener(self, esperar=False):
+        """Cierra el pool (al salir o en tests)"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=esperar, cancel_futures=not esperar)
+                self._pool = None
+
+    # ========== ENCOLAR ==========
+
+    def requiere_procesamiento(self, tipo) -> bool:
+        """True si un recurso de este tipo debe pasar por el pool"""
+        return tipo in TIPOS_PROCESABLES and self.activo
+
+    def _genera_variantes(self, multimedia) -> bool:
+        return (
+            multimedia.tipo == TipoMultimedia.IMAGEN
+            and PILLOW_DISPONIBLE
+            and ConfiguracionMultimedia.obtener_booleano('generar_thumbnails', True)
+        )
+
+    def _parametros(self, multimedia, ruta_origen):
+        parametros = {'ruta_origen': ruta_origen}
+        if self._genera_variantes(multimedia):
+            ruta_base = ConfiguracionMultimedia.obtener_valor('ruta_almacenamiento', 'uploads/multimedia')
+            parametros['variantes'] = self._parametros_variantes(multimedia, ruta_base)
+        if multimedia.tipo == TipoMultimedia.IMAGEN and HASH_PERCEPTUAL_DISPONIBLE:
+            parametros['hash_perceptual'] = True
+        return parametros
+
+    def _parametros_variantes(self, multimedia, ruta_base):
+        nombre_base = multimedia.hash_sha256 or os.path.splitext(multimedia.nombre_almacenado)[0]
+        return {
+            'directorio_destino': os.path.join(
+                ruta_base, CARPETA_VARIANTES, subdirectorio(nombre_base, self._niveles())
+            ),
+            'nombre_base': nombre_base,
+            'tamano_miniatura': (
+                ConfiguracionMultimedia.obtener_entero('thumbnail_ancho', 300),
+                ConfiguracionMultimedia.obtener_entero('thumbnail_alto', 300)
+            ),
+            'anchos': anchos_desde_texto(
+                ConfiguracionMultimedia.obtener_valor('anchos_variantes_imagen', ANCHOS_POR_DEFECTO)
+            ),
+            'calidad': ConfiguracionMultimedia.obtener_entero('calidad_compresion_imagen', 85),
+        }
+
+    def _niveles(self):
+        return ConfiguracionMultimedia.obtener_entero('niveles_directorio', NIVELES_POR_DEFECTO)
+
+    def encolar(self, multimedia_id) -> bool:
+        """
+        Envía un recurso PENDIENTE al pool y lo marca PROCESANDO.
+        No espera el resultado. Devuelve False si no se pudo encolar.
+        """
+        if not self.activo:
+            return False
+
+        multimedia = db.session.get(Multimedia, multimedia_id)
+        if not multimedia or not (multimedia.ruta_local or multimedia.clave_almacenamiento):
+            return False
+
+        copia = None
+        try:
+            ruta_origen = multimedia.ruta_local
+            if not ruta_origen:
+                # Con almacenamiento remoto (S3) cada tarea trabaja sobre su propia copia local
+                ruta_origen = copia = almacenamiento_multimedia.copia_para_procesar(
+                    multimedia.clave_almacenamiento
+                )
+            parametros = self._parametros(multimedia, ruta_origen)
+            multimedia.estado = EstadoMultimedia.PROCESANDO
+            multimedia.mensaje_error = None
+            db.session.commit()
+
+            futuro = self._obtener_pool().submit(procesar_archivo, **parametros)
+            futuro.add_done_callback(
+                lambda f, mid=multimedia_id, c=copia: self._al_terminar(mid, f, c)
+            )
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ No se pudo encolar multimedia {multimedia_id}: {e}")
+            self._guardar_resultado(multimedia_id, error=str(e), copia=copia)
+            return False
+
+    def encolar_pendientes(self, limite=500) -> int:
+        """Reencola PENDIENTE y PROCESANDO abandonados. Devuelve cuántos."""
+        if not self.activo:
+            return 0
+
+        abandonado = datetime.utcnow() - TIEMPO_MAXIMO_PROCESANDO
+        ids = [fila.id for fila in db.session.query(Multimedia.id).filter(
+            Multimedia.tipo.in_(TIPOS_PROCESABLES),
+            db.or_(
+                Multimedia.estado == EstadoMultimedia.PENDIENTE,
+                db.and_(
+                    Multimedia.estado == EstadoMultimedia.PROCESANDO,
+                    Multimedia.actualizado_en < abandonado
+                )
+            )
+        ).order_by(Multimedia.id).limit(limite)]
+
+        return sum(1 for multimedia_id in ids if self.encolar(multimedia_id))
+
+    # ========== RESULTADOS ==========
+
+    def _al_terminar(self, multimedia_id, futuro, copia=None):
+        """Callback en el proceso principal (hilo del pool)"""
+        if futuro.cancelled():
+            if copia:
+                almacenamiento_multimedia.liberar_copia(copia)
+            return  # Se queda PROCESANDO; encolar_pendientes lo recupera
+        error = futuro.exception()
+        if isinstance(error, BrokenProcessPool):
+            # Un proceso murió (p. ej. sin memoria): el pool ya no sirve, se recrea al encolar
+            with self._lock:
+                self._pool = None
+        if error is not None:
+            self._guardar_resultado(multimedia_id, error=str(error), copia=copia)
+        else:
+            self._guardar_resultado(multimedia_id, resultado=futuro.result(), copia=copia)
+
+    def _subir_variantes(self, variantes, niveles):
+        """Sube al almacenamiento remoto las variantes generadas en disco local"""
+        ruta_base = ConfiguracionMultimedia.obtener_valor('ruta_almacenamiento', 'uploads/multimedia')
+        for nombre in [variantes['miniatura'], *variantes['variantes'].values()]:
+            clave = ruta_distribuida(f"{CARPETA_VARIANTES}/{nombre}", niveles)
+            ruta = os.path.join(ruta_base, *clave.split('/'))
+            if os.path.isfile(ruta):
+                almacenamiento_multimedia.guardar(ruta, clave, 'image/webp')
+
+    def _avisar_similares(self, multimedia):
+        """Guarda en meta_data las imágenes ya subidas que se ven igual"""
+        # Las copias exactas (mismo archivo) no son un aviso útil
+        excluir = {multimedia.id}
+        if multimedia.hash_sha256:
+            excluir.update(fila.id for fila in db.session.query(Multimedia.id).filter(
+                Multimedia.hash_sha256 == multimedia.hash_sha256
+            ))
+        similares = indice_similitud.buscar(
+            multimedia.hash_perceptual, excluir=excluir, limite=MAXIMO_SIMILARES_AVISO
+        )
+        if similares:
+            multimedia.meta_data = {
+                **(multimedia.meta_data or {}),
+                'similares': [{'id': mid, 'distancia': distancia} for distancia, mid in similares]
+            }
+            print(f"⚠️ Multimedia {multimedia.id} se parece a: {[mid for _, mid in similares]}")
+
+    def _completar_duplicados(self, multimedia):
+        """Copia el resultado a los duplicados subidos mientras se procesaba el original"""
+        if not multimedia.hash_sha256:
+            return []
+        duplicados = Multimedia.query.filter(
+            Multimedia.id != multimedia.id,
+            Multimedia.hash_sha256 == multimedia.hash_sha256,
+            Multimedia.tipo == multimedia.tipo,
+            Multimedia.estado == EstadoMultimedia.PENDIENTE
+        ).all()
+        for duplicado in duplicados:
+            duplicado.copiar_derivados(multimedia)
+            if multimedia.estado == EstadoMultimedia.ERROR:
+                duplicado.marcar_error(multimedia.mensaje_error)
+            else:
+                duplicado.marcar_disponible()
+        return duplicados
+
+    def _guardar_resultado(self, multimedia_id, resultado=None, error=None, copia=None):
+        if copia:
+            almacenamiento_multimedia.liberar_copia(copia)
+
+        with self._app.app_context():
+            try:
+                multimedia = db.session.get(Multimedia, multimedia_id)
+                if not multimedia:
+                    return
+
+                if error is not None:
+                    multimedia.marcar_error(f"Error al procesar el archivo: {error}")
+                    self._completar_duplicados(multimedia)
+                    db.session.commit()
+                    print(f"❌ Procesamiento de multimedia {multimedia_id}: {error}")
+                    return
+
+                multimedia.aplicar_metadatos(resultado['metadatos'])
+
+                variantes = resultado.get('variantes')
+                if variantes:
+                    niveles = self._niveles()
+
+                    def url_variante(nombre):
+                        return url_de(ruta_distribuida(f"{CARPETA_VARIANTES}/{nombre}", niveles))
+
+                    if not almacenamiento_multimedia.es_local:
+                        self._subir_variantes(variantes, niveles)
+
+                    multimedia.dimensiones = variantes['dimensiones']
+                    multimedia.url_thumbnail = url_variante(variantes['miniatura'])
+                    multimedia.meta_data = {
+                        **(multimedia.meta_data or {}),
+                        'variantes': {
+                            ancho: url_variante(nombre)
+                            for ancho, nombre in variantes['variantes'].items()
+                        }
+                    }
+
+                hash_perceptual = resultado.get('hash_perceptual')
+                if hash_perceptual:
+                    multimedia.hash_perceptual = hash_perceptual
+                    self._avisar_similares(multimedia)
+
+                multimedia.marcar_disponible()
+                duplicados = self._completar_duplicados(multimedia)
+                db.session.commit()
+                for registro in (multimedia, *duplicados):
+                    indice_similitud.agregar(registro.id, hash_perceptual)
+                print(f"✅ Multimedia {multimedia_id} procesado")
+
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ No se pudo guardar el resultado de multimedia {multimedia_id}: {e}")
+
+
+# Instancia global del procesador
+procesador_multimedia = ProcesadorMultimedia()
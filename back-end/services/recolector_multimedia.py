@@ -0,0 +1,260 @@
+"""
+Recolector de archivos huérfanos y registros sin archivo - SpeakLexi
+
+Reconcilia la carpeta de almacenamiento con la tabla multimedia:
+
+- Archivos huérfanos (sin registro): la subida escribe el archivo antes del
+  commit y un fallo a medias puede dejarlo suelto. Se mueven a
+  <ruta_almacenamiento>/.cuarentena/<fecha>/ (no se borran ni se sirven).
+- Registros sin archivo: se marcan ERROR con un mensaje, no se borran.
+
+Memoria acotada con millones de archivos: el recorrido usa os.scandir como
+generador (una pila de carpetas, nunca la lista completa) y los nombres se
+comprueban contra la BD en lotes con una consulta IN por lote.
+
+Solo se tocan nombres generados por el sistema:
+    <sha256>.<ext>, <sha256>_<variante>.webp  -> se busca el hash_sha256
+    <uuid4.hex>.<ext> (subidas antiguas)       -> se busca nombre_almacenado
+    temporales (.subida-*.tmp, *.<pid>.tmp)     -> huérfanos si son viejos
+El resto se ignora. Los archivos más recientes que `edad_minima` nunca se
+tocan: pueden pertenecer a una subida en curso.
+"""
+
+import os
+import re
+import shutil
+import time
+from datetime import datetime, timedelta
+
+from config.database import db
+from models.multimedia import Multimedia, ConfiguracionMultimedia
+from services.almacenamiento_multimedia import almacenamiento_multimedia
+from utils.distribucion_archivos import rutas_candidatas, NIVELES_POR_DEFECTO
+
+CARPETA_CUARENTENA = '.cuarentena'
+# .subidas: gestor_subidas.limpiar_expiradas; paquetes: services/paquetes_lecciones.py
+CARPETAS_EXCLUIDAS = {CARPETA_CUARENTENA, '.subidas', 'paquetes'}
+TAMANO_LOTE = 1000
+EDAD_MINIMA_POR_DEFECTO = timedelta(hours=1)
+MENSAJE_SIN_ARCHIVO = "Archivo no encontrado en el almacenamiento (recolector)"
+
+_NOMBRE_HASH = re.compile(r'^([0-9a-f]{64})(?:_[a-z0-9]+)?\.[A-Za-z0-9]{1,10}$')
+_NOMBRE_UUID = re.compile(r'^[0-9a-f]{32}\.[A-Za-z0-9]{1,10}$')
+_NOMBRE_TEMPORAL = re.compile(r'^\.subida-.*\.tmp$|\.\d+\.tmp$')
+
+
+class LimitadorRitmo:
+    """Limita operaciones por segundo (0 = sin límite) para no saturar el disco"""
+
+    def __init__(self, por_segundo=0):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0.0
+        self._siguiente = time.monotonic()
+
+    def esperar(self):
+        if not self.intervalo:
+            return
+        ahora = time.monotonic()
+        if self._siguiente > ahora:
+            time.sleep(self._siguiente - ahora)
+        self._siguiente = max(self._siguiente, ahora) + self.intervalo
+
+
+def recorrer_archivos(ruta_base):
+    """
+    Genera (ruta_relativa, DirEntry) de todos los archivos bajo ruta_base.
+    Recorrido iterativo con os.scandir: solo guarda las carpetas pendientes.
+    """
+    pendientes = ['']
+    while pendientes:
+        relativa = pendientes.pop()
+        try:
+            entradas = os.scandir(os.path.join(ruta_base, relativa) if relativa else ruta_base)
+        except (FileNotFoundError, PermissionError):
+            continue
+        with entradas:
+            for entrada in entradas:
+                ruta = f"{relativa}/{entrada.name}" if relativa else entrada.name
+                if entrada.is_dir(follow_symlinks=False):
+                    if not (relativa == '' and entrada.name in CARPETAS_EXCLUIDAS):
+                        pendientes.append(ruta)
+                elif entrada.is_file(follow_symlinks=False):
+                    yield ruta, entrada
+
+
+class RecolectorMultimedia:
+    """Busca archivos huérfanos y registros sin archivo"""
+
+    # ========== ARCHIVOS HUÉRFANOS ==========
+
+    def _referenciados(self, lote):
+        """Subconjunto de rutas del lote con registro (dos consultas IN como máximo)"""
+        hashes = {}
+        nombres = {}
+        for ruta, nombre in lote:
+            coincidencia = _NOMBRE_HASH.match(nombre)
+            if coincidencia:
+                hashes.setdefault(coincidencia.group(1), []).append(ruta)
+            else:
+                nombres.setdefault(nombre, []).append(ruta)
+
+        referenciados = set()
+        if hashes:
+            for (valor,) in db.session.query(Multimedia.hash_sha256).filter(
+                Multimedia.hash_sha256.in_(list(hashes))
+            ).distinct():
+                referenciados.update(hashes[valor])
+        if nombres:
+            for (valor,) in db.session.query(Multimedia.nombre_almacenado).filter(
+                Multimedia.nombre_almacenado.in_(list(nombres))
+            ):
+                referenciados.update(nombres[valor])
+        return referenciados
+
+    def _poner_en_cuarentena(self, ruta_base, relativa, carpeta_cuarentena):
+        destino = os.path.join(ruta_base, carpeta_cuarentena, *relativa.split('/'))
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        shutil.move(os.path.join(ruta_base, *relativa.split('/')), destino)
+
+    def recolectar_huerfanos(self, simular=False, edad_minima=EDAD_MINIMA_POR_DEFECTO,
+                             por_segundo=0, tamano_lote=TAMANO_LOTE):
+        """
+        Mueve a cuarentena los archivos sin registro.
+
+        Args:
+            simular: Solo informar, sin mover nada
+            edad_minima: Ignorar archivos modificados hace menos de esto
+            por_segundo: Máximo de archivos revisados por segundo (0 = sin límite)
+            tamano_lote: Nombres comprobados por consulta
+
+        Returns:
+            dict con revisados, huerfanos, bytes_huerfanos, en_cuarentena,
+            recientes, no_reconocidos y ejemplos (hasta 20 rutas)
+        """
+        resumen = {
+            "revisados": 0, "huerfanos": 0, "bytes_huerfanos": 0, "en_cuarentena": 0,
+            "recientes": 0, "no_reconocidos": 0, "ejemplos": [], "simulacion": simular
+        }
+        if not almacenamiento_multimedia.es_local:
+            resumen["error"] = "El recorrido de archivos solo aplica al almacenamiento local"
+            return resumen
+
+        ruta_base = ConfiguracionMultimedia.obtener_valor('ruta_almacenamiento', 'uploads/multimedia')
+        carpeta_cuarentena = f"{CARPETA_CUARENTENA}/{datetime.utcnow():%Y%m%d-%H%M%S}"
+        limite = time.time() - edad_minima.total_seconds()
+        limitador = LimitadorRitmo(por_segundo)
+
+        def procesar(lote, tamanos):
+            referenciados = self._referenciados(lote)
+            for ruta, _ in lote:
+                if ruta in referenciados:
+                    continue
+                self._registrar_huerfano(resumen, ruta, tamanos[ruta])
+                if not simular:
+                    self._mover_huerfano(resumen, ruta_base, ruta, carpeta_cuarentena)
+            db.session.rollback()  # Cierra la transacción de lectura del lote
+
+        lote, tamanos = [], {}
+        for ruta, entrada in recorrer_archivos(ruta_base):
+            limitador.esperar()
+            resumen["revisados"] += 1
+            try:
+                estado = entrada.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            if estado.st_mtime > limite:
+                resumen["recientes"] += 1
+                continue
+
+            nombre = entrada.name
+            if _NOMBRE_TEMPORAL.search(nombre):
+                # Temporal viejo: la subida o la variante que lo escribía ya no existe
+                self._registrar_huerfano(resumen, ruta, estado.st_size)
+                if not simular:
+                    self._mover_huerfano(resumen, ruta_base, ruta, carpeta_cuarentena)
+                continue
+            if not (_NOMBRE_HASH.match(nombre) or _NOMBRE_UUID.match(nombre)):
+                resumen["no_reconocidos"] += 1
+                continue
+
+            lote.append((ruta, nombre))
+            tamanos[ruta] = estado.st_size
+            if len(lote) >= tamano_lote:
+                procesar(lote, tamanos)
+                lote, tamanos = [], {}
+
+        if lote:
+            procesar(lote, tamanos)
+
+        return resumen
+
+    def _registrar_huerfano(self, resumen, ruta, tamano):
+        resumen["huerfanos"] += 1
+        resumen["bytes_huerfanos"] += tamano
+        if len(resumen["ejemplos"]) < 20:
+            resumen["ejemplos"].append(ruta)
+
+    def _mover_huerfano(self, resumen, ruta_base, ruta, carpeta_cuarentena):
+        try:
+            self._poner_en_cuarentena(ruta_base, ruta, carpeta_cuarentena)
+            resumen["en_cuarentena"] += 1
+        except OSError as e:
+            print(f"⚠️ No se pudo poner en cuarentena {ruta}: {e}")
+
+    # ========== REGISTROS SIN ARCHIVO ==========
+
+    def _archivo_existe(self, multimedia, ruta_base, niveles):
+        clave = multimedia.clave_almacenamiento
+        if not almacenamiento_multimedia.es_local:
+            return bool(clave) and almacenamiento_multimedia.existe(clave)
+        if multimedia.ruta_local and os.path.isfile(multimedia.ruta_local):
+            return True
+        # Durante una migración de distribución puede estar en la otra ruta
+        return bool(clave) and any(
+            os.path.isfile(os.path.join(ruta_base, *candidata.split('/')))
+            for candidata in rutas_candidatas(clave, niveles)
+        )
+
+    def marcar_registros_sin_archivo(self, simular=False, por_segundo=0, tamano_lote=TAMANO_LOTE):
+        """
+        Marca ERROR los registros cuyo archivo no existe.
+
+        Returns:
+            dict con revisados, sin_archivo, marcados e ids (hasta 100)
+        """
+        resumen = {"revisados": 0, "sin_archivo": 0, "marcados": 0, "ids": [], "simulacion": simular}
+        ruta_base = ConfiguracionMultimedia.obtener_valor('ruta_almacenamiento', 'uploads/multimedia')
+        niveles = ConfiguracionMultimedia.obtener_entero('niveles_directorio', NIVELES_POR_DEFECTO)
+        limitador = LimitadorRitmo(por_segundo)
+        ultimo_id = 0
+
+        while True:
+            lote = Multimedia.query.filter(
+                Multimedia.id > ultimo_id
+            ).order_by(Multimedia.id).limit(tamano_lote).all()
+            if not lote:
+                break
+            ultimo_id = lote[-1].id
+
+            for multimedia in lote:
+                limitador.esperar()
+                resumen["revisados"] += 1
+                if self._archivo_existe(multimedia, ruta_base, niveles):
+                    continue
+                resumen["sin_archivo"] += 1
+                if len(resumen["ids"]) < 100:
+                    resumen["ids"].append(multimedia.id)
+                if not simular and multimedia.mensaje_error != MENSAJE_SIN_ARCHIVO:
+                    multimedia.marcar_error(MENSAJE_SIN_ARCHIVO)
+                    resumen["marcados"] += 1
+
+            if simular:
+                db.session.rollback()
+            else:
+                db.session.commit()
+            db.session.expunge_all()
+
+        return resumen
+
+
+# Instancia global del recolector
+recolector_multimedia = RecolectorMultimedia()
@@ -9,5 +9,7 @@ Incluye validadores, responses, logger y helpers
 __all__ = [
     'validators',
     'responses', 
-    'logger'
+    'logger',
+    'paginacion',
+    'json_provider'
 ]
\ No newline at end of file
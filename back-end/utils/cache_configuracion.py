@@ -0,0 +1,157 @@
+"""
+Caché de configuración en memoria para SpeakLexi
+
+Guarda una tabla clave/valor completa en memoria del proceso: se carga
+con una sola consulta y se vuelve a cargar cuando:
+    - vence el TTL (por defecto 5 minutos),
+    - se llama a invalidar() (p. ej. tras establecer_valor en este proceso),
+    - otro worker avisa de un cambio tocando el archivo de versión.
+
+El archivo de versión es el aviso entre workers (gunicorn, varios
+procesos en la misma máquina): notificar_cambio() actualiza su mtime y
+cada proceso lo compara con el que vio en la última carga. Es un stat()
+por lectura, sin consultas a la BD.
+
+Uso:
+    cache = CacheConfiguracion(lambda: {'clave': 'valor', ...})
+    cache.obtener('clave', 'defecto')       # str
+    cache.obtener_entero('clave', 10)       # int
+    cache.establecido()                     # tras escribir en la BD
+"""
+
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+TTL_POR_DEFECTO = 300  # segundos
+
+VALORES_VERDADEROS = {'1', 'true', 'si', 'sí', 'yes', 'on'}
+
+
+class CacheConfiguracion:
+    """
+    Caché de solo lectura de una tabla de configuración.
+
+    Args:
+        cargador: Función sin argumentos que devuelve {clave: valor} con
+                  una sola consulta. Se llama dentro del app context.
+        ttl: Segundos que vale la copia en memoria
+        archivo_version: Archivo compartido entre workers para avisar cambios
+    """
+
+    def __init__(
+        self,
+        cargador: Callable[[], Dict[str, str]],
+        ttl: float = TTL_POR_DEFECTO,
+        archivo_version: Optional[str] = None
+    ):
+        self._cargador = cargador
+        self._lock = threading.Lock()
+        self._valores: Optional[Dict[str, str]] = None
+        self._convertidos: Dict[tuple, Any] = {}
+        self._expira = 0.0
+        self._version_vista: Optional[float] = None
+        self.configurar(ttl, archivo_version)
+
+    def configurar(self, ttl: Optional[float] = None, archivo_version: Optional[str] = None):
+        """Ajusta TTL y archivo de versión (se llama desde create_app)"""
+        if ttl is not None:
+            self.ttl = float(ttl)
+        if archivo_version is not None or not hasattr(self, 'archivo_version'):
+            self.archivo_version = archivo_version or os.path.join(
+                tempfile.gettempdir(), 'speaklexi_configuracion.version'
+            )
+        self.invalidar()
+
+    # ========== CARGA ==========
+
+    def _version_compartida(self) -> Optional[float]:
+        try:
+            return os.stat(self.archivo_version).st_mtime_ns
+        except OSError:
+            return None
+
+    def cargar(self) -> Dict[str, str]:
+        """Carga toda la tabla en una consulta y reinicia el TTL"""
+        with self._lock:
+            version = self._version_compartida()
+            valores = dict(self._cargador())
+            self._valores = valores
+            self._convertidos = {}
+            self._expira = time.monotonic() + self.ttl
+            self._version_vista = version
+            return valores
+
+    def _vigentes(self) -> Dict[str, str]:
+        valores = self._valores
+        if (
+            valores is None
+            or time.monotonic() >= self._expira
+            or self._version_compartida() != self._version_vista
+        ):
+            valores = self.cargar()
+        return valores
+
+    def invalidar(self):
+        """Descarta la copia local; la siguiente lectura recarga"""
+        with self._lock:
+            self._valores = None
+            self._convertidos = {}
+
+    def notificar_cambio(self):
+        """Avisa a los demás workers de que la tabla cambió"""
+        try:
+            with open(self.archivo_version, 'a'):
+                pass
+            os.utime(self.archivo_version, None)
+        except OSError as e:
+            print(f"⚠️ No se pudo avisar el cambio de configuración: {e}")
+
+    def establecido(self):
+        """Invalida la copia local y avisa al resto tras escribir en la BD"""
+        self.invalidar()
+        self.notificar_cambio()
+
+    # ========== LECTURA ==========
+
+    def todos(self) -> Dict[str, str]:
+        """Copia de todos los valores en caché"""
+        return dict(self._vigentes())
+
+    def obtener(self, clave: str, valor_por_defecto: Optional[Any] = None) -> Any:
+        """Valor crudo (str) o el valor por defecto si la clave no existe"""
+        return self._vigentes().get(clave, valor_por_defecto)
+
+    def _convertido(self, clave: str, tipo: str, valor_por_defecto: Any, convertir: Callable[[str], Any]) -> Any:
+        valores = self._vigentes()
+        if clave not in valores:
+            return valor_por_defecto
+        llave = (clave, tipo)
+        try:
+            return self._convertidos[llave]
+        except KeyError:
+            pass
+        try:
+            valor = convertir(valores[clave])
+        except (TypeError, ValueError):
+            valor = valor_por_defecto
+        self._convertidos[llave] = valor
+        return valor
+
+    def obtener_entero(self, clave: str, valor_por_defecto: Optional[int] = None) -> Optional[int]:
+        return self._convertido(clave, 'int', valor_por_defecto, lambda v: int(v.strip()))
+
+    def obtener_booleano(self, clave: str, valor_por_defecto: bool = False) -> bool:
+        return self._convertido(
+            clave, 'bool', valor_por_defecto, lambda v: v.strip().lower() in VALORES_VERDADEROS
+        )
+
+    def obtener_lista(self, clave: str, valor_por_defecto: Optional[List[str]] = None) -> List[str]:
+        """Lista separada por comas (p. ej. 'jpg,png')"""
+        lista = self._convertido(
+            clave, 'lista', valor_por_defecto,
+            lambda v: tuple(p.strip() for p in v.split(',') if p.strip())
+        )
+        return list(lista) if lista is not None else []
@@ -0,0 +1,126 @@
+"""
+GET condicional (ETag / Last-Modified) para SpeakLexi
+
+Cada endpoint declara una función de versión que resuelve, con una
+consulta ligera (COUNT/MAX sobre actualizado_en, sin cargar filas ni
+JSON), qué "versión" de los datos devolvería. Con ella se calcula un
+ETag débil; si coincide con If-None-Match (o If-Modified-Since no es
+anterior) se responde 304 sin ejecutar la vista.
+
+Uso:
+    def version_curso(curso_id):
+        fecha = db.session.query(Curso.actualizado_en).filter_by(id=curso_id).scalar()
+        return VersionRecurso((curso_id, fecha), fecha) if fecha else None
+
+    @curso_bp.route('/<int:curso_id>', methods=['GET'])
+    @respuesta_condicional(version_curso)
+    def obtener_curso(curso_id):
+        ...
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Any, Callable, NamedTuple, Optional, Sequence, Tuple
+
+from flask import make_response, request
+from sqlalchemy import func
+from werkzeug.http import http_date, is_resource_modified, quote_etag
+
+# Los clientes siempre revalidan, pero con 304 no se descarga nada
+CACHE_CONTROL_POR_DEFECTO = 'no-cache'
+
+
+class VersionRecurso(NamedTuple):
+    """Versión de lo que devolvería un endpoint"""
+    partes: Tuple[Any, ...]
+    ultima_modificacion: Optional[datetime] = None
+
+
+def calcular_etag(*partes: Any) -> str:
+    """Hash corto y estable de las partes (sin comillas)"""
+    return hashlib.sha1(repr(partes).encode('utf-8')).hexdigest()[:32]
+
+
+def version_de_consulta(query, columna_fecha, *agregados) -> Tuple[Any, ...]:
+    """
+    Versión agregada de un conjunto de filas: (total, [agregados...], max(fecha))
+    en una consulta. Cambia al crear, borrar o modificar cualquier fila del conjunto.
+
+    Args:
+        query: Consulta con los filtros ya aplicados
+        columna_fecha: Columna de última modificación (p. ej. Leccion.actualizado_en)
+        agregados: Expresiones extra para datos de la respuesta que cambian
+                   sin tocar la fecha (p. ej. func.sum(Multimedia.veces_usado))
+    """
+    return tuple(query.order_by(None).with_entities(
+        func.count(), *agregados, func.max(columna_fecha)
+    ).one())
+
+
+def combinar_versiones(*versiones: Sequence[Any]) -> VersionRecurso:
+    """
+    Junta varias versiones (total, fecha) en una VersionRecurso; la última
+    modificación es la más reciente de todas.
+    """
+    fechas = [v[-1] for v in versiones if v and isinstance(v[-1], datetime)]
+    return VersionRecurso(tuple(versiones), max(fechas) if fechas else None)
+
+
+def _fecha_http(fecha: datetime) -> datetime:
+    # Las fechas se guardan en UTC sin zona (datetime.utcnow)
+    fecha = fecha.replace(microsecond=0)
+    return fecha if fecha.tzinfo else fecha.replace(tzinfo=timezone.utc)
+
+
+def respuesta_condicional(
+    obtener_version: Callable[..., Optional[VersionRecurso]],
+    cache_control: str = CACHE_CONTROL_POR_DEFECTO
+):
+    """
+    Decorador de GET condicional.
+
+    Args:
+        obtener_version: Recibe los argumentos de la ruta y devuelve la
+                         VersionRecurso, o None si no aplica (p. ej. 404);
+                         en ese caso la vista se ejecuta normalmente.
+        cache_control: Valor de Cache-Control para respuestas 200/304
+
+    El ETag incluye la ruta y los query params, así cada combinación de
+    filtros/página tiene el suyo.
+    """
+    def decorador(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return f(*args, **kwargs)
+
+            version = obtener_version(**kwargs)
+            if version is None:
+                return f(*args, **kwargs)
+
+            etag = calcular_etag(
+                request.path,
+                sorted(request.args.items(multi=True)),
+                version.partes
+            )
+            ultima = _fecha_http(version.ultima_modificacion) if version.ultima_modificacion else None
+
+            if not is_resource_modified(
+                request.environ,
+                etag=quote_etag(etag, weak=True),
+                last_modified=ultima
+            ):
+                respuesta = make_response('', 304)
+            else:
+                respuesta = make_response(f(*args, **kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+
+            respuesta.set_etag(etag, weak=True)
+            if ultima:
+                respuesta.headers['Last-Modified'] = http_date(ultima)
+            respuesta.headers['Cache-Control'] = cache_control
+            return respuesta
+        return decorated
+    return decorador
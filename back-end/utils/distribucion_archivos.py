@@ -0,0 +1,85 @@
+"""
+Distribución en disco de los archivos multimedia - SpeakLexi
+
+Con miles de archivos por carpeta los listados, copias de seguridad y
+búsquedas del sistema de archivos se vuelven lentos. Los nombres
+almacenados son hexadecimales (SHA-256 o uuid4.hex), así que se reparten
+en subcarpetas con los primeros caracteres del nombre:
+
+    niveles = 0   imagen/9f86d081...png            (plano, como antes)
+    niveles = 2   imagen/9f/86/9f86d081...png
+
+El número de niveles se configura con 'niveles_directorio'
+(ConfiguracionMultimedia). scripts/migrar_distribucion_multimedia.py mueve
+los archivos existentes; mientras tanto, rutas_candidatas() permite servir
+un archivo tanto en la distribución plana como en la repartida.
+"""
+
+import os
+import re
+from typing import List
+
+PREFIJO_URL = '/uploads/multimedia/'
+NIVELES_POR_DEFECTO = 2
+CARACTERES_POR_NIVEL = 2
+NIVELES_MAXIMOS = 4
+
+_NOMBRE_HEX = re.compile(r'^[0-9a-f]+$')
+
+
+def subdirectorio(nombre: str, niveles: int) -> str:
+    """
+    Subcarpeta ('9f/86') de un nombre almacenado, o '' si no se reparte.
+
+    Solo se reparten nombres hexadecimales generados por el sistema; el
+    resto (nombres antiguos o subidos a mano) se queda en la carpeta del tipo.
+    """
+    niveles = max(0, min(int(niveles or 0), NIVELES_MAXIMOS))
+    base = os.path.splitext(os.path.basename(nombre))[0].split('_', 1)[0]
+    if not niveles or len(base) < niveles * CARACTERES_POR_NIVEL or not _NOMBRE_HEX.match(base):
+        return ''
+    return '/'.join(
+        base[i * CARACTERES_POR_NIVEL:(i + 1) * CARACTERES_POR_NIVEL] for i in range(niveles)
+    )
+
+
+def ruta_plana(relativa: str) -> str:
+    """'imagen/9f/86/x.png' -> 'imagen/x.png'"""
+    partes = relativa.replace(os.sep, '/').split('/')
+    if len(partes) <= 2:
+        return '/'.join(partes)
+    return f"{partes[0]}/{partes[-1]}"
+
+
+def ruta_distribuida(relativa: str, niveles: int) -> str:
+    """'imagen/x.png' (o ya repartida con otros niveles) -> 'imagen/9f/86/x.png'"""
+    partes = ruta_plana(relativa).split('/')
+    if len(partes) != 2:
+        return '/'.join(partes)
+    carpeta, nombre = partes
+    sub = subdirectorio(nombre, niveles)
+    return f"{carpeta}/{sub}/{nombre}" if sub else f"{carpeta}/{nombre}"
+
+
+def rutas_candidatas(relativa: str, niveles: int) -> List[str]:
+    """
+    Rutas relativas donde puede estar un archivo durante la migración:
+    la pedida, la repartida con los niveles actuales y la plana.
+    """
+    candidatas = []
+    for ruta in (relativa, ruta_distribuida(relativa, niveles), ruta_plana(relativa)):
+        if ruta not in candidatas:
+            candidatas.append(ruta)
+    return candidatas
+
+
+def url_de(relativa: str) -> str:
+    """URL pública de una ruta relativa a la carpeta de almacenamiento"""
+    return PREFIJO_URL + relativa.replace(os.sep, '/')
+
+
+def url_distribuida(url: str, niveles: int) -> str:
+    """Reescribe una URL /uploads/multimedia/... a la distribución actual"""
+    if not url or not url.startswith(PREFIJO_URL):
+        return url
+    return url_de(ruta_distribuida(url[len(PREFIJO_URL):], niveles))
@@ -0,0 +1,174 @@
+"""
+Envío eficiente de archivos multimedia para SpeakLexi
+
+- Rangos de bytes (206 Partial Content) para poder adelantar audio/video
+- ETag fuerte a partir de tamaño + mtime (un solo os.stat, sin leer el archivo)
+- Cache-Control largo e inmutable para nombres generados (uuid4.hex o SHA-256),
+  que nunca cambian de contenido
+- Modo opcional en que el servidor web envía los bytes:
+    MULTIMEDIA_MODO_ENVIO = 'python'      (default) Werkzeug lee y envía el archivo
+    MULTIMEDIA_MODO_ENVIO = 'x-accel'     nginx: cabecera X-Accel-Redirect
+    MULTIMEDIA_MODO_ENVIO = 'x-sendfile'  Apache/lighttpd: cabecera X-Sendfile
+
+Ejemplo de nginx para 'x-accel' (prefijo MULTIMEDIA_X_ACCEL_PREFIJO):
+    location /protegido/multimedia/ {
+        internal;
+        alias /ruta/a/back-end/uploads/multimedia/;
+    }
+"""
+
+import mimetypes
+import os
+import re
+import stat
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
+
+from flask import current_app, request
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.security import safe_join
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
+
+MODO_PYTHON = 'python'
+MODO_X_ACCEL = 'x-accel'
+MODO_X_SENDFILE = 'x-sendfile'
+MODOS_ENVIO = (MODO_PYTHON, MODO_X_ACCEL, MODO_X_SENDFILE)
+
+X_ACCEL_PREFIJO_POR_DEFECTO = '/protegido/multimedia/'
+
+CACHE_CONTROL_INMUTABLE = 'public, max-age=31536000, immutable'
+CACHE_CONTROL_POR_DEFECTO = 'public, max-age=3600'
+
+# Nombres generados: uuid4.hex (32) o SHA-256 del contenido (64), sufijo de
+# variante opcional (_miniatura, _w640) y extensión opcional
+_NOMBRE_INMUTABLE = re.compile(r'^(?:[0-9a-f]{32}|[0-9a-f]{64})(?:_[a-z0-9]+)?(\.[A-Za-z0-9]{1,10})?$')
+
+
+class ArchivoNoEncontrado(Exception):
+    """El archivo no existe o la ruta sale del directorio base"""
+
+
+@lru_cache(maxsize=32)
+def _base_absoluta(ruta_base: str) -> str:
+    # La ruta base casi nunca cambia: se resuelve una vez por valor
+    return os.path.realpath(ruta_base)
+
+
+@lru_cache(maxsize=256)
+def _tipo_mime(nombre: str) -> str:
+    return mimetypes.guess_type(nombre)[0] or 'application/octet-stream'
+
+
+def etag_archivo(tamano: int, mtime_ns: int) -> str:
+    """ETag fuerte (sin comillas): cambia si cambia el tamaño o el mtime"""
+    return f'{tamano:x}-{mtime_ns:x}'
+
+
+def cache_control_para(nombre: str) -> str:
+    """Inmutable para nombres generados por el sistema, corto para el resto"""
+    if _NOMBRE_INMUTABLE.match(os.path.basename(nombre)):
+        return CACHE_CONTROL_INMUTABLE
+    return CACHE_CONTROL_POR_DEFECTO
+
+
+def resolver_ruta(ruta_base: str, nombre: str) -> str:
+    """
+    Ruta absoluta del archivo dentro de ruta_base.
+
+    safe_join rechaza '..', rutas absolutas y separadores raros sin tocar
+    el disco; no hace falta Path.resolve() por petición. Los nombres
+    ocultos (.subidas/, temporales .subida-*) nunca se sirven.
+
+    Raises:
+        ArchivoNoEncontrado: Si la ruta no es válida
+    """
+    ruta = safe_join(_base_absoluta(ruta_base), nombre)
+    if ruta is None or any(parte.startswith('.') for parte in nombre.split('/')):
+        raise ArchivoNoEncontrado(nombre)
+    return ruta
+
+
+def enviar_archivo(ruta_base: str, nombre: str, modo: Optional[str] = None,
+                   cache_control: Optional[str] = None):
+    """
+    Respuesta para GET/HEAD de un archivo con soporte de Range y GET condicional.
+
+    Args:
+        ruta_base: Directorio raíz de los archivos
+        nombre: Ruta relativa dentro de ruta_base (p. ej. 'audio/abc.mp3')
+        modo: Modo de envío; por defecto MULTIMEDIA_MODO_ENVIO
+        cache_control: Cache-Control; por defecto según el nombre (cache_control_para)
+
+    Raises:
+        ArchivoNoEncontrado: Si la ruta no es válida o no es un archivo
+    """
+    config = current_app.config
+    return construir_respuesta(
+        request.environ,
+        ruta_base,
+        nombre,
+        modo=modo or config.get('MULTIMEDIA_MODO_ENVIO', MODO_PYTHON),
+        prefijo_x_accel=config.get('MULTIMEDIA_X_ACCEL_PREFIJO', X_ACCEL_PREFIJO_POR_DEFECTO),
+        clase_respuesta=current_app.response_class,
+        cache_control=cache_control
+    )
+
+
+def construir_respuesta(
+    environ: dict,
+    ruta_base: str,
+    nombre: str,
+    modo: str = MODO_PYTHON,
+    prefijo_x_accel: str = X_ACCEL_PREFIJO_POR_DEFECTO,
+    clase_respuesta=Response,
+    cache_control: Optional[str] = None
+):
+    """
+    Lo mismo que enviar_archivo pero sin Flask (solo el environ WSGI), para
+    usarlo fuera de una petición de la app (utils/urls_firmadas.py).
+
+    Raises:
+        ArchivoNoEncontrado: Si la ruta no es válida o no es un archivo
+    """
+    ruta = resolver_ruta(ruta_base, nombre)
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        raise ArchivoNoEncontrado(nombre)
+    if not stat.S_ISREG(estado.st_mode):
+        raise ArchivoNoEncontrado(nombre)
+
+    if modo == MODO_X_ACCEL:
+        # nginx resuelve Range / If-* y envía los bytes
+        respuesta = clase_respuesta(mimetype=_tipo_mime(nombre))
+        respuesta.headers['X-Accel-Redirect'] = prefijo_x_accel.rstrip('/') + '/' + nombre.replace(os.sep, '/')
+    elif modo == MODO_X_SENDFILE:
+        respuesta = clase_respuesta(mimetype=_tipo_mime(nombre))
+        respuesta.headers['X-Sendfile'] = ruta
+    else:
+        archivo = open(ruta, 'rb')
+        respuesta = clase_respuesta(
+            wrap_file(environ, archivo),
+            mimetype=_tipo_mime(nombre),
+            direct_passthrough=True
+        )
+        respuesta.content_length = estado.st_size
+        # Anunciar siempre el soporte de rangos para que los reproductores permitan adelantar
+        respuesta.accept_ranges = 'bytes'
+
+    respuesta.set_etag(etag_archivo(estado.st_size, estado.st_mtime_ns))
+    respuesta.last_modified = datetime.fromtimestamp(int(estado.st_mtime), timezone.utc)
+    respuesta.headers['Cache-Control'] = cache_control or cache_control_para(nombre)
+
+    if modo == MODO_PYTHON:
+        # 304 / 206 / 416 según If-None-Match, If-Modified-Since, Range e If-Range
+        try:
+            respuesta = respuesta.make_conditional(
+                environ, accept_ranges=True, complete_length=estado.st_size
+            )
+        except RequestedRangeNotSatisfiable as e:
+            respuesta.close()
+            return e.get_response(environ)  # 416 con Content-Range: bytes */tamaño
+    return respuesta
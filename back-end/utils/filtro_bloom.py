@@ -0,0 +1,55 @@
+"""
+Filtro de Bloom - SpeakLexi
+
+Conjunto aproximado en un bytearray: `x in filtro` es False seguro si x
+nunca se añadió, y True con una probabilidad de falso positivo acotada.
+Con 100.000 elementos y un 1 % de error ocupa unos 117 KB, y cada
+consulta es un blake2b y 7 lecturas de bits.
+
+No admite borrar: se reconstruye entero (services/lista_revocacion.py).
+"""
+
+import math
+from hashlib import blake2b
+from typing import Iterable
+
+
+class FiltroBloom:
+    """Filtro de Bloom de tamaño fijo para cadenas"""
+
+    def __init__(self, capacidad: int, error: float = 0.01):
+        capacidad = max(1, int(capacidad))
+        self.capacidad = capacidad
+        self.error = error
+        self.bits = max(8, math.ceil(-capacidad * math.log(error) / (math.log(2) ** 2)))
+        self.funciones = max(1, round(self.bits / capacidad * math.log(2)))
+        self._tabla = bytearray((self.bits + 7) // 8)
+        self.elementos = 0
+
+    def _posiciones(self, valor: str) -> Iterable[int]:
+        # Doble hashing (Kirsch-Mitzenmacher): h1 + i*h2 con un solo digest
+        digest = blake2b(valor.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.funciones))
+
+    def agregar(self, valor: str) -> None:
+        for posicion in self._posiciones(valor):
+            self._tabla[posicion >> 3] |= 1 << (posicion & 7)
+        self.elementos += 1
+
+    def __contains__(self, valor: str) -> bool:
+        tabla = self._tabla
+        return all(tabla[posicion >> 3] & (1 << (posicion & 7)) for posicion in self._posiciones(valor))
+
+    def __len__(self) -> int:
+        return self.elementos
+
+    @property
+    def lleno(self) -> bool:
+        """True si ya tiene más elementos de los previstos (el error sube)"""
+        return self.elementos > self.capacidad
+
+    @property
+    def tamano_bytes(self) -> int:
+        return len(self._tabla)
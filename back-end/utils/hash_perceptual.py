@@ -0,0 +1,80 @@
+"""
+Hash perceptual (dHash) de imágenes - SpeakLexi
+
+Dos imágenes que se ven igual (redimensionadas, recomprimidas, con otro
+formato) dan hashes de 64 bits a poca distancia de Hamming, aunque sus
+bytes (y su SHA-256) no se parezcan en nada.
+
+dHash: la imagen en gris se reduce a 9x8 y cada bit dice si un píxel es
+más claro que su vecino de la derecha. Es barato, resiste bien el
+reescalado y la compresión, y con JPEG draft() decodifica ya reducido.
+
+Funciones puras para los procesos del pool (utils/tareas_multimedia.py).
+Requiere Pillow y NumPy (requirements.txt); sin NumPy se calcula en Python
+puro con el mismo resultado.
+"""
+
+from typing import Optional
+
+from utils.variantes_imagen import Image, ImageOps, PILLOW_DISPONIBLE
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+TAMANO_HASH = 8  # 8x8 = 64 bits
+BITS_HASH = TAMANO_HASH * TAMANO_HASH
+HASH_PERCEPTUAL_DISPONIBLE = PILLOW_DISPONIBLE
+
+
+def _bits_numpy(pixeles, ancho: int) -> int:
+    matriz = np.frombuffer(pixeles, dtype=np.uint8).reshape(-1, ancho)
+    bits = (matriz[:, 1:] > matriz[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def _bits_python(pixeles, ancho: int) -> int:
+    valor = 0
+    for fila in range(0, len(pixeles), ancho):
+        for x in range(ancho - 1):
+            valor = (valor << 1) | (pixeles[fila + x + 1] > pixeles[fila + x])
+    return valor
+
+
+def calcular_dhash(ruta: str, tamano: int = TAMANO_HASH) -> Optional[str]:
+    """
+    dHash de una imagen como 16 caracteres hex (64 bits), o None si no se
+    puede leer como imagen.
+
+    Raises:
+        RuntimeError: Si Pillow no está instalado
+    """
+    if not PILLOW_DISPONIBLE:
+        raise RuntimeError("Pillow no está instalado")
+
+    try:
+        with Image.open(ruta) as imagen:
+            # JPEG: decodifica directamente a 1/2, 1/4 o 1/8 del tamaño
+            imagen.draft('L', (tamano * 8, tamano * 8))
+            imagen = ImageOps.exif_transpose(imagen).convert('L')
+            reducida = imagen.resize((tamano + 1, tamano), Image.BILINEAR, reducing_gap=2.0)
+            pixeles = reducida.tobytes()
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+    bits = _bits_numpy(pixeles, tamano + 1) if np is not None else _bits_python(pixeles, tamano + 1)
+    return f"{bits:0{tamano * tamano // 4}x}"
+
+
+def _contar_bits_bin(valor: int) -> int:
+    return bin(valor).count('1')
+
+
+# int.bit_count existe desde Python 3.10 y es varias veces más rápido
+_contar_bits = getattr(int, 'bit_count', _contar_bits_bin)
+
+
+def distancia_hamming(a: int, b: int) -> int:
+    """Bits distintos entre dos hashes enteros"""
+    return _contar_bits(a ^ b)
@@ -0,0 +1,109 @@
+"""
+Proveedor JSON de la aplicación SpeakLexi
+Usa orjson si está instalado y la librería estándar como respaldo
+
+Se instala en create_app() (app.json = ProveedorJSON(app)), así que
+jsonify(), los dict que devuelven las rutas y los manejadores de error,
+utils/responses.py y request.get_json() pasan todos por aquí.
+
+Tipos soportados en ambos modos, con la misma salida:
+    - datetime / date / time -> ISO 8601 (no el formato HTTP de Flask)
+    - Decimal -> float
+    - Enum -> .value
+    - UUID -> str
+"""
+
+import dataclasses
+import decimal
+import enum
+import json
+import uuid
+from datetime import date, datetime, time
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+
+def convertir_valor(obj: Any) -> Any:
+    """
+    Convierte los tipos que el codificador no sabe serializar.
+    orjson ya trata datetime, Enum, UUID y dataclasses de forma nativa;
+    aquí llegan Decimal y, en modo estándar, el resto.
+    """
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Objeto de tipo {type(obj).__name__} no es serializable a JSON")
+
+
+class ProveedorJSON(DefaultJSONProvider):
+    """
+    Proveedor JSON con orjson opcional.
+
+    Configuración:
+        JSON_USAR_ORJSON (bool): Usar orjson si está instalado (default: True)
+    """
+
+    default = staticmethod(convertir_valor)
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.usar_orjson = orjson is not None and app.config.get('JSON_USAR_ORJSON', True)
+
+    @property
+    def motor(self) -> str:
+        """Nombre del codificador activo (para health checks y logs)"""
+        return 'orjson' if self.usar_orjson else 'json'
+
+    def _opciones_orjson(self, indentar: bool = False) -> int:
+        opciones = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            opciones |= orjson.OPT_SORT_KEYS
+        if indentar:
+            opciones |= orjson.OPT_INDENT_2
+        return opciones
+
+    def _dumps_bytes(self, obj: Any, indentar: bool = False) -> bytes:
+        return orjson.dumps(obj, default=convertir_valor, option=self._opciones_orjson(indentar))
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # Con argumentos propios de json.dumps (cls, indent, ...) se usa la
+        # librería estándar para respetarlos tal cual.
+        if self.usar_orjson and not kwargs:
+            return self._dumps_bytes(obj).decode('utf-8')
+        kwargs.setdefault('default', convertir_valor)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        # orjson.JSONDecodeError hereda de ValueError: Flask responde 400 igual
+        if self.usar_orjson and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        """Como DefaultJSONProvider.response pero sin pasar por str con orjson."""
+        if not self.usar_orjson:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = self.compact is False or (self.compact is None and self._app.debug)
+        cuerpo = self._dumps_bytes(obj, indentar) + b'\n'
+        return self._app.response_class(cuerpo, mimetype=self.mimetype)
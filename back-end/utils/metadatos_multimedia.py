@@ -0,0 +1,344 @@
+"""
+Extracción de metadatos de archivos multimedia leyendo solo cabeceras - SpeakLexi
+
+Python puro, sin decodificar el contenido: cada formato lee unos pocos KB
+(cabecera, primer frame de audio, cajas moov/mvhd/tkhd de MP4 o la última
+página Ogg) usando seek. Formatos:
+
+    Imagen: PNG, JPEG, GIF, WebP          -> dimensiones
+    Audio:  WAV, MP3 (CBR / Xing / VBRI), Ogg (Vorbis / Opus) -> duración, bitrate
+    Video:  MP4 / MOV / M4A               -> dimensiones, duración, bitrate
+
+Uso:
+    extraer_metadatos('/ruta/video.mp4')
+    # {'formato': 'mp4', 'dimensiones': {'ancho': 1280, 'alto': 720},
+    #  'duracion': 93.4, 'bitrate': 1450}
+
+Las claves que no se pueden determinar no aparecen; un archivo no
+reconocido o dañado devuelve {} en vez de lanzar una excepción.
+"""
+
+import os
+import struct
+from typing import Any, BinaryIO, Dict, Optional
+
+TAMANO_CABECERA = 64 * 1024        # Lo máximo que se lee del inicio del archivo
+TAMANO_COLA_OGG = 64 * 1024        # Se busca la última página Ogg en este final
+TAMANO_MAXIMO_MOOV = 8 * 1024 * 1024
+
+
+# ========== IMÁGENES ==========
+
+def _png(cabecera: bytes, f: BinaryIO, tamano: int) -> Dict[str, Any]:
+    if len(cabecera) < 24 or cabecera[12:16] != b'IHDR':
+        return {}
+    ancho, alto = struct.unpack('>II', cabecera[16:24])
+    return {'formato': 'png', 'dimensiones': {'ancho': ancho, 'alto': alto}}
+
+
+def _gif(cabecera: bytes, f: BinaryIO, tamano: int) -> Dict[str, Any]:
+    if len(cabecera) < 10:
+        return {}
+    ancho, alto = struct.unpack('<HH', cabecera[6:10])
+    return {'formato': 'gif', 'dimensiones': {'ancho': ancho, 'alto': alto}}
+
+
+# Marcadores SOF (inicio de frame) que llevan las dimensiones
+_SOF_JPEG = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg(cabecera: bytes, f: BinaryIO, tamano: int) -> Dict[str, Any]:
+    # Recorre los segmentos saltando su contenido hasta el primer SOF
+    posicion = 2
+    while True:
+        f.seek(posicion)
+        marcador = f.read(4)
+        if len(marcador) < 4 or marcador[0] != 0xFF:
+            return {}
+        tipo = marcador[1]
+        if tipo == 0xFF:  # relleno
+            posicion += 1
+            continue
+        if tipo in (0xD8, 0x01) or 0xD0 <= tipo <= 0xD7:  # sin longitud
+            posicion += 2
+            continue
+        longitud = struct.unpack('>H', marcador[2:4])[0]
+        if tipo in _SOF_JPEG:
+            datos = f.read(5)
+            if len(datos) < 5:
+                return {}
+            alto, ancho = struct.unpack('>HH', datos[1:5])
+            return {'formato': 'jpeg', 'dimensiones': {'ancho': ancho, 'alto': alto}}
+        if tipo == 0xDA:  # inicio de los datos comprimidos: ya no hay SOF
+            return {}
+        posicion += 2 + longitud
+
+
+def _webp(cabecera: bytes, f: BinaryIO, tamano: int) -> Dict[str, Any]:
+    if len(cabecera) < 30:
+        return {}
+    fragmento = cabecera[12:16]
+    if fragmento == b'VP8 ':
+        # Frame clave: código de inicio 9d 01 2a y luego ancho/alto de 14 bits
+        if cabecera[23:26] != b'\x9d\x01\x2a':
+            return {}
+        ancho, alto = struct.unpack('<HH', cabecera[26:30])
+        ancho, alto = ancho & 0x3FFF, alto & 0x3FFF
+    elif fragmento == b'VP8L':
+        bits = int.from_bytes(cabecera[21:25], 'little')
+        ancho, alto = (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    elif fragmento == b'VP8X':
+        ancho = int.from_bytes(cabecera[24:27], 'little') + 1
+        alto = int.from_bytes(cabecera[27:30], 'little') + 1
+    else:
+        return {}
+    return {'formato': 'webp', 'dimensiones': {'ancho': ancho, 'alto': alto}}
+
+
+# ========== AUDIO ==========
+
+def _con_bitrate(datos: Dict[str, Any], tamano: int) -> Dict[str, Any]:
+    """Completa el bitrate medio (kbps) a partir del tamaño y la duración"""
+    duracion = datos.get('duracion')
+    if duracion and 'bitrate' not in datos:
+        datos['bitrate'] = int(round(tamano * 8 / duracion / 1000))
+    return datos
+
+
+def _wav(cabecera: bytes, f: BinaryIO, tamano: int) -> Dict[str, Any]:
+    # Recorre los fragmentos RIFF: fmt (bytes por segundo) y data (tamaño)
+    posicion = 12
+    bytes_por_segundo = None
+    while posicion + 8 <= tamano:
+        f.seek(posicion)
+        encabezado = f.read(8)
+        if len(encabezado) < 8:
+            break
+        identificador, longitud = encabezado[:4], struct.unpack('<I', encabezado[4:])[0]
+        if identificador == b'fmt ':
+            fmt = f.read(16)
+            if len(fmt) < 16:
+                return {}
+            bytes_por_segundo = struct.unpack('<I', fmt[8:12])[0]
+        elif identificador == b'data':
+            if not bytes_por_segundo:
+                return {}
+            longitud = min(longitud, tamano - posicion - 8)
+            return {
+                'formato': 'wav',
+                'duracion': round(longitud / bytes_por_segundo, 3),
+                'bitrate': int(round(bytes_por_segundo * 8 / 1000))
+            }
+        posicion += 8 + longitud + (longitud & 1)  # los fragmentos van alineados a 2 bytes
+    return {}
+
+
+_MP3_BITRATES = {
+    # (versión MPEG 1, capa III) y (MPEG 2/2.5, capa III), en kbps
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],
+}
+_MP3_FRECUENCIAS = {
+    3: [44100, 48000, 32000],   # MPEG 1
+    2: [22050, 24000, 16000],   # MPEG 2
+    0: [11025, 12000, 8000],    # MPEG 2.5
+}
+
+
+def _mp3(cabecera: bytes, f: BinaryIO, tamano: int) -> Dict[str, Any]:
+    inicio = 0
+    if cabecera[:3] == b'ID3' and len(cabecera) >= 10:
+        # Tamaño ID3v2 "syncsafe": 4 bytes de 7 bits
+        s = cabecera[6:10]
+        inicio = 10 + ((s[0] << 21) | (s[1] << 14) | (s[2] << 7) | s[3])
+        f.seek(inicio)
+        cabecera = f.read(TAMANO_CABECERA)
+        if not cabecera:
+            return {}
+
+    # Primer frame válido (sincronía de 11 bits, capa III)
+    for i in range(len(cabecera) - 4):
+        if cabecera[i] != 0xFF or (cabecera[i + 1] & 0xE0) != 0xE0:
+            continue
+        b1, b2, b3 = cabecera[i + 1], cabecera[i + 2], cabecera[i + 3]
+        version = (b1 >> 3) & 0x03
+        capa = (b1 >> 1) & 0x03
+        indice_bitrate = (b2 >> 4) & 0x0F
+        indice_frecuencia = (b2 >> 2) & 0x03
+        if version == 1 or capa != 1 or indice_bitrate in (0, 15) or indice_frecuencia == 3:
+            continue
+
+        bitrate = _MP3_BITRATES[1 if version == 3 else 2][indice_bitrate]
+        frecuencia = _MP3_FRECUENCIAS[version][indice_frecuencia]
+        muestras_por_frame = 1152 if version == 3 else 576
+        mono = (b3 >> 6) == 3
+
+        # Cabecera Xing/Info (VBR): número total de frames
+        if version == 3:
+            desplazamiento_xing = 4 + (17 if mono else 32)
+        else:
+            desplazamiento_xing = 4 + (9 if mono else 17)
+        frame = cabecera[i:i + 200]
+        frames = None
+        etiqueta = frame[desplazamiento_xing:desplazamiento_xing + 4]
+        if etiqueta in (b'Xing', b'Info') and len(frame) >= desplazamiento_xing + 12:
+            banderas = struct.unpack('>I', frame[desplazamiento_xing + 4:desplazamiento_xing + 8])[0]
+            if banderas & 0x01:
+                frames = struct.unpack('>I', frame[desplazamiento_xing + 8:desplazamiento_xing + 12])[0]
+        elif frame[36:40] == b'VBRI' and len(frame) >= 54:
+            frames = struct.unpack('>I', frame[50:54])[0]
+
+        bytes_audio = tamano - inicio - i
+        if frames:
+            duracion = frames * muestras_por_frame / frecuencia
+            datos = {'formato': 'mp3', 'duracion': round(duracion, 3)}
+            return _con_bitrate(datos, bytes_audio)
+
+        # CBR: duración estimada por tamaño
+        return {
+            'formato': 'mp3',
+            'duracion': round(bytes_audio * 8 / (bitrate * 1000), 3),
+            'bitrate': bitrate
+        }
+    return {}
+
+
+def _ogg(cabecera: bytes, f: BinaryIO, tamano: int) -> Dict[str, Any]:
+    # Primera página: cabecera de identificación del códec
+    segmentos = cabecera[26] if len(cabecera) > 26 else 0
+    paquete = cabecera[27 + segmentos:27 + segmentos + 64]
+    if paquete[:7] == b'\x01vorbis' and len(paquete) >= 16:
+        frecuencia = struct.unpack('<I', paquete[12:16])[0]
+        formato, omitir = 'ogg', 0
+    elif paquete[:8] == b'OpusHead' and len(paquete) >= 12:
+        # Opus siempre cuenta las muestras a 48 kHz; pre-skip al inicio
+        frecuencia = 48000
+        formato, omitir = 'opus', struct.unpack('<H', paquete[10:12])[0]
+    else:
+        return {}
+    if not frecuencia:
+        return {}
+
+    # Última página: su granule position es el total de muestras
+    f.seek(max(0, tamano - TAMANO_COLA_OGG))
+    cola = f.read(TAMANO_COLA_OGG)
+    posicion = cola.rfind(b'OggS')
+    if posicion < 0 or posicion + 14 > len(cola):
+        return {'formato': formato}
+    muestras = struct.unpack('<q', cola[posicion + 6:posicion + 14])[0]
+    if muestras <= 0:
+        return {'formato': formato}
+    datos = {'formato': formato, 'duracion': round((muestras - omitir) / frecuencia, 3)}
+    return _con_bitrate(datos, tamano)
+
+
+# ========== VIDEO (ISO BMFF: MP4 / MOV / M4A) ==========
+
+def _cajas(datos: bytes, inicio: int = 0, fin: Optional[int] = None):
+    """Itera (tipo, inicio_contenido, fin) de las cajas contenidas en `datos`"""
+    fin = len(datos) if fin is None else fin
+    posicion = inicio
+    while posicion + 8 <= fin:
+        longitud, tipo = struct.unpack('>I4s', datos[posicion:posicion + 8])
+        cabecera = 8
+        if longitud == 1 and posicion + 16 <= fin:
+            longitud = struct.unpack('>Q', datos[posicion + 8:posicion + 16])[0]
+            cabecera = 16
+        elif longitud == 0:
+            longitud = fin - posicion
+        if longitud < cabecera:
+            return
+        yield tipo, posicion + cabecera, min(posicion + longitud, fin)
+        posicion += longitud
+
+
+def _buscar_moov(f: BinaryIO, tamano: int) -> Optional[bytes]:
+    """Lee solo la caja moov saltando mdat (que puede estar antes o después)"""
+    posicion = 0
+    while posicion + 8 <= tamano:
+        f.seek(posicion)
+        encabezado = f.read(16)
+        if len(encabezado) < 8:
+            return None
+        longitud, tipo = struct.unpack('>I4s', encabezado[:8])
+        cabecera = 8
+        if longitud == 1 and len(encabezado) >= 16:
+            longitud = struct.unpack('>Q', encabezado[8:16])[0]
+            cabecera = 16
+        elif longitud == 0:
+            longitud = tamano - posicion
+        if longitud < cabecera:
+            return None
+        if tipo == b'moov':
+            if longitud > TAMANO_MAXIMO_MOOV:
+                return None
+            f.seek(posicion + cabecera)
+            return f.read(longitud - cabecera)
+        posicion += longitud
+    return None
+
+
+def _mp4(cabecera: bytes, f: BinaryIO, tamano: int) -> Dict[str, Any]:
+    moov = _buscar_moov(f, tamano)
+    if moov is None:
+        return {}
+
+    datos: Dict[str, Any] = {'formato': 'mp4'}
+    for tipo, inicio, fin in _cajas(moov):
+        if tipo == b'mvhd':
+            version = moov[inicio]
+            if version == 1:
+                escala, duracion = struct.unpack('>IQ', moov[inicio + 20:inicio + 32])
+            else:
+                escala, duracion = struct.unpack('>II', moov[inicio + 12:inicio + 20])
+            if escala:
+                datos['duracion'] = round(duracion / escala, 3)
+        elif tipo == b'trak' and 'dimensiones' not in datos:
+            for subtipo, sub_inicio, sub_fin in _cajas(moov, inicio, fin):
+                if subtipo != b'tkhd':
+                    continue
+                # Ancho y alto: últimos 8 bytes, punto fijo 16.16
+                ancho, alto = struct.unpack('>II', moov[sub_fin - 8:sub_fin])
+                ancho, alto = ancho >> 16, alto >> 16
+                if ancho and alto:  # las pistas de audio tienen 0x0
+                    datos['dimensiones'] = {'ancho': ancho, 'alto': alto}
+    return _con_bitrate(datos, tamano)
+
+
+# ========== DETECCIÓN ==========
+
+def _detectar(cabecera: bytes):
+    if cabecera.startswith(b'\x89PNG\r\n\x1a\n'):
+        return _png
+    if cabecera.startswith(b'\xff\xd8'):
+        return _jpeg
+    if cabecera[:6] in (b'GIF87a', b'GIF89a'):
+        return _gif
+    if cabecera[:4] == b'RIFF' and cabecera[8:12] == b'WEBP':
+        return _webp
+    if cabecera[:4] == b'RIFF' and cabecera[8:12] == b'WAVE':
+        return _wav
+    if cabecera[:4] == b'OggS':
+        return _ogg
+    if cabecera[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide', b'skip'):
+        return _mp4
+    if cabecera[:3] == b'ID3' or (len(cabecera) > 1 and cabecera[0] == 0xFF and (cabecera[1] & 0xE0) == 0xE0):
+        return _mp3
+    return None
+
+
+def extraer_metadatos(ruta: str) -> Dict[str, Any]:
+    """
+    Metadatos básicos del archivo (formato, dimensiones, duración, bitrate).
+    Devuelve {} si el formato no se reconoce o el archivo está dañado.
+    """
+    try:
+        tamano = os.path.getsize(ruta)
+        with open(ruta, 'rb') as f:
+            cabecera = f.read(TAMANO_CABECERA)
+            extractor = _detectar(cabecera)
+            if extractor is None:
+                return {}
+            return extractor(cabecera, f, tamano)
+    except (OSError, struct.error, IndexError, KeyError, ValueError, ZeroDivisionError):
+        return {}
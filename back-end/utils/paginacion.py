@@ -0,0 +1,240 @@
+"""
+Paginación por cursor (keyset) para SpeakLexi
+Evita el COUNT(*) + OFFSET de paginate() en listados grandes
+"""
+
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import DateTime, and_, false, or_
+
+
+POR_PAGINA_MAXIMA = 100
+
+
+class CursorInvalido(ValueError):
+    """Se lanza cuando el cursor recibido no se puede decodificar"""
+    pass
+
+
+class PaginacionInvalida(ValueError):
+    """Se lanza cuando pagina o por_pagina no son enteros positivos"""
+    pass
+
+
+def validar_paginacion(pagina: Any, por_pagina: Any, maximo: int = POR_PAGINA_MAXIMA) -> Tuple[int, int]:
+    """
+    Valida pagina y por_pagina recibidos del cliente
+
+    Args:
+        pagina: Número de página (>= 1)
+        por_pagina: Elementos por página (>= 1); por encima de maximo se acota
+        maximo: Máximo de elementos por página
+
+    Returns:
+        Tupla (pagina, por_pagina) como enteros
+
+    Raises:
+        PaginacionInvalida: Si alguno no es un entero mayor que cero
+    """
+    try:
+        pagina, por_pagina = int(pagina), int(por_pagina)
+    except (TypeError, ValueError):
+        raise PaginacionInvalida("pagina y por_pagina deben ser números enteros")
+    if pagina < 1:
+        raise PaginacionInvalida("pagina debe ser mayor que 0")
+    if por_pagina < 1:
+        raise PaginacionInvalida("por_pagina debe ser mayor que 0")
+    return pagina, min(por_pagina, maximo)
+
+
+def codificar_cursor(valores: Sequence[Any]) -> str:
+    """
+    Codifica los valores de la última fila en un cursor opaco (base64 url-safe)
+
+    Args:
+        valores: Valores de las columnas de orden de la última fila
+
+    Returns:
+        Cursor listo para enviarse como ?cursor=
+    """
+    normalizados = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    crudo = json.dumps(normalizados, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(crudo).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor: str, columnas: Sequence[Tuple[Any, bool]]) -> List[Any]:
+    """
+    Decodifica un cursor usando los tipos de las columnas de orden
+
+    Args:
+        cursor: Cursor recibido del cliente
+        columnas: Lista de (columna, descendente) usada para ordenar
+
+    Returns:
+        Lista de valores, uno por columna
+
+    Raises:
+        CursorInvalido: Si el cursor está corrupto o no coincide con las columnas
+    """
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError) as e:
+        raise CursorInvalido(f"Cursor inválido: {str(e)}")
+
+    if not isinstance(valores, list) or len(valores) != len(columnas):
+        raise CursorInvalido("Cursor inválido: no coincide con el orden del listado")
+
+    resultado = []
+    for valor, (columna, _) in zip(valores, columnas):
+        if valor is not None and isinstance(columna.type, DateTime):
+            try:
+                valor = datetime.fromisoformat(valor)
+            except (TypeError, ValueError):
+                raise CursorInvalido("Cursor inválido: fecha mal formada")
+        resultado.append(valor)
+    return resultado
+
+
+def _igual(columna, valor):
+    return columna.is_(None) if valor is None else columna == valor
+
+
+def _despues_de(columna, valor, descendente: bool):
+    """
+    Condición "viene después de valor" para una columna.
+    Los NULL se tratan como el valor más pequeño (semántica de MySQL/SQLite).
+    """
+    if descendente:
+        if valor is None:
+            return false()
+        return or_(columna < valor, columna.is_(None))
+    if valor is None:
+        return columna.isnot(None)
+    return columna > valor
+
+
+def filtro_keyset(columnas: Sequence[Tuple[Any, bool]], valores: Sequence[Any]):
+    """
+    Construye la condición WHERE para continuar después de una fila
+
+    (a, b, c) > (va, vb, vc) se expande como:
+        a > va OR (a = va AND b > vb) OR (a = va AND b = vb AND c > vc)
+    respetando la dirección de cada columna.
+    """
+    alternativas = []
+    for i, (columna, descendente) in enumerate(columnas):
+        iguales = [_igual(col, val) for (col, _), val in zip(columnas[:i], valores[:i])]
+        alternativas.append(and_(*iguales, _despues_de(columna, valores[i], descendente)))
+    return or_(*alternativas)
+
+
+def paginar_por_cursor(
+    query,
+    columnas: Sequence[Tuple[Any, bool]],
+    cursor: Optional[str],
+    por_pagina: int
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Pagina una consulta por keyset en lugar de OFFSET
+
+    Args:
+        query: Consulta SQLAlchemy con los filtros ya aplicados (sin order_by)
+        columnas: Lista de (columna, descendente); la última debe ser única (id)
+        cursor: Cursor de la página anterior o None/'' para la primera página
+        por_pagina: Elementos por página
+
+    Returns:
+        Tupla (items, siguiente_cursor). siguiente_cursor es None en la última página
+
+    Raises:
+        CursorInvalido: Si el cursor no es válido
+        PaginacionInvalida: Si por_pagina es menor que 1
+
+    Ejemplo:
+        items, siguiente = paginar_por_cursor(
+            Multimedia.query,
+            [(Multimedia.creado_en, True), (Multimedia.id, True)],
+            request.args.get('cursor'),
+            20
+        )
+    """
+    if por_pagina < 1:
+        raise PaginacionInvalida("por_pagina debe ser mayor que 0")
+
+    if cursor:
+        valores = decodificar_cursor(cursor, columnas)
+        query = query.filter(filtro_keyset(columnas, valores))
+
+    orden = [columna.desc() if descendente else columna.asc() for columna, descendente in columnas]
+
+    # Pedimos una fila extra para saber si hay página siguiente sin contar
+    filas = query.order_by(*orden).limit(por_pagina + 1).all()
+    items = filas[:por_pagina]
+
+    siguiente_cursor = None
+    if len(filas) > por_pagina:
+        ultimo = items[-1]
+        siguiente_cursor = codificar_cursor([getattr(ultimo, columna.key) for columna, _ in columnas])
+
+    return items, siguiente_cursor
+
+
+class ContadorEstimado:
+    """
+    Cache en memoria de totales (COUNT(*)) con tiempo de vida
+
+    En modo cursor el total es opcional; cuando se pide se sirve
+    desde aquí para no contar la tabla en cada página.
+    """
+
+    def __init__(self, ttl_segundos: int = 60, max_entradas: int = 512):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._valores: Dict[Hashable, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: Hashable, contar: Callable[[], int]) -> int:
+        """
+        Devuelve el total cacheado para la clave o lo calcula con contar()
+
+        Args:
+            clave: Identificador del listado (modelo + filtros)
+            contar: Función que ejecuta el COUNT real
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._valores.get(clave)
+            if entrada and entrada[0] > ahora:
+                return entrada[1]
+
+        total = contar()
+
+        with self._lock:
+            if len(self._valores) >= self.max_entradas:
+                self._valores.clear()
+            self._valores[clave] = (ahora + self.ttl_segundos, total)
+        return total
+
+    def invalidar(self, prefijo: Optional[str] = None) -> None:
+        """Elimina los totales cacheados (todos o los de un modelo)"""
+        with self._lock:
+            if prefijo is None:
+                self._valores.clear()
+                return
+            for clave in [c for c in self._valores if isinstance(c, tuple) and c and c[0] == prefijo]:
+                del self._valores[clave]
+
+
+# Instancia global compartida por los gestores
+contador_estimado = ContadorEstimado()
+
+
+def clave_conteo(modelo: str, filtros: Optional[Dict[str, Any]]) -> Tuple:
+    """Genera una clave hashable para ContadorEstimado a partir de los filtros"""
+    return (modelo, tuple(sorted((k, str(v)) for k, v in (filtros or {}).items())))
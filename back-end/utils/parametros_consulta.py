@@ -0,0 +1,17 @@
+"""
+Lectura de parámetros de consulta compartidos por varias rutas
+"""
+
+from typing import List
+
+from flask import request
+
+
+def obtener_etiquetas_query() -> List[str]:
+    """Lee ?etiqueta= repetida o separada por comas como lista"""
+    return [
+        etiqueta.strip()
+        for valor in request.args.getlist('etiqueta')
+        for etiqueta in valor.split(',')
+        if etiqueta.strip()
+    ]
@@ -1,6 +1,9 @@
 """
 Utilidades para respuestas estándar de la API
 Asegura que todas las respuestas tengan el mismo formato
+
+jsonify() usa el proveedor JSON de la app (utils/json_provider.py), así que
+los datos pueden llevar datetime, Decimal o Enum sin convertirlos antes.
 """
 
 from flask import jsonify
@@ -156,20 +159,26 @@ def server_error_response(mensaje: str = "Error interno del servidor") -> tuple:
 
 def paginated_response(
     items: List[Any],
-    total: int,
-    pagina: int,
+    total: Optional[int],
+    pagina: Optional[int],
     por_pagina: int,
-    mensaje: str = "Datos obtenidos exitosamente"
+    mensaje: str = "Datos obtenidos exitosamente",
+    next_cursor: Optional[str] = None
 ) -> tuple:
     """
     Respuesta paginada estándar
     
+    Soporta paginación por número de página y por cursor (keyset).
+    En modo cursor el total es opcional y tiene_siguiente se deduce
+    de next_cursor.
+    
     Args:
         items: Lista de items de la página actual
-        total: Total de items en la base de datos
-        pagina: Número de página actual
+        total: Total de items en la base de datos (None si no se calculó)
+        pagina: Número de página actual (None en modo cursor)
         por_pagina: Items por página
         mensaje: Mensaje de éxito
+        next_cursor: Cursor para pedir la página siguiente (modo cursor)
     
     Returns:
         Tupla (respuesta_json, codigo_http)
@@ -181,9 +190,32 @@ def paginated_response(
             pagina=1,
             por_pagina=20
         )
+        
+        # Modo cursor
+        return paginated_response(
+            items=lecciones,
+            total=None,
+            pagina=None,
+            por_pagina=20,
+            next_cursor=siguiente_cursor
+        )
     """
     import math
     
+    if pagina is None:
+        response = {
+            "success": True,
+            "mensaje": mensaje,
+            "data": items,
+            "paginacion": {
+                "por_pagina": por_pagina,
+                "total_items": total,
+                "next_cursor": next_cursor,
+                "tiene_siguiente": next_cursor is not None
+            }
+        }
+        return jsonify(response), 200
+    
     total_paginas = math.ceil(total / por_pagina) if por_pagina > 0 else 0
     
     response = {
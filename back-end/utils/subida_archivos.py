@@ -0,0 +1,142 @@
+"""
+Recepción de archivos subidos para SpeakLexi
+
+Copia el stream de la subida a un archivo temporal por bloques de tamaño
+fijo, calculando el SHA-256 y controlando el tamaño al mismo tiempo:
+nunca se carga el archivo completo en memoria y la copia se corta en
+cuanto se pasa del máximo.
+
+El temporal se crea en el mismo directorio de destino para que
+mover_a_destino() sea un os.replace() atómico (mismo sistema de archivos).
+
+Uso:
+    recibido = recibir_archivo(archivo.stream, directorio, tamano_maximo)
+    # o, para subidas por partes: ensamblar_partes([parte1, parte2, ...], directorio, tamano_maximo)
+    if ya_existe(recibido.sha256):
+        recibido.descartar()
+    else:
+        recibido.mover_a_destino(directorio / nombre)
+"""
+
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, List, Union
+
+TAMANO_BLOQUE = 64 * 1024  # 64 KB
+
+RutaArchivo = Union[str, os.PathLike]
+
+
+class ArchivoDemasiadoGrande(Exception):
+    """La subida superó el tamaño máximo permitido"""
+
+    def __init__(self, tamano_maximo: int):
+        self.tamano_maximo = tamano_maximo
+        super().__init__(f"El archivo supera el máximo de {tamano_maximo} bytes")
+
+
+@dataclass
+class ArchivoRecibido:
+    """Archivo temporal ya escrito en disco"""
+    ruta_temporal: str
+    tamano: int
+    sha256: str
+
+    def mover_a_destino(self, destino: RutaArchivo) -> str:
+        """Mueve el temporal a su ruta definitiva (atómico)"""
+        os.replace(self.ruta_temporal, destino)
+        return os.fspath(destino)
+
+    def descartar(self) -> None:
+        """Borra el temporal (p. ej. si el contenido ya existía)"""
+        try:
+            os.unlink(self.ruta_temporal)
+        except FileNotFoundError:
+            pass
+
+
+def recibir_archivo(
+    stream: BinaryIO,
+    directorio: RutaArchivo,
+    tamano_maximo: int,
+    tamano_bloque: int = TAMANO_BLOQUE
+) -> ArchivoRecibido:
+    """
+    Copia el stream a un temporal en `directorio` calculando su SHA-256.
+
+    Args:
+        stream: Stream binario de la subida (FileStorage.stream)
+        directorio: Directorio donde se dejará el archivo definitivo
+        tamano_maximo: Bytes permitidos; se corta al superarlos
+        tamano_bloque: Bytes leídos por iteración
+
+    Raises:
+        ArchivoDemasiadoGrande: Si el stream supera tamano_maximo
+                                (el temporal ya se ha borrado)
+    """
+    descriptor, ruta_temporal = tempfile.mkstemp(prefix='.subida-', suffix='.tmp', dir=directorio)
+    resumen = hashlib.sha256()
+    tamano = 0
+    try:
+        with os.fdopen(descriptor, 'wb') as destino:
+            while True:
+                bloque = stream.read(tamano_bloque)
+                if not bloque:
+                    break
+                tamano += len(bloque)
+                if tamano > tamano_maximo:
+                    raise ArchivoDemasiadoGrande(tamano_maximo)
+                resumen.update(bloque)
+                destino.write(bloque)
+    except BaseException:
+        try:
+            os.unlink(ruta_temporal)
+        except FileNotFoundError:
+            pass
+        raise
+
+    return ArchivoRecibido(ruta_temporal, tamano, resumen.hexdigest())
+
+
+class _LectorPartes:
+    """Stream de solo lectura que concatena varios archivos en orden"""
+
+    def __init__(self, rutas: List[RutaArchivo]):
+        self._pendientes = list(rutas)
+        self._actual = None
+
+    def read(self, tamano: int = -1) -> bytes:
+        while True:
+            if self._actual is None:
+                if not self._pendientes:
+                    return b''
+                self._actual = open(self._pendientes.pop(0), 'rb')
+            bloque = self._actual.read(tamano)
+            if bloque:
+                return bloque
+            self._actual.close()
+            self._actual = None
+
+    def close(self) -> None:
+        if self._actual is not None:
+            self._actual.close()
+            self._actual = None
+
+
+def ensamblar_partes(
+    rutas: List[RutaArchivo],
+    directorio: RutaArchivo,
+    tamano_maximo: int,
+    tamano_bloque: int = TAMANO_BLOQUE
+) -> ArchivoRecibido:
+    """
+    Une las partes de una subida reanudable en un temporal de `directorio`.
+    Igual que recibir_archivo: por bloques, con SHA-256 y límite de tamaño.
+    """
+    lector = _LectorPartes(rutas)
+    try:
+        return recibir_archivo(lector, directorio, tamano_maximo, tamano_bloque)
+    finally:
+        lector.close()
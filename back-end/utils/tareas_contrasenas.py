@@ -0,0 +1,45 @@
+"""
+Tareas que ejecutan los procesos del pool de services/hash_contrasenas.py
+
+Sin Flask ni BD: reciben la contraseña y el hash y devuelven el resultado.
+Los hashes son los de werkzeug.security ("metodo$sal$hash"), así que los
+antiguos (pbkdf2, scrypt con otros parámetros) se siguen verificando.
+"""
+
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+@lru_cache(maxsize=8)
+def parametros_de(metodo: str) -> str:
+    """
+    Forma completa de un método de werkzeug, como aparece al inicio del hash
+    ('scrypt' -> 'scrypt:32768:8:1', 'pbkdf2' -> 'pbkdf2:sha256:600000')
+    """
+    return generate_password_hash('', method=metodo, salt_length=1).split('$', 1)[0]
+
+
+def necesita_rehash(hash_actual: str, metodo: str) -> bool:
+    """True si el hash se generó con otros parámetros que los actuales"""
+    return hash_actual.split('$', 1)[0] != parametros_de(metodo)
+
+
+def generar_hash(password: str, metodo: str) -> str:
+    return generate_password_hash(password, method=metodo)
+
+
+def verificar_hash(hash_actual: str, password: str, metodo: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica la contraseña y, si es correcta pero el hash es de otros
+    parámetros, genera el nuevo en la misma tarea.
+
+    Returns:
+        (correcta, hash nuevo o None)
+    """
+    if not check_password_hash(hash_actual, password):
+        return False, None
+    if necesita_rehash(hash_actual, metodo):
+        return True, generar_hash(password, metodo)
+    return True, None
@@ -0,0 +1,33 @@
+"""
+Tareas que ejecutan los procesos del pool de services/procesador_multimedia.py
+
+Sin Flask ni BD: reciben rutas y parámetros y devuelven un dict que el
+proceso principal guarda en el registro Multimedia.
+"""
+
+from typing import Any, Dict, Optional
+
+from utils.hash_perceptual import calcular_dhash
+from utils.metadatos_multimedia import extraer_metadatos
+from utils.variantes_imagen import generar_variantes
+
+
+def procesar_archivo(ruta_origen: str, variantes: Optional[Dict[str, Any]] = None,
+                     hash_perceptual: bool = False) -> Dict[str, Any]:
+    """
+    Metadatos de cabecera y, si se piden, miniatura, variantes WebP y hash perceptual.
+
+    Args:
+        ruta_origen: Archivo a procesar
+        variantes: Argumentos de generar_variantes (sin ruta_origen) o None
+        hash_perceptual: Calcular el dHash de la imagen
+
+    Returns:
+        {'metadatos': {...}, 'variantes': {...} | None, 'hash_perceptual': str | None}
+    """
+    resultado = {'metadatos': extraer_metadatos(ruta_origen), 'variantes': None, 'hash_perceptual': None}
+    if variantes is not None:
+        resultado['variantes'] = generar_variantes(ruta_origen, **variantes)
+    if hash_perceptual:
+        resultado['hash_perceptual'] = calcular_dhash(ruta_origen)
+    return resultado
@@ -0,0 +1,217 @@
+"""
+URLs de multimedia firmadas con HMAC y caducidad - SpeakLexi
+
+    /media/<clave>?e=<expira>&s=<firma>
+
+    expira: timestamp Unix en que deja de valer
+    firma:  HMAC-SHA256(secreto, "<clave>:<expira>"), 128 bits en base64url
+
+La firma es la autorización: para servir el archivo basta con comprobarla,
+sin BD, sin sesión y sin JWT. MediosFirmados es un middleware WSGI que
+atiende /media/ antes de que la petición llegue a Flask; también puede
+ejecutarse como aplicación independiente (medios_wsgi.py) detrás de nginx,
+que con MULTIMEDIA_MODO_ENVIO = 'x-accel' solo recibe la cabecera y envía
+los bytes él mismo.
+
+La caducidad se redondea a ventanas (MULTIMEDIA_FIRMA_VENTANA): dentro de
+una ventana la misma clave produce la misma URL, así el navegador y las
+CDN pueden cachearla y el ETag de los listados sigue siendo estable.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, quote
+
+from werkzeug.wrappers import Response
+
+from utils.distribucion_archivos import PREFIJO_URL, rutas_candidatas
+from utils.envio_archivos import (
+    ArchivoNoEncontrado, MODO_PYTHON, X_ACCEL_PREFIJO_POR_DEFECTO, construir_respuesta
+)
+
+PREFIJO_FIRMADO_POR_DEFECTO = '/media/'
+DURACION_POR_DEFECTO = 3600
+VENTANA_POR_DEFECTO = 300
+CACHE_MAXIMO = 31536000
+
+
+def calcular_firma(secreto: bytes, clave: str, expira: int) -> str:
+    """Firma (base64url sin relleno) de una clave y su caducidad"""
+    mac = hmac.new(secreto, f"{clave}:{expira}".encode('utf-8'), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(mac[:16]).rstrip(b'=').decode('ascii')
+
+
+class FirmadorUrls:
+    """Firma y verifica URLs de /media/ (configurado con init_app)"""
+
+    def __init__(self, secreto=None, prefijo=PREFIJO_FIRMADO_POR_DEFECTO,
+                 duracion=DURACION_POR_DEFECTO, ventana=VENTANA_POR_DEFECTO):
+        self.configurar(secreto, prefijo, duracion, ventana)
+
+    def configurar(self, secreto=None, prefijo=PREFIJO_FIRMADO_POR_DEFECTO,
+                   duracion=DURACION_POR_DEFECTO, ventana=VENTANA_POR_DEFECTO):
+        self.secreto = secreto.encode('utf-8') if isinstance(secreto, str) else secreto
+        self.prefijo = '/' + prefijo.strip('/') + '/'
+        self.duracion = int(duracion)
+        self.ventana = max(1, int(ventana))
+
+    def init_app(self, app):
+        """
+        Configuración:
+            MULTIMEDIA_FIRMA_SECRETO (str): Clave HMAC (default: SECRET_KEY)
+            MULTIMEDIA_FIRMA_PREFIJO (str): Ruta de las URLs firmadas (default: /media/)
+            MULTIMEDIA_FIRMA_DURACION (int): Validez mínima en segundos (default: 3600)
+            MULTIMEDIA_FIRMA_VENTANA (int): Redondeo de la caducidad en segundos (default: 300)
+        """
+        self.configurar(
+            app.config.get('MULTIMEDIA_FIRMA_SECRETO') or app.config['SECRET_KEY'],
+            app.config.get('MULTIMEDIA_FIRMA_PREFIJO', PREFIJO_FIRMADO_POR_DEFECTO),
+            app.config.get('MULTIMEDIA_FIRMA_DURACION', DURACION_POR_DEFECTO),
+            app.config.get('MULTIMEDIA_FIRMA_VENTANA', VENTANA_POR_DEFECTO)
+        )
+
+    @property
+    def activo(self) -> bool:
+        return bool(self.secreto)
+
+    def periodo_actual(self, ahora: Optional[float] = None) -> int:
+        """Ventana en curso: cambia cuando cambian las URLs firmadas"""
+        return int(ahora if ahora is not None else time.time()) // self.ventana
+
+    def _expira(self, ahora: Optional[float] = None) -> int:
+        # Fin de la ventana actual + duración: al menos `duracion` segundos de validez
+        return (self.periodo_actual(ahora) + 1) * self.ventana + self.duracion
+
+    # ========== FIRMAR ==========
+
+    def firmar_clave(self, clave: str, ahora: Optional[float] = None) -> str:
+        """URL firmada de una clave de almacenamiento ('imagen/9f/86/x.png')"""
+        expira = self._expira(ahora)
+        firma = calcular_firma(self.secreto, clave, expira)
+        return f"{self.prefijo}{quote(clave)}?e={expira}&s={firma}"
+
+    def firmar_url(self, url: Optional[str], ahora: Optional[float] = None) -> Optional[str]:
+        """Firma una URL /uploads/multimedia/...; el resto se devuelve igual"""
+        if not url or not url.startswith(PREFIJO_URL) or not self.activo:
+            return url
+        return self.firmar_clave(url[len(PREFIJO_URL):], ahora)
+
+    def firmar_recurso(self, datos: Dict[str, Any], ahora: Optional[float] = None) -> Dict[str, Any]:
+        """Sustituye url, url_thumbnail y variantes de un Multimedia serializado"""
+        ahora = ahora if ahora is not None else time.time()
+        for campo in ('url', 'url_thumbnail'):
+            if datos.get(campo):
+                datos[campo] = self.firmar_url(datos[campo], ahora)
+        variantes = (datos.get('metadata') or {}).get('variantes')
+        if variantes:
+            datos['metadata'] = {
+                **datos['metadata'],
+                'variantes': {ancho: self.firmar_url(url, ahora) for ancho, url in variantes.items()}
+            }
+        return datos
+
+    # ========== VERIFICAR ==========
+
+    def verificar(self, clave: str, expira: str, firma: str, ahora: Optional[float] = None) -> Optional[int]:
+        """
+        Segundos de validez restantes si la firma es correcta y no ha
+        caducado; None en otro caso.
+        """
+        if not self.activo or not expira or not firma:
+            return None
+        try:
+            expira_ts = int(expira)
+        except ValueError:
+            return None
+        restante = expira_ts - int(ahora if ahora is not None else time.time())
+        if restante <= 0:
+            return None
+        if not hmac.compare_digest(calcular_firma(self.secreto, clave, expira_ts), firma):
+            return None
+        return restante
+
+
+class MediosFirmados:
+    """
+    Middleware WSGI que sirve las URLs firmadas sin pasar por Flask.
+
+    Args:
+        aplicacion: App WSGI para el resto de rutas (None = 404)
+        firmador: FirmadorUrls configurado
+        ruta_base: Carpeta de almacenamiento (se lee una vez al arrancar)
+        niveles: Niveles de subcarpetas, para encontrar también la ruta plana
+        modo: python | x-accel | x-sendfile (utils/envio_archivos.py)
+        prefijo_x_accel: Prefijo interno de nginx para 'x-accel'
+        almacenamiento: Backend remoto (S3): se redirige a su URL prefirmada
+    """
+
+    def __init__(self, aplicacion, firmador, ruta_base, niveles=0, modo=MODO_PYTHON,
+                 prefijo_x_accel=X_ACCEL_PREFIJO_POR_DEFECTO, almacenamiento=None):
+        self.aplicacion = aplicacion
+        self.firmador = firmador
+        self.ruta_base = ruta_base
+        self.niveles = niveles
+        self.modo = modo
+        self.prefijo_x_accel = prefijo_x_accel
+        self.almacenamiento = almacenamiento
+
+    def __call__(self, environ, start_response):
+        ruta = environ.get('PATH_INFO', '')
+        if not ruta.startswith(self.firmador.prefijo):
+            if self.aplicacion is None:
+                return self._error(404, "Archivo no encontrado")(environ, start_response)
+            return self.aplicacion(environ, start_response)
+        return self._servir(environ, ruta[len(self.firmador.prefijo):])(environ, start_response)
+
+    def _servir(self, environ, clave):
+        if environ.get('REQUEST_METHOD') not in ('GET', 'HEAD'):
+            return self._error(405, "Método no permitido")
+
+        parametros = parse_qs(environ.get('QUERY_STRING', ''))
+        restante = self.firmador.verificar(
+            clave,
+            (parametros.get('e') or [''])[0],
+            (parametros.get('s') or [''])[0]
+        )
+        if restante is None:
+            return self._error(403, "URL no válida o caducada")
+
+        # Cacheable hasta que caduca la firma (nunca más allá)
+        cache_control = f"private, max-age={min(restante, CACHE_MAXIMO)}"
+
+        if self.almacenamiento is not None and not self.almacenamiento.es_local:
+            try:
+                destino = self.almacenamiento.url_firmada(clave, restante)
+            except ValueError:
+                return self._error(404, "Archivo no encontrado")
+            respuesta = Response(status=302, headers={'Location': destino})
+            respuesta.headers['Cache-Control'] = cache_control
+            return respuesta
+
+        for candidata in rutas_candidatas(clave, self.niveles):
+            try:
+                return construir_respuesta(
+                    environ, self.ruta_base, candidata,
+                    modo=self.modo,
+                    prefijo_x_accel=self.prefijo_x_accel,
+                    cache_control=cache_control
+                )
+            except ArchivoNoEncontrado:
+                continue
+        return self._error(404, "Archivo no encontrado")
+
+    @staticmethod
+    def _error(codigo, mensaje):
+        return Response(
+            json.dumps({"error": mensaje}, ensure_ascii=False),
+            status=codigo,
+            mimetype='application/json'
+        )
+
+
+# Instancia global del firmador
+firmador_urls = FirmadorUrls()
@@ -0,0 +1,355 @@
+"""
+Usuario actual de las rutas con JWT - SpeakLexi
+
+Resuelve el usuario del token una sola vez por petición y lo comparte:
+
+    1. flask.g: la misma petición nunca lo vuelve a buscar (el
+       user_lookup_loader de app.py, los decoradores y la vista leen lo mismo)
+    2. Claims del access token (rol, estado_cuenta, correo_verificado y
+       `ver`, firmados en /api/auth/login): si la versión sigue vigente no
+       hace falta nada más
+    3. LRU en memoria con TTL corto (USUARIO_CACHE_TTL, 30 s por defecto),
+       para tokens emitidos antes de los claims
+    4. BD: una consulta de 5 columnas, sin cargar el modelo completo
+
+Se guarda un UsuarioSesion, no la instancia de SQLAlchemy, que no puede
+sobrevivir a la sesión de una petición. Las comprobaciones de rol usan
+solo eso; si la vista necesita más datos del usuario los carga ella.
+
+Al cambiar rol, estado_cuenta o correo_verificado, o al restablecer la
+contraseña (revocar_sesiones), sube Usuario.version_token. Los tokens
+con una versión anterior dejan de valer, también los refresh tokens, que
+llevan `ver` sin los demás claims (401 TOKEN_DESACTUALIZADO; hay que
+volver a iniciar sesión): en este proceso al hacer commit, en otros
+workers al sincronizar VersionesToken (JWT_VERSIONES_INTERVALO, 30 s por
+defecto), que solo lee los usuarios con version_token > 0 modificados
+desde la última vez.
+
+Uso:
+    access_token = create_access_token(
+        identity=str(usuario_id), additional_claims=claims_para_token(usuario_id)
+    )
+
+    @curso_bp.route('/', methods=['POST'])
+    @jwt_required()
+    def crear_curso():
+        usuario = obtener_usuario_actual()
+        if not usuario.tiene_rol('admin', 'profesor'):
+            return jsonify({...}), 403
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import NamedTuple, Optional
+
+from flask import g, has_app_context
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from models.usuario import Usuario
+
+TTL_POR_DEFECTO = 30  # segundos
+MAXIMO_POR_DEFECTO = 4096
+INTERVALO_VERSIONES = 30  # segundos
+CAMPOS_SESION = ('rol', 'estado_cuenta', 'correo_verificado')
+CLAIM_VERSION = 'ver'
+_VERSIONES_PENDIENTES = 'versiones_token'  # Clave en Session.info hasta el commit
+
+
+class UsuarioSesion(NamedTuple):
+    """Lo que necesitan las comprobaciones de permisos"""
+    id: int
+    rol: str
+    estado_cuenta: str
+    correo_verificado: bool
+    version_token: int = 0
+
+    @property
+    def activo(self) -> bool:
+        return self.estado_cuenta == 'activo'
+
+    def tiene_rol(self, *roles: str) -> bool:
+        """True si la cuenta está activa y su rol es uno de `roles`"""
+        return self.activo and self.rol in roles
+
+
+class CacheUsuarios:
+    """LRU con caducidad de UsuarioSesion por id (seguro entre hilos)"""
+
+    def __init__(self, ttl: float = TTL_POR_DEFECTO, maximo: int = MAXIMO_POR_DEFECTO):
+        self.ttl = ttl
+        self.maximo = maximo
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # id -> (caduca, UsuarioSesion)
+
+    def init_app(self, app):
+        """
+        Configuración:
+            USUARIO_CACHE_TTL (int): Segundos que vale una entrada; 0 desactiva (default: 30)
+            USUARIO_CACHE_MAXIMO (int): Usuarios en memoria (default: 4096)
+        """
+        self.ttl = float(app.config.get('USUARIO_CACHE_TTL', TTL_POR_DEFECTO))
+        self.maximo = int(app.config.get('USUARIO_CACHE_MAXIMO', MAXIMO_POR_DEFECTO))
+        self.limpiar()
+
+    def obtener(self, usuario_id: int) -> Optional[UsuarioSesion]:
+        with self._lock:
+            entrada = self._entradas.get(usuario_id)
+            if entrada is None:
+                return None
+            if entrada[0] <= time.monotonic():
+                del self._entradas[usuario_id]
+                return None
+            self._entradas.move_to_end(usuario_id)
+            return entrada[1]
+
+    def guardar(self, usuario: UsuarioSesion) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entradas[usuario.id] = (time.monotonic() + self.ttl, usuario)
+            self._entradas.move_to_end(usuario.id)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, usuario_id: int) -> None:
+        with self._lock:
+            self._entradas.pop(usuario_id, None)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+
+# Instancia global de la caché
+cache_usuarios = CacheUsuarios()
+
+
+class VersionesToken:
+    """
+    Última version_token de los usuarios a los que alguna vez se les ha
+    subido (la gran mayoría sigue en 0 y no ocupa nada).
+    """
+
+    def __init__(self, intervalo: float = INTERVALO_VERSIONES):
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._versiones = {}
+        self._cargado = False
+        self._marca = None  # Mayor actualizado_en visto
+        self._siguiente_sincronizacion = 0.0
+
+    def init_app(self, app):
+        """
+        Configuración:
+            JWT_VERSIONES_INTERVALO (int): Segundos entre lecturas de las versiones
+                cambiadas en otros workers (default: 30)
+        """
+        self.intervalo = float(app.config.get('JWT_VERSIONES_INTERVALO', INTERVALO_VERSIONES))
+        self.limpiar()
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._versiones = {}
+            self._cargado = False
+            self._marca = None
+
+    def _anotar(self, usuario_id: int, version: int) -> None:
+        if version > self._versiones.get(usuario_id, 0):
+            self._versiones[usuario_id] = version
+
+    def anotar(self, usuario_id: int, version: int) -> None:
+        with self._lock:
+            self._anotar(usuario_id, version)
+
+    def _sincronizar(self):
+        ahora = time.monotonic()
+        if self._cargado and ahora < self._siguiente_sincronizacion:
+            return
+
+        consulta = db.session.query(
+            Usuario.id, Usuario.version_token, Usuario.actualizado_en
+        ).filter(Usuario.version_token > 0)
+        if not self._cargado:
+            # La marca se toma antes de leer: lo que cambie mientras entra en la siguiente
+            self._marca = db.session.query(db.func.max(Usuario.actualizado_en)).scalar()
+        elif self._marca is not None:
+            # >= y un segundo de margen: fechas iguales o con redondeo de la BD
+            consulta = consulta.filter(Usuario.actualizado_en >= self._marca - timedelta(seconds=1))
+
+        for usuario_id, version, actualizado_en in consulta.execution_options(yield_per=5000):
+            self._anotar(usuario_id, version)
+            if actualizado_en and (self._marca is None or actualizado_en > self._marca):
+                self._marca = actualizado_en
+
+        self._cargado = True
+        self._siguiente_sincronizacion = ahora + self.intervalo
+
+    def vigente(self, usuario_id: int, version: int) -> bool:
+        """True si un token con esta versión sigue valiendo"""
+        with self._lock:
+            self._sincronizar()
+            return version >= self._versiones.get(usuario_id, 0)
+
+
+# Instancia global de las versiones
+versiones_token = VersionesToken()
+
+
+# ========== RESOLUCIÓN ==========
+
+def _cargar(usuario_id: int) -> Optional[UsuarioSesion]:
+    fila = db.session.query(
+        Usuario.id, Usuario.rol, Usuario.estado_cuenta, Usuario.correo_verificado,
+        Usuario.version_token
+    ).filter(Usuario.id == usuario_id).first()
+    if fila is None:
+        return None
+    return UsuarioSesion(
+        fila.id, fila.rol, fila.estado_cuenta, bool(fila.correo_verificado), fila.version_token or 0
+    )
+
+
+def resolver_usuario(usuario_id: int) -> Optional[UsuarioSesion]:
+    """UsuarioSesion por id: g -> LRU -> BD (None si no existe)"""
+    en_peticion = g.get('_usuario_actual')
+    if en_peticion is not None and en_peticion.id == usuario_id:
+        return en_peticion
+
+    usuario = cache_usuarios.obtener(usuario_id)
+    if usuario is None:
+        usuario = _cargar(usuario_id)
+        if usuario is not None:
+            cache_usuarios.guardar(usuario)
+    if usuario is not None:
+        g._usuario_actual = usuario
+    return usuario
+
+
+def claims_para_token(usuario_id: int) -> dict:
+    """
+    Claims del access token (create_access_token(additional_claims=...)).
+    Se leen de la BD, no de la caché: el token dura más que el TTL.
+    """
+    usuario = _cargar(usuario_id)
+    if usuario is None:
+        return {}
+    cache_usuarios.guardar(usuario)
+    return {
+        'rol': usuario.rol,
+        'estado_cuenta': usuario.estado_cuenta,
+        'correo_verificado': usuario.correo_verificado,
+        CLAIM_VERSION: usuario.version_token,
+    }
+
+
+def usuario_de_token(jwt_data: dict) -> Optional[UsuarioSesion]:
+    """
+    UsuarioSesion de un JWT decodificado: de sus claims si la versión
+    sigue vigente (sin BD), con resolver_usuario si es un token sin claims.
+    None si el usuario no existe o el token es de una versión anterior.
+    """
+    try:
+        usuario_id = int(jwt_data['sub'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    en_peticion = g.get('_usuario_actual')
+    if en_peticion is not None and en_peticion.id == usuario_id:
+        return en_peticion
+
+    version = jwt_data.get(CLAIM_VERSION)
+    if jwt_data.get('type') == 'refresh':
+        # Solo la versión (sin ella, 0: los anteriores a `ver` caen al primer cambio)
+        if not versiones_token.vigente(usuario_id, version or 0):
+            return None
+        return resolver_usuario(usuario_id)
+    if version is None:
+        return resolver_usuario(usuario_id)
+    if not versiones_token.vigente(usuario_id, version):
+        return None
+
+    usuario = UsuarioSesion(
+        usuario_id, jwt_data.get('rol'), jwt_data.get('estado_cuenta'),
+        bool(jwt_data.get('correo_verificado')), version
+    )
+    g._usuario_actual = usuario
+    return usuario
+
+
+def usuario_actual_id() -> Optional[int]:
+    """Id del token como int (el `sub` del JWT es un str)"""
+    identidad = get_jwt_identity()
+    try:
+        return int(identidad) if identidad is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def obtener_usuario_actual() -> Optional[UsuarioSesion]:
+    """Usuario del JWT de la petición (requiere jwt_required antes)"""
+    return usuario_de_token(get_jwt())
+
+
+# ========== INVALIDACIÓN ==========
+
+def revocar_sesiones(usuario) -> None:
+    """
+    Invalida todos los tokens del usuario, access y refresh, al hacer
+    commit (p. ej. al restablecer la contraseña)
+    """
+    usuario.version_token = (usuario.version_token or 0) + 1
+
+
+def _cambia_sesion(usuario) -> bool:
+    estado = inspect(usuario)
+    return any(estado.attrs[campo].history.has_changes() for campo in CAMPOS_SESION)
+
+
+def _cambia_version(usuario) -> bool:
+    return inspect(usuario).attrs.version_token.history.has_changes()
+
+
+def _anotar_al_confirmar(usuario, version):
+    # La versión solo se da por buena si el commit llega: tras un rollback
+    # la BD sigue con la anterior y los tokens nuevos no deben rechazarse
+    sesion = object_session(usuario)
+    if sesion is not None:
+        sesion.info.setdefault(_VERSIONES_PENDIENTES, {})[usuario.id] = version
+
+
+@event.listens_for(Usuario, 'before_update')
+def _subir_version(mapper, connection, usuario):
+    if _cambia_sesion(usuario):
+        usuario.version_token = (usuario.version_token or 0) + 1
+
+
+@event.listens_for(Usuario, 'after_update')
+def _usuario_actualizado(mapper, connection, usuario):
+    if _cambia_sesion(usuario) or _cambia_version(usuario):
+        cache_usuarios.invalidar(usuario.id)
+        _anotar_al_confirmar(usuario, usuario.version_token)
+        if has_app_context() and getattr(g.get('_usuario_actual'), 'id', None) == usuario.id:
+            g.pop('_usuario_actual')
+
+
+@event.listens_for(Usuario, 'after_delete')
+def _usuario_borrado(mapper, connection, usuario):
+    cache_usuarios.invalidar(usuario.id)
+    # Ningún token del usuario borrado vale ya (en otros workers, hasta que caduque)
+    _anotar_al_confirmar(usuario, float('inf'))
+
+
+@event.listens_for(Session, 'after_commit')
+def _aplicar_versiones(sesion):
+    for usuario_id, version in sesion.info.pop(_VERSIONES_PENDIENTES, {}).items():
+        versiones_token.anotar(usuario_id, version)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_versiones(sesion):
+    sesion.info.pop(_VERSIONES_PENDIENTES, None)
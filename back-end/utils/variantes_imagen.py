@@ -0,0 +1,105 @@
+"""
+Generación de miniaturas y variantes WebP de imágenes - SpeakLexi
+
+Funciones puras (sin Flask ni BD) para ejecutarse en los procesos del
+pool de services/procesador_multimedia.py. Requiere Pillow, que es
+opcional: sin él, PILLOW_DISPONIBLE es False y no se procesa nada.
+
+Las salidas se nombran con el SHA-256 del original, así que un archivo
+deduplicado (varios registros, un solo archivo) se procesa una vez y las
+siguientes llamadas reutilizan lo que ya existe en disco.
+"""
+
+import os
+from typing import Dict, Iterable, Optional
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow es opcional
+    Image = None
+    ImageOps = None
+
+PILLOW_DISPONIBLE = Image is not None
+
+
+def _guardar_webp(imagen, destino: str, calidad: int) -> None:
+    # Escribir en temporal y renombrar: nunca queda una variante a medias
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    imagen.save(temporal, 'WEBP', quality=calidad, method=4)
+    os.replace(temporal, destino)
+
+
+def generar_variantes(
+    ruta_origen: str,
+    directorio_destino: str,
+    nombre_base: str,
+    tamano_miniatura: tuple = (300, 300),
+    anchos: Iterable[int] = (320, 640, 1280),
+    calidad: int = 85
+) -> Dict[str, object]:
+    """
+    Genera la miniatura y las variantes WebP de una imagen.
+
+    Args:
+        ruta_origen: Imagen original
+        directorio_destino: Carpeta de salida (p. ej. .../multimedia/thumbnails)
+        nombre_base: Prefijo de los archivos generados (SHA-256 del original)
+        tamano_miniatura: Caja (ancho, alto) en la que cabe la miniatura
+        anchos: Anchos de las variantes responsive (no se amplía la imagen)
+        calidad: Calidad WebP (0-100)
+
+    Returns:
+        {'dimensiones': {'ancho', 'alto'}, 'miniatura': nombre,
+         'variantes': {'ancho': nombre}} con nombres relativos a directorio_destino
+
+    Raises:
+        RuntimeError: Si Pillow no está instalado
+    """
+    if not PILLOW_DISPONIBLE:
+        raise RuntimeError("Pillow no está instalado")
+
+    os.makedirs(directorio_destino, exist_ok=True)
+
+    with Image.open(ruta_origen) as original:
+        # Respetar la orientación EXIF de las fotos de móvil
+        imagen = ImageOps.exif_transpose(original)
+        if imagen.mode not in ('RGB', 'RGBA'):
+            imagen = imagen.convert('RGBA' if 'A' in imagen.getbands() else 'RGB')
+        ancho, alto = imagen.size
+
+        resultado = {
+            'dimensiones': {'ancho': ancho, 'alto': alto},
+            'miniatura': None,
+            'variantes': {}
+        }
+
+        nombre_miniatura = f"{nombre_base}_miniatura.webp"
+        destino = os.path.join(directorio_destino, nombre_miniatura)
+        if not os.path.exists(destino):
+            miniatura = imagen.copy()
+            miniatura.thumbnail(tamano_miniatura, Image.LANCZOS)
+            _guardar_webp(miniatura, destino, calidad)
+        resultado['miniatura'] = nombre_miniatura
+
+        for ancho_variante in sorted(set(int(a) for a in anchos)):
+            if ancho_variante >= ancho:
+                continue
+            nombre_variante = f"{nombre_base}_w{ancho_variante}.webp"
+            destino = os.path.join(directorio_destino, nombre_variante)
+            if not os.path.exists(destino):
+                alto_variante = max(1, round(alto * ancho_variante / ancho))
+                variante = imagen.resize((ancho_variante, alto_variante), Image.LANCZOS)
+                _guardar_webp(variante, destino, calidad)
+            resultado['variantes'][str(ancho_variante)] = nombre_variante
+
+    return resultado
+
+
+def anchos_desde_texto(texto: Optional[str]) -> tuple:
+    """'320,640,1280' -> (320, 640, 1280), ignorando valores no válidos"""
+    anchos = []
+    for parte in (texto or '').split(','):
+        parte = parte.strip()
+        if parte.isdigit() and int(parte) > 0:
+            anchos.append(int(parte))
+    return tuple(anchos)